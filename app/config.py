@@ -15,11 +15,77 @@ class Settings(BaseSettings):
     DB_NAME: str = "credigestor_db"
     DB_SSLMODE: str = "require"  # Padrão 'require' para funcionar com Neon
 
+    # Pool de conexões (vale para o engine síncrono e para o assíncrono)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_PRE_PING: bool = True
+    # Responde 503 quando a espera estimada por conexão passar disso (0 desativa)
+    DB_POOL_WAIT_BUDGET_MS: int = 2000
+
+    # Réplica de leitura (opcional). URL SQLAlchemy completa; sem ela as
+    # leituras pesadas (relatórios, dashboard, exportações) usam o primário.
+    DB_REPLICA_URL: Optional[str] = None
+    # Atraso máximo aceito antes de voltar a ler do primário
+    DB_REPLICA_MAX_LAG_SECONDS: int = 30
+    DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS: int = 5
+
+    # Estatísticas de SQL por requisição (Server-Timing + log) e aviso de
+    # N+1 quando o mesmo statement se repete essa quantidade de vezes
+    SQL_STATS_ENABLED: bool = True
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5
+
+    # Autocomplete de clientes em memória (opcional por deployment: custa
+    # ~335 MiB e ~9,5 s de carga por worker a cada milhão de clientes). A
+    # carga roda em segundo plano; até terminar, ou desligado, o autocomplete
+    # usa a busca no banco. O mesmo laço busca as alterações feitas por
+    # outros workers (updated_at) a cada RECONCILE_SECONDS
+    CUSTOMER_AUTOCOMPLETE_ENABLED: bool = False
+    CUSTOMER_AUTOCOMPLETE_RECONCILE_SECONDS: int = 30
+
     # Segurança
     JWT_SECRET: str = "credigestor"
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRATION_HOURS: int = 24
 
+    # Cache de usuários autenticados (0 desativa). O TTL é o tempo máximo
+    # que um usuário desativado ainda pode ser aceito por outros workers.
+    AUTH_CACHE_TTL_SECONDS: int = 30
+    AUTH_CACHE_MAX_ENTRIES: int = 1024
+    # Intervalo para notar restaurações feitas por outros workers e esvaziar
+    # o cache (0 desativa; sobra o TTL)
+    AUTH_CACHE_RESTORE_CHECK_SECONDS: int = 5
+
+    # Threads dedicadas ao bcrypt (login, criação e reset de senha)
+    PASSWORD_HASH_WORKERS: int = 2
+
+    # Rate limiting: "memory" (por processo) ou "database" (compartilhado
+    # entre workers via tabela no PostgreSQL)
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    LOGIN_RATE_LIMIT_ATTEMPTS: int = 10
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS: int = 300
+    EXPORT_RATE_LIMIT_ATTEMPTS: int = 5
+    EXPORT_RATE_LIMIT_WINDOW_SECONDS: int = 60
+    # Proxies reversos confiáveis (IPs separados por vírgula ou "*"): deles o
+    # X-Forwarded-For vale como IP do cliente. Vazio: usa o IP da conexão
+    FORWARDED_ALLOW_IPS: str = ""
+
+    # Conexões copiando tabelas em paralelo durante o backup (além da
+    # conexão que segura o snapshot) e a restauração
+    BACKUP_WORKERS: int = 4
+    # Backup incremental: volta esse tanto antes do watermark anterior, para
+    # pegar transações que gravaram updated_at antes do snapshot mas só
+    # fizeram commit depois dele (a restauração é idempotente)
+    BACKUP_WATERMARK_OVERLAP_SECONDS: int = 300
+
+    # Job que marca como overdue as promissórias vencidas (pending e
+    # partial_payment com due_date no passado); a primeira execução é no
+    # startup. Com vários workers, só um executa por vez (advisory lock)
+    OVERDUE_JOB_ENABLED: bool = True
+    OVERDUE_JOB_INTERVAL_SECONDS: int = 3600
+    OVERDUE_JOB_BATCH_SIZE: int = 5000
+
     # E-mail (Opcional)
     SMTP_HOST: str = "localhost"
     SMTP_PORT: int = 1025
@@ -46,6 +112,21 @@ class Settings(BaseSettings):
         """URL para uso com asyncpg se necessário"""
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}?sslmode={self.DB_SSLMODE}"
 
+    @property
+    def DATABASE_REPLICA_URL_ASYNC(self) -> Optional[str]:
+        """URL da réplica com o driver assíncrono equivalente"""
+        if not self.DB_REPLICA_URL:
+            return None
+        for sync_prefix, async_prefix in (
+            ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+            ("postgresql://", "postgresql+asyncpg://"),
+            ("sqlite+pysqlite://", "sqlite+aiosqlite://"),
+            ("sqlite://", "sqlite+aiosqlite://"),
+        ):
+            if self.DB_REPLICA_URL.startswith(sync_prefix):
+                return async_prefix + self.DB_REPLICA_URL[len(sync_prefix):]
+        return self.DB_REPLICA_URL
+
     @property
     def is_development(self) -> bool:
         return self.APP_ENV == "development"
@@ -1,21 +1,148 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.config import settings
+from app.utils import pool_metrics
+from app.utils.replica_lag import ReplicaLagMonitor
+
+_pool_kwargs = dict(
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+)
+
+primary_pool_metrics = pool_metrics.register(
+    "primary",
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+)
 
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+    poolclass=primary_pool_metrics.pool_class(QueuePool),
     echo=settings.is_development,
+    **_pool_kwargs,
 )
+primary_pool_metrics.attach(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _async_url_and_connect_args(async_url: str = settings.DATABASE_URL_ASYNC):
+    """
+    asyncpg não entende o parâmetro sslmode da URL: ele vira connect_args.
+    """
+    url = make_url(async_url)
+    sslmode = url.query.get("sslmode")
+    url = url.difference_update_query(["sslmode"])
+    connect_args = {"ssl": sslmode} if sslmode and sslmode != "disable" else {}
+    return url, connect_args
+
+
+_async_url, _async_connect_args = _async_url_and_connect_args()
+
+primary_async_pool_metrics = pool_metrics.register(
+    "primary_async",
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+)
+
+# Engine assíncrono (asyncpg) usado pelas rotas de leitura mais acessadas.
+# O engine síncrono continua sendo o padrão para as demais rotas e scripts.
+async_engine = create_async_engine(
+    _async_url,
+    connect_args=_async_connect_args,
+    poolclass=primary_async_pool_metrics.pool_class(AsyncAdaptedQueuePool),
+    echo=settings.is_development,
+    **_pool_kwargs,
+)
+primary_async_pool_metrics.attach(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Réplica de leitura (opcional): relatórios, dashboard, exportações e
+# backups leem dela enquanto o atraso estiver dentro do limite.
+replica_engine = None
+ReplicaSessionLocal = None
+async_replica_engine = None
+AsyncReplicaSessionLocal = None
+replica_monitor = None
+
+if settings.DB_REPLICA_URL:
+    replica_pool_metrics = pool_metrics.register(
+        "replica",
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        # réplica saturada não deve recusar requisições que usam o primário
+        sheds_load=False,
+    )
+    replica_engine = create_engine(
+        settings.DB_REPLICA_URL,
+        poolclass=replica_pool_metrics.pool_class(QueuePool),
+        echo=settings.is_development,
+        **_pool_kwargs,
+    )
+    replica_pool_metrics.attach(replica_engine)
+    ReplicaSessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, bind=replica_engine
+    )
+
+    _replica_async_url, _replica_async_connect_args = _async_url_and_connect_args(
+        settings.DATABASE_REPLICA_URL_ASYNC
+    )
+    replica_async_pool_metrics = pool_metrics.register(
+        "replica_async",
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        sheds_load=False,
+    )
+    async_replica_engine = create_async_engine(
+        _replica_async_url,
+        connect_args=_replica_async_connect_args,
+        poolclass=replica_async_pool_metrics.pool_class(AsyncAdaptedQueuePool),
+        echo=settings.is_development,
+        **_pool_kwargs,
+    )
+    replica_async_pool_metrics.attach(async_replica_engine.sync_engine)
+    AsyncReplicaSessionLocal = async_sessionmaker(
+        bind=async_replica_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+    replica_monitor = ReplicaLagMonitor(
+        replica_engine,
+        max_lag_seconds=settings.DB_REPLICA_MAX_LAG_SECONDS,
+        check_interval_seconds=settings.DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS,
+    )
+
+# Cabeçalho para ler do primário (read-your-writes logo após uma escrita)
+CONSISTENCY_HEADER = "X-Consistency"
+
 Base = declarative_base()
 
 
+@event.listens_for(Engine, "connect")
+def _sqlite_foreign_keys(dbapi_connection, connection_record) -> None:
+    """
+    SQLite (testes, benchmarks) só aplica as FKs, e com elas o ON DELETE
+    CASCADE, com o pragma ligado em cada conexão.
+    """
+    if "sqlite" in type(dbapi_connection).__module__:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
 def get_db():
     """
     Dependency para obter sessão do banco de dados.
@@ -26,3 +153,60 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Dependency para obter sessão assíncrona do banco de dados.
+    Usado nos endpoints async def.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _wants_primary(request: Request | None) -> bool:
+    if request is None:
+        return False
+    return request.headers.get(CONSISTENCY_HEADER, "").lower() == "primary"
+
+
+def use_replica(request: Request | None = None) -> bool:
+    """Réplica configurada, dentro do limite de atraso e não fixada no primário."""
+    if replica_monitor is None or _wants_primary(request):
+        return False
+    return replica_monitor.is_fresh()
+
+
+def get_read_engine(request: Request | None = None):
+    """
+    Engine para leituras pesadas fora de uma sessão (ex.: backup). Como em
+    get_read_db, X-Consistency: primary força o primário.
+    """
+    return replica_engine if use_replica(request) else engine
+
+
+def get_read_db(request: Request):
+    """
+    Dependency de leitura: usa a réplica quando disponível e atualizada,
+    senão o primário. Envie X-Consistency: primary para forçar o primário.
+    """
+    factory = ReplicaSessionLocal if use_replica(request) else SessionLocal
+    db = factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    """Versão assíncrona de get_read_db."""
+    replica = False
+    if replica_monitor is not None and not _wants_primary(request):
+        # a medição do atraso é síncrona: só sai do event loop quando vence
+        if replica_monitor.needs_check():
+            await run_in_threadpool(replica_monitor.refresh)
+        replica = replica_monitor.is_fresh()
+
+    factory = AsyncReplicaSessionLocal if replica else AsyncSessionLocal
+    async with factory() as db:
+        yield db
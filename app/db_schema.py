@@ -0,0 +1,231 @@
+"""
+Versionamento do schema do banco.
+
+O startup faz uma única consulta barata (SELECT na tabela schema_version).
+Se a versão gravada for a atual, nenhum DDL roda. Caso contrário,
+ensure_schema cria as tabelas que faltam (create_all com checkfirst) e
+aplica as migrações pendentes (MIGRATIONS) em ordem, gravando a nova
+versão na mesma transação.
+
+Para alterar o schema: incremente SCHEMA_VERSION e registre em MIGRATIONS
+uma função idempotente (ex.: CREATE INDEX IF NOT EXISTS), porque bancos
+anteriores ao versionamento executam todas as migrações.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Callable, Optional
+
+from sqlalchemy import Column, Integer, MetaData, Table, bindparam, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import AddConstraint
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 10
+
+# chave do advisory lock que serializa o DDL entre workers (PostgreSQL)
+SCHEMA_LOCK_KEY = 7_351_001
+
+
+def _v2_query_indexes(conn: Connection) -> None:
+    """Índices compostos/parciais para os formatos reais das consultas."""
+    from app.models import Payment, PromissoryNote, Sale
+
+    names = {
+        "ix_promissory_notes_open_due",
+        "uq_promissory_notes_sale_installment",
+        "ix_sales_created_at_id",
+        "ix_payments_payment_date",
+    }
+    for table in (PromissoryNote.__table__, Sale.__table__, Payment.__table__):
+        for index in table.indexes:
+            if index.name in names:
+                index.create(bind=conn, checkfirst=True)
+
+    # coberto pela coluna líder de uq_promissory_notes_sale_installment
+    conn.execute(text("DROP INDEX IF EXISTS ix_promissory_notes_sale_id"))
+
+
+def _v3_customer_search(conn: Connection) -> None:
+    """Coluna normalizada de busca de clientes + índice de trigramas."""
+    from app.models.customer import Customer, build_search_text
+
+    columns = {c["name"] for c in inspect(conn).get_columns("customers")}
+    if "search_text" not in columns:
+        conn.execute(
+            text("ALTER TABLE customers ADD COLUMN search_text TEXT NOT NULL DEFAULT ''")
+        )
+
+    table = Customer.__table__
+    rows = conn.execute(
+        select(table.c.id, table.c.full_name, table.c.cpf, table.c.phone).where(
+            table.c.search_text == ""
+        )
+    ).all()
+    if rows:
+        conn.execute(
+            table.update()
+            .where(table.c.id == bindparam("row_id"))
+            .values(search_text=bindparam("value")),
+            [
+                {"row_id": r.id, "value": build_search_text(r.full_name, r.cpf, r.phone)}
+                for r in rows
+            ],
+        )
+
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for index in table.indexes:
+            if index.name == "ix_customers_search_trgm":
+                index.create(bind=conn, checkfirst=True)
+
+
+def _v4_note_listing_keyset(conn: Connection) -> None:
+    """Índice (due_date, id) para a listagem de promissórias por cursor."""
+    from app.models import PromissoryNote
+
+    for index in PromissoryNote.__table__.indexes:
+        if index.name == "ix_promissory_notes_due_date_id":
+            index.create(bind=conn, checkfirst=True)
+
+    # coberto pela coluna líder do índice composto
+    conn.execute(text("DROP INDEX IF EXISTS ix_promissory_notes_due_date"))
+
+
+def _v5_backup_tracking(conn: Connection) -> None:
+    """Tombstones (deleted_rows) e cadeia de backups para o backup incremental."""
+    from app.models.backup import install_tombstone_triggers
+
+    # backup_runs e deleted_rows já saem do create_all; os triggers também,
+    # mas são refeitos aqui para bancos em que as tabelas já existiam
+    install_tombstone_triggers(conn)
+
+
+def _v6_cascading_deletes(conn: Connection) -> None:
+    """FKs de promissórias e pagamentos com ON DELETE CASCADE."""
+    # SQLite não altera constraints; lá o CASCADE vem do create_all
+    if conn.dialect.name != "postgresql":
+        return
+
+    from app.models import Payment, PromissoryNote
+
+    inspector = inspect(conn)
+    for table in (PromissoryNote.__table__, Payment.__table__):
+        existing = {
+            tuple(fk["constrained_columns"]): fk
+            for fk in inspector.get_foreign_keys(table.name)
+        }
+        for constraint in table.foreign_key_constraints:
+            if constraint.ondelete != "CASCADE":
+                continue
+            found = existing.get(tuple(constraint.column_keys))
+            if found is not None:
+                if (found["options"].get("ondelete") or "").upper() == "CASCADE":
+                    continue
+                conn.execute(
+                    text(f'ALTER TABLE "{table.name}" DROP CONSTRAINT "{found["name"]}"')
+                )
+            conn.execute(AddConstraint(constraint))
+
+
+def _v7_overdue_candidates(conn: Connection) -> None:
+    """Índice parcial das parcelas que o job de vencimento ainda pode marcar."""
+    from app.models import PromissoryNote
+
+    for index in PromissoryNote.__table__.indexes:
+        if index.name == "ix_promissory_notes_overdue_candidates":
+            index.create(bind=conn, checkfirst=True)
+
+
+def _v8_utc_tombstones(conn: Connection) -> None:
+    """
+    Tombstones com deleted_at em UTC (como updated_at), independente do
+    TimeZone da sessão. Marcas antigas estão na hora local do servidor:
+    depois desta versão, gere um backup completo para começar uma cadeia nova.
+    """
+    from app.models.backup import install_tombstone_triggers
+
+    install_tombstone_triggers(conn)
+
+
+def _v9_rate_limit_buckets(conn: Connection) -> None:
+    """Tabela do rate limit compartilhado (RATE_LIMIT_BACKEND=database)."""
+    from app.utils.rate_limit import install_rate_limit_table
+
+    install_rate_limit_table(conn)
+
+
+def _v10_restore_runs(conn: Connection) -> None:
+    """Registro das restaurações (geração dos dados para os caches dos workers)."""
+    from app.models.backup import RestoreRun
+
+    RestoreRun.__table__.create(bind=conn, checkfirst=True)
+
+
+# versão -> migração que leva o schema da versão anterior até ela
+MIGRATIONS: dict[int, Callable[[Connection], None]] = {
+    2: _v2_query_indexes,
+    3: _v3_customer_search,
+    4: _v4_note_listing_keyset,
+    5: _v5_backup_tracking,
+    6: _v6_cascading_deletes,
+    7: _v7_overdue_candidates,
+    8: _v8_utc_tombstones,
+    9: _v9_rate_limit_buckets,
+    10: _v10_restore_runs,
+}
+
+# metadata própria: a tabela de controle não entra no Base.metadata
+_version_metadata = MetaData()
+schema_version_table = Table(
+    "schema_version",
+    _version_metadata,
+    Column("version", Integer, nullable=False),
+)
+
+
+def current_schema_version(conn: Connection) -> Optional[int]:
+    """Versão gravada no banco, ou None se o banco ainda não é versionado."""
+    try:
+        return conn.execute(select(schema_version_table.c.version)).scalar()
+    except SQLAlchemyError:
+        conn.rollback()
+        return None
+
+
+def ensure_schema(engine: Engine, base) -> bool:
+    """
+    Garante o schema na versão SCHEMA_VERSION.
+    Retorna True se algum DDL foi executado, False se já estava atualizado.
+    """
+    with engine.connect() as conn:
+        found = current_schema_version(conn)
+    # versão maior: outro worker já roda código mais novo (deploy gradual)
+    if found is not None and found >= SCHEMA_VERSION:
+        return False
+
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql(f"SELECT pg_advisory_xact_lock({SCHEMA_LOCK_KEY})")
+
+        _version_metadata.create_all(bind=conn)
+        # relido dentro da transação: outro worker pode ter migrado antes
+        found = conn.execute(select(schema_version_table.c.version)).scalar() or 0
+        if found >= SCHEMA_VERSION:
+            return False
+
+        base.metadata.create_all(bind=conn)
+
+        for version in range(found + 1, SCHEMA_VERSION + 1):
+            migration = MIGRATIONS.get(version)
+            if migration is not None:
+                logger.info(f"Aplicando migração do schema: versão {version}")
+                migration(conn)
+
+        conn.execute(schema_version_table.delete())
+        conn.execute(schema_version_table.insert().values(version=SCHEMA_VERSION))
+
+    logger.info(f"Schema do banco atualizado para a versão {SCHEMA_VERSION}")
+    return True
@@ -1,16 +1,17 @@
+import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from app.database import SessionLocal
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import inspect
-from scripts.create_admin import create_admin_user
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 from app.router import (
     auth_routes,
     customer_routes,
     dashboard_routes,
     export_routes,
     interest_routes,
+    metrics_routes,
     payment_receipts_routes,
     payment_routes,
     promissory_note_routes,
@@ -21,6 +22,13 @@ from app.router import (
     backup_routes,
 )
 from app.database import get_db
+from app.db_schema import ensure_schema
+from app.services.overdue_service import overdue_job
+from app.utils.customer_autocomplete import customer_autocomplete
+from app.utils.hashing_executor import hashing_executor
+from app.utils import query_stats
+from app.utils.pool_metrics import PoolLoadSheddingMiddleware
+from app.utils.principal_cache import principal_cache, watch_restore_generation
 from sqlalchemy.orm import Session
 
 
@@ -43,12 +51,11 @@ async def lifespan(app: FastAPI):
     Executa o que está antes do yield no startup e o que está depois no shutdown.
     """
     try:
-        logger.info("Tentando conectar ao banco de dados e criar tabelas...")
-        Base.metadata.create_all(bind=engine)
-        logger.info("Tabelas criadas/verificadas com sucesso!")
-        inspector = inspect(engine)
-        tables = inspector.get_table_names()
-        logger.info(f"Tabelas no banco: {', '.join(tables)}")
+        logger.info("Verificando a versão do schema do banco...")
+        if ensure_schema(engine, Base):
+            logger.info("Tabelas criadas/migradas com sucesso!")
+        else:
+            logger.info("Schema já está atualizado.")
 
     except Exception as e:
         logger.error(f"Erro ao inicializar o banco de dados: {e}")
@@ -57,9 +64,33 @@ async def lifespan(app: FastAPI):
         )
         logger.warning("Certifique-se de que o PostgreSQL está rodando: mise run up")
 
+    overdue_task = None
+    if settings.OVERDUE_JOB_ENABLED:
+        overdue_task = asyncio.create_task(
+            overdue_job.loop(engine, settings.OVERDUE_JOB_INTERVAL_SECONDS)
+        )
+
+    # em segundo plano: o worker fica pronto sem esperar a carga do índice
+    autocomplete_task = None
+    if settings.CUSTOMER_AUTOCOMPLETE_ENABLED:
+        autocomplete_task = asyncio.create_task(customer_autocomplete.loop(engine))
+
+    restore_task = None
+    if principal_cache.enabled and settings.AUTH_CACHE_RESTORE_CHECK_SECONDS > 0:
+        restore_task = asyncio.create_task(
+            watch_restore_generation(engine, settings.AUTH_CACHE_RESTORE_CHECK_SECONDS)
+        )
+
     yield  # Aplicação recebe as requisições aqui
 
     logger.info("Desligando aplicação...")
+    for task in (overdue_task, autocomplete_task, restore_task):
+        if task is None:
+            continue
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    hashing_executor.shutdown()
 
 
 app = FastAPI(
@@ -71,14 +102,32 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+if settings.SQL_STATS_ENABLED:
+    query_stats.install()
+    app.add_middleware(
+        query_stats.QueryStatsMiddleware,
+        n_plus_one_threshold=settings.SQL_N_PLUS_ONE_THRESHOLD,
+    )
+
+# registrado antes do CORS para que o 503 também leve os headers de CORS
+app.add_middleware(
+    PoolLoadSheddingMiddleware, budget_ms=settings.DB_POOL_WAIT_BUDGET_MS
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# por último (mais externo): o IP do cliente já chega certo aos demais
+if settings.FORWARDED_ALLOW_IPS:
+    app.add_middleware(
+        ProxyHeadersMiddleware, trusted_hosts=settings.FORWARDED_ALLOW_IPS
+    )
+
 
 # autenticação e usuários
 app.include_router(auth_routes.router, prefix="/api/auth", tags=["Autenticação"])
@@ -106,6 +155,7 @@ app.include_router(
 )
 app.include_router(export_routes.router, prefix="/api", tags=["Exportação"])
 app.include_router(backup_routes.router, prefix="/api/backups", tags=["Backups"])
+app.include_router(metrics_routes.router, prefix="/api/metrics", tags=["Métricas"])
 
 
 @app.get("/")
@@ -141,6 +191,9 @@ def health_check():
 @app.get("/primeira-execucao-admin")
 def setup_inicial():
     try:
+        # import tardio: o script só é usado na primeira execução
+        from scripts.create_admin import create_admin_user
+
         create_admin_user()
         return {
             "status": "sucesso",
@@ -8,6 +8,7 @@ from app.models.sale import Sale
 from app.models.promissory_note import PromissoryNote, PromissoryNoteStatus
 from app.models.payment import Payment
 from app.models.system_config import SystemConfig
+from app.models.backup import BackupRun, DeletedRow, RestoreRun
 
 __all__ = [
     "User",
@@ -18,4 +19,7 @@ __all__ = [
     "PromissoryNoteStatus",
     "Payment",
     "SystemConfig",
+    "BackupRun",
+    "DeletedRow",
+    "RestoreRun",
 ]
@@ -0,0 +1,119 @@
+"""
+Models de controle dos backups incrementais
+
+- BackupRun: cada backup concluído (cadeia full -> incrementais e watermark)
+- DeletedRow: tombstones das linhas apagadas, gravados por trigger AFTER
+  DELETE nas tabelas com updated_at (pega também deletes em massa e em
+  cascata, que não passam pelos eventos do ORM)
+- RestoreRun: cada restauração concluída; o maior id é a "geração" dos
+  dados, que os caches em memória dos workers comparam para saber que
+  precisam recarregar tudo
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import DateTime, Integer, String, event, func, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class BackupRun(Base):
+    __tablename__ = "backup_runs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    backup_id: Mapped[str] = mapped_column(String(32), nullable=False, unique=True)
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)  # full | incremental
+    parent_id: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    base_id: Mapped[str] = mapped_column(String(32), nullable=False)
+    # instante do snapshot (mesmo relógio do updated_at): o próximo
+    # incremental parte daqui
+    watermark: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<BackupRun(backup_id={self.backup_id}, kind={self.kind})>"
+
+
+class DeletedRow(Base):
+    __tablename__ = "deleted_rows"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    table_name: Mapped[str] = mapped_column(String(64), nullable=False)
+    row_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<DeletedRow(table={self.table_name}, row_id={self.row_id})>"
+
+
+class RestoreRun(Base):
+    __tablename__ = "restore_runs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    restored_at: Mapped[datetime] = mapped_column(
+        DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<RestoreRun(id={self.id})>"
+
+
+def restore_generation(conn) -> int:
+    """Geração atual dos dados: id da última restauração (0 se nunca houve)."""
+    return conn.scalar(select(func.coalesce(func.max(RestoreRun.id), 0)))
+
+
+def tracked_tables(metadata=None) -> list:
+    """Tabelas acompanhadas pelo backup incremental (as que têm updated_at)."""
+    metadata = metadata or Base.metadata
+    return [t for t in metadata.sorted_tables if "updated_at" in t.c]
+
+
+_PG_FUNCTION = """
+CREATE OR REPLACE FUNCTION record_deleted_row() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO deleted_rows (table_name, row_id, deleted_at)
+    VALUES (TG_TABLE_NAME, OLD.id, timezone('UTC', now()));
+    RETURN OLD;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def install_tombstone_triggers(conn: Connection) -> None:
+    """Cria (idempotente) os triggers AFTER DELETE que gravam os tombstones."""
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        conn.execute(text(_PG_FUNCTION))
+
+    for table in tracked_tables():
+        trigger = f"trg_{table.name}_deleted_rows"
+        if dialect == "postgresql":
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger} ON {table.name}"))
+            conn.execute(
+                text(
+                    f"CREATE TRIGGER {trigger} AFTER DELETE ON {table.name} "
+                    "FOR EACH ROW EXECUTE FUNCTION record_deleted_row()"
+                )
+            )
+        elif dialect == "sqlite":
+            conn.execute(
+                text(
+                    f"CREATE TRIGGER IF NOT EXISTS {trigger} AFTER DELETE ON {table.name} "
+                    "BEGIN INSERT INTO deleted_rows (table_name, row_id, deleted_at) "
+                    f"VALUES ('{table.name}', OLD.id, strftime('%Y-%m-%d %H:%M:%f', 'now')); "
+                    "END"
+                )
+            )
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_tombstone_triggers(target, connection, **kw) -> None:
+    install_tombstone_triggers(connection)
@@ -6,18 +6,39 @@ from __future__ import annotations
 
 from typing import List, Optional, TYPE_CHECKING
 
-from sqlalchemy import Boolean, Integer, String, Text
+from sqlalchemy import DDL, Boolean, Index, Integer, String, Text, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
 from app.models.base import TimestampMixin
+from app.utils.text_search import digits_only, normalize_search
 
 if TYPE_CHECKING:
     from app.models.sale import Sale
 
 
+def build_search_text(full_name: str | None, cpf: str | None, phone: str | None) -> str:
+    """Texto normalizado usado pela busca (nome sem acentos + CPF e telefone em dígitos)."""
+    parts = [normalize_search(full_name), digits_only(cpf), digits_only(phone)]
+    return " ".join(p for p in parts if p)
+
+
+def _search_text_default(context) -> str:
+    # vale também para INSERTs em lote (Core), não só para o ORM
+    params = context.get_current_parameters()
+    return build_search_text(params.get("full_name"), params.get("cpf"), params.get("phone"))
+
+
 class Customer(Base, TimestampMixin):
     __tablename__ = "customers"
+    __table_args__ = (
+        Index(
+            "ix_customers_search_trgm",
+            "search_text",
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     full_name: Mapped[str] = mapped_column(String(200), nullable=False, index=True)
@@ -33,8 +54,25 @@ class Customer(Base, TimestampMixin):
 
     active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
 
+    search_text: Mapped[str] = mapped_column(
+        Text, nullable=False, default=_search_text_default, server_default=""
+    )
+
     # Relacionamentos
     sales: Mapped[List["Sale"]] = relationship("Sale", back_populates="customer")
 
     def __repr__(self) -> str:
         return f"<Customer(id={self.id}, name={self.full_name}, cpf={self.cpf})>"
+
+
+@event.listens_for(Customer, "before_update")
+def _refresh_search_text(mapper, connection, target: Customer) -> None:
+    target.search_text = build_search_text(target.full_name, target.cpf, target.phone)
+
+
+# o índice GIN de trigramas depende da extensão pg_trgm
+event.listen(
+    Customer.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
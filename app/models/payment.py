@@ -24,13 +24,13 @@ class Payment(Base, TimestampMixin):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     promissory_note_id: Mapped[int] = mapped_column(
         Integer,
-        ForeignKey("promissory_notes.id"),
+        ForeignKey("promissory_notes.id", ondelete="CASCADE"),
         nullable=False,
         index=True,
     )
 
     amount_paid: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
-    payment_date: Mapped[date] = mapped_column(Date, nullable=False)
+    payment_date: Mapped[date] = mapped_column(Date, nullable=False, index=True)
 
     interest_amount: Mapped[Decimal] = mapped_column(
         Numeric(10, 2),
@@ -9,7 +9,18 @@ from datetime import date
 from decimal import Decimal
 from typing import List, Optional, TYPE_CHECKING
 
-from sqlalchemy import Date, ForeignKey, Integer, Numeric, String, Text
+from sqlalchemy import (
+    Date,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    Text,
+    bindparam,
+    literal,
+    text,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -31,10 +42,39 @@ class PromissoryNoteStatus(str, enum.Enum):
 
 class PromissoryNote(Base, TimestampMixin):
     __tablename__ = "promissory_notes"
+    __table_args__ = (
+        # promissórias em aberto por vencimento (dashboard, inadimplência)
+        Index(
+            "ix_promissory_notes_open_due",
+            "due_date",
+            "id",
+            postgresql_where=text("status <> 'paid'"),
+            sqlite_where=text("status <> 'paid'"),
+        ),
+        # candidatas do job de vencimento (overdue_service): só as parcelas
+        # em aberto que ainda não foram marcadas como vencidas
+        Index(
+            "ix_promissory_notes_overdue_candidates",
+            "due_date",
+            "id",
+            postgresql_where=text("status IN ('pending', 'partial_payment')"),
+            sqlite_where=text("status IN ('pending', 'partial_payment')"),
+        ),
+        # listagem paginada por keyset (due_date, id); também atende os
+        # filtros por faixa de vencimento
+        Index("ix_promissory_notes_due_date_id", "due_date", "id"),
+        # também cobre as buscas por sale_id (coluna líder)
+        Index(
+            "uq_promissory_notes_sale_installment",
+            "sale_id",
+            "installment_number",
+            unique=True,
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     sale_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("sales.id"), nullable=False, index=True
+        Integer, ForeignKey("sales.id", ondelete="CASCADE"), nullable=False
     )
 
     installment_number: Mapped[int] = mapped_column(
@@ -47,7 +87,7 @@ class PromissoryNote(Base, TimestampMixin):
         default=Decimal("0.00"),
     )
 
-    due_date: Mapped[date] = mapped_column(Date, nullable=False, index=True)
+    due_date: Mapped[date] = mapped_column(Date, nullable=False)
     payment_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
 
     # Usar String em vez de Enum no DB
@@ -66,6 +106,7 @@ class PromissoryNote(Base, TimestampMixin):
         "Payment",
         back_populates="promissory_note",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     @property
@@ -103,3 +144,21 @@ class PromissoryNote(Base, TimestampMixin):
             f"installment={self.installment_number}, status={self.status})>"
         )
 
+
+# Predicado do índice parcial ix_promissory_notes_open_due. O literal vai
+# inline (sem bind) para que o planner consiga casar a consulta com o
+# índice, inclusive em prepared statements (asyncpg).
+OPEN_NOTE_CLAUSE = PromissoryNote.status != literal(
+    PromissoryNoteStatus.PAID.value, literal_execute=True
+)
+
+# Predicado de ix_promissory_notes_overdue_candidates, também com os valores
+# inline para o planner casar a consulta com o índice parcial.
+OVERDUE_CANDIDATE_CLAUSE = PromissoryNote.status.in_(
+    bindparam(
+        "overdue_candidate_statuses",
+        [PromissoryNoteStatus.PENDING.value, PromissoryNoteStatus.PARTIAL_PAYMENT.value],
+        expanding=True,
+        literal_execute=True,
+    )
+)
@@ -8,7 +8,7 @@ from datetime import date
 from decimal import Decimal
 from typing import List, Optional, TYPE_CHECKING
 
-from sqlalchemy import Date, ForeignKey, Integer, Numeric, Text
+from sqlalchemy import Date, ForeignKey, Index, Integer, Numeric, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -22,6 +22,8 @@ if TYPE_CHECKING:
 
 class Sale(Base, TimestampMixin):
     __tablename__ = "sales"
+    # listagem paginada por created_at DESC (id desempata)
+    __table_args__ = (Index("ix_sales_created_at_id", "created_at", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
@@ -56,6 +58,8 @@ class Sale(Base, TimestampMixin):
         "PromissoryNote",
         back_populates="sale",
         cascade="all, delete-orphan",
+        # o banco apaga as parcelas (ON DELETE CASCADE): o ORM não as carrega
+        passive_deletes=True,
     )
 
     def __repr__(self) -> str:
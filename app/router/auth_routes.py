@@ -1,25 +1,33 @@
 from __future__ import annotations
 
+from dataclasses import replace
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.models.user import User
+from app.database import get_async_db
 from app.schemas.auth_schema import LoginRequest, TokenResponse
 from app.services.auth_service import (
-    authenticate_user,
+    authenticate_user_async,
     create_access_token,
     decode_access_token,
+    get_user_by_id_async,
 )
+from app.utils.principal_cache import CachedPrincipal, principal_cache
+from app.utils.rate_limit import login_rate_limiter, rate_limit
 
 router = APIRouter()
 
 security = HTTPBearer(description="Use: Bearer <JWT>")
 
 
-@router.post("/login", response_model=TokenResponse)
-def login(data: LoginRequest, db: Session = Depends(get_db)):
+@router.post(
+    "/login",
+    response_model=TokenResponse,
+    dependencies=[Depends(rate_limit(login_rate_limiter))],
+)
+async def login(data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     # MSG03: campos obrigatórios
     if not data.email or not data.password:
         raise HTTPException(
@@ -27,7 +35,7 @@ def login(data: LoginRequest, db: Session = Depends(get_db)):
             detail="MSG03: Por favor, preencha todos os campos obrigatórios.",
         )
 
-    user = authenticate_user(db, data.email, data.password)
+    user = await authenticate_user_async(db, data.email, data.password)
 
     # MSG02: credenciais inválidas
     if not user:
@@ -58,10 +66,10 @@ def login(data: LoginRequest, db: Session = Depends(get_db)):
     )
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
+    db: AsyncSession = Depends(get_async_db),
+) -> CachedPrincipal:
     payload = decode_access_token(credentials.credentials)
 
     if not payload:
@@ -73,16 +81,22 @@ def get_current_user(
     if not user_id or not role:
         raise HTTPException(status_code=401, detail="Token inválido")
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    if not user or not user.active:
-        raise HTTPException(status_code=401, detail="Usuário inválido")
+    principal = principal_cache.get(int(user_id))
+    if principal is None:
+        user = await get_user_by_id_async(db, int(user_id))
+        if not user or not user.active:
+            raise HTTPException(status_code=401, detail="Usuário inválido")
+
+        principal = CachedPrincipal.from_user(user)
+        principal_cache.set(principal)
 
     # injeta role vindo do token
-    setattr(user, "token_role", role)
-    return user
+    return replace(principal, token_role=role)
 
 
-def require_admin(user: User = Depends(get_current_user)) -> User:
+def require_admin(
+    user: CachedPrincipal = Depends(get_current_user),
+) -> CachedPrincipal:
     if getattr(user, "token_role", user.role) != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -91,7 +105,9 @@ def require_admin(user: User = Depends(get_current_user)) -> User:
     return user
 
 
-def require_seller(user: User = Depends(get_current_user)) -> User:
+def require_seller(
+    user: CachedPrincipal = Depends(get_current_user),
+) -> CachedPrincipal:
     if getattr(user, "token_role", user.role) != "seller":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -101,7 +117,7 @@ def require_seller(user: User = Depends(get_current_user)) -> User:
 
 
 @router.get("/me")
-def me(user: User = Depends(get_current_user)):
+def me(user: CachedPrincipal = Depends(get_current_user)):
     return {
         "id": user.id,
         "name": user.name,
@@ -1,34 +1,107 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import Response
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.database import get_db, engine
-from app.models.user import User
+from app import database
+from app.database import get_db, get_read_engine
 from app.router.auth_routes import require_admin
-from app.services.backup_service import build_backup_zip
+from app.services.backup_service import (
+    latest_backup_run,
+    record_backup_run,
+    stream_backup_zip,
+)
+from app.services.restore_service import restore_backup_chain
+from app.utils.customer_autocomplete import customer_autocomplete
+from app.utils.principal_cache import CachedPrincipal, principal_cache
+from app.utils.rate_limit import export_rate_limiter, rate_limit
 
 router = APIRouter()
 
 
+def _record_run(manifest: dict) -> None:
+    # a sessão da requisição pode já ter sido fechada quando o stream termina
+    db = database.SessionLocal()
+    try:
+        record_backup_run(db, manifest)
+    finally:
+        db.close()
+
+
 @router.get(
-    "", summary="Gerar e baixar backup dos dados (ZIP com CSV)", status_code=200
+    "",
+    summary="Gerar e baixar backup dos dados (ZIP com CSV)",
+    status_code=200,
+    dependencies=[Depends(rate_limit(export_rate_limiter))],
 )
 def download_backup(
+    request: Request,
+    mode: Literal["full", "incremental"] = Query(
+        default="full",
+        description="incremental: só o que mudou desde o último backup concluído",
+    ),
     db: Session = Depends(get_db),  # mantém padrão do projeto
-    _: User = Depends(require_admin),
+    _: CachedPrincipal = Depends(require_admin),
 ):
+    parent = None
+    if mode == "incremental":
+        parent = latest_backup_run(db)
+        if parent is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Nenhum backup anterior: gere um backup completo primeiro.",
+            )
+
     try:
-        filename, zip_bytes = build_backup_zip(engine, schema="public")
+        filename, chunks = stream_backup_zip(
+            get_read_engine(request), schema="public", parent=parent, on_complete=_record_run
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"MSG21: Erro ao gerar o arquivo de backup. {str(e)}",
         )
 
-    return Response(
-        content=zip_bytes,
+    return StreamingResponse(
+        chunks,
         media_type="application/zip",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
+
+
+@router.post(
+    "/restore",
+    summary="Restaurar backup (ZIP completo seguido dos incrementais)",
+    status_code=200,
+    dependencies=[Depends(rate_limit(export_rate_limiter))],
+)
+def restore_backup(
+    files: List[UploadFile] = File(
+        ..., description="ZIP completo e, em ordem, os incrementais da mesma cadeia"
+    ),
+    db: Session = Depends(get_db),
+    _: CachedPrincipal = Depends(require_admin),
+):
+    """
+    Substitui os dados do banco (primário) pelos do backup. No PostgreSQL
+    as tabelas são carregadas com COPY FROM em paralelo.
+    """
+    try:
+        summary = restore_backup_chain(database.engine, [f.file for f in files])
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao restaurar o backup. {str(e)}",
+        )
+
+    # caches em memória refletiam os dados anteriores: neste worker já
+    # recarregados; nos demais, pela geração nova em restore_runs
+    principal_cache.clear()
+    if customer_autocomplete.loaded:
+        customer_autocomplete.load(db)
+    return {"tables": summary}
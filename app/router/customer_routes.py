@@ -1,22 +1,29 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.router.auth_routes import get_current_user
-from app.models.user import User
+from app.utils.principal_cache import CachedPrincipal
 from app.services.customer_service import (
     create_customer,
     get_customer_by_id,
+    get_customer_by_id_async,
     list_customers,
+    search_customers,
+    stream_customers,
     update_customer,
 )
 from app.schemas.customer_schema import (
     CustomerCreate,
     CustomerUpdate,
     CustomerOut,
+    CustomerSuggestionOut,
 )
+from app.utils.customer_autocomplete import customer_autocomplete
+from app.utils.streaming import ndjson_response, wants_ndjson
 
 router = APIRouter()
 
@@ -29,7 +36,7 @@ router = APIRouter()
 def create(
     data: CustomerCreate,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: CachedPrincipal = Depends(get_current_user),
 ):
     try:
         return create_customer(db, data)
@@ -39,30 +46,63 @@ def create(
 
 @router.get("", response_model=list[CustomerOut])
 def list_all(
+    request: Request,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: CachedPrincipal = Depends(get_current_user),
 ):
+    """Com `Accept: application/x-ndjson`, um cliente por linha em streaming."""
+    if wants_ndjson(request):
+        return ndjson_response(stream_customers(db), CustomerOut)
     return list_customers(db)
 
 
-@router.get("/{customer_id}", response_model=CustomerOut)
-def get_one(
-    customer_id: int,
+@router.get("/search", response_model=list[CustomerOut])
+def search(
+    q: str = Query(..., min_length=1, max_length=100, description="Nome, CPF ou telefone"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: CachedPrincipal = Depends(get_current_user),
 ):
-    customer = get_customer_by_id(db, customer_id)
+    """Busca ranqueada de clientes (sem acentos, tolerante a erros de digitação)."""
+    return search_customers(db, q, limit=limit, offset=offset)
+
+
+@router.get("/autocomplete", response_model=list[CustomerSuggestionOut])
+def autocomplete(
+    q: str = Query(..., min_length=1, max_length=100, description="Início do nome ou do CPF"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    _: CachedPrincipal = Depends(get_current_user),
+):
+    """
+    Sugestões por tecla digitada, servidas do índice em memória do worker
+    (CUSTOMER_AUTOCOMPLETE_ENABLED). Sem o índice carregado, vêm da busca
+    no banco.
+    """
+    if customer_autocomplete.loaded:
+        return customer_autocomplete.lookup(q, limit=limit)
+    return search_customers(db, q, limit=limit, active_only=True)
+
+
+@router.get("/{customer_id:int}", response_model=CustomerOut)
+async def get_one(
+    customer_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    _: CachedPrincipal = Depends(get_current_user),
+):
+    customer = await get_customer_by_id_async(db, customer_id)
     if not customer:
         raise HTTPException(status_code=404, detail="Cliente não encontrado")
     return customer
 
 
-@router.put("/{customer_id}", response_model=CustomerOut)
+@router.put("/{customer_id:int}", response_model=CustomerOut)
 def update(
     customer_id: int,
     data: CustomerUpdate,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: CachedPrincipal = Depends(get_current_user),
 ):
     customer = get_customer_by_id(db, customer_id)
     if not customer:
@@ -1,20 +1,20 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.models.user import User
+from app.database import get_async_read_db
+from app.utils.principal_cache import CachedPrincipal
 from app.router.auth_routes import get_current_user
 from app.schemas.dashboard_schema import DashboardOut
-from app.services.dashboard_service import get_dashboard
+from app.services.dashboard_service import get_dashboard_async
 
 router = APIRouter()
 
 
 @router.get("", response_model=DashboardOut)
-def dashboard(
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+async def dashboard(
+    db: AsyncSession = Depends(get_async_read_db),
+    _: CachedPrincipal = Depends(get_current_user),
 ):
-    return get_dashboard(db)
+    return await get_dashboard_async(db)
@@ -1,21 +1,59 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import Optional
+from typing import Iterator, Literal, Optional
 
 from fastapi import APIRouter, Depends, Query
-from fastapi.responses import Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models.user import User
+from app.database import get_read_db
+from app.utils.principal_cache import CachedPrincipal
 from app.router.auth_routes import get_current_user
 
-from app.models.customer import Customer
-from app.services.export_service import to_csv_bytes
-from app.services.promissory_note_service import list_promissory_notes
+from app.services.customer_service import customers_export_select
+from app.services.export_service import (
+    COLUMNAR_FORMATS,
+    gzip_chunks,
+    stream_query_columnar,
+    stream_query_csv,
+)
+from app.services.promissory_note_service import promissory_notes_export_select
+from app.utils.rate_limit import export_rate_limiter, rate_limit
+
+router = APIRouter(dependencies=[Depends(rate_limit(export_rate_limiter))])
+
+GZIP_QUERY = Query(default=False, description="Comprime o CSV com gzip (.csv.gz)")
+
+# extensão na URL -> formato colunar (arrows = Arrow IPC stream)
+COLUMNAR_EXTENSIONS = {ext: fmt for fmt, (_, ext) in COLUMNAR_FORMATS.items()}
+ColumnarExtension = Literal["arrows", "parquet"]
+
+
+def _csv_response(chunks: Iterator[bytes], filename: str, gzip: bool) -> StreamingResponse:
+    if gzip:
+        return StreamingResponse(
+            gzip_chunks(chunks),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.gz"'},
+        )
+    return StreamingResponse(
+        chunks,
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
-router = APIRouter()
+
+def _columnar_response(
+    db: Session, stmt, ext: str, basename: str, label: str
+) -> StreamingResponse:
+    fmt = COLUMNAR_EXTENSIONS[ext]
+    media_type, _ = COLUMNAR_FORMATS[fmt]
+    return StreamingResponse(
+        stream_query_columnar(db, stmt, fmt=fmt, label=label),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{basename}.{ext}"'},
+    )
 
 
 @router.get("/promissory-notes/export.csv")
@@ -24,14 +62,14 @@ def export_promissory_notes_csv(
     customer_id: Optional[int] = Query(default=None, ge=1),
     due_from: Optional[date] = Query(default=None),
     due_to: Optional[date] = Query(default=None),
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    gzip: bool = GZIP_QUERY,
+    db: Session = Depends(get_read_db),
+    _: CachedPrincipal = Depends(get_current_user),
 ):
     """
     RF13 - Exportar promissórias (CSV), respeitando filtros do RF06.
     """
-    result = list_promissory_notes(
-        db,
+    stmt = promissory_notes_export_select(
         status=status,
         customer_id=customer_id,
         due_from=due_from,
@@ -53,42 +91,19 @@ def export_promissory_notes_csv(
         "updated_at",
     ]
 
-    csv_bytes = to_csv_bytes(headers=headers, rows=result["items"])
-
-    return Response(
-        content=csv_bytes,
-        media_type="text/csv; charset=utf-8",
-        headers={
-            "Content-Disposition": 'attachment; filename="promissorias.csv"',
-        },
-    )
+    chunks = stream_query_csv(db, stmt, headers, label="promissory_notes")
+    return _csv_response(chunks, "promissorias.csv", gzip)
 
 
 @router.get("/customers/export.csv")
 def export_customers_csv(
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    gzip: bool = GZIP_QUERY,
+    db: Session = Depends(get_read_db),
+    _: CachedPrincipal = Depends(get_current_user),
 ):
     """
     RF13 - Exportar clientes (CSV).
     """
-    customers = db.query(Customer).order_by(Customer.id.asc()).all()
-
-    rows = [
-        {
-            "id": c.id,
-            "full_name": c.full_name,
-            "cpf": c.cpf,
-            "phone": c.phone,
-            "email": c.email,
-            "address": c.address,
-            "active": c.active,
-            "created_at": c.created_at,
-            "updated_at": c.updated_at,
-        }
-        for c in customers
-    ]
-
     headers = [
         "id",
         "full_name",
@@ -101,12 +116,43 @@ def export_customers_csv(
         "updated_at",
     ]
 
-    csv_bytes = to_csv_bytes(headers=headers, rows=rows)
+    chunks = stream_query_csv(db, customers_export_select(), headers, label="customers")
+    return _csv_response(chunks, "clientes.csv", gzip)
 
-    return Response(
-        content=csv_bytes,
-        media_type="text/csv; charset=utf-8",
-        headers={
-            "Content-Disposition": 'attachment; filename="clientes.csv"',
-        },
+
+# declaradas depois das rotas .csv, que teriam a extensão capturada por {ext}
+@router.get("/promissory-notes/export.{ext}")
+def export_promissory_notes_columnar(
+    ext: ColumnarExtension,
+    status: Optional[str] = Query(default=None),
+    customer_id: Optional[int] = Query(default=None, ge=1),
+    due_from: Optional[date] = Query(default=None),
+    due_to: Optional[date] = Query(default=None),
+    db: Session = Depends(get_read_db),
+    _: CachedPrincipal = Depends(get_current_user),
+):
+    """
+    RF13 - Exportar promissórias em formato colunar (Arrow IPC stream ou
+    Parquet), com os filtros do RF06. Valores monetários saem como inteiros
+    escalados (centavos, escala nos metadados do campo).
+    """
+    stmt = promissory_notes_export_select(
+        status=status,
+        customer_id=customer_id,
+        due_from=due_from,
+        due_to=due_to,
     )
+    return _columnar_response(db, stmt, ext, "promissorias", "promissory_notes")
+
+
+@router.get("/customers/export.{ext}")
+def export_customers_columnar(
+    ext: ColumnarExtension,
+    db: Session = Depends(get_read_db),
+    _: CachedPrincipal = Depends(get_current_user),
+):
+    """
+    RF13 - Exportar clientes em formato colunar (Arrow IPC stream ou Parquet).
+    """
+    stmt = customers_export_select(active_as_text=False)
+    return _columnar_response(db, stmt, ext, "clientes", "customers")
@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models.user import User
+from app.utils.principal_cache import CachedPrincipal
 from app.router.auth_routes import get_current_user
 from app.schemas.interest_schema import InterestFineBreakdown
 from app.models.promissory_note import PromissoryNote
@@ -19,7 +19,7 @@ router = APIRouter()
 def preview_interest(
     note_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: CachedPrincipal = Depends(get_current_user),
 ):
     note = db.query(PromissoryNote).filter(PromissoryNote.id == note_id).first()
     if not note:
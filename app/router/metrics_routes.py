@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends
+
+from app.router.auth_routes import require_admin
+from app.services.overdue_service import overdue_job
+from app.utils import pool_metrics
+from app.utils.customer_autocomplete import customer_autocomplete
+from app.utils.hashing_executor import hashing_executor
+from app.utils.principal_cache import CachedPrincipal
+
+router = APIRouter()
+
+
+@router.get("/hashing")
+def hashing_metrics(_: CachedPrincipal = Depends(require_admin)):
+    """Fila e latência do executor de hashing de senhas."""
+    return hashing_executor.stats()
+
+
+@router.get("/db-pool")
+def db_pool_metrics(_: CachedPrincipal = Depends(require_admin)):
+    """Checkouts, espera, conexões em uso/overflow, invalidações e pre-ping."""
+    return {name: m.snapshot() for name, m in pool_metrics.registry.items()}
+
+
+@router.get("/customer-autocomplete")
+def customer_autocomplete_metrics(_: CachedPrincipal = Depends(require_admin)):
+    """Tamanho e memória do índice de autocomplete de clientes deste worker."""
+    return customer_autocomplete.stats()
+
+
+@router.get("/overdue-job")
+def overdue_job_metrics(_: CachedPrincipal = Depends(require_admin)):
+    """Execuções do job de vencimento neste worker e promissórias alteradas."""
+    return overdue_job.stats()
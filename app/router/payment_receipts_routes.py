@@ -5,7 +5,7 @@ from fastapi.responses import Response
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models.user import User
+from app.utils.principal_cache import CachedPrincipal
 from app.router.auth_routes import get_current_user
 from app.services.payment_receipt_service import build_payment_receipt_pdf
 
@@ -16,7 +16,7 @@ router = APIRouter()
 def get_payment_receipt_pdf(
     payment_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: CachedPrincipal = Depends(get_current_user),
 ):
     pdf = build_payment_receipt_pdf(db, payment_id=payment_id)
     if not pdf:
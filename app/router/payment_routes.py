@@ -5,7 +5,7 @@ from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.promissory_note import PromissoryNoteStatus
-from app.models.user import User
+from app.utils.principal_cache import CachedPrincipal
 from app.router.auth_routes import get_current_user
 from app.schemas.payment_schema import PaymentCreate, PaymentOut
 from app.services.payment_service import register_payment
@@ -22,7 +22,7 @@ def create_payment(
     promissory_note_id: int,
     data: PaymentCreate,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: CachedPrincipal = Depends(get_current_user),
 ):
     try:
         return register_payment(db, promissory_note_id=promissory_note_id, data=data)
@@ -1,40 +1,113 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import Optional
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app import database
+from app.database import get_async_db, get_db
 from app.models.promissory_note import PromissoryNoteStatus
-from app.models.user import User
-from app.router.auth_routes import get_current_user
-from app.schemas.promissory_note_schema import PromissoryNoteListResponse
+from app.utils.principal_cache import CachedPrincipal
+from app.router.auth_routes import get_current_user, require_admin
+from app.schemas.promissory_note_schema import (
+    PromissoryNoteBulkStatusOut,
+    PromissoryNoteBulkStatusUpdate,
+    PromissoryNoteListItem,
+    PromissoryNoteListResponse,
+)
 from app.services.promissory_note_service import (
-    list_promissory_notes,
+    DEFAULT_LIST_LIMIT,
+    MAX_LIST_LIMIT,
+    bulk_update_promissory_note_status,
+    list_promissory_notes_async,
+    stream_promissory_notes_async,
     update_promissory_note_status,
 )
+from app.services.overdue_service import overdue_job
+from app.utils.streaming import ndjson_response, wants_ndjson
 
 router = APIRouter()
 
 
 @router.get("", response_model=PromissoryNoteListResponse)
-def get_promissory_notes(
+async def get_promissory_notes(
+    request: Request,
     status: Optional[str] = Query(default=None),
     customer_id: Optional[int] = Query(default=None, ge=1),
     due_from: Optional[date] = Query(default=None),
     due_to: Optional[date] = Query(default=None),
+    limit: int = Query(DEFAULT_LIST_LIMIT, ge=1, le=MAX_LIST_LIMIT),
+    cursor: Optional[str] = Query(
+        default=None, description="Cursor da página anterior (campo next_cursor)"
+    ),
+    total: Optional[Literal["exact", "estimate", "none"]] = Query(
+        default=None,
+        description=(
+            "Total exato (COUNT), estimado pelo planner ou não calculado; "
+            "por padrão, exato só na primeira página (sem cursor)"
+        ),
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    _: CachedPrincipal = Depends(get_current_user),
+):
+    """
+    RF06 paginado por keyset (due_date, id): siga next_cursor até vir None.
+    Com `Accept: application/x-ndjson`, todos os itens a partir do cursor vêm
+    em streaming, um por linha (limit e total são ignorados).
+
+    Parcelas pagas em parte que vencem passam a overdue e mantêm o
+    paid_amount: overdue com paid_amount > 0 era partial_payment.
+    """
+    try:
+        if wants_ndjson(request):
+            rows = await stream_promissory_notes_async(
+                db,
+                status=status,
+                customer_id=customer_id,
+                due_from=due_from,
+                due_to=due_to,
+                cursor=cursor,
+            )
+            return ndjson_response(rows, PromissoryNoteListItem)
+        return await list_promissory_notes_async(
+            db,
+            status=status,
+            customer_id=customer_id,
+            due_from=due_from,
+            due_to=due_to,
+            limit=limit,
+            cursor=cursor,
+            total=total,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.put("/status", response_model=PromissoryNoteBulkStatusOut)
+def bulk_update_promissory_note_status_route(
+    data: PromissoryNoteBulkStatusUpdate,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: CachedPrincipal = Depends(require_admin),
 ):
-    return list_promissory_notes(
-        db,
-        status=status,
-        customer_id=customer_id,
-        due_from=due_from,
-        due_to=due_to,
-    )
+    """
+    Atualiza o status de várias promissórias (ids ou filtros do RF06) num
+    único UPDATE. Só mudam as que admitem a transição; com dry_run apenas
+    conta quantas seriam alteradas.
+    """
+    try:
+        return bulk_update_promissory_note_status(
+            db,
+            status=data.status,
+            ids=data.ids,
+            filters=data.filters.model_dump() if data.filters else None,
+            dry_run=data.dry_run,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.put("/{promissory_note_id}/status")
@@ -56,3 +129,17 @@ def update_promissory_note_status_route(
     return {
         "message": f"Status da promissória {promissory_note_id} atualizado para {status}"
     }
+
+
+@router.post("/overdue/refresh")
+async def refresh_overdue_promissory_notes(_: CachedPrincipal = Depends(require_admin)):
+    """
+    Executa agora o job de vencimento (pending/partial_payment com
+    vencimento no passado -> overdue) e retorna quantas mudaram.
+    """
+    updated = await run_in_threadpool(overdue_job.run, database.engine)
+    if updated is None:
+        raise HTTPException(
+            status_code=409, detail="O job de vencimento já está em execução."
+        )
+    return {"updated": updated}
@@ -2,23 +2,33 @@ from __future__ import annotations
 from datetime import date
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_read_db
 from app.models.user import User
 from app.router.auth_routes import get_current_user
-from app.schemas.report_schema import DelinquencyReportOut
-from app.services.report_service import delinquency_report
+from app.schemas.report_schema import DelinquencyReportOut, DelinquentCustomerItem
+from app.services.report_service import delinquency_report, stream_delinquency_report
+from app.utils.streaming import ndjson_response, wants_ndjson
 
 router = APIRouter()
 
 
 @router.get("/delinquency", response_model=DelinquencyReportOut)
 def delinquency_report_route(
+    request: Request,
     due_from: Optional[date] = Query(None),
     due_to: Optional[date] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    """Gera o relatório de inadimplência com filtros de datas de vencimento."""
+    """
+    Gera o relatório de inadimplência com filtros de datas de vencimento.
+    Com `Accept: application/x-ndjson`, um cliente por linha em streaming.
+    """
+    if wants_ndjson(request):
+        return ndjson_response(
+            stream_delinquency_report(db, due_from=due_from, due_to=due_to),
+            DelinquentCustomerItem,
+        )
     return delinquency_report(db, due_from=due_from, due_to=due_to)
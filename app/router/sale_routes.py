@@ -2,18 +2,35 @@ from __future__ import annotations
 
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query, Path
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models.user import User
-from app.router.auth_routes import get_current_user
-from app.schemas.sale_schema import SaleCreate, SaleWithNotesOut, SaleUpdate
+from app.database import get_async_db, get_db
+from app.utils.principal_cache import CachedPrincipal
+from app.router.auth_routes import get_current_user, require_admin
+from app.schemas.sale_schema import (
+    SaleBulkCreate,
+    SaleBulkDelete,
+    SaleBulkDeleteOut,
+    SaleBulkOut,
+    SaleCreate,
+    SalePreview,
+    SalePreviewBulk,
+    SalePreviewBulkOut,
+    SalePreviewOut,
+    SaleUpdate,
+    SaleWithNotesOut,
+)
 from app.services.sale_service import (
     create_sale_and_promissory_notes,
-    get_sales,
+    create_sales_bulk,
+    get_sales_async,
+    sales_next_cursor,
     get_sale_by_id,
     delete_sale,
+    delete_sales,
+    preview_sales,
     update_sale
 )
 
@@ -28,15 +45,13 @@ router = APIRouter()
 def create_sale_endpoint(
     data: SaleCreate,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: CachedPrincipal = Depends(get_current_user),
 ):
     """
     Cria uma nova venda e suas notas promissórias.
     """
     try:
-        sale, notes = create_sale_and_promissory_notes(db, user_id=user.id, data=data)
-        # Injeta relação no retorno
-        sale.promissory_notes = notes
+        sale, _ = create_sale_and_promissory_notes(db, user_id=user.id, data=data)
         return sale
     except ValueError as e:
         msg = str(e)
@@ -46,28 +61,100 @@ def create_sale_endpoint(
         raise HTTPException(status_code=400, detail=msg)
 
 
+@router.post(
+    "/bulk",
+    response_model=SaleBulkOut,
+    status_code=status.HTTP_200_OK,
+)
+def create_sales_bulk_endpoint(
+    data: SaleBulkCreate,
+    db: Session = Depends(get_db),
+    user: CachedPrincipal = Depends(get_current_user),
+):
+    """
+    Cria várias vendas (com suas promissórias) numa única transação.
+    Cada item do resultado traz a venda criada ou o erro de validação.
+    """
+    results = create_sales_bulk(db, user_id=user.id, items=data.items)
+    created = sum(1 for r in results if r["sale"] is not None)
+    return {
+        "created": created,
+        "failed": len(results) - created,
+        "results": results,
+    }
+
+
+@router.post(
+    "/preview",
+    response_model=SalePreviewOut,
+    status_code=status.HTTP_200_OK,
+)
+def preview_sale_endpoint(
+    data: SalePreview,
+    user: CachedPrincipal = Depends(get_current_user),
+):
+    """
+    Simula o cronograma (valores e vencimentos das parcelas) de uma venda,
+    sem gravar nada.
+    """
+    [result] = preview_sales([data])
+    if result["error"]:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result["schedule"]
+
+
+@router.post(
+    "/preview/bulk",
+    response_model=SalePreviewBulkOut,
+    status_code=status.HTTP_200_OK,
+)
+def preview_sales_bulk_endpoint(
+    data: SalePreviewBulk,
+    user: CachedPrincipal = Depends(get_current_user),
+):
+    """
+    Simula os cronogramas de várias vendas de uma vez. Cada item do
+    resultado traz o cronograma ou o erro de validação.
+    """
+    return {"results": preview_sales(data.items)}
+
+
 @router.get(
     "",
     response_model=List[SaleWithNotesOut],
     status_code=status.HTTP_200_OK,
 )
-def list_sales_endpoint(
+async def list_sales_endpoint(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1),
+    cursor: Optional[str] = Query(
+        None, description="Cursor da página anterior (cabeçalho X-Next-Cursor)"
+    ),
     client_name: Optional[str] = Query(None, description="Filtrar por nome do cliente"),
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: CachedPrincipal = Depends(get_current_user),
 ):
     """
     Lista todas as vendas. Permite paginação e filtro por nome do cliente.
+    O cabeçalho X-Next-Cursor traz o cursor da próxima página (keyset em
+    created_at, id), que não degrada em páginas profundas como o skip.
     """
-    sales = get_sales(
-        db, 
-        skip=skip, 
-        limit=limit, 
-        user_id=None,
-        client_name=client_name
-    )
+    try:
+        sales = await get_sales_async(
+            db, 
+            skip=skip, 
+            limit=limit, 
+            user_id=None,
+            client_name=client_name,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    next_cursor = sales_next_cursor(sales, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return sales
 
 
@@ -79,7 +166,7 @@ def list_sales_endpoint(
 def get_sale_endpoint(
     sale_id: int = Path(..., description="ID da venda"),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: CachedPrincipal = Depends(get_current_user),
 ):
     """
     Busca uma venda específica pelo ID.
@@ -102,7 +189,7 @@ def update_sale_endpoint(
     data: SaleUpdate,
     sale_id: int = Path(..., description="ID da venda"),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: CachedPrincipal = Depends(get_current_user),
 ):
     """
     Atualiza uma venda. Se alterar valores financeiros, regenera as notas
@@ -123,7 +210,7 @@ def update_sale_endpoint(
 def delete_sale_endpoint(
     sale_id: int = Path(..., description="ID da venda"),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: CachedPrincipal = Depends(get_current_user),
 ):
     """
     Deleta uma venda e suas notas promissórias.
@@ -134,4 +221,24 @@ def delete_sale_endpoint(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="Venda não encontrada."
         )
-    return None
\ No newline at end of file
+    return None
+
+
+@router.delete(
+    "",
+    response_model=SaleBulkDeleteOut,
+    status_code=status.HTTP_200_OK,
+)
+def delete_sales_endpoint(
+    data: SaleBulkDelete,
+    db: Session = Depends(get_db),
+    _: CachedPrincipal = Depends(require_admin),
+):
+    """
+    Exclui vendas em lote pelos ids e/ou filtros (cliente, período de
+    criação), com as notas promissórias e pagamentos. Retorna as contagens.
+    """
+    try:
+        return delete_sales(db, **data.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
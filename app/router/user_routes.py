@@ -1,15 +1,17 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models.user import User
+from app.utils.principal_cache import CachedPrincipal
 from app.router.auth_routes import require_admin
 from app.schemas.user_schema import UserCreate, UserOut, UserUpdate
+from app.utils.streaming import ndjson_response, wants_ndjson
 from app.services.user_service import (
     create_user,
     list_users,
+    stream_users,
     update_user,
     deactivate_user,
 )
@@ -19,9 +21,13 @@ router = APIRouter()
 
 @router.get("", response_model=list[UserOut])
 def get_users(
+    request: Request,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: CachedPrincipal = Depends(require_admin),
 ):
+    """Com `Accept: application/x-ndjson`, um usuário por linha em streaming."""
+    if wants_ndjson(request):
+        return ndjson_response(stream_users(db), UserOut)
     return list_users(db)
 
 
@@ -29,7 +35,7 @@ def get_users(
 def create_user_route(
     data: UserCreate,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: CachedPrincipal = Depends(require_admin),
 ):
     try:
         return create_user(db, data)
@@ -42,7 +48,7 @@ def update_user_route(
     user_id: int,
     data: UserUpdate,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: CachedPrincipal = Depends(require_admin),
 ):
     try:
         return update_user(db, user_id, data)
@@ -54,7 +60,7 @@ def update_user_route(
 def deactivate_user_route(
     user_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: CachedPrincipal = Depends(require_admin),
 ):
     try:
         return deactivate_user(db, user_id)
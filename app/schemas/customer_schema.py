@@ -56,3 +56,18 @@ class CustomerOut(BaseModel):
         return v
     
     model_config = ConfigDict(from_attributes=True)
+
+
+class CustomerSuggestionOut(BaseModel):
+    id: int
+    full_name: str
+    cpf: str
+
+    @field_validator("cpf", mode="before")
+    @classmethod
+    def format_cpf(cls, v):
+        if isinstance(v, str) and len(v) == 11 and v.isdigit():
+            return f"{v[:3]}.{v[3:6]}.{v[6:9]}-{v[9:]}"
+        return v
+
+    model_config = ConfigDict(from_attributes=True)
@@ -2,9 +2,9 @@ from __future__ import annotations
 
 from datetime import date
 from decimal import Decimal
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 from app.schemas.base import TimestampSchema
 
@@ -37,7 +37,10 @@ class PromissoryNoteListResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
     items: List[PromissoryNoteListItem]
-    total: int
+    # None quando o total não foi pedido (total=none)
+    total: Optional[int] = None
+    # cursor da próxima página; None na última
+    next_cursor: Optional[str] = None
     message: Optional[str] = None
 
 
@@ -56,3 +59,41 @@ class PromissoryNoteOut(TimestampSchema):
 
     status: str
     notes: Optional[str] = None
+
+
+# limite de promissórias alteradas por requisição em PUT /api/promissory-notes/status
+MAX_BULK_STATUS_UPDATE = 10_000
+
+
+class PromissoryNoteFilters(BaseModel):
+    """Mesmos filtros da listagem (RF06)."""
+
+    status: Optional[str] = None
+    customer_id: Optional[int] = Field(None, ge=1)
+    due_from: Optional[date] = None
+    due_to: Optional[date] = None
+
+
+class PromissoryNoteBulkStatusUpdate(BaseModel):
+    status: Literal["pending", "overdue", "paid"]
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=MAX_BULK_STATUS_UPDATE)
+    filters: Optional[PromissoryNoteFilters] = None
+    # só conta quantas seriam alteradas
+    dry_run: bool = False
+
+    @model_validator(mode="after")
+    def validate_target(self) -> "PromissoryNoteBulkStatusUpdate":
+        if (self.ids is None) == (self.filters is None):
+            raise ValueError("Informe ids ou filters (apenas um dos dois).")
+        return self
+
+
+class PromissoryNoteBulkStatusOut(BaseModel):
+    status: str
+    dry_run: bool
+    # promissórias selecionadas pelos ids/filtros (só no dry_run)
+    matched: Optional[int] = None
+    # alteradas (ou que seriam, no dry_run)
+    updated: int
+    ids: List[int]
+    max_notes: int
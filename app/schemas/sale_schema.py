@@ -4,15 +4,14 @@ from datetime import date
 from decimal import Decimal
 from typing import List, Optional
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
 from app.schemas.base import TimestampSchema
 from app.schemas.promissory_note_schema import PromissoryNoteOut
 
 
-class SaleCreate(BaseModel):
-    customer_id: int
-    description: Optional[str] = None
+class SalePreview(BaseModel):
+    """Dados financeiros da venda (cronograma sem gravar nada)."""
 
     total_amount: Decimal = Field(..., gt=0, decimal_places=2)
     down_payment: Decimal = Field(default=Decimal("0.00"), ge=0, decimal_places=2)
@@ -26,6 +25,11 @@ class SaleCreate(BaseModel):
         return v if v is not None else Decimal("0.00")
 
 
+class SaleCreate(SalePreview):
+    customer_id: int
+    description: Optional[str] = None
+
+
 class SaleOut(TimestampSchema):
     model_config = ConfigDict(from_attributes=True)
 
@@ -44,6 +48,27 @@ class SaleOut(TimestampSchema):
 class SaleWithNotesOut(SaleOut):
     promissory_notes: List[PromissoryNoteOut]
 
+
+# limite de itens por requisição em POST /api/sales/bulk
+MAX_BULK_SALES = 1000
+
+
+class SaleBulkCreate(BaseModel):
+    items: List[SaleCreate] = Field(..., min_length=1, max_length=MAX_BULK_SALES)
+
+
+class SaleBulkItemResult(BaseModel):
+    index: int
+    sale: Optional[SaleWithNotesOut] = None
+    error: Optional[str] = None
+
+
+class SaleBulkOut(BaseModel):
+    created: int
+    failed: int
+    results: List[SaleBulkItemResult]
+
+
 class SaleUpdate(BaseModel):
     customer_id: Optional[int] = None
     description: Optional[str] = None
@@ -55,3 +80,56 @@ class SaleUpdate(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class InstallmentPreviewOut(BaseModel):
+    installment_number: int
+    amount: Decimal
+    due_date: date
+
+
+class SalePreviewOut(BaseModel):
+    total_amount: Decimal
+    down_payment: Decimal
+    financed_amount: Decimal
+    installments_count: int
+    installments: List[InstallmentPreviewOut]
+
+
+class SalePreviewBulk(BaseModel):
+    items: List[SalePreview] = Field(..., min_length=1, max_length=MAX_BULK_SALES)
+
+
+class SalePreviewBulkItemResult(BaseModel):
+    index: int
+    schedule: Optional[SalePreviewOut] = None
+    error: Optional[str] = None
+
+
+class SalePreviewBulkOut(BaseModel):
+    results: List[SalePreviewBulkItemResult]
+
+
+# limite de ids por requisição em DELETE /api/sales
+MAX_BULK_DELETE_IDS = 10_000
+
+
+class SaleBulkDelete(BaseModel):
+    """Critérios da exclusão em lote (combinados com AND)."""
+
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=MAX_BULK_DELETE_IDS)
+    customer_id: Optional[int] = None
+    created_from: Optional[date] = None
+    created_to: Optional[date] = None
+
+    @model_validator(mode="after")
+    def validate_criteria(self) -> "SaleBulkDelete":
+        if not self.model_dump(exclude_none=True):
+            raise ValueError("Informe os ids ou ao menos um filtro para excluir vendas.")
+        return self
+
+
+class SaleBulkDeleteOut(BaseModel):
+    deleted_sales: int
+    deleted_promissory_notes: int
+    deleted_payments: int
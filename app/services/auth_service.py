@@ -1,23 +1,43 @@
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Optional
 
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.config import settings
 from app.models.user import User
+from app.utils.hashing_executor import hashing_executor
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=1)
+def _pwd_context():
+    # passlib/bcrypt carregados no primeiro uso, fora do startup
+    from passlib.context import CryptContext
 
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+
+# versões síncronas: chamadas de rotas síncronas, que já estão numa thread
+# do threadpool, então o hash roda ali mesmo (ver hashing_executor)
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return _pwd_context().hash(password)
 
 
 def verify_password(password: str, password_hash: str) -> bool:
-    return pwd_context.verify(password, password_hash)
+    return _pwd_context().verify(password, password_hash)
+
+
+async def hash_password_async(password: str) -> str:
+    return await hashing_executor.run_async(_pwd_context().hash, password)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    return await hashing_executor.run_async(
+        _pwd_context().verify, password, password_hash
+    )
 
 
 def create_access_token(
@@ -57,10 +77,33 @@ def decode_access_token(token: str) -> dict | None:
         return None
 
 
+def _get_user_by_email(db: Session, email: str) -> User | None:
+    return db.query(User).filter(User.email == email).first()
+
+
 def authenticate_user(db: Session, email: str, password: str) -> User | None:
-    user = db.query(User).filter(User.email == email).first()
+    user = _get_user_by_email(db, email)
     if not user:
         return None
     if not verify_password(password, user.password_hash):
         return None
     return user
+
+
+async def get_user_by_id_async(db: AsyncSession, user_id: int) -> User | None:
+    return await db.scalar(select(User).where(User.id == user_id))
+
+
+async def authenticate_user_async(
+    db: AsyncSession, email: str, password: str
+) -> User | None:
+    """
+    Versão assíncrona do login: a consulta usa a sessão async e o bcrypt
+    roda no executor de hashing, sem ocupar threads das demais rotas.
+    """
+    user = await db.scalar(select(User).where(User.email == email))
+    if not user:
+        return None
+    if not await verify_password_async(password, user.password_hash):
+        return None
+    return user
@@ -1,103 +1,422 @@
+"""
+Backup lógico (ZIP com um CSV por tabela) gerado por streaming.
+
+Uma conexão coordenadora abre uma transação REPEATABLE READ e exporta o
+snapshot (pg_export_snapshot). As tabelas são copiadas em paralelo
+(COPY ... TO STDOUT), cada uma numa conexão própria que importa esse mesmo
+snapshot: o backup inteiro enxerga um único estado do banco.
+
+Cada COPY vai para um arquivo temporário (em memória até SPOOL_BYTES, depois
+em disco) enquanto calcula o sha256 e o tamanho; as tabelas prontas entram
+no ZIP e seguem para o cliente em blocos, sem montar o arquivo em memória.
+O manifest.json, com linhas e checksum por tabela, é a última entrada.
+
+Backup incremental: parte do watermark do último backup (BackupRun) e só
+exporta as linhas com updated_at depois dele, mais os tombstones
+(deleted_rows) do período. O manifest registra a cadeia (backup_id,
+parent_id, base_id); restore_service reaplica full + incrementais. Ao
+registrar um backup, os tombstones anteriores ao ponto de partida do
+próximo incremental são apagados.
+"""
 from __future__ import annotations
 
-import io
+import hashlib
 import json
+import re
+import tempfile
+import uuid
 import zipfile
-from datetime import datetime
-from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import IO, Callable, Dict, Iterator, List, Optional, Tuple
 
-from sqlalchemy import text
 from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.backup import BackupRun, DeletedRow
+from app.utils.pool_metrics import exclude_from_hold_time
+
+CHUNK_BYTES = 64 * 1024
+# acima disso o CSV de uma tabela vai para disco até entrar no ZIP
+SPOOL_BYTES = 8 * 1024 * 1024
+
+_SNAPSHOT_ID = re.compile(r"^[0-9A-Fa-f-]+$")
+
+# watermark em UTC sem fuso, como updated_at (datetime.now(timezone.utc)) e
+# deleted_at; LOCALTIMESTAMP dependeria do TimeZone da sessão
+_SNAPSHOT_SQL = "SELECT pg_export_snapshot(), timezone('UTC', now())"
+
+# NULL sai como \N (sem aspas), para não se confundir com a string vazia
+# (campo vazio); o manifest registra o marcador em "null"
+NULL_MARKER = "\\N"
+_COPY_OPTIONS = f"WITH (FORMAT csv, HEADER, NULL '{NULL_MARKER}')"
+
+_LIST_TABLES_SQL = """
+    SELECT tablename
+    FROM pg_catalog.pg_tables
+    WHERE schemaname = %(schema)s
+    ORDER BY tablename
+"""
+
+
+# coluna usada para filtrar cada tabela no incremental (deleted_rows: tombstones)
+_WATERMARK_COLUMNS_SQL = """
+    SELECT table_name, column_name
+    FROM information_schema.columns
+    WHERE table_schema = %(schema)s
+      AND column_name IN ('updated_at', 'deleted_at')
+"""
+
+
+def _list_tables(cur, schema: str = "public") -> List[str]:
+    cur.execute(_LIST_TABLES_SQL, {"schema": schema})
+    return [r[0] for r in cur.fetchall()]
+
+
+def _watermark_columns(cur, schema: str = "public") -> Dict[str, str]:
+    """tabela -> coluna de watermark (updated_at tem preferência)."""
+    cur.execute(_WATERMARK_COLUMNS_SQL, {"schema": schema})
+    columns: Dict[str, str] = {}
+    for table, column in cur.fetchall():
+        if columns.get(table) != "updated_at":
+            columns[table] = column
+    return columns
+
+
+def latest_backup_run(db: Session) -> Optional[BackupRun]:
+    """Último backup concluído (ponto de partida do próximo incremental)."""
+    return db.query(BackupRun).order_by(BackupRun.id.desc()).first()
 
 
-def _list_tables(engine: Engine, schema: str = "public") -> List[str]:
-    q = text(
-        """
-        SELECT tablename
-        FROM pg_catalog.pg_tables
-        WHERE schemaname = :schema
-        ORDER BY tablename;
-        """
+def _incremental_since(parent: BackupRun) -> datetime:
+    """Início da janela do incremental feito a partir de parent."""
+    return parent.watermark - timedelta(seconds=settings.BACKUP_WATERMARK_OVERLAP_SECONDS)
+
+
+def prune_tombstones(db: Session) -> int:
+    """
+    Apaga os tombstones que nenhum incremental vai mais exportar: os
+    anteriores à janela do próximo, que parte do último backup registrado.
+    Retorna quantos foram apagados.
+    """
+    latest = latest_backup_run(db)
+    if latest is None:
+        return 0
+    result = db.execute(
+        DeletedRow.__table__.delete().where(
+            DeletedRow.deleted_at < _incremental_since(latest)
+        )
     )
-    with engine.connect() as conn:
-        rows = conn.execute(q, {"schema": schema}).fetchall()
-    return [r[0] for r in rows]
+    return result.rowcount
+
+
+def record_backup_run(db: Session, manifest: dict) -> BackupRun:
+    """Grava o backup concluído a partir do manifest e poda os tombstones."""
+    run = BackupRun(
+        backup_id=manifest["backup_id"],
+        kind=manifest["kind"],
+        parent_id=manifest["parent_id"],
+        base_id=manifest["base_id"],
+        watermark=datetime.fromisoformat(manifest["watermark"]),
+    )
+    db.add(run)
+    db.flush()
+    prune_tombstones(db)
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+class _ChecksumWriter:
+    """Arquivo para o COPY: grava no spool e acumula sha256 e tamanho."""
 
+    def __init__(self, out: IO[bytes]):
+        self.out = out
+        self.sha256 = hashlib.sha256()
+        self.size = 0
 
-def _copy_table_csv(engine: Engine, table: str, schema: str = "public") -> bytes:
+    def write(self, data) -> int:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.out.write(data)
+        self.sha256.update(data)
+        self.size += len(data)
+        return len(data)
+
+
+def _copy_to(cur, sql: str, out: _ChecksumWriter) -> None:
+    # psycopg2: copy_expert
+    if hasattr(cur, "copy_expert"):
+        cur.copy_expert(sql, out, size=CHUNK_BYTES)
+
+    # psycopg3: copy (iterável de blocos)
+    elif hasattr(cur, "copy"):
+        with cur.copy(sql) as copy:  # type: ignore[attr-defined]
+            for data in copy:
+                out.write(bytes(data))
+
+    else:
+        raise RuntimeError(
+            "Driver não suporta COPY (nem copy_expert nem copy). "
+            "Use psycopg2 ou psycopg."
+        )
+
+
+def _begin_snapshot(cur, snapshot: str | None = None) -> None:
     """
-    Faz COPY da tabela para CSV (com header) via TO STDOUT.
-    Evita pg_dump. Retorna bytes do CSV.
+    Transação REPEATABLE READ somente leitura; com snapshot, importa o
+    snapshot exportado pela conexão coordenadora.
+    """
+    cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+    if snapshot is not None:
+        # SET não aceita parâmetro; o id vem do próprio PostgreSQL
+        if not _SNAPSHOT_ID.match(snapshot):
+            raise ValueError(f"Snapshot inválido: {snapshot!r}")
+        cur.execute(f"SET TRANSACTION SNAPSHOT '{snapshot}'")
+
 
-    IMPORTANTE: engine.raw_connection() retorna um ConnectionFairy que
-    não suporta "with ... as ...". Fechamos manualmente.
+@dataclass
+class _TableDump:
+    table: str
+    mode: str
+    spool: IO[bytes]
+    rows: int
+    size: int
+    sha256: str
+
+
+def _copy_sql(schema: str, table: str, column: str | None, since: datetime | None) -> str:
+    if column is None or since is None:
+        return f'COPY "{schema}"."{table}" TO STDOUT {_COPY_OPTIONS}'
+    # since vem do BackupRun (não do usuário)
+    return (
+        f'COPY (SELECT * FROM "{schema}"."{table}" '
+        f"WHERE \"{column}\" > '{since.isoformat(sep=' ')}'::timestamp) "
+        f"TO STDOUT {_COPY_OPTIONS}"
+    )
+
+
+def _dump_table(
+    engine: Engine,
+    snapshot: str,
+    schema: str,
+    table: str,
+    column: str | None = None,
+    since: datetime | None = None,
+) -> _TableDump:
     """
-    sql = f'COPY "{schema}"."{table}" TO STDOUT WITH CSV HEADER'
+    COPY da tabela (CSV com header) para um spool, dentro do snapshot. Com
+    since, só as linhas em que a coluna de watermark é posterior a ele.
+    """
+    sql = _copy_sql(schema, table, column, since)
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
 
     raw = engine.raw_connection()
+    exclude_from_hold_time(raw)
     try:
         cur = raw.cursor()
         try:
-            buf = io.StringIO()
+            _begin_snapshot(cur, snapshot)
+            out = _ChecksumWriter(spool)
+            _copy_to(cur, sql, out)
+            rows = max(cur.rowcount, 0)
+        finally:
+            cur.close()
+        raw.rollback()
+    except BaseException:
+        spool.close()
+        raise
+    finally:
+        raw.close()
 
-            # psycopg2: copy_expert
-            if hasattr(cur, "copy_expert"):
-                cur.copy_expert(sql, buf)
+    spool.seek(0)
+    return _TableDump(
+        table=table,
+        mode="full" if column is None or since is None else "changed",
+        spool=spool,
+        rows=rows,
+        size=out.size,
+        sha256=out.sha256.hexdigest(),
+    )
 
-            # psycopg3: copy (objeto com rows())
-            elif hasattr(cur, "copy"):
-                copy = cur.copy(sql)  # type: ignore[attr-defined]
-                for row in copy.rows():  # type: ignore[attr-defined]
-                    buf.write(row)
 
-            else:
-                raise RuntimeError(
-                    "Driver não suporta COPY (nem copy_expert nem copy). "
-                    "Use psycopg2 ou psycopg."
-                )
+class _ZipSink:
+    """Saída não-posicionável do ZipFile; drain() devolve o que já foi escrito."""
 
-            return buf.getvalue().encode("utf-8")
+    def __init__(self):
+        self.parts: list[bytes] = []
 
-        finally:
-            try:
-                cur.close()
-            except Exception:
-                pass
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+@dataclass
+class _BackupPlan:
+    backup_id: str
+    kind: str
+    parent_id: Optional[str]
+    base_id: str
+    snapshot: str
+    watermark: datetime
+    since: Optional[datetime]
+    tables: List[str]
+    columns: Dict[str, str]
+
+    def manifest(self, schema: str, files: list) -> dict:
+        return {
+            "generated_at": datetime.now().isoformat(),
+            "backup_id": self.backup_id,
+            "kind": self.kind,
+            "parent_id": self.parent_id,
+            "base_id": self.base_id,
+            "changed_since": self.since.isoformat() if self.since else None,
+            "watermark": self.watermark.isoformat(),
+            "schema": schema,
+            "snapshot": self.snapshot,
+            "tables": self.tables,
+            "files": sorted(files, key=lambda f: f["table"]),
+            "format": "zip+csv",
+            "null": NULL_MARKER,
+            "notes": (
+                "Backup lógico (dados) via COPY TO STDOUT, todas as tabelas "
+                "no mesmo snapshot. Incrementais trazem só as linhas alteradas "
+                "desde changed_since e os tombstones (deleted_rows). "
+                "Restauração: scripts/restore_backup.py com o full e os "
+                "incrementais em ordem (confere rows/sha256 do manifest)."
+            ),
+        }
+
+
+def _stream_zip(
+    engine: Engine,
+    coordinator,
+    plan: _BackupPlan,
+    schema: str,
+    workers: int,
+    on_complete: Optional[Callable[[dict], None]],
+) -> Iterator[bytes]:
+    sink = _ZipSink()
+    files = []
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backup")
+    futures = [
+        pool.submit(
+            _dump_table,
+            engine,
+            plan.snapshot,
+            schema,
+            table,
+            plan.columns.get(table),
+            plan.since,
+        )
+        for table in plan.tables
+    ]
+    try:
+        zf = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED)
+
+        for future in as_completed(futures):
+            dump = future.result()
+            path = f"data/{dump.table}.csv"
+            with dump.spool, zf.open(path, "w", force_zip64=True) as entry:
+                while chunk := dump.spool.read(CHUNK_BYTES):
+                    entry.write(chunk)
+                    yield sink.drain()
+            files.append(
+                {
+                    "table": dump.table,
+                    "path": path,
+                    "mode": dump.mode,
+                    "rows": dump.rows,
+                    "bytes": dump.size,
+                    "sha256": dump.sha256,
+                }
+            )
+
+        manifest = plan.manifest(schema, files)
+        zf.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
+        zf.close()
+        yield sink.drain()
+
+        # só depois do último bloco: um backup interrompido não entra na cadeia
+        if on_complete is not None:
+            on_complete(manifest)
     finally:
+        # cliente desconectado ou erro: descarta o que ainda não foi enviado
+        pool.shutdown(wait=True, cancel_futures=True)
+        for future in futures:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                future.result().spool.close()
         try:
-            raw.close()
-        except Exception:
-            pass
+            coordinator.rollback()
+        finally:
+            coordinator.close()
 
 
-def build_backup_zip(engine: Engine, schema: str = "public") -> Tuple[str, bytes]:
+def stream_backup_zip(
+    engine: Engine,
+    schema: str = "public",
+    workers: int | None = None,
+    *,
+    parent: Optional[BackupRun] = None,
+    on_complete: Optional[Callable[[dict], None]] = None,
+) -> Tuple[str, Iterator[bytes]]:
     """
-    Gera um .zip em memória contendo:
-      - manifest.json
-      - data/<tabela>.csv para cada tabela do schema
-    Retorna (nome_arquivo, bytes_zip).
+    Abre o snapshot e lista as tabelas (erros aqui sobem na hora) e devolve
+    (nome_arquivo, blocos do ZIP). O ZIP contém data/<tabela>.csv para cada
+    tabela do schema e, por último, o manifest.json.
+
+    Com parent, o backup é incremental a partir do watermark dele.
+    on_complete recebe o manifest depois que o último bloco foi entregue.
     """
-    tables = _list_tables(engine, schema=schema)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"credigestor_backup_{ts}.zip"
-
-    manifest = {
-        "generated_at": datetime.now().isoformat(),
-        "schema": schema,
-        "tables": tables,
-        "format": "zip+csv",
-        "notes": (
-            "Backup lógico (dados) via COPY TO STDOUT. "
-            "Restauração: criar o schema/tabelas e importar os CSVs."
-        ),
-    }
-
-    out = io.BytesIO()
-    with zipfile.ZipFile(out, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
+    # segura o snapshot até o último bloco do ZIP
+    coordinator = engine.raw_connection()
+    exclude_from_hold_time(coordinator)
+    try:
+        cur = coordinator.cursor()
+        try:
+            _begin_snapshot(cur)
+            cur.execute(_SNAPSHOT_SQL)
+            snapshot, watermark = cur.fetchone()
+            tables = _list_tables(cur, schema=schema)
+            columns = _watermark_columns(cur, schema=schema) if parent else {}
+        finally:
+            cur.close()
+    except BaseException:
+        coordinator.close()
+        raise
 
-        for t in tables:
-            csv_bytes = _copy_table_csv(engine, t, schema=schema)
-            zf.writestr(f"data/{t}.csv", csv_bytes)
+    backup_id = uuid.uuid4().hex
+    if parent is None:
+        kind, base_id, since = "full", backup_id, None
+    else:
+        kind, base_id, since = "incremental", parent.base_id, _incremental_since(parent)
+
+    plan = _BackupPlan(
+        backup_id=backup_id,
+        kind=kind,
+        parent_id=parent.backup_id if parent else None,
+        base_id=base_id,
+        snapshot=snapshot,
+        watermark=watermark,
+        since=since,
+        tables=tables,
+        columns=columns,
+    )
+
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    suffix = "_incremental" if parent else ""
+    filename = f"credigestor_backup_{ts}{suffix}.zip"
+    workers = max(1, min(workers or settings.BACKUP_WORKERS, len(tables) or 1))
 
-    return filename, out.getvalue()
+    chunks = _stream_zip(engine, coordinator, plan, schema, workers, on_complete)
+    return filename, chunks
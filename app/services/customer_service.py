@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+from typing import Iterator
+
+from sqlalchemy import case, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.customer import Customer
 from app.schemas.customer_schema import CustomerCreate, CustomerUpdate
+from app.utils.customer_autocomplete import customer_autocomplete
+from app.utils.streaming import STREAM_BATCH_SIZE
+from app.utils.text_search import SearchMatch, SearchRank, search_tokens
 
 
 def get_customer_by_cpf(db: Session, cpf: str) -> Customer | None:
@@ -14,10 +21,89 @@ def get_customer_by_id(db: Session, customer_id: int) -> Customer | None:
     return db.query(Customer).filter(Customer.id == customer_id).first()
 
 
+async def get_customer_by_id_async(
+    db: AsyncSession, customer_id: int
+) -> Customer | None:
+    return await db.scalar(select(Customer).where(Customer.id == customer_id))
+
+
 def list_customers(db: Session) -> list[Customer]:
     return db.query(Customer).order_by(Customer.full_name.asc()).all()
 
 
+def stream_customers(db: Session) -> Iterator:
+    """list_customers em lotes, só com as colunas de CustomerOut (streaming)."""
+    stmt = (
+        select(
+            Customer.id,
+            Customer.full_name,
+            Customer.cpf,
+            Customer.email,
+            Customer.phone,
+        )
+        .order_by(Customer.full_name.asc())
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+    return iter(db.execute(stmt))
+
+
+def customers_export_select(*, active_as_text: bool = True):
+    """
+    Colunas da exportação de clientes (RF13), por id. No CSV o active sai
+    como texto no SQL (o COPY escreveria booleanos como t/f); no formato
+    colunar fica booleano.
+    """
+    active = Customer.active
+    if active_as_text:
+        active = case((Customer.active, "True"), else_="False").label("active")
+    return select(
+        Customer.id,
+        Customer.full_name,
+        Customer.cpf,
+        Customer.phone,
+        Customer.email,
+        Customer.address,
+        active,
+        Customer.created_at,
+        Customer.updated_at,
+    ).order_by(Customer.id.asc())
+
+
+def customer_search_clause(query: str):
+    """Condição de busca (nome, CPF e telefone) reutilizável em outros filtros."""
+    return SearchMatch(Customer.search_text, query)
+
+
+def search_customers(
+    db: Session,
+    query: str,
+    *,
+    limit: int = 20,
+    offset: int = 0,
+    active_only: bool = False,
+) -> list[Customer]:
+    """
+    Busca ranqueada por nome (sem acentos, tolerante a erros de digitação no
+    PostgreSQL), CPF ou telefone.
+    """
+    if not search_tokens(query):
+        return []
+
+    stmt = select(Customer).where(customer_search_clause(query))
+    if active_only:
+        stmt = stmt.where(Customer.active.is_(True))
+    stmt = (
+        stmt.order_by(
+            SearchRank(Customer.search_text, query).desc(),
+            Customer.full_name.asc(),
+            Customer.id.asc(),
+        )
+        .offset(offset)
+        .limit(limit)
+    )
+    return list(db.scalars(stmt).all())
+
+
 def create_customer(db: Session, data: CustomerCreate) -> Customer:
     if get_customer_by_cpf(db, data.cpf):
         raise ValueError("MSG05: O CPF informado já pertence a outro cliente.")
@@ -26,6 +112,7 @@ def create_customer(db: Session, data: CustomerCreate) -> Customer:
     db.add(customer)
     db.commit()
     db.refresh(customer)
+    customer_autocomplete.upsert(customer)
     return customer
 
 
@@ -37,4 +124,5 @@ def update_customer(db: Session, customer: Customer, data: CustomerUpdate) -> Cu
 
     db.commit()
     db.refresh(customer)
+    customer_autocomplete.upsert(customer)
     return customer
@@ -3,11 +3,12 @@ from __future__ import annotations
 from datetime import date, timedelta
 from decimal import Decimal
 
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.payment import Payment
-from app.models.promissory_note import PromissoryNote, PromissoryNoteStatus
+from app.models.promissory_note import OPEN_NOTE_CLAUSE, PromissoryNote
 from app.models.sale import Sale
 
 
@@ -26,7 +27,7 @@ def get_dashboard(db: Session) -> dict:
                 func.sum(PromissoryNote.original_amount - PromissoryNote.paid_amount), 0
             )
         )
-        .filter(PromissoryNote.status != PromissoryNoteStatus.PAID.value)
+        .filter(OPEN_NOTE_CLAUSE)
         .scalar()
     )
 
@@ -38,7 +39,7 @@ def get_dashboard(db: Session) -> dict:
             )
         )
         .filter(PromissoryNote.due_date < today)
-        .filter(PromissoryNote.status != PromissoryNoteStatus.PAID.value)
+        .filter(OPEN_NOTE_CLAUSE)
         .scalar()
     )
 
@@ -62,12 +63,20 @@ def get_dashboard(db: Session) -> dict:
     next_due_rows = (
         db.query(PromissoryNote, Sale.customer_id)
         .join(Sale, PromissoryNote.sale_id == Sale.id)
-        .filter(PromissoryNote.status != PromissoryNoteStatus.PAID.value)
+        .filter(OPEN_NOTE_CLAUSE)
         .order_by(PromissoryNote.due_date.asc(), PromissoryNote.id.asc())
         .limit(5)
         .all()
     )
 
+    return _dashboard_result(
+        total_to_receive, total_overdue, received_last_30_days, next_due_rows
+    )
+
+
+def _dashboard_result(
+    total_to_receive, total_overdue, received_last_30_days, next_due_rows
+) -> dict:
     next_due = []
     for note, customer_id in next_due_rows:
         outstanding = note.original_amount - note.paid_amount
@@ -90,3 +99,42 @@ def get_dashboard(db: Session) -> dict:
         "received_last_30_days": _d0(received_last_30_days),
         "next_due": next_due,
     }
+
+
+async def get_dashboard_async(db: AsyncSession) -> dict:
+    """Mesmas métricas de get_dashboard, usando a sessão assíncrona."""
+    today = date.today()
+    start_30d = today - timedelta(days=30)
+
+    outstanding = func.coalesce(
+        func.sum(PromissoryNote.original_amount - PromissoryNote.paid_amount), 0
+    )
+    not_paid = OPEN_NOTE_CLAUSE
+
+    total_to_receive = await db.scalar(select(outstanding).where(not_paid))
+    total_overdue = await db.scalar(
+        select(outstanding).where(PromissoryNote.due_date < today, not_paid)
+    )
+    received_last_30_days = await db.scalar(
+        select(
+            func.coalesce(
+                func.sum(
+                    Payment.amount_paid + Payment.interest_amount + Payment.fine_amount
+                ),
+                0,
+            )
+        ).where(Payment.payment_date >= start_30d, Payment.payment_date <= today)
+    )
+    next_due_rows = (
+        await db.execute(
+            select(PromissoryNote, Sale.customer_id)
+            .join(Sale, PromissoryNote.sale_id == Sale.id)
+            .where(not_paid)
+            .order_by(PromissoryNote.due_date.asc(), PromissoryNote.id.asc())
+            .limit(5)
+        )
+    ).all()
+
+    return _dashboard_result(
+        total_to_receive, total_overdue, received_last_30_days, next_due_rows
+    )
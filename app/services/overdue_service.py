@@ -0,0 +1,145 @@
+"""
+Job de vencimento: marca como overdue as promissórias pending e
+partial_payment com due_date no passado, para que as leituras possam
+confiar no status (ex.: GET /api/promissory-notes?status=overdue).
+
+Cada lote é um único UPDATE ... WHERE id IN (SELECT ... LIMIT n FOR UPDATE
+SKIP LOCKED) sobre o índice parcial ix_promissory_notes_overdue_candidates,
+com commit por lote. É idempotente (o WHERE só pega quem ainda não foi
+marcado); no PostgreSQL um advisory lock garante uma execução por vez entre
+os workers, e o SKIP LOCKED pula parcelas presas numa transação (ex.: um
+pagamento em andamento). Um lote curto pode ser só efeito dessas travas,
+então os lotes se repetem até um deles não alterar nada; o que continuar
+travado fica para a próxima execução.
+
+A parcela partial_payment que vence vira overdue mantendo o paid_amount:
+na listagem, overdue com paid_amount > 0 é uma parcela paga em parte.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import date, datetime
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, text, update
+from sqlalchemy.engine import Connection, Engine
+
+from app.config import settings
+from app.models.promissory_note import (
+    OVERDUE_CANDIDATE_CLAUSE,
+    PromissoryNote,
+    PromissoryNoteStatus,
+)
+
+logger = logging.getLogger(__name__)
+
+# chave do advisory lock que serializa o job entre workers (PostgreSQL)
+OVERDUE_LOCK_KEY = 7_351_002
+
+
+def mark_overdue_notes(
+    conn: Connection, *, today: date | None = None, batch_size: int | None = None
+) -> int:
+    """
+    Marca as promissórias vencidas em lotes (commit a cada lote), até um lote
+    não alterar nada. Retorna quantas foram alteradas.
+    """
+    today = today or date.today()
+    batch_size = batch_size or settings.OVERDUE_JOB_BATCH_SIZE
+
+    candidates = (
+        select(PromissoryNote.id)
+        .where(OVERDUE_CANDIDATE_CLAUSE, PromissoryNote.due_date < today)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(PromissoryNote)
+        .where(PromissoryNote.id.in_(candidates), OVERDUE_CANDIDATE_CLAUSE)
+        .values(status=PromissoryNoteStatus.OVERDUE.value)
+    )
+
+    total = 0
+    while True:
+        changed = conn.execute(stmt).rowcount
+        conn.commit()
+        if not changed:
+            return total
+        total += changed
+
+
+class OverdueJob:
+    """Execuções do job neste worker (para /api/metrics/overdue-job)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.skipped = 0
+        self.total_updated = 0
+        self.last_updated: Optional[int] = None
+        self.last_run_at: Optional[datetime] = None
+        self.last_duration_ms: Optional[float] = None
+
+    def run(self, engine: Engine, *, today: date | None = None) -> Optional[int]:
+        """
+        Uma execução do job. Retorna quantas promissórias mudaram, ou None se
+        outro worker já está executando.
+        """
+        started = time.perf_counter()
+        with engine.connect() as conn:
+            postgres = conn.dialect.name == "postgresql"
+            if postgres:
+                acquired = conn.execute(
+                    text("SELECT pg_try_advisory_lock(:key)"), {"key": OVERDUE_LOCK_KEY}
+                ).scalar()
+                conn.commit()
+                if not acquired:
+                    with self._lock:
+                        self.skipped += 1
+                    return None
+            try:
+                changed = mark_overdue_notes(conn, today=today)
+            finally:
+                if postgres:
+                    conn.execute(
+                        text("SELECT pg_advisory_unlock(:key)"), {"key": OVERDUE_LOCK_KEY}
+                    )
+                    conn.commit()
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.runs += 1
+            self.total_updated += changed
+            self.last_updated = changed
+            self.last_run_at = datetime.now()
+            self.last_duration_ms = round(elapsed * 1000, 3)
+        logger.info(f"Promissórias marcadas como vencidas: {changed} ({elapsed:.2f} s)")
+        return changed
+
+    async def loop(self, engine: Engine, interval_seconds: int) -> None:
+        """Executa o job no startup e depois a cada interval_seconds."""
+        while True:
+            try:
+                await run_in_threadpool(self.run, engine)
+            except Exception as e:
+                logger.warning(f"Falha no job de vencimento das promissórias: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "skipped": self.skipped,
+                "total_updated": self.total_updated,
+                "last_updated": self.last_updated,
+                "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+                "last_duration_ms": self.last_duration_ms,
+            }
+
+
+overdue_job = OverdueJob()
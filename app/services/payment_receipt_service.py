@@ -3,8 +3,6 @@ from __future__ import annotations
 from io import BytesIO
 from typing import Any
 
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
 from sqlalchemy.orm import Session
 
 from app.models.customer import Customer
@@ -52,6 +50,10 @@ def build_payment_receipt_pdf(db: Session, *, payment_id: int) -> bytes | None:
     cfg = db.query(SystemConfig).order_by(SystemConfig.id.asc()).first()
     company_name = cfg.company_name if cfg else "Minha Empresa"
 
+    # reportlab é pesado e só é usado aqui: carregado no primeiro recibo
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
     buffer = BytesIO()
     c = canvas.Canvas(buffer, pagesize=A4)
     width, height = A4
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import json
 from datetime import date
+from typing import AsyncIterator, List
 
+from sqlalchemy import and_, case, func, select, text, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.customer import Customer
-from app.models.promissory_note import PromissoryNote
+from app.models.promissory_note import PromissoryNote, PromissoryNoteStatus
 from app.models.sale import Sale
+from app.schemas.promissory_note_schema import MAX_BULK_STATUS_UPDATE
+from app.utils.cursor import decode_cursor, encode_cursor
+from app.utils.streaming import STREAM_BATCH_SIZE
 
 
 def get_promissory_note_by_id(db: Session, note_id: int) -> PromissoryNote | None:
@@ -14,23 +21,20 @@ def get_promissory_note_by_id(db: Session, note_id: int) -> PromissoryNote | Non
     return db.query(PromissoryNote).filter(PromissoryNote.id == note_id).first()
 
 
-def list_promissory_notes(
-    db: Session,
+# limites da listagem paginada (RF06)
+DEFAULT_LIST_LIMIT = 100
+MAX_LIST_LIMIT = 1000
+
+
+def _apply_list_filters(
+    q,
     *,
     status: str | None = None,
     customer_id: int | None = None,
     due_from: date | None = None,
     due_to: date | None = None,
-) -> dict:
-    """
-    RF06 - Consultar e Filtrar Promissórias
-    """
-    q = (
-        db.query(PromissoryNote, Sale, Customer)
-        .join(Sale, PromissoryNote.sale_id == Sale.id)
-        .join(Customer, Sale.customer_id == Customer.id)
-    )
-
+):
+    """Filtros do RF06 (serve para Query e Select)."""
     if status:
         q = q.filter(PromissoryNote.status == status)
 
@@ -43,34 +47,112 @@ def list_promissory_notes(
     if due_to:
         q = q.filter(PromissoryNote.due_date <= due_to)
 
-    q = q.order_by(PromissoryNote.due_date.asc(), PromissoryNote.id.asc())
-
-    rows = q.all()
-
-    items: list[dict] = []
-    for note, sale, customer in rows:
-        outstanding = note.original_amount - note.paid_amount
-
-        items.append(
-            {
-                "id": note.id,
-                "sale_id": note.sale_id,
-                "customer_id": customer.id,
-                "customer_name": customer.full_name,
-                "installment_number": note.installment_number,
-                "due_date": note.due_date,
-                "original_amount": note.original_amount,
-                "paid_amount": note.paid_amount,
-                "outstanding_balance": outstanding,
-                "status": note.status,
-                "created_at": note.created_at,
-                "updated_at": note.updated_at,
-            }
+    return q
+
+
+def _list_select():
+    """Apenas as colunas de PromissoryNoteListItem, sem carregar entidades."""
+    return (
+        select(
+            PromissoryNote.id,
+            PromissoryNote.sale_id,
+            Sale.customer_id,
+            Customer.full_name.label("customer_name"),
+            PromissoryNote.installment_number,
+            PromissoryNote.due_date,
+            PromissoryNote.original_amount,
+            PromissoryNote.paid_amount,
+            (PromissoryNote.original_amount - PromissoryNote.paid_amount).label(
+                "outstanding_balance"
+            ),
+            PromissoryNote.status,
+            PromissoryNote.created_at,
+            PromissoryNote.updated_at,
         )
+        .join(Sale, PromissoryNote.sale_id == Sale.id)
+        .join(Customer, Sale.customer_id == Customer.id)
+    )
+
+
+def _notes_cursor_after(stmt, cursor: str | None):
+    """Keyset sobre (due_date, id) ASC: itens depois do cursor informado."""
+    if not cursor:
+        return stmt
+    due_date, note_id = decode_cursor(cursor, 2)
+    try:
+        after = (date.fromisoformat(due_date), int(note_id))
+    except (TypeError, ValueError) as e:
+        raise ValueError("Cursor de paginação inválido.") from e
+    return stmt.where(tuple_(PromissoryNote.due_date, PromissoryNote.id) > after)
+
+
+def _list_statement(filters: dict, *, limit: int | None, cursor: str | None):
+    stmt = _apply_list_filters(_list_select(), **filters)
+    stmt = _notes_cursor_after(stmt, cursor)
+    stmt = stmt.order_by(PromissoryNote.due_date.asc(), PromissoryNote.id.asc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def promissory_notes_export_select(
+    *,
+    status: str | None = None,
+    customer_id: int | None = None,
+    due_from: date | None = None,
+    due_to: date | None = None,
+):
+    """SELECT completo do RF06 (mesmos filtros e colunas da listagem) para exportação."""
+    filters = dict(
+        status=status, customer_id=customer_id, due_from=due_from, due_to=due_to
+    )
+    return _list_statement(filters, limit=None, cursor=None)
+
+
+def _count_statement(filters: dict):
+    stmt = select(func.count()).select_from(PromissoryNote)
+    if filters.get("customer_id"):
+        stmt = stmt.join(Sale, PromissoryNote.sale_id == Sale.id)
+    return _apply_list_filters(stmt, **filters)
+
+
+def _estimate_sql(db, filters: dict) -> str | None:
+    """EXPLAIN da contagem (só PostgreSQL); None nos demais bancos."""
+    dialect = db.get_bind().dialect
+    if dialect.name != "postgresql":
+        return None
+    stmt = _apply_list_filters(
+        select(PromissoryNote.id).join(Sale, PromissoryNote.sale_id == Sale.id),
+        **filters,
+    )
+    compiled = stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    return f"EXPLAIN (FORMAT JSON) {compiled}"
+
+
+def _plan_rows(raw) -> int:
+    plan = raw if isinstance(raw, list) else json.loads(raw)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _total_mode(total: str | None, cursor: str | None) -> str:
+    # Sem modo explícito, o COUNT exato só roda na primeira página; nas
+    # seguintes o cliente já tem o total e o keyset não paga o COUNT de novo.
+    if total is None:
+        return "none" if cursor else "exact"
+    return total
+
+
+def _list_response(rows, *, limit: int | None, total: int | None) -> dict:
+    items = [dict(row._mapping) for row in rows]
+    next_cursor = None
+    if limit is not None and len(items) == limit:
+        last = items[-1]
+        next_cursor = encode_cursor((last["due_date"], last["id"]))
 
     return {
         "items": items,
-        "total": len(items),
+        "total": total,
+        "next_cursor": next_cursor,
         "message": (
             "MSG13: Nenhuma promissória encontrada com os filtros aplicados."
             if len(items) == 0
@@ -79,6 +161,94 @@ def list_promissory_notes(
     }
 
 
+def list_promissory_notes(
+    db: Session,
+    *,
+    status: str | None = None,
+    customer_id: int | None = None,
+    due_from: date | None = None,
+    due_to: date | None = None,
+    limit: int | None = DEFAULT_LIST_LIMIT,
+    cursor: str | None = None,
+    total: str | None = None,
+) -> dict:
+    """
+    RF06 - Consultar e Filtrar Promissórias
+
+    Página de até `limit` itens a partir do cursor (keyset em due_date, id),
+    projetando só as colunas da listagem. O total vem de uma consulta à parte
+    conforme `total` ("exact", "estimate" ou "none"); sem `total`, é exato na
+    primeira página e omitido nas páginas com cursor.
+    """
+    filters = dict(
+        status=status, customer_id=customer_id, due_from=due_from, due_to=due_to
+    )
+    rows = db.execute(_list_statement(filters, limit=limit, cursor=cursor)).all()
+
+    total = _total_mode(total, cursor)
+    count = None
+    if total == "estimate":
+        sql = _estimate_sql(db, filters)
+        if sql is not None:
+            count = _plan_rows(db.execute(text(sql)).scalar())
+    if total == "exact" or (total == "estimate" and count is None):
+        count = db.scalar(_count_statement(filters))
+
+    return _list_response(rows, limit=limit, total=count)
+
+
+async def list_promissory_notes_async(
+    db: AsyncSession,
+    *,
+    status: str | None = None,
+    customer_id: int | None = None,
+    due_from: date | None = None,
+    due_to: date | None = None,
+    limit: int | None = DEFAULT_LIST_LIMIT,
+    cursor: str | None = None,
+    total: str | None = None,
+) -> dict:
+    """RF06 usando a sessão assíncrona."""
+    filters = dict(
+        status=status, customer_id=customer_id, due_from=due_from, due_to=due_to
+    )
+    rows = (
+        await db.execute(_list_statement(filters, limit=limit, cursor=cursor))
+    ).all()
+
+    total = _total_mode(total, cursor)
+    count = None
+    if total == "estimate":
+        sql = _estimate_sql(db, filters)
+        if sql is not None:
+            count = _plan_rows((await db.execute(text(sql))).scalar())
+    if total == "exact" or (total == "estimate" and count is None):
+        count = await db.scalar(_count_statement(filters))
+
+    return _list_response(rows, limit=limit, total=count)
+
+
+async def stream_promissory_notes_async(
+    db: AsyncSession,
+    *,
+    status: str | None = None,
+    customer_id: int | None = None,
+    due_from: date | None = None,
+    due_to: date | None = None,
+    cursor: str | None = None,
+) -> AsyncIterator:
+    """
+    RF06 completo (sem limite) lido pelo cursor do servidor em lotes, para
+    respostas em streaming. O cursor de paginação é validado antes de a
+    resposta começar.
+    """
+    filters = dict(
+        status=status, customer_id=customer_id, due_from=due_from, due_to=due_to
+    )
+    stmt = _list_statement(filters, limit=None, cursor=cursor)
+    return await db.stream(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+
+
 def update_promissory_note_status(
     db: Session, promissory_note_id: int, status: str
 ) -> PromissoryNote:
@@ -93,3 +263,110 @@ def update_promissory_note_status(
     db.commit()
     db.refresh(note)
     return note
+
+
+# destino -> status de origem aceitos; as condições extras ficam em
+# _transition_clause (o job de vencimento desfaria um pending vencido)
+STATUS_TRANSITIONS = {
+    PromissoryNoteStatus.PENDING.value: (PromissoryNoteStatus.OVERDUE.value,),
+    PromissoryNoteStatus.OVERDUE.value: (
+        PromissoryNoteStatus.PENDING.value,
+        PromissoryNoteStatus.PARTIAL_PAYMENT.value,
+    ),
+    PromissoryNoteStatus.PAID.value: (
+        PromissoryNoteStatus.PENDING.value,
+        PromissoryNoteStatus.OVERDUE.value,
+        PromissoryNoteStatus.PARTIAL_PAYMENT.value,
+    ),
+}
+
+
+def _transition_clause(status: str, today: date):
+    """Promissórias que podem passar para status (validado no próprio SQL)."""
+    if status not in STATUS_TRANSITIONS:
+        raise ValueError("Status inválido.")
+
+    clause = PromissoryNote.status.in_(STATUS_TRANSITIONS[status])
+    if status == PromissoryNoteStatus.PENDING.value:
+        clause = and_(
+            clause, PromissoryNote.due_date >= today, PromissoryNote.paid_amount == 0
+        )
+    elif status == PromissoryNoteStatus.OVERDUE.value:
+        clause = and_(clause, PromissoryNote.due_date < today)
+    return clause
+
+
+def _bulk_status_targets(stmt, ids: List[int] | None, filters: dict | None):
+    """Restringe stmt às promissórias informadas (ids) ou aos filtros do RF06."""
+    if ids:
+        return stmt.where(PromissoryNote.id.in_(ids))
+
+    filters = {k: v for k, v in (filters or {}).items() if v is not None}
+    if not filters:
+        raise ValueError("Informe os ids ou ao menos um filtro das promissórias.")
+    if filters.get("customer_id"):
+        stmt = stmt.join(Sale, PromissoryNote.sale_id == Sale.id)
+    return _apply_list_filters(stmt, **filters)
+
+
+def bulk_update_promissory_note_status(
+    db: Session,
+    *,
+    status: str,
+    ids: List[int] | None = None,
+    filters: dict | None = None,
+    dry_run: bool = False,
+    max_notes: int = MAX_BULK_STATUS_UPDATE,
+    today: date | None = None,
+) -> dict:
+    """
+    Altera o status de várias promissórias (ids ou filtros do RF06) com um
+    único UPDATE ... WHERE id IN (SELECT ...) RETURNING id. As que não
+    admitem a transição ficam de fora pelo próprio WHERE. Acima de
+    max_notes nada é alterado (ValueError). Com dry_run, só conta.
+    """
+    valid = _transition_clause(status, today or date.today())
+
+    if dry_run:
+        matched, eligible = db.execute(
+            _bulk_status_targets(
+                select(func.count(), func.sum(case((valid, 1), else_=0))).select_from(
+                    PromissoryNote
+                ),
+                ids,
+                filters,
+            )
+        ).one()
+        return {
+            "status": status,
+            "dry_run": True,
+            "matched": matched,
+            "updated": eligible or 0,
+            "ids": [],
+            "max_notes": max_notes,
+        }
+
+    # max_notes + 1 basta para saber que passou do limite
+    targets = _bulk_status_targets(select(PromissoryNote.id), ids, filters).where(valid)
+    updated = db.scalars(
+        update(PromissoryNote)
+        .where(PromissoryNote.id.in_(targets.limit(max_notes + 1).scalar_subquery()), valid)
+        .values(status=status)
+        .returning(PromissoryNote.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    if len(updated) > max_notes:
+        db.rollback()
+        raise ValueError(
+            f"Mais de {max_notes} promissórias seriam alteradas; refine os filtros."
+        )
+    db.commit()
+    return {
+        "status": status,
+        "dry_run": False,
+        "matched": None,
+        "updated": len(updated),
+        "ids": sorted(updated),
+        "max_notes": max_notes,
+    }
@@ -2,27 +2,26 @@ from __future__ import annotations
 
 from datetime import date
 from decimal import Decimal
-from typing import Optional
+from typing import Iterator, Optional
 
 from sqlalchemy.orm import Session
 
 from app.models.customer import Customer
-from app.models.promissory_note import PromissoryNote, PromissoryNoteStatus
+from app.models.promissory_note import OPEN_NOTE_CLAUSE, PromissoryNote
 from app.models.sale import Sale
+from app.utils.streaming import STREAM_BATCH_SIZE
 
 
-def delinquency_report(
-    db: Session, due_from: Optional[date] = None, due_to: Optional[date] = None
-) -> dict:
-    today = date.today()
-
+def _delinquency_query(
+    db: Session, today: date, due_from: Optional[date], due_to: Optional[date]
+):
     query = (
         db.query(PromissoryNote, Sale, Customer)
         .join(Sale, PromissoryNote.sale_id == Sale.id)
         .join(Customer, Sale.customer_id == Customer.id)
     )
     query = query.filter(PromissoryNote.due_date < today)
-    query = query.filter(PromissoryNote.status != PromissoryNoteStatus.PAID.value)
+    query = query.filter(OPEN_NOTE_CLAUSE)
 
     if due_from:
         query = query.filter(PromissoryNote.due_date >= due_from)
@@ -30,25 +29,33 @@ def delinquency_report(
     if due_to:
         query = query.filter(PromissoryNote.due_date <= due_to)
 
-    rows = query.order_by(Customer.full_name.asc(), PromissoryNote.due_date.asc()).all()
+    # id desempata homônimos: as parcelas de um cliente ficam contíguas
+    return query.order_by(
+        Customer.full_name.asc(), Customer.id.asc(), PromissoryNote.due_date.asc()
+    )
+
 
-    by_customer: dict[int, dict] = {}
+def _group_by_customer(rows, today: date) -> Iterator[dict]:
+    """Agrupa as linhas (já ordenadas por cliente) emitindo um cliente por vez."""
+    current: dict | None = None
 
     for note, sale, customer in rows:
-        cust_id = customer.id
-        if cust_id not in by_customer:
-            by_customer[cust_id] = {
-                "customer_id": cust_id,
+        if current is None or current["customer_id"] != customer.id:
+            if current is not None:
+                yield current
+            current = {
+                "customer_id": customer.id,
                 "customer_name": customer.full_name,
                 "customer_phone": customer.phone,
                 "installments": [],
+                "overdue_installments_count": 0,
                 "total_due": Decimal("0.00"),
             }
 
         outstanding = note.original_amount - note.paid_amount
         days_overdue = (today - note.due_date).days if today > note.due_date else 0
 
-        by_customer[cust_id]["installments"].append(
+        current["installments"].append(
             {
                 "promissory_note_id": note.id,
                 "sale_id": sale.id,
@@ -60,20 +67,36 @@ def delinquency_report(
                 "status": note.status,
             }
         )
-        by_customer[cust_id]["total_due"] = (
-            by_customer[cust_id]["total_due"] + outstanding
-        )
+        current["overdue_installments_count"] += 1
+        current["total_due"] = current["total_due"] + outstanding
+
+    if current is not None:
+        yield current
 
-    customers = []
-    total_due_all = Decimal("0.00")
 
-    for cust in by_customer.values():
-        cust["overdue_installments_count"] = len(cust["installments"])
-        total_due_all += cust["total_due"]
-        customers.append(cust)
+def delinquency_report(
+    db: Session, due_from: Optional[date] = None, due_to: Optional[date] = None
+) -> dict:
+    today = date.today()
+    rows = _delinquency_query(db, today, due_from, due_to).all()
+
+    customers = list(_group_by_customer(rows, today))
+    total_due_all = sum((c["total_due"] for c in customers), Decimal("0.00"))
 
     return {
         "customers": customers,
         "total_customers": len(customers),
         "total_due_all": total_due_all,
     }
+
+
+def stream_delinquency_report(
+    db: Session, due_from: Optional[date] = None, due_to: Optional[date] = None
+) -> Iterator[dict]:
+    """
+    Relatório de inadimplência um cliente por vez, lido em lotes (streaming).
+    Os totais gerais não são emitidos: cada linha traz o total do cliente.
+    """
+    today = date.today()
+    query = _delinquency_query(db, today, due_from, due_to)
+    return _group_by_customer(query.yield_per(STREAM_BATCH_SIZE), today)
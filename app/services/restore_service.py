@@ -0,0 +1,514 @@
+"""
+Restauração dos backups gerados por backup_service.
+
+Recebe o backup completo e, em ordem, os incrementais da mesma cadeia
+(parent_id de cada um = backup_id do anterior). Nos bancos sem COPY
+tudo roda numa única transação:
+
+1. apaga os dados das tabelas do schema;
+2. insere o backup completo (pais antes dos filhos);
+3. para cada incremental, aplica os tombstones (deleted_rows) e depois faz
+   upsert das linhas alteradas.
+
+No PostgreSQL o backup completo não passa por INSERTs linha a linha: cada
+tabela recebe um COPY FROM STDIN, lido direto do ZIP e em paralelo, numa
+tabela de staging. Só com todas carregadas (e checksums conferidos) uma
+única transação tira FKs e índices secundários, troca os dados
+(INSERT ... SELECT do staging), recria índices/FKs, aplica os incrementais
+e ajusta as sequências; uma falha em qualquer ponto deixa o banco intacto.
+
+O sha256 de cada CSV é conferido com o manifest durante a leitura. As
+tabelas de controle (backup_runs, deleted_rows, restore_runs,
+schema_version) não são restauradas: o banco restaurado começa uma cadeia
+nova com um backup completo. Na mesma transação a restauração grava uma
+linha em restore_runs; os workers veem a geração nova e recarregam os
+caches em memória.
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import json
+import logging
+import secrets
+import time
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from functools import partial
+from pathlib import Path
+from typing import IO, Dict, Iterator, List, Sequence, Union
+
+from sqlalchemy import Boolean, Date, DateTime, Integer, Numeric, Table, insert, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import AddConstraint, CreateIndex
+
+import app.models  # noqa: F401  (registra as tabelas no metadata)
+from app.config import settings
+from app.database import Base
+from app.models.backup import BackupRun, DeletedRow, RestoreRun
+from app.utils.pool_metrics import exclude_from_hold_time
+
+logger = logging.getLogger(__name__)
+
+RESTORE_BATCH_SIZE = 1000
+COPY_CHUNK_BYTES = 64 * 1024
+
+# controle do backup/schema: não fazem parte dos dados restaurados
+CONTROL_TABLES = {"backup_runs", "deleted_rows", "restore_runs", "schema_version"}
+
+# marcador de NULL nos CSVs (manifest "null"); backups antigos não têm o
+# campo e usam o padrão do COPY CSV (campo vazio), que não separa NULL de ''
+NULL_MARKERS = ("", "\\N")
+
+Archive = Union[str, Path, IO[bytes]]
+
+
+@dataclass
+class _Backup:
+    name: str
+    zf: zipfile.ZipFile
+    manifest: dict
+
+    @property
+    def files(self) -> Dict[str, dict]:
+        return {f["table"]: f for f in self.manifest["files"]}
+
+    @property
+    def null(self) -> str:
+        return self.manifest.get("null", "")
+
+
+def _open(archive: Archive) -> _Backup:
+    name = str(archive) if isinstance(archive, (str, Path)) else getattr(archive, "name", "backup")
+    try:
+        zf = zipfile.ZipFile(archive)
+        manifest = json.loads(zf.read("manifest.json"))
+    except (zipfile.BadZipFile, KeyError, json.JSONDecodeError) as e:
+        raise ValueError(f"{name}: arquivo de backup inválido ({e}).") from e
+    backup = _Backup(name=name, zf=zf, manifest=manifest)
+    # vai para o SQL do COPY FROM: só os marcadores conhecidos
+    if backup.null not in NULL_MARKERS:
+        zf.close()
+        raise ValueError(f"{name}: marcador de NULL não suportado ({backup.null!r}).")
+    return backup
+
+
+def _check_chain(backups: List[_Backup]) -> None:
+    if not backups:
+        raise ValueError("Nenhum backup informado.")
+
+    first = backups[0].manifest
+    if first.get("kind") != "full":
+        raise ValueError(f"{backups[0].name}: o primeiro backup precisa ser completo.")
+
+    previous = first
+    for backup in backups[1:]:
+        manifest = backup.manifest
+        if manifest.get("kind") != "incremental":
+            raise ValueError(f"{backup.name}: esperado um backup incremental.")
+        if manifest["parent_id"] != previous["backup_id"]:
+            raise ValueError(
+                f"{backup.name}: não continua a cadeia "
+                f"(parent_id {manifest['parent_id']}, esperado {previous['backup_id']})."
+            )
+        previous = manifest
+
+
+class _HashingReader(io.RawIOBase):
+    """Lê a entrada do ZIP acumulando o sha256."""
+
+    def __init__(self, raw: IO[bytes]):
+        self.raw = raw
+        self.sha256 = hashlib.sha256()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.raw.read(len(buffer))
+        self.sha256.update(data)
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def _parse_value(column, raw: str, null: str = ""):
+    """
+    Converte um campo do CSV do COPY para o tipo da coluna; só o marcador
+    `null` do backup vira None.
+    """
+    if raw == null and column.nullable:
+        return None
+    col_type = column.type
+    if isinstance(col_type, Boolean):
+        return raw in ("t", "true", "True", "1")
+    if isinstance(col_type, Integer):
+        return int(raw)
+    if isinstance(col_type, Numeric):
+        return Decimal(raw)
+    if isinstance(col_type, DateTime):
+        return datetime.fromisoformat(raw)
+    if isinstance(col_type, Date):
+        return date.fromisoformat(raw)
+    return raw
+
+
+def _read_rows(backup: _Backup, table: Table) -> Iterator[dict]:
+    """Linhas do CSV da tabela; confere o sha256 do manifest ao final."""
+    entry = backup.files[table.name]
+    with backup.zf.open(entry["path"]) as raw:
+        hashed = _HashingReader(raw)
+        reader = csv.reader(io.TextIOWrapper(io.BufferedReader(hashed), encoding="utf-8"))
+        header = next(reader, None) or []
+        columns = [table.c[name] for name in header]
+        for values in reader:
+            yield {c.name: _parse_value(c, v, backup.null) for c, v in zip(columns, values)}
+
+    if hashed.sha256.hexdigest() != entry["sha256"]:
+        raise ValueError(f"{backup.name}: checksum não confere em {entry['path']}.")
+
+
+def _batches(rows: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    batch: List[dict] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _upsert(conn: Connection, table: Table):
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(table)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(table)
+    else:
+        raise RuntimeError(f"Restauração incremental não suportada em {dialect}.")
+    keys = [c.name for c in table.primary_key.columns]
+    return stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={c.name: stmt.excluded[c.name] for c in table.columns if c.name not in keys},
+    )
+
+
+def _tombstones(backup: _Backup) -> Dict[str, List[int]]:
+    deleted = DeletedRow.__table__
+    if deleted.name not in backup.files:
+        return {}
+    ids: Dict[str, List[int]] = defaultdict(list)
+    for row in _read_rows(backup, deleted):
+        ids[row["table_name"]].append(row["row_id"])
+    return ids
+
+
+def _reset_sequences(conn: Connection, tables: Sequence[Table]) -> None:
+    """PostgreSQL: sequências dos ids depois dos inserts com id explícito."""
+    if conn.dialect.name != "postgresql":
+        return
+    for table in tables:
+        if "id" not in table.c:
+            continue
+        conn.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"COALESCE(MAX(id), 0) + 1, false) FROM {table.name}"
+            )
+        )
+
+
+def _insert_full(
+    conn: Connection, backup: _Backup, tables: Sequence[Table], summary: dict, batch_size: int
+) -> None:
+    for table in tables:
+        if table.name not in backup.files:
+            continue
+        for batch in _batches(_read_rows(backup, table), batch_size):
+            conn.execute(insert(table), batch)
+            summary[table.name]["rows"] += len(batch)
+
+
+def _apply_incremental(
+    conn: Connection, backup: _Backup, tables: Sequence[Table], summary: dict, batch_size: int
+) -> None:
+    tombstones = _tombstones(backup)
+    # filhos antes dos pais (chaves estrangeiras)
+    for table in reversed(tables):
+        ids = tombstones.get(table.name, [])
+        for i in range(0, len(ids), batch_size):
+            result = conn.execute(table.delete().where(table.c.id.in_(ids[i:i + batch_size])))
+            summary[table.name]["deleted"] += result.rowcount
+
+    for table in tables:
+        if table.name not in backup.files:
+            continue
+        stmt = _upsert(conn, table)
+        for batch in _batches(_read_rows(backup, table), batch_size):
+            conn.execute(stmt, batch)
+            summary[table.name]["rows"] += len(batch)
+
+
+def _finish(conn: Connection, tables: Sequence[Table]) -> None:
+    # os deletes passaram pelos triggers de tombstone; a cadeia antiga deste
+    # banco não vale mais
+    conn.execute(DeletedRow.__table__.delete())
+    conn.execute(BackupRun.__table__.delete())
+    _reset_sequences(conn, tables)
+    # nova geração dos dados: os caches dos outros workers se recarregam
+    conn.execute(insert(RestoreRun.__table__))
+
+
+# ---------------------------------------------------------------------------
+# PostgreSQL: carga do backup completo com COPY FROM STDIN em paralelo
+# ---------------------------------------------------------------------------
+
+
+def _supports_copy(engine: Engine) -> bool:
+    return engine.dialect.name == "postgresql" and engine.dialect.driver in (
+        "psycopg2",
+        "psycopg",
+    )
+
+
+def _raw_execute(engine: Engine, statements: Sequence[str]) -> None:
+    """Executa os statements numa conexão própria e faz commit."""
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        try:
+            for sql in statements:
+                cur.execute(sql)
+        finally:
+            cur.close()
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def _copy_from(cur, sql: str, source: IO[bytes]) -> None:
+    # psycopg2: copy_expert
+    if hasattr(cur, "copy_expert"):
+        cur.copy_expert(sql, source, size=COPY_CHUNK_BYTES)
+
+    # psycopg3: copy (recebe os blocos)
+    elif hasattr(cur, "copy"):
+        with cur.copy(sql) as copy:  # type: ignore[attr-defined]
+            while data := source.read(COPY_CHUNK_BYTES):
+                copy.write(data)
+
+    else:
+        raise RuntimeError(
+            "Driver não suporta COPY (nem copy_expert nem copy). "
+            "Use psycopg2 ou psycopg."
+        )
+
+
+def _copy_in(engine: Engine, backup: _Backup, staging: Dict[str, str], table: Table) -> tuple:
+    """
+    COPY FROM STDIN do CSV da tabela, direto da entrada do ZIP (streaming),
+    para a tabela de staging, numa transação própria; só faz commit se o
+    sha256 conferir. Retorna (linhas, colunas do CSV).
+    """
+    entry = backup.files[table.name]
+    with backup.zf.open(entry["path"]) as raw_entry:
+        hashed = _HashingReader(raw_entry)
+        source = io.BufferedReader(hashed, COPY_CHUNK_BYTES)
+        header = next(csv.reader([source.readline().decode("utf-8")]), [])
+        columns = ", ".join(f'"{table.c[name].name}"' for name in header)
+        options = f"FORMAT csv, NULL '{backup.null}'" if backup.null else "FORMAT csv"
+        sql = f'COPY "{staging[table.name]}" ({columns}) FROM STDIN WITH ({options})'
+
+        raw = engine.raw_connection()
+        exclude_from_hold_time(raw)
+        try:
+            cur = raw.cursor()
+            try:
+                # staging é descartável: durabilidade do commit não importa
+                cur.execute("SET LOCAL synchronous_commit TO OFF")
+                _copy_from(cur, sql, source)
+                rows = max(cur.rowcount, 0)
+            finally:
+                cur.close()
+            if hashed.sha256.hexdigest() != entry["sha256"]:
+                raw.rollback()
+                raise ValueError(f"{backup.name}: checksum não confere em {entry['path']}.")
+            raw.commit()
+        finally:
+            raw.close()
+    return rows, columns
+
+
+def _stage_full(
+    engine: Engine,
+    backup: _Backup,
+    tables: Sequence[Table],
+    staging: Dict[str, str],
+    workers: int,
+) -> Dict[str, tuple]:
+    """
+    Carrega o backup completo em tabelas de staging (UNLOGGED, sem índices),
+    com COPY em paralelo. As tabelas do banco não são tocadas.
+    """
+    present = [t for t in tables if t.name in staging]
+    _raw_execute(
+        engine,
+        [
+            f'CREATE UNLOGGED TABLE "{staging[t.name]}" (LIKE "{t.name}" INCLUDING DEFAULTS)'
+            for t in present
+        ],
+    )
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="restore") as pool:
+        loaded = list(pool.map(partial(_copy_in, engine, backup, staging), present))
+    return {t.name: result for t, result in zip(present, loaded)}
+
+
+def _swap_in(
+    conn: Connection,
+    tables: Sequence[Table],
+    staging: Dict[str, str],
+    loaded: Dict[str, tuple],
+    summary: dict,
+) -> None:
+    """
+    Na transação de conn: tira FKs e índices secundários, esvazia as
+    tabelas, copia o staging (pais antes dos filhos) e recria índices e FKs.
+    Qualquer falha (ex.: linha órfã ao recriar uma FK) desfaz tudo.
+    """
+    # nomes vêm do metadata, não do arquivo
+    names = ", ".join(f"'{t.name}'" for t in tables)
+    fks = conn.exec_driver_sql(
+        "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+        f"WHERE contype = 'f' AND conrelid::regclass::text IN ({names})"
+    ).all()
+    for table_name, fk in fks:
+        conn.exec_driver_sql(f'ALTER TABLE "{table_name}" DROP CONSTRAINT IF EXISTS "{fk}"')
+    for table in tables:
+        for index in table.indexes:
+            conn.exec_driver_sql(f'DROP INDEX IF EXISTS "{index.name}"')
+    conn.exec_driver_sql("TRUNCATE " + ", ".join(f'"{t.name}"' for t in tables))
+
+    for table in tables:
+        if table.name not in loaded:
+            continue
+        rows, columns = loaded[table.name]
+        conn.exec_driver_sql(
+            f'INSERT INTO "{table.name}" ({columns}) '
+            f'SELECT {columns} FROM "{staging[table.name]}"'
+        )
+        summary[table.name]["rows"] += rows
+
+    pg = postgresql.dialect()
+    for table in tables:
+        for index in table.indexes:
+            conn.exec_driver_sql(str(CreateIndex(index).compile(dialect=pg)))
+    for table in tables:
+        for fk in table.foreign_key_constraints:
+            conn.exec_driver_sql(str(AddConstraint(fk).compile(dialect=pg)))
+    for table in tables:
+        conn.exec_driver_sql(f'ANALYZE "{table.name}"')
+
+
+def _drop_staging(engine: Engine, staging: Dict[str, str]) -> None:
+    _raw_execute(engine, [f'DROP TABLE IF EXISTS "{name}"' for name in staging.values()])
+
+
+def _restore_with_copy(
+    engine: Engine,
+    full: _Backup,
+    increments: Sequence[_Backup],
+    tables: Sequence[Table],
+    summary: dict,
+    batch_size: int,
+    workers: int,
+) -> None:
+    """
+    PostgreSQL: COPY em paralelo para o staging e depois uma única
+    transação que troca os dados, aplica os incrementais e zera a cadeia de
+    backups. Se algo falhar o banco fica como estava; o staging é removido
+    nos dois casos e um erro na limpeza não esconde o erro original.
+    """
+    token = secrets.token_hex(4)
+    staging = {t.name: f"_restore_{token}_{t.name}" for t in tables if t.name in full.files}
+    try:
+        started = time.perf_counter()
+        loaded = _stage_full(engine, full, tables, staging, workers)
+        with engine.begin() as conn:
+            _swap_in(conn, tables, staging, loaded, summary)
+            for backup in increments:
+                _apply_incremental(conn, backup, tables, summary, batch_size)
+            _finish(conn, tables)
+        elapsed = time.perf_counter() - started
+    except BaseException as error:
+        try:
+            _drop_staging(engine, staging)
+        except Exception as cleanup:
+            error.add_note(f"Falha ao remover as tabelas de staging: {cleanup!r}")
+        raise
+
+    try:
+        _drop_staging(engine, staging)
+    except Exception as cleanup:
+        # os dados já foram restaurados; só sobra lixo para remover à mão
+        logger.warning(f"restore: falha ao remover as tabelas de staging: {cleanup!r}")
+    rows = sum(c["rows"] for c in summary.values())
+    logger.info(
+        f"restore: rows={rows} seconds={elapsed:.3f} "
+        f"rows_per_s={rows / elapsed if elapsed else 0:.0f}"
+    )
+
+
+def restore_backup_chain(
+    engine: Engine,
+    archives: Sequence[Archive],
+    *,
+    batch_size: int = RESTORE_BATCH_SIZE,
+    workers: int | None = None,
+) -> Dict[str, Dict[str, int]]:
+    """
+    Restaura o backup completo seguido dos incrementais informados.
+    Retorna, por tabela, as linhas gravadas e apagadas.
+
+    No PostgreSQL o completo é carregado com COPY FROM em paralelo em
+    tabelas de staging e entra no banco, com os incrementais, numa única
+    transação (_restore_with_copy). Nos demais bancos tudo vai numa única
+    transação.
+    """
+    backups = [_open(a) for a in archives]
+    try:
+        _check_chain(backups)
+        tables = [t for t in Base.metadata.sorted_tables if t.name not in CONTROL_TABLES]
+        summary: Dict[str, Dict[str, int]] = {
+            t.name: {"rows": 0, "deleted": 0} for t in tables
+        }
+        full, increments = backups[0], backups[1:]
+
+        if _supports_copy(engine):
+            _restore_with_copy(
+                engine,
+                full,
+                increments,
+                tables,
+                summary,
+                batch_size,
+                workers or settings.BACKUP_WORKERS,
+            )
+        else:
+            with engine.begin() as conn:
+                for table in reversed(tables):
+                    conn.execute(table.delete())
+                _insert_full(conn, full, tables, summary, batch_size)
+                for backup in increments:
+                    _apply_incremental(conn, backup, tables, summary, batch_size)
+                _finish(conn, tables)
+    finally:
+        for backup in backups:
+            backup.zf.close()
+
+    return summary
@@ -1,15 +1,27 @@
 from __future__ import annotations
 
-from datetime import date
+from datetime import date, datetime, time, timedelta, timezone
 from decimal import Decimal, ROUND_HALF_UP
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, delete, distinct, func, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.models.customer import Customer
+from app.models.payment import Payment
+from app.services.customer_service import customer_search_clause
 from app.models.promissory_note import PromissoryNote, PromissoryNoteStatus
 from app.models.sale import Sale
-from app.schemas.sale_schema import SaleCreate, SaleUpdate
+from app.schemas.sale_schema import SaleCreate, SalePreview, SaleUpdate
+from app.services.schedule_service import (
+    ScheduleBatch,
+    build_schedules,
+    financed_cents,
+    from_cents,
+)
+from app.utils.cursor import decode_cursor, encode_cursor
 
 
 TWOPLACES = Decimal("0.01")
@@ -39,7 +51,8 @@ def add_months(d: date, months: int) -> date:
 
 def _split_amount(total: Decimal, n: int) -> List[Decimal]:
     """
-    Divide total em n parcelas.
+    Divide total em n parcelas (versão em Decimal; o cronograma das vendas
+    vem de schedule_service, que segue a mesma regra em centavos).
     """
     total = total.quantize(TWOPLACES, rounding=ROUND_HALF_UP)
     base = (total / Decimal(n)).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
@@ -49,6 +62,98 @@ def _split_amount(total: Decimal, n: int) -> List[Decimal]:
     return parts
 
 
+def _validate_sale_data(data: SaleCreate) -> None:
+    if data.installments_count <= 0:
+        raise ValueError("MSG09: O número de parcelas deve ser maior que zero.")
+
+    if data.down_payment > data.total_amount:
+        raise ValueError("Entrada não pode ser maior que o valor total.")
+
+
+def _schedules(items) -> ScheduleBatch:
+    """Cronogramas (schedule_service) das vendas ou dados financeiros informados."""
+    return build_schedules(
+        (
+            financed_cents(data.total_amount, data.down_payment),
+            data.installments_count,
+            data.first_installment_date,
+        )
+        for data in items
+    )
+
+
+def _insert_sales_with_notes(
+    db: Session, *, user_id: int, items: List[SaleCreate]
+) -> List[Tuple[Sale, List[PromissoryNote]]]:
+    """
+    Insere as vendas e todas as parcelas com dois INSERT ... RETURNING em
+    lote (um para vendas, outro para promissórias), sem refresh por objeto.
+    Não faz commit.
+    """
+    if not items:
+        return []
+
+    # a ordem do RETURNING casa cada venda com seu item (no PostgreSQL o
+    # lote continua num único INSERT; no SQLite vira uma linha por vez)
+    sales = db.scalars(
+        insert(Sale).returning(Sale, sort_by_parameter_order=True),
+        [
+            {
+                "customer_id": data.customer_id,
+                "user_id": user_id,
+                "description": data.description,
+                "total_amount": data.total_amount,
+                "down_payment": data.down_payment,
+                "installments_count": data.installments_count,
+                "first_installment_date": data.first_installment_date,
+            }
+            for data in items
+        ],
+    ).all()
+
+    schedules = _schedules(items)
+    note_rows = [
+        {
+            "sale_id": sale.id,
+            "installment_number": number,
+            "original_amount": from_cents(cents),
+            "paid_amount": Decimal("0.00"),
+            "due_date": due,
+            "payment_date": None,
+            "status": PromissoryNoteStatus.PENDING.value,
+            "notes": None,
+        }
+        for i, sale in enumerate(sales)
+        for number, cents, due in schedules.schedule(i)
+    ]
+
+    # sem exigir a ordem do RETURNING: (sale_id, installment_number) já
+    # identifica cada parcela e o lote não cai para uma linha por vez
+    notes_by_sale: dict[int, List[PromissoryNote]] = {}
+    for note in db.scalars(insert(PromissoryNote).returning(PromissoryNote), note_rows):
+        notes_by_sale.setdefault(note.sale_id, []).append(note)
+
+    result = []
+    for sale in sales:
+        sale_notes = sorted(
+            notes_by_sale.get(sale.id, []), key=lambda n: n.installment_number
+        )
+        # coleção já conhecida: evita o lazy load na serialização
+        set_committed_value(sale, "promissory_notes", sale_notes)
+        result.append((sale, sale_notes))
+    return result
+
+
+def _commit_keeping_loaded(db: Session) -> None:
+    """Commit sem expirar os objetos recém-inseridos (já vieram do RETURNING)."""
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
+
+
 def create_sale_and_promissory_notes(
     db: Session,
     *,
@@ -64,52 +169,136 @@ def create_sale_and_promissory_notes(
             "Cliente não encontrado. Verifique ou cadastre um novo cliente."
         )
 
-    if data.installments_count <= 0:
-        raise ValueError("MSG09: O número de parcelas deve ser maior que zero.")
+    _validate_sale_data(data)
+
+    [(sale, notes)] = _insert_sales_with_notes(db, user_id=user_id, items=[data])
+    _commit_keeping_loaded(db)
+    return sale, notes
 
-    if data.down_payment > data.total_amount:
-        raise ValueError("Entrada não pode ser maior que o valor total.")
 
-    financed = (data.total_amount - data.down_payment).quantize(
-        TWOPLACES, rounding=ROUND_HALF_UP
+def create_sales_bulk(
+    db: Session,
+    *,
+    user_id: int,
+    items: List[SaleCreate],
+) -> List[dict]:
+    """
+    Cria várias vendas em uma única transação. Os clientes são validados com
+    uma só consulta; itens inválidos são reportados (index + error) e não
+    impedem a criação dos demais.
+    """
+    customer_ids = {data.customer_id for data in items}
+    existing = set(
+        db.scalars(select(Customer.id).where(Customer.id.in_(customer_ids)))
     )
 
-    sale = Sale(
-        customer_id=data.customer_id,
-        user_id=user_id,
-        description=data.description,
-        total_amount=data.total_amount,
-        down_payment=data.down_payment,
-        installments_count=data.installments_count,
-        first_installment_date=data.first_installment_date,
+    results: List[dict] = [
+        {"index": i, "sale": None, "error": None} for i in range(len(items))
+    ]
+    valid: List[Tuple[int, SaleCreate]] = []
+    for i, data in enumerate(items):
+        try:
+            if data.customer_id not in existing:
+                raise ValueError(
+                    "Cliente não encontrado. Verifique ou cadastre um novo cliente."
+                )
+            _validate_sale_data(data)
+        except ValueError as e:
+            results[i]["error"] = str(e)
+            continue
+        valid.append((i, data))
+
+    created = _insert_sales_with_notes(
+        db, user_id=user_id, items=[data for _, data in valid]
     )
-    db.add(sale)
-    db.flush()
+    _commit_keeping_loaded(db)
 
-    amounts = _split_amount(financed, data.installments_count)
-
-    notes: List[PromissoryNote] = []
-    for i in range(1, data.installments_count + 1):
-        due = add_months(data.first_installment_date, i - 1)
-        pn = PromissoryNote(
-            sale_id=sale.id,
-            installment_number=i,
-            original_amount=amounts[i - 1],
-            paid_amount=Decimal("0.00"),
-            due_date=due,
-            payment_date=None,
-            status=PromissoryNoteStatus.PENDING.value,
-            notes=None,
-        )
-        db.add(pn)
-        notes.append(pn)
+    for (i, _), (sale, _notes) in zip(valid, created):
+        results[i]["sale"] = sale
+    return results
 
-    db.commit()
-    db.refresh(sale)
-    for pn in notes:
-        db.refresh(pn)
 
-    return sale, notes
+def preview_sales(items: List[SalePreview]) -> List[dict]:
+    """
+    Cronogramas (valores e vencimentos) das vendas sem tocar no banco.
+    Itens inválidos são reportados (index + error), como em create_sales_bulk.
+    """
+    results: List[dict] = [
+        {"index": i, "schedule": None, "error": None} for i in range(len(items))
+    ]
+    valid: List[Tuple[int, SalePreview]] = []
+    for i, data in enumerate(items):
+        try:
+            _validate_sale_data(data)
+        except ValueError as e:
+            results[i]["error"] = str(e)
+            continue
+        valid.append((i, data))
+
+    schedules = _schedules(data for _, data in valid)
+    for k, (i, data) in enumerate(valid):
+        results[i]["schedule"] = {
+            "total_amount": data.total_amount,
+            "down_payment": data.down_payment,
+            "financed_amount": from_cents(schedules.financed_cents[k]),
+            "installments_count": data.installments_count,
+            "installments": [
+                {"installment_number": number, "amount": from_cents(cents), "due_date": due}
+                for number, cents, due in schedules.schedule(k)
+            ],
+        }
+    return results
+
+
+def _apply_sales_filters(q, *, user_id: int = None, client_name: str = None):
+    """Filtros da listagem de vendas (serve para Query e Select)."""
+    if user_id:
+        q = q.filter(Sale.user_id == user_id)
+
+    if client_name:
+        q = q.join(Customer).filter(customer_search_clause(client_name))
+
+    return q
+
+
+def _sales_cursor_after(q, cursor: str | None):
+    """Keyset sobre (created_at, id) DESC: itens depois do cursor informado."""
+    if not cursor:
+        return q
+    created_at, sale_id = decode_cursor(cursor, 2)
+    try:
+        after = (datetime.fromisoformat(created_at), int(sale_id))
+    except (TypeError, ValueError) as e:
+        raise ValueError("Cursor de paginação inválido.") from e
+    return q.filter(tuple_(Sale.created_at, Sale.id) < after)
+
+
+def sales_next_cursor(sales: List[Sale], limit: int) -> str | None:
+    """Cursor da próxima página, ou None quando esta é a última."""
+    if len(sales) < limit:
+        return None
+    last = sales[-1]
+    return encode_cursor((last.created_at, last.id))
+
+
+def _sales_statement(
+    skip: int,
+    limit: int,
+    user_id: int = None,
+    client_name: str = None,
+    cursor: str | None = None,
+):
+    """
+    SELECT da listagem de vendas, compartilhado pelas versões sync e async.
+    As promissórias vêm num único SELECT extra (selectin).
+    """
+    stmt = _apply_sales_filters(
+        select(Sale).options(selectinload(Sale.promissory_notes)),
+        user_id=user_id,
+        client_name=client_name,
+    )
+    stmt = _sales_cursor_after(stmt, cursor)
+    return stmt.order_by(Sale.created_at.desc(), Sale.id.desc()).offset(skip).limit(limit)
 
 
 def get_sales(
@@ -118,19 +307,30 @@ def get_sales(
     limit: int = 100, 
     user_id: int = None,
     client_name: str = None,
+    cursor: str | None = None,
 ) -> List[Sale]:
     """
-    Lista vendas com paginação e filtros opcionais.
+    Lista vendas com paginação e filtros opcionais. Com cursor, pagina por
+    keyset (created_at, id) em vez de OFFSET.
     """
-    query = db.query(Sale)
+    stmt = _sales_statement(skip, limit, user_id, client_name, cursor)
+    return list(db.scalars(stmt).all())
 
-    if user_id:
-        query = query.filter(Sale.user_id == user_id)
-    
-    if client_name:
-        query = query.join(Customer).filter(Customer.full_name.ilike(f"%{client_name}%"))
 
-    return query.order_by(Sale.created_at.desc()).offset(skip).limit(limit).all()
+async def get_sales_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    user_id: int = None,
+    client_name: str = None,
+    cursor: str | None = None,
+) -> List[Sale]:
+    """
+    Versão assíncrona de get_sales, com o mesmo SELECT (a carga selectin das
+    promissórias também evita lazy load, que não é permitido em sessão async).
+    """
+    stmt = _sales_statement(skip, limit, user_id, client_name, cursor)
+    return list((await db.scalars(stmt)).all())
 
 
 def get_sale_by_id(db: Session, sale_id: int) -> Sale | None:
@@ -138,23 +338,182 @@ def get_sale_by_id(db: Session, sale_id: int) -> Sale | None:
 
 
 def delete_sale(db: Session, sale_id: int) -> bool:
-    sale = db.query(Sale).filter(Sale.id == sale_id).first()
-    if not sale:
-        return False
-    db.delete(sale)
+    """
+    Exclui a venda com um único DELETE; parcelas e pagamentos saem por
+    ON DELETE CASCADE no banco, sem serem carregados na sessão.
+    """
+    result = db.execute(
+        delete(Sale)
+        .where(Sale.id == sale_id)
+        .execution_options(synchronize_session="fetch")
+    )
+    db.commit()
+    return result.rowcount > 0
+
+
+def _sales_delete_clause(
+    *,
+    ids: Optional[List[int]] = None,
+    customer_id: Optional[int] = None,
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+):
+    clauses = []
+    if ids is not None:
+        clauses.append(Sale.id.in_(ids))
+    if customer_id is not None:
+        clauses.append(Sale.customer_id == customer_id)
+    if created_from is not None:
+        clauses.append(Sale.created_at >= datetime.combine(created_from, time.min))
+    if created_to is not None:
+        end = datetime.combine(created_to + timedelta(days=1), time.min)
+        clauses.append(Sale.created_at < end)
+    if not clauses:
+        raise ValueError("Informe os ids ou ao menos um filtro para excluir vendas.")
+    return and_(*clauses)
+
+
+def delete_sales(
+    db: Session,
+    *,
+    ids: Optional[List[int]] = None,
+    customer_id: Optional[int] = None,
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+) -> dict:
+    """
+    Exclui em lote as vendas pelos ids e/ou filtros (combinados com AND).
+    As vendas alvo são travadas (SELECT ... FOR UPDATE) antes de contar as
+    parcelas e pagamentos delas, e o DELETE remove exatamente esses ids; o
+    resto sai por ON DELETE CASCADE.
+    """
+    where = _sales_delete_clause(
+        ids=ids,
+        customer_id=customer_id,
+        created_from=created_from,
+        created_to=created_to,
+    )
+
+    sale_ids = db.scalars(select(Sale.id).where(where).with_for_update()).all()
+    if not sale_ids:
+        db.commit()
+        return {
+            "deleted_sales": 0,
+            "deleted_promissory_notes": 0,
+            "deleted_payments": 0,
+        }
+
+    notes, payments = db.execute(
+        select(func.count(distinct(PromissoryNote.id)), func.count(Payment.id))
+        .select_from(PromissoryNote)
+        .outerjoin(Payment, Payment.promissory_note_id == PromissoryNote.id)
+        .where(PromissoryNote.sale_id.in_(sale_ids))
+    ).one()
+    db.execute(
+        delete(Sale)
+        .where(Sale.id.in_(sale_ids))
+        .execution_options(synchronize_session="fetch")
+    )
     db.commit()
-    return True
+
+    return {
+        "deleted_sales": len(sale_ids),
+        "deleted_promissory_notes": notes,
+        "deleted_payments": payments,
+    }
+
+
+def _installment_schedule(sale: Sale) -> dict[int, Tuple[Decimal, date]]:
+    """Parcela -> (valor, vencimento) a partir dos dados financeiros da venda."""
+    return {
+        number: (from_cents(cents), due)
+        for number, cents, due in _schedules([sale]).schedule(0)
+    }
+
+
+def _sync_promissory_notes(
+    db: Session, sale: Sale, notes: List[PromissoryNote]
+) -> List[PromissoryNote]:
+    """
+    Aplica o cronograma da venda como diff sobre as parcelas existentes:
+    as iguais ficam intocadas (nem updated_at muda), as alteradas vão num
+    UPDATE em lote por id, as que sobram num DELETE e as que faltam num
+    INSERT ... RETURNING. Não faz commit.
+    """
+    schedule = _installment_schedule(sale)
+    by_number = {note.installment_number: note for note in notes}
+    now = datetime.now(timezone.utc)
+
+    changed = []
+    for number, (amount, due) in schedule.items():
+        note = by_number.get(number)
+        if note is not None and (note.original_amount, note.due_date) != (amount, due):
+            changed.append(
+                {
+                    "id": note.id,
+                    "original_amount": amount,
+                    "due_date": due,
+                    "status": PromissoryNoteStatus.PENDING.value,
+                    "updated_at": now,
+                }
+            )
+    surplus = [note.id for note in notes if note.installment_number not in schedule]
+    missing = [
+        {
+            "sale_id": sale.id,
+            "installment_number": number,
+            "original_amount": amount,
+            "paid_amount": Decimal("0.00"),
+            "due_date": due,
+            "status": PromissoryNoteStatus.PENDING.value,
+        }
+        for number, (amount, due) in schedule.items()
+        if number not in by_number
+    ]
+
+    if surplus:
+        db.execute(delete(PromissoryNote).where(PromissoryNote.id.in_(surplus)))
+    if changed:
+        db.execute(update(PromissoryNote), changed)
+        # o UPDATE por chave primária não sincroniza a sessão
+        loaded = {note.id: note for note in notes}
+        for row in changed:
+            for key in ("original_amount", "due_date", "status", "updated_at"):
+                set_committed_value(loaded[row["id"]], key, row[key])
+    inserted = (
+        list(db.scalars(insert(PromissoryNote).returning(PromissoryNote), missing))
+        if missing
+        else []
+    )
+
+    kept = [note for note in notes if note.installment_number in schedule]
+    return sorted(kept + inserted, key=lambda n: n.installment_number)
 
 
 def update_sale(
-    db: Session, 
-    sale_id: int, 
+    db: Session,
+    sale_id: int,
     data: SaleUpdate
 ) -> Tuple[Sale, List[PromissoryNote]]:
-    sale = db.query(Sale).filter(Sale.id == sale_id).first()
+    """
+    Atualiza uma venda sob lock de linha. Alterações financeiras recalculam
+    o cronograma como diff sobre as parcelas existentes (desde que nenhuma
+    tenha pagamento).
+    """
+    sale = db.scalars(
+        select(Sale).where(Sale.id == sale_id).with_for_update()
+    ).first()
     if not sale:
         raise ValueError("Venda não encontrada.")
 
+    notes = list(
+        db.scalars(
+            select(PromissoryNote)
+            .where(PromissoryNote.sale_id == sale.id)
+            .order_by(PromissoryNote.installment_number)
+        )
+    )
+
     financial_changes = (
         (data.total_amount is not None and data.total_amount != sale.total_amount) or
         (data.installments_count is not None and data.installments_count != sale.installments_count) or
@@ -163,42 +522,23 @@ def update_sale(
     )
 
     if financial_changes:
-        existing_notes = db.query(PromissoryNote).filter(PromissoryNote.sale_id == sale.id).all()
-        for note in existing_notes:
+        for note in notes:
             if note.status == PromissoryNoteStatus.PAID.value or note.paid_amount > 0:
                 raise ValueError("Não é possível alterar valores de uma venda que já possui parcelas pagas.")
 
-        if data.total_amount: sale.total_amount = data.total_amount
-        if data.down_payment: sale.down_payment = data.down_payment
-        if data.installments_count: sale.installments_count = data.installments_count
-        if data.first_installment_date: sale.first_installment_date = data.first_installment_date
-        
-        db.query(PromissoryNote).filter(PromissoryNote.sale_id == sale.id).delete()
-
-        financed = (sale.total_amount - sale.down_payment).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
-        amounts = _split_amount(financed, sale.installments_count)
-
-        new_notes = []
-        for i in range(1, sale.installments_count + 1):
-            due = add_months(sale.first_installment_date, i - 1)
-            pn = PromissoryNote(
-                sale_id=sale.id,
-                installment_number=i,
-                original_amount=amounts[i - 1],
-                paid_amount=Decimal("0.00"),
-                due_date=due,
-                status=PromissoryNoteStatus.PENDING.value
-            )
-            db.add(pn)
-            new_notes.append(pn)
+        if data.total_amount is not None: sale.total_amount = data.total_amount
+        if data.down_payment is not None: sale.down_payment = data.down_payment
+        if data.installments_count is not None: sale.installments_count = data.installments_count
+        if data.first_installment_date is not None: sale.first_installment_date = data.first_installment_date
+
+        notes = _sync_promissory_notes(db, sale, notes)
     else:
         if data.description is not None:
             sale.description = data.description
         if data.customer_id is not None:
             sale.customer_id = data.customer_id
-    
-    db.commit()
-    db.refresh(sale)
-    
-    current_notes = db.query(PromissoryNote).filter(PromissoryNote.sale_id == sale.id).all()
-    return sale, current_notes
\ No newline at end of file
+
+    db.flush()
+    set_committed_value(sale, "promissory_notes", notes)
+    _commit_keeping_loaded(db)
+    return sale, notes
@@ -0,0 +1,118 @@
+"""
+Motor de cronograma de parcelas.
+
+Calcula valores e vencimentos de várias vendas de uma vez em centavos
+inteiros (sem Decimal nem objetos do ORM no laço), com a mesma semântica
+de sale_service._split_amount/add_months: valor financiado e parcela base
+arredondados ROUND_HALF_UP, diferença na última parcela; vencimentos mês a
+mês no dia da primeira parcela, limitado ao último dia do mês.
+
+O resultado sai em colunas (ScheduleBatch), uma posição por parcela, pronto
+para virar as linhas do INSERT em lote ou a resposta do preview.
+"""
+
+from __future__ import annotations
+
+import calendar
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Tuple
+
+TWOPLACES = Decimal("0.01")
+
+
+def to_cents(value: Decimal) -> int:
+    """Valor monetário -> centavos (ROUND_HALF_UP)."""
+    return int(value.quantize(TWOPLACES, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+@lru_cache(maxsize=65536)
+def from_cents(cents: int) -> Decimal:
+    """Centavos -> Decimal com duas casas (a parcela base se repete: cache)."""
+    return Decimal(cents).scaleb(-2)
+
+
+def financed_cents(total_amount: Decimal, down_payment: Decimal) -> int:
+    """Valor financiado (total - entrada) em centavos."""
+    return to_cents(total_amount - down_payment)
+
+
+def split_cents(total_cents: int, n: int) -> Tuple[int, int]:
+    """(parcela base, última parcela) ao dividir total_cents em n parcelas."""
+    # total / n arredondado ROUND_HALF_UP (para longe do zero) em inteiros
+    if total_cents >= 0:
+        base = (2 * total_cents + n) // (2 * n)
+    else:
+        base = -((-2 * total_cents + n) // (2 * n))
+    return base, total_cents - base * (n - 1)
+
+
+@lru_cache(maxsize=None)
+def _days_in_month(year: int, month: int) -> int:
+    return calendar.monthrange(year, month)[1]
+
+
+@lru_cache(maxsize=16384)
+def due_dates(first: date, n: int) -> Tuple[date, ...]:
+    """Vencimentos das n parcelas a partir da primeira (cache por data/parcelas)."""
+    start = first.year * 12 + first.month - 1
+    day = first.day
+    dates = []
+    for offset in range(n):
+        year, month = divmod(start + offset, 12)
+        month += 1
+        # até o dia 28 todo mês tem o dia
+        if day > 28:
+            dates.append(date(year, month, min(day, _days_in_month(year, month))))
+        else:
+            dates.append(date(year, month, day))
+    return tuple(dates)
+
+
+@dataclass
+class ScheduleBatch:
+    """
+    Cronogramas em colunas. As parcelas da venda i ocupam as posições
+    offsets[i]:offsets[i + 1] de amount_cents e due_date.
+    """
+
+    financed_cents: List[int] = field(default_factory=list)
+    amount_cents: List[int] = field(default_factory=list)
+    due_date: List[date] = field(default_factory=list)
+    offsets: List[int] = field(default_factory=lambda: [0])
+
+    def __len__(self) -> int:
+        return len(self.financed_cents)
+
+    def schedule(self, i: int) -> Iterator[Tuple[int, int, date]]:
+        """(número da parcela, valor em centavos, vencimento) da venda i."""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return zip(
+            range(1, end - start + 1),
+            self.amount_cents[start:end],
+            self.due_date[start:end],
+        )
+
+
+def build_schedules(items: Iterable[Tuple[int, int, date]]) -> ScheduleBatch:
+    """
+    Cronogramas de várias vendas. items: (valor financiado em centavos,
+    número de parcelas, data da primeira parcela).
+    """
+    batch = ScheduleBatch()
+    financed, amounts, dues, offsets = (
+        batch.financed_cents,
+        batch.amount_cents,
+        batch.due_date,
+        batch.offsets,
+    )
+    for total, n, first in items:
+        base, last = split_cents(total, n)
+        financed.append(total)
+        amounts.extend([base] * (n - 1))
+        amounts.append(last)
+        dues.extend(due_dates(first, n))
+        offsets.append(len(amounts))
+    return batch
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+from typing import Iterator
+
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.models.user import User
 from app.schemas.user_schema import UserCreate, UserUpdate
 from app.services.auth_service import hash_password
+from app.utils.principal_cache import principal_cache
+from app.utils.streaming import STREAM_BATCH_SIZE
 
 
 def create_user(db: Session, data: UserCreate) -> User:
@@ -33,6 +38,24 @@ def list_users(db: Session) -> list[User]:
     return db.query(User).order_by(User.id.asc()).all()
 
 
+def stream_users(db: Session) -> Iterator:
+    """list_users em lotes, só com as colunas de UserOut (streaming)."""
+    stmt = (
+        select(
+            User.id,
+            User.name,
+            User.email,
+            User.role,
+            User.active,
+            User.created_at,
+            User.updated_at,
+        )
+        .order_by(User.id.asc())
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+    return iter(db.execute(stmt))
+
+
 def update_user(db: Session, user_id: int, data: UserUpdate) -> User:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -49,6 +72,7 @@ def update_user(db: Session, user_id: int, data: UserUpdate) -> User:
 
     db.add(user)
     db.commit()
+    principal_cache.invalidate(user.id)
     db.refresh(user)
     return user
 
@@ -61,5 +85,6 @@ def deactivate_user(db: Session, user_id: int) -> User:
     user.active = False
     db.add(user)
     db.commit()
+    principal_cache.invalidate(user.id)
     db.refresh(user)
     return user
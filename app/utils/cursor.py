@@ -0,0 +1,38 @@
+"""
+Cursores opacos para paginação por keyset.
+
+O cursor é a tupla de valores da chave de ordenação do último item da
+página (ex.: created_at, id), serializada em JSON e codificada em base64
+url-safe. Quem decodifica converte cada valor de volta para o seu tipo.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, Sequence
+
+
+def _default(value: Any) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Tipo não suportado em cursor: {type(value).__name__}")
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), default=_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> list:
+    """Decodifica o cursor; ValueError se for inválido ou de outro formato."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError("Cursor de paginação inválido.") from e
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Cursor de paginação inválido.")
+    return values
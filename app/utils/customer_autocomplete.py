@@ -0,0 +1,371 @@
+"""
+Índice em memória (por worker) para o autocomplete de clientes.
+
+Representação compacta:
+- nomes: um dicionário id -> (nome normalizado, nome de exibição em UTF-8,
+  CPF) e um array de inteiros ordenado pelo sufixo do nome normalizado a
+  partir de cada palavra (cada entrada é id << 8 | deslocamento), de modo
+  que "silva jo" encontre "José Silva Jordão" sem guardar uma string por
+  palavra;
+- CPF: dois arrays paralelos (CPF como inteiro de 11 dígitos, id), onde um
+  prefixo vira um intervalo numérico.
+
+As buscas são bisseções (O(log n)) e nunca consultam o banco. A carga e a
+reconciliação rodam em segundo plano (loop): alterações feitas neste
+worker entram incrementalmente via upsert; as dos demais workers são
+reconciliadas a cada reconcile_interval_seconds buscando os clientes com
+updated_at recente e, para os excluídos, os tombstones de deleted_rows
+(mesmo relógio, UTC). Enquanto o índice não está carregado (loaded), a
+rota de autocomplete responde pela busca no banco.
+Se a geração dos dados (restore_runs) mudou, um backup foi restaurado e o
+índice é recarregado por inteiro: as linhas restauradas podem ter
+updated_at anterior ao watermark.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.models.backup import DeletedRow, restore_generation
+from app.models.customer import Customer
+from app.utils.text_search import digits_only, normalize_search
+
+logger = logging.getLogger(__name__)
+
+_OFFSET_BITS = 8
+_OFFSET_MASK = (1 << _OFFSET_BITS) - 1
+CPF_DIGITS = 11
+# folga na reconciliação para transações que gravaram updated_at antes do
+# último corte mas só foram confirmadas depois dele
+RECONCILE_OVERLAP = timedelta(seconds=5)
+LOAD_BATCH_SIZE = 10_000
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    id: int
+    full_name: str
+    cpf: str
+
+
+def _word_offsets(normalized: str) -> list[int]:
+    offsets = [0] + [i + 1 for i, c in enumerate(normalized) if c == " "]
+    return [o for o in offsets if o <= _OFFSET_MASK]
+
+
+def _cpf_key(cpf: str | None) -> int:
+    digits = digits_only(cpf)
+    return int(digits) if len(digits) == CPF_DIGITS else -1
+
+
+def _entry_bytes(customer_id: int, entry: tuple[str, bytes, int]) -> int:
+    """Memória de uma entrada de _customers (chave, tupla e campos)."""
+    normalized, full_name, cpf = entry
+    return (
+        sys.getsizeof(customer_id)
+        + sys.getsizeof(entry)
+        + sys.getsizeof(normalized)
+        + sys.getsizeof(full_name)
+        + sys.getsizeof(cpf)
+    )
+
+
+class CustomerAutocompleteIndex:
+    def __init__(self, reconcile_interval_seconds: float = 30):
+        self.reconcile_interval_seconds = reconcile_interval_seconds
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._customers: dict[int, tuple[str, bytes, int]] = {}
+            # soma de _entry_bytes, mantida em build/_add/_remove para stats()
+            self._entries_bytes = 0
+            self._name_keys = array("q")
+            self._cpf_keys = array("q")
+            self._cpf_ids = array("q")
+            self.loaded = False
+            self.build_seconds: float | None = None
+            self._watermark: datetime | None = None
+            self._reconciled_at: float | None = None
+            self._generation: int | None = None
+
+    def __len__(self) -> int:
+        return len(self._customers)
+
+    # ---- consulta ----------------------------------------------------------
+
+    def _suffix(self, entry: int) -> str:
+        return self._customers[entry >> _OFFSET_BITS][0][entry & _OFFSET_MASK:]
+
+    def lookup(self, query: str, limit: int = 10) -> list[Suggestion]:
+        """Clientes ativos cujo nome (qualquer palavra) ou CPF começa com query."""
+        normalized = normalize_search(query)
+        if not normalized or limit <= 0:
+            return []
+
+        compact = normalized.replace(" ", "")
+        with self._lock:
+            if compact.isdigit():
+                ids = self._cpf_prefix(compact, limit)
+            else:
+                ids = self._name_prefix(normalized, limit)
+            return [self._suggestion(i) for i in ids]
+
+    def _name_prefix(self, prefix: str, limit: int) -> list[int]:
+        keys = self._name_keys
+        i = bisect_left(keys, prefix, key=self._suffix)
+        ids: list[int] = []
+        while i < len(keys) and len(ids) < limit:
+            entry = keys[i]
+            if not self._suffix(entry).startswith(prefix):
+                break
+            customer_id = entry >> _OFFSET_BITS
+            if customer_id not in ids:
+                ids.append(customer_id)
+            i += 1
+        return ids
+
+    def _cpf_prefix(self, prefix: str, limit: int) -> list[int]:
+        if len(prefix) > CPF_DIGITS:
+            return []
+        scale = 10 ** (CPF_DIGITS - len(prefix))
+        low, high = int(prefix) * scale, (int(prefix) + 1) * scale
+        i = bisect_left(self._cpf_keys, low)
+        ids: list[int] = []
+        while i < len(self._cpf_keys) and self._cpf_keys[i] < high and len(ids) < limit:
+            ids.append(self._cpf_ids[i])
+            i += 1
+        return ids
+
+    def _suggestion(self, customer_id: int) -> Suggestion:
+        _, full_name, cpf = self._customers[customer_id]
+        return Suggestion(
+            id=customer_id,
+            full_name=full_name.decode(),
+            cpf=f"{cpf:0{CPF_DIGITS}d}" if cpf >= 0 else "",
+        )
+
+    # ---- atualização incremental -------------------------------------------
+
+    def upsert(self, customer) -> None:
+        """Reflete um cliente criado/alterado (inativos saem do índice)."""
+        if not self.loaded or customer.id is None:
+            # a carga completa já vai trazê-lo
+            return
+        with self._lock:
+            self._remove(customer.id)
+            if customer.active:
+                self._add(customer.id, customer.full_name, customer.cpf)
+
+    def _add(self, customer_id: int, full_name: str, cpf: str | None) -> None:
+        normalized = normalize_search(full_name)
+        cpf_key = _cpf_key(cpf)
+        entry = (normalized, full_name.encode(), cpf_key)
+        self._customers[customer_id] = entry
+        self._entries_bytes += _entry_bytes(customer_id, entry)
+        for offset in _word_offsets(normalized):
+            insort(
+                self._name_keys,
+                customer_id << _OFFSET_BITS | offset,
+                key=self._suffix,
+            )
+        if cpf_key >= 0:
+            i = bisect_left(self._cpf_keys, cpf_key)
+            self._cpf_keys.insert(i, cpf_key)
+            self._cpf_ids.insert(i, customer_id)
+
+    def _remove(self, customer_id: int) -> None:
+        current = self._customers.get(customer_id)
+        if current is None:
+            return
+        normalized, _, cpf_key = current
+        for offset in _word_offsets(normalized):
+            entry = customer_id << _OFFSET_BITS | offset
+            i = bisect_left(self._name_keys, normalized[offset:], key=self._suffix)
+            # sufixos iguais de clientes diferentes ficam lado a lado
+            while self._name_keys[i] != entry:
+                i += 1
+            del self._name_keys[i]
+        if cpf_key >= 0:
+            i = bisect_left(self._cpf_keys, cpf_key)
+            while self._cpf_ids[i] != customer_id:
+                i += 1
+            del self._cpf_keys[i]
+            del self._cpf_ids[i]
+        del self._customers[customer_id]
+        self._entries_bytes -= _entry_bytes(customer_id, current)
+
+    # ---- carga e reconciliação ---------------------------------------------
+
+    def build(self, rows: Iterable, generation: int | None = None) -> None:
+        """Reconstrói o índice a partir de linhas (id, full_name, cpf, active, updated_at)."""
+        started = time.perf_counter()
+        # nome de exibição em bytes: com acentos, um str ocupa 2 bytes por caractere
+        customers: dict[int, tuple[str, bytes, int]] = {}
+        watermark: datetime | None = None
+        for row in rows:
+            if watermark is None or row.updated_at > watermark:
+                watermark = row.updated_at
+            if row.active:
+                customers[row.id] = (
+                    normalize_search(row.full_name),
+                    row.full_name.encode(),
+                    _cpf_key(row.cpf),
+                )
+
+        name_keys = sorted(
+            (
+                customer_id << _OFFSET_BITS | offset
+                for customer_id, (normalized, _, _) in customers.items()
+                for offset in _word_offsets(normalized)
+            ),
+            key=lambda e: customers[e >> _OFFSET_BITS][0][e & _OFFSET_MASK:],
+        )
+        cpfs = sorted(
+            (cpf, customer_id)
+            for customer_id, (_, _, cpf) in customers.items()
+            if cpf >= 0
+        )
+        entries_bytes = sum(_entry_bytes(i, entry) for i, entry in customers.items())
+
+        with self._lock:
+            self._customers = customers
+            self._entries_bytes = entries_bytes
+            self._name_keys = array("q", name_keys)
+            self._cpf_keys = array("q", (cpf for cpf, _ in cpfs))
+            self._cpf_ids = array("q", (customer_id for _, customer_id in cpfs))
+            self._watermark = watermark
+            self._reconciled_at = time.monotonic()
+            self._generation = generation
+            self.loaded = True
+            self.build_seconds = time.perf_counter() - started
+
+    def apply(self, rows: Iterable, deleted: Iterable = ()) -> int:
+        """
+        Aplica as linhas alteradas e os tombstones (row_id, deleted_at) desde
+        a última reconciliação.
+        """
+        # lidos antes de travar: as buscas não esperam o round-trip do banco
+        rows = list(rows)
+        deleted = list(deleted)
+        with self._lock:
+            for row in rows:
+                self.upsert(row)
+                if self._watermark is None or row.updated_at > self._watermark:
+                    self._watermark = row.updated_at
+            for customer_id, deleted_at in deleted:
+                self._remove(customer_id)
+                if self._watermark is None or deleted_at > self._watermark:
+                    self._watermark = deleted_at
+            self._reconciled_at = time.monotonic()
+        return len(rows) + len(deleted)
+
+    @staticmethod
+    def _rows(db: Session, since: datetime | None = None):
+        stmt = select(
+            Customer.id,
+            Customer.full_name,
+            Customer.cpf,
+            Customer.active,
+            Customer.updated_at,
+        ).execution_options(yield_per=LOAD_BATCH_SIZE)
+        if since is not None:
+            stmt = stmt.where(Customer.updated_at >= since)
+        return db.execute(stmt)
+
+    @staticmethod
+    def _deleted(db: Session, since: datetime):
+        return db.execute(
+            select(DeletedRow.row_id, DeletedRow.deleted_at).where(
+                DeletedRow.table_name == Customer.__tablename__,
+                DeletedRow.deleted_at >= since,
+            )
+        )
+
+    def load(self, db: Session) -> None:
+        # lida antes das linhas: uma restauração no meio força outra carga
+        generation = restore_generation(db)
+        self.build(self._rows(db), generation)
+        logger.info(
+            f"Autocomplete de clientes: {len(self)} clientes indexados "
+            f"em {self.build_seconds * 1000:.0f} ms"
+        )
+
+    def reconcile(self, db: Session) -> int:
+        if not self.loaded or restore_generation(db) != self._generation:
+            self.load(db)
+            return len(self)
+        if self._watermark is None:
+            # índice carregado de uma tabela vazia
+            since = db.scalar(select(func.min(Customer.updated_at)))
+            if since is None:
+                self._reconciled_at = time.monotonic()
+                return 0
+        else:
+            since = self._watermark - RECONCILE_OVERLAP
+        return self.apply(self._rows(db, since), self._deleted(db, since))
+
+    def refresh(self, engine: Engine) -> int:
+        """Carga inicial ou reconciliação, numa sessão própria."""
+        with Session(engine) as db:
+            return self.reconcile(db)
+
+    async def loop(self, engine: Engine) -> None:
+        """Carrega o índice e o reconcilia a cada reconcile_interval_seconds."""
+        while True:
+            try:
+                await run_in_threadpool(self.refresh, engine)
+            except Exception as e:
+                logger.warning(f"Falha ao atualizar o autocomplete de clientes: {e}")
+            await asyncio.sleep(self.reconcile_interval_seconds)
+
+    # ---- métricas ------------------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            arrays_bytes = sum(
+                sys.getsizeof(a)
+                for a in (self._name_keys, self._cpf_keys, self._cpf_ids)
+            )
+            # O(1): o tamanho das entradas é mantido nas alterações do índice
+            customers_bytes = sys.getsizeof(self._customers) + self._entries_bytes
+            total = arrays_bytes + customers_bytes
+            return {
+                "loaded": self.loaded,
+                "customers": len(self._customers),
+                "name_keys": len(self._name_keys),
+                "cpf_keys": len(self._cpf_keys),
+                "memory_bytes": total,
+                "bytes_per_customer": round(total / len(self._customers), 1)
+                if self._customers
+                else 0,
+                "build_ms": round(self.build_seconds * 1000, 1)
+                if self.build_seconds is not None
+                else None,
+                "watermark": self._watermark.isoformat() if self._watermark else None,
+                "seconds_since_reconcile": round(
+                    time.monotonic() - self._reconciled_at, 1
+                )
+                if self._reconciled_at is not None
+                else None,
+            }
+
+
+customer_autocomplete = CustomerAutocompleteIndex(
+    reconcile_interval_seconds=settings.CUSTOMER_AUTOCOMPLETE_RECONCILE_SECONDS
+)
@@ -0,0 +1,98 @@
+"""
+Executor dedicado para hashing de senhas (bcrypt).
+
+O bcrypt é CPU-bound e libera o GIL, então um pool de threads próprio basta
+para tirá-lo do threadpool compartilhado pelas rotas: o login assíncrono
+aguarda o hash aqui (run_async) e, no pico de logins, só
+PASSWORD_HASH_WORKERS threads ficam ocupadas com hashing e o restante da API
+continua sendo atendido.
+
+Código síncrono não passa por aqui: ele já roda numa thread do threadpool,
+e submeter e esperar o resultado ocuparia duas threads em vez de uma.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from app.config import settings
+from app.utils.metrics import percentile_ms
+
+T = TypeVar("T")
+
+
+class HashingExecutor:
+    def __init__(self, max_workers: int = 2, sample_size: int = 1024):
+        self.max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._wait_times: deque[float] = deque(maxlen=sample_size)
+        self._run_times: deque[float] = deque(maxlen=sample_size)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # criado sob demanda: workers que nunca fazem login não abrem threads
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="password-hash",
+                    )
+        return self._executor
+
+    def submit(self, fn: Callable[..., T], *args: Any) -> Future[T]:
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+
+        def task() -> T:
+            started_at = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._wait_times.append(started_at - submitted_at)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._run_times.append(time.perf_counter() - started_at)
+
+        return self._get_executor().submit(task)
+
+    async def run_async(self, fn: Callable[..., T], *args: Any) -> T:
+        """Executa no pool sem bloquear o event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self) -> dict:
+        with self._lock:
+            wait_times = list(self._wait_times)
+            run_times = list(self._run_times)
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "wait_ms_p50": percentile_ms(wait_times, 50),
+                "wait_ms_p99": percentile_ms(wait_times, 99),
+                "run_ms_p50": percentile_ms(run_times, 50),
+                "run_ms_p99": percentile_ms(run_times, 99),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+hashing_executor = HashingExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
@@ -0,0 +1,59 @@
+"""
+Helpers de métricas em memória (percentis e histogramas).
+"""
+from __future__ import annotations
+
+import threading
+from collections import deque
+
+
+def percentile_ms(values: list[float], p: float) -> float:
+    """Percentil p de uma lista de durações em segundos, em milissegundos."""
+    if not values:
+        return 0.0
+    data = sorted(values)
+    k = min(len(data) - 1, int(round(p / 100 * (len(data) - 1))))
+    return round(data[k] * 1000, 3)
+
+
+class LatencyRecorder:
+    """Amostra das últimas durações + histograma cumulativo (buckets em ms)."""
+
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self, sample_size: int = 1024):
+        self._samples: deque[float] = deque(maxlen=sample_size)
+        self._buckets = [0] * (len(self.BUCKETS_MS) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds: float) -> None:
+        ms = seconds * 1000
+        with self._lock:
+            self.count += 1
+            self._samples.append(seconds)
+            for i, bound in enumerate(self.BUCKETS_MS):
+                if ms <= bound:
+                    self._buckets[i] += 1
+                    break
+            else:
+                self._buckets[-1] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = list(self._samples)
+            buckets = list(self._buckets)
+            count = self.count
+
+        histogram, cumulative = {}, 0
+        for bound, n in zip(self.BUCKETS_MS, buckets):
+            cumulative += n
+            histogram[f"le_{bound}ms"] = cumulative
+        histogram["le_inf"] = cumulative + buckets[-1]
+
+        return {
+            "count": count,
+            "p50_ms": percentile_ms(samples, 50),
+            "p99_ms": percentile_ms(samples, 99),
+            "histogram": histogram,
+        }
@@ -0,0 +1,239 @@
+"""
+Telemetria do pool de conexões e load shedding baseado no pool.
+
+Cada engine recebe uma subclasse do seu pool que mede o tempo de checkout
+(espera + conexão + pre-ping), além de listeners de eventos do pool para
+conexões novas, invalidações e tempo de uso das conexões. A estimativa de
+espera dos pools do primário alimenta o PoolLoadSheddingMiddleware, que
+responde 503 + Retry-After em vez de deixar a requisição presa até o
+pool_timeout; a réplica saturada não barra requisições que só usam o
+primário.
+
+Checkouts longos por natureza (streams com yield_per/stream_results,
+COPY de exportação, backup e restore) ficam fora da média do tempo de
+uso: senão alguns minutos de backup inflariam a espera estimada e o
+middleware recusaria requisições comuns.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Callable, Iterable
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.utils.metrics import LatencyRecorder
+
+# marca no info da conexão (vale até o checkin) para não entrar na média
+LONG_CHECKOUT_KEY = "pool_metrics_long_checkout"
+
+
+def exclude_from_hold_time(connection) -> None:
+    """
+    Tira o checkout atual da média de tempo de uso. Aceita Connection ou a
+    conexão de raw_connection() (os dois expõem o info do pool).
+    """
+    connection.info[LONG_CHECKOUT_KEY] = True
+
+
+class PoolMetrics:
+    # peso da amostra mais recente na média móvel do tempo de uso
+    HOLD_EWMA_ALPHA = 0.2
+
+    def __init__(
+        self, name: str, *, pool_size: int, max_overflow: int, sheds_load: bool = True
+    ):
+        self.name = name
+        self.capacity = pool_size + max(max_overflow, 0)
+        # entra na estimativa do PoolLoadSheddingMiddleware
+        self.sheds_load = sheds_load
+        self._engine: Engine | None = None
+        self._lock = threading.Lock()
+
+        self.checkout = LatencyRecorder()
+        self.pre_ping = LatencyRecorder()
+        self.pending_checkouts = 0
+        self.checkout_timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.hold_seconds_ewma = 0.0
+
+    def pool_class(self, base: type[Pool]) -> type[Pool]:
+        """
+        Subclasse do pool que mede o checkout. recreate() usa
+        self.__class__, então a instrumentação sobrevive a dispose().
+        """
+        metrics = self
+
+        class InstrumentedPool(base):  # type: ignore[valid-type, misc]
+            def connect(self):
+                with metrics._lock:
+                    metrics.pending_checkouts += 1
+                started = time.perf_counter()
+                try:
+                    return super().connect()
+                except exc.TimeoutError:
+                    with metrics._lock:
+                        metrics.checkout_timeouts += 1
+                    raise
+                finally:
+                    metrics.checkout.record(time.perf_counter() - started)
+                    with metrics._lock:
+                        metrics.pending_checkouts -= 1
+
+        InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+        return InstrumentedPool
+
+    def attach(self, engine: Engine) -> None:
+        """Registra os eventos do pool e mede o pre-ping do dialeto."""
+        self._engine = engine
+
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_conn, record):
+            with self._lock:
+                self.connects += 1
+
+        @event.listens_for(engine, "checkout")
+        def _on_checkout(dbapi_conn, record, proxy):
+            record.info["checked_out_at"] = time.perf_counter()
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _on_execute(conn, cursor, statement, parameters, context, executemany):
+            if context.execution_options.get("stream_results"):
+                exclude_from_hold_time(conn)
+
+        @event.listens_for(engine, "checkin")
+        def _on_checkin(dbapi_conn, record):
+            started = record.info.pop("checked_out_at", None)
+            if record.info.pop(LONG_CHECKOUT_KEY, False) or started is None:
+                return
+            held = time.perf_counter() - started
+            with self._lock:
+                self.hold_seconds_ewma += self.HOLD_EWMA_ALPHA * (
+                    held - self.hold_seconds_ewma
+                )
+
+        @event.listens_for(engine, "invalidate")
+        @event.listens_for(engine, "soft_invalidate")
+        def _on_invalidate(dbapi_conn, record, exception):
+            with self._lock:
+                self.invalidations += 1
+
+        dialect = engine.dialect
+        do_ping = dialect.do_ping
+
+        def timed_do_ping(dbapi_connection):
+            started = time.perf_counter()
+            try:
+                return do_ping(dbapi_connection)
+            finally:
+                self.pre_ping.record(time.perf_counter() - started)
+
+        dialect.do_ping = timed_do_ping  # type: ignore[method-assign]
+
+    def _pool_counts(self) -> tuple[int, int]:
+        pool = self._engine.pool if self._engine is not None else None
+        if pool is None or not hasattr(pool, "checkedout"):
+            return 0, 0
+        return pool.checkedout(), max(pool.overflow(), 0)
+
+    def estimated_wait_seconds(self) -> float:
+        """
+        Espera estimada por uma conexão: zero enquanto houver folga no pool;
+        com o pool cheio, a fila (checkouts pendentes + este) é drenada à
+        taxa de capacity conexões a cada tempo médio de uso.
+        """
+        in_use, _ = self._pool_counts()
+        if self.capacity <= 0 or in_use < self.capacity:
+            return 0.0
+        with self._lock:
+            queued = self.pending_checkouts + 1
+            hold = self.hold_seconds_ewma
+        return queued * hold / self.capacity
+
+    def snapshot(self) -> dict:
+        in_use, overflow = self._pool_counts()
+        with self._lock:
+            counters = {
+                "pending_checkouts": self.pending_checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "hold_ms_avg": round(self.hold_seconds_ewma * 1000, 3),
+            }
+        return {
+            "capacity": self.capacity,
+            "in_use": in_use,
+            "overflow": overflow,
+            **counters,
+            "checkout_wait": self.checkout.snapshot(),
+            "pre_ping": self.pre_ping.snapshot(),
+            "estimated_wait_ms": round(self.estimated_wait_seconds() * 1000, 3),
+        }
+
+
+registry: dict[str, PoolMetrics] = {}
+
+
+def register(
+    name: str, *, pool_size: int, max_overflow: int, sheds_load: bool = True
+) -> PoolMetrics:
+    metrics = PoolMetrics(
+        name, pool_size=pool_size, max_overflow=max_overflow, sheds_load=sheds_load
+    )
+    registry[name] = metrics
+    return metrics
+
+
+def max_estimated_wait_seconds() -> float:
+    """Maior espera estimada entre os pools com sheds_load (os do primário)."""
+    return max(
+        (m.estimated_wait_seconds() for m in registry.values() if m.sheds_load),
+        default=0.0,
+    )
+
+
+class PoolLoadSheddingMiddleware:
+    """
+    Responde 503 + Retry-After quando a espera estimada por conexão passa
+    do orçamento (budget_ms <= 0 desativa).
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        budget_ms: int,
+        estimate: Callable[[], float] = max_estimated_wait_seconds,
+        exempt_paths: Iterable[str] = ("/health", "/api/metrics"),
+    ):
+        self.app = app
+        self.budget_seconds = budget_ms / 1000
+        self.estimate = estimate
+        self.exempt_paths = tuple(exempt_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or self.budget_seconds <= 0
+            or scope["path"].startswith(self.exempt_paths)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        wait = self.estimate()
+        if wait > self.budget_seconds:
+            response = JSONResponse(
+                {"detail": "Servidor sobrecarregado. Tente novamente em instantes."},
+                status_code=503,
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,145 @@
+"""
+Cache de usuários autenticados (principais) usado por get_current_user.
+
+Guarda apenas o necessário para autorização, com TTL e limite de entradas.
+Alterações em usuários invalidam a entrada explicitamente neste processo;
+nos demais workers a entrada expira em no máximo AUTH_CACHE_TTL_SECONDS.
+Uma restauração de backup (em qualquer worker) troca a geração dos dados
+em restore_runs: watch_restore_generation confere a geração a cada
+AUTH_CACHE_RESTORE_CHECK_SECONDS e esvazia o cache quando ela muda.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.models.backup import restore_generation
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachedPrincipal:
+    id: int
+    name: str
+    email: str
+    role: str
+    active: bool
+    # role vindo do token (preenchido por requisição, nunca armazenado)
+    token_role: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "CachedPrincipal":
+        return cls(
+            id=user.id,
+            name=user.name,
+            email=user.email,
+            role=user.role,
+            active=user.active,
+        )
+
+
+class PrincipalCache:
+    def __init__(self, ttl_seconds: float = 30, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, tuple[float, CachedPrincipal]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # geração dos dados (restore_runs) vista por último neste worker
+        self.generation: int | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, user_id: int) -> CachedPrincipal | None:
+        if not self.enabled:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, principal = entry
+            if expires_at <= now:
+                del self._entries[user_id]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return principal
+
+    def set(self, principal: CachedPrincipal) -> None:
+        if not self.enabled:
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[principal.id] = (expires_at, principal)
+            self._entries.move_to_end(principal.id)
+            # LRU: descarta os menos usados ao passar do limite
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def sync_generation(self, generation: int) -> bool:
+        """Registra a geração dos dados; se mudou, esvazia o cache e retorna True."""
+        with self._lock:
+            changed = self.generation is not None and generation != self.generation
+            self.generation = generation
+            if changed:
+                self._entries.clear()
+            return changed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+)
+
+
+def check_restore_generation(engine: Engine) -> bool:
+    with engine.connect() as conn:
+        generation = restore_generation(conn)
+    changed = principal_cache.sync_generation(generation)
+    if changed:
+        logger.info(f"Backup restaurado (geração {generation}): cache de usuários esvaziado")
+    return changed
+
+
+async def watch_restore_generation(engine: Engine, interval_seconds: int) -> None:
+    """Confere a geração dos dados a cada interval_seconds (fora das requisições)."""
+    while True:
+        try:
+            await run_in_threadpool(check_restore_generation, engine)
+        except Exception as e:
+            logger.warning(f"Falha ao conferir a geração dos dados: {e}")
+        await asyncio.sleep(interval_seconds)
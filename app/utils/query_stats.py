@@ -0,0 +1,164 @@
+"""
+Estatísticas de SQL por requisição.
+
+Listeners de cursor registrados na classe Engine (valem para o engine
+síncrono, o assíncrono e a réplica) atribuem cada statement à requisição
+corrente através de um ContextVar. O QueryStatsMiddleware abre o contexto,
+publica o resumo no cabeçalho Server-Timing, registra um log estruturado e
+avisa quando o mesmo formato de statement se repete (padrão N+1).
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class QueryStats:
+    method: str = ""
+    path: str = ""
+    count: int = 0
+    total_seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: str | None = None
+    shapes: Counter = field(default_factory=Counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        # o SQL já vem parametrizado: o texto normalizado é o "formato"
+        shape = _WHITESPACE.sub(" ", statement).strip()
+        with self._lock:
+            self.count += 1
+            self.total_seconds += elapsed
+            self.shapes[shape] += 1
+            if elapsed >= self.slowest_seconds:
+                self.slowest_seconds = elapsed
+                self.slowest_statement = shape
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Formatos executados pelo menos threshold vezes (suspeitos de N+1)."""
+        if threshold <= 0:
+            return []
+        return [(s, n) for s, n in self.shapes.most_common() if n >= threshold]
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.total_seconds * 1000:.3f};desc="{self.count} queries", '
+            f"db-slowest;dur={self.slowest_seconds * 1000:.3f}"
+        )
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+# chamados ao fim de cada requisição (ex.: orçamento de queries nos testes)
+observers: list[Callable[[QueryStats], None]] = []
+
+
+def current() -> QueryStats | None:
+    return _current.get()
+
+
+@contextmanager
+def track_queries(method: str = "", path: str = "") -> Iterator[QueryStats]:
+    """Atribui os statements executados neste contexto a um novo QueryStats."""
+    stats = QueryStats(method=method, path=path)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+# o início fica no contexto de execução (um por statement): um statement que
+# falha não deixa nada para trás na conexão do pool
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None and context is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "_query_started", None)
+    if stats is None or started is None:
+        return
+    stats.record(statement, time.perf_counter() - started)
+
+
+_installed = False
+
+
+def install() -> None:
+    """Registra os listeners em todos os engines (idempotente)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app: ASGIApp, *, n_plus_one_threshold: int = 5):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries(scope["method"], scope["path"]) as stats:
+
+            async def send_with_timing(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", stats.server_timing())
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                self._report(stats)
+
+    def _report(self, stats: QueryStats) -> None:
+        suspects = stats.repeated(self.n_plus_one_threshold)
+        logger.info(
+            f"sql method={stats.method} path={stats.path} queries={stats.count} "
+            f"db_ms={stats.total_seconds * 1000:.3f} "
+            f"slowest_ms={stats.slowest_seconds * 1000:.3f} "
+            f"n_plus_one={len(suspects)}",
+            extra={
+                "sql_stats": {
+                    "method": stats.method,
+                    "path": stats.path,
+                    "queries": stats.count,
+                    "db_ms": round(stats.total_seconds * 1000, 3),
+                    "slowest_ms": round(stats.slowest_seconds * 1000, 3),
+                    "slowest_statement": stats.slowest_statement,
+                }
+            },
+        )
+        for shape, times in suspects:
+            logger.warning(
+                f"Possível N+1 em {stats.method} {stats.path}: "
+                f"{times}x {shape[:200]}"
+            )
+
+        for observer in observers:
+            observer(stats)
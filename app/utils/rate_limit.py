@@ -1,27 +1,235 @@
+"""
+Rate limiting por GCRA (Generic Cell Rate Algorithm).
+
+Cada chave guarda um único número (TAT, "theoretical arrival time"), então a
+memória por chave é O(1). O estado fica num backend plugável:
+  - InMemoryBackend: por processo, com descarte de chaves ociosas e limite
+    rígido de chaves rastreadas;
+  - DatabaseBackend: tabela no próprio PostgreSQL, compartilhada entre
+    workers (um único UPSERT atômico por verificação), criada pela migração
+    do schema (install_rate_limit_table).
+
+A dependency rate_limit usa como chave o usuário do token, quando houver;
+senão o IP do cliente. Atrás de proxy reverso, configure
+FORWARDED_ALLOW_IPS (ProxyHeadersMiddleware) para que o IP seja o do
+cliente e não o do proxy; sem isso as requisições anônimas dividem o
+mesmo balde.
+"""
 from __future__ import annotations
 
+import math
+import threading
 import time
-from collections import defaultdict, deque
+from collections import OrderedDict
+from typing import Callable, Protocol
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.config import settings
+from app.services.auth_service import decode_access_token
+
+
+class RateLimitBackend(Protocol):
+    def acquire(
+        self, key: str, *, now: float, interval: float, tolerance: float
+    ) -> tuple[bool, float]:
+        """Retorna (permitido, segundos até a próxima tentativa possível)."""
+        ...
+
+    def clear(self) -> None: ...
+
+
+class InMemoryBackend:
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # ordem de uso (LRU): as chaves mais antigas ficam no início
+        self._tat: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(
+        self, key: str, *, now: float, interval: float, tolerance: float
+    ) -> tuple[bool, float]:
+        with self._lock:
+            tat = max(self._tat.get(key, now), now)
+
+            if tat - now > tolerance:
+                return False, tat - now - tolerance
+
+            self._tat[key] = tat + interval
+            self._tat.move_to_end(key)
+            self._evict(now)
+            return True, 0.0
+
+    def _evict(self, now: float) -> None:
+        # chave com TAT no passado equivale a uma chave nova: pode sair
+        while self._tat:
+            oldest_key, oldest_tat = next(iter(self._tat.items()))
+            if oldest_tat > now and len(self._tat) <= self.max_keys:
+                break
+            del self._tat[oldest_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tat.clear()
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+
+class DatabaseBackend:
+    TABLE = "rate_limit_buckets"
+
+    def __init__(self, engine: Engine, cleanup_every: int = 1000):
+        self.engine = engine
+        self.cleanup_every = cleanup_every
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def acquire(
+        self, key: str, *, now: float, interval: float, tolerance: float
+    ) -> tuple[bool, float]:
+        # a condição do GCRA vai no WHERE do DO UPDATE: se a chave estiver
+        # bloqueada nada é alterado e o RETURNING volta vazio
+        upsert = text(
+            f"""
+            INSERT INTO {self.TABLE} (key, tat) VALUES (:key, :now + :interval)
+            ON CONFLICT (key) DO UPDATE
+            SET tat = CASE WHEN {self.TABLE}.tat > :now
+                           THEN {self.TABLE}.tat ELSE :now END + :interval
+            WHERE CASE WHEN {self.TABLE}.tat > :now
+                       THEN {self.TABLE}.tat ELSE :now END - :now <= :tolerance
+            RETURNING tat
+            """
+        )
+        params = {"key": key, "now": now, "interval": interval, "tolerance": tolerance}
 
+        with self.engine.begin() as conn:
+            row = conn.execute(upsert, params).first()
+            retry_after = 0.0
+            if row is None:
+                tat = conn.execute(
+                    text(f"SELECT tat FROM {self.TABLE} WHERE key = :key"),
+                    {"key": key},
+                ).scalar_one()
+                retry_after = max(tat - now - tolerance, 0.0)
 
-class SimpleRateLimiter:
-    def __init__(self, max_attempts: int = 10, window_seconds: int = 300):
+        self._maybe_cleanup(now)
+        return row is not None, retry_after
+
+    def _maybe_cleanup(self, now: float) -> None:
+        with self._lock:
+            self._calls += 1
+            if self._calls % self.cleanup_every:
+                return
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(f"DELETE FROM {self.TABLE} WHERE tat < :now"), {"now": now}
+            )
+
+    def clear(self) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {self.TABLE}"))
+
+
+def install_rate_limit_table(conn: Connection) -> None:
+    """Cria (idempotente) a tabela do DatabaseBackend. Chamada pela migração."""
+    # UNLOGGED: estado descartável, sem custo de WAL
+    unlogged = "UNLOGGED " if conn.dialect.name == "postgresql" else ""
+    conn.execute(
+        text(
+            f"CREATE {unlogged}TABLE IF NOT EXISTS {DatabaseBackend.TABLE} "
+            "(key VARCHAR(255) PRIMARY KEY, tat DOUBLE PRECISION NOT NULL)"
+        )
+    )
+
+
+class RateLimiter:
+    """
+    Permite até max_attempts em rajada e, depois disso, uma tentativa a cada
+    window_seconds / max_attempts segundos.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 10,
+        window_seconds: int = 300,
+        *,
+        name: str = "default",
+        backend: RateLimitBackend | None = None,
+    ):
         self.max_attempts = max_attempts
         self.window_seconds = window_seconds
-        self._hits: dict[str, deque[float]] = defaultdict(deque)
+        self.name = name
+        self.backend = backend if backend is not None else InMemoryBackend()
+
+        self.interval = window_seconds / max_attempts
+        self.tolerance = self.interval * (max_attempts - 1)
+
+    def check(self, key: str) -> tuple[bool, float]:
+        return self.backend.acquire(
+            f"{self.name}:{key}",
+            now=time.time(),
+            interval=self.interval,
+            tolerance=self.tolerance,
+        )
 
     def allow(self, key: str) -> bool:
-        now = time.time()
-        q = self._hits[key]
+        return self.check(key)[0]
+
+
+# compatibilidade com o nome antigo
+SimpleRateLimiter = RateLimiter
+
+
+def client_key(request: Request) -> str:
+    """Usuário do token (assinatura válida) ou, sem ele, o IP do cliente."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        payload = decode_access_token(token)
+        if payload and payload.get("sub"):
+            return f"user:{payload['sub']}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def rate_limit(limiter: RateLimiter) -> Callable[[Request], None]:
+    """Dependency FastAPI que limita por usuário ou IP (429 + Retry-After)."""
+
+    def dependency(request: Request) -> None:
+        key = client_key(request)
+        allowed, retry_after = limiter.check(key)
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Muitas tentativas. Aguarde e tente novamente.",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+    return dependency
+
+
+def _build_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "database":
+        from app.database import engine
 
-        while q and now - q[0] > self.window_seconds:
-            q.popleft()
+        return DatabaseBackend(engine)
+    return InMemoryBackend(max_keys=settings.RATE_LIMIT_MAX_KEYS)
 
-        if len(q) >= self.max_attempts:
-            return False
 
-        q.append(now)
-        return True
+backend = _build_backend()
 
+login_rate_limiter = RateLimiter(
+    max_attempts=settings.LOGIN_RATE_LIMIT_ATTEMPTS,
+    window_seconds=settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+    name="login",
+    backend=backend,
+)
+export_rate_limiter = RateLimiter(
+    max_attempts=settings.EXPORT_RATE_LIMIT_ATTEMPTS,
+    window_seconds=settings.EXPORT_RATE_LIMIT_WINDOW_SECONDS,
+    name="export",
+    backend=backend,
+)
 
-rate_limiter = SimpleRateLimiter(max_attempts=10, window_seconds=300)
+rate_limiter = login_rate_limiter
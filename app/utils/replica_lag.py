@@ -0,0 +1,85 @@
+"""
+Política de staleness da réplica de leitura.
+
+O atraso de replicação é medido no máximo a cada check_interval_seconds.
+Se a réplica está recebendo WAL em streaming e já aplicou tudo o que
+recebeu, o atraso é zero (o primário pode só estar sem escritas). Senão,
+inclusive com o WAL receiver desconectado (as duas LSNs param e ficam
+iguais), é o tempo desde a última transação aplicada
+(pg_last_xact_replay_timestamp). Se passar de max_lag_seconds, ou se a
+réplica não responder, as leituras voltam para o primário até a próxima
+verificação.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# sem pg_read_all_stats o status do receiver vem NULL e vale o tempo de replay
+LAG_SQL = text(
+    """
+    SELECT
+        pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() AS caught_up,
+        EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming'
+        ) AS streaming,
+        EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) AS replay_age
+    """
+)
+
+
+class ReplicaLagMonitor:
+    def __init__(
+        self,
+        engine: Engine,
+        *,
+        max_lag_seconds: float,
+        check_interval_seconds: float = 5,
+    ):
+        self.engine = engine
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self.last_lag_seconds: float | None = None
+        self._fresh = False
+        self._checked_at: float | None = None
+        self._lock = threading.Lock()
+
+    def needs_check(self) -> bool:
+        return (
+            self._checked_at is None
+            or time.monotonic() - self._checked_at >= self.check_interval_seconds
+        )
+
+    def measure_lag(self) -> float:
+        # fora do PostgreSQL (ex.: SQLite nos testes) não há replicação
+        if self.engine.dialect.name != "postgresql":
+            return 0.0
+        with self.engine.connect() as conn:
+            row = conn.execute(LAG_SQL).one()
+        if row.caught_up and row.streaming:
+            return 0.0
+        return float(row.replay_age or 0)
+
+    def refresh(self) -> bool:
+        with self._lock:
+            try:
+                lag = self.measure_lag()
+            except Exception as e:
+                logger.warning(f"Réplica indisponível, usando o primário: {e}")
+                lag = None
+
+            self.last_lag_seconds = lag
+            self._fresh = lag is not None and lag <= self.max_lag_seconds
+            self._checked_at = time.monotonic()
+            return self._fresh
+
+    def is_fresh(self) -> bool:
+        if self.needs_check():
+            return self.refresh()
+        return self._fresh
@@ -0,0 +1,71 @@
+"""
+Respostas em streaming (NDJSON) para endpoints de listagem.
+
+O cliente opta pelo modo com `Accept: application/x-ndjson`. As linhas vêm
+do banco em lotes (yield_per / cursor do servidor) e cada uma é serializada
+e enviada sem montar a lista nem o documento JSON completo, de modo que o
+tempo até o primeiro byte e o pico de memória não dependem do tamanho do
+resultado.
+"""
+from __future__ import annotations
+
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# linhas buscadas por vez no cursor e agrupadas por chunk enviado
+STREAM_BATCH_SIZE = 1000
+
+
+def wants_ndjson(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return any(
+        part.split(";")[0].strip().lower() == NDJSON_MEDIA_TYPE
+        for part in accept.split(",")
+    )
+
+
+def _line(schema: type[BaseModel], item) -> str:
+    return schema.model_validate(item).model_dump_json() + "\n"
+
+
+def _chunks(items: Iterable, schema: type[BaseModel]) -> Iterator[bytes]:
+    batch: list[str] = []
+    for item in items:
+        batch.append(_line(schema, item))
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield "".join(batch).encode()
+            batch.clear()
+    if batch:
+        yield "".join(batch).encode()
+
+
+async def _async_chunks(
+    items: AsyncIterable, schema: type[BaseModel]
+) -> AsyncIterator[bytes]:
+    batch: list[str] = []
+    async for item in items:
+        batch.append(_line(schema, item))
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield "".join(batch).encode()
+            batch.clear()
+    if batch:
+        yield "".join(batch).encode()
+
+
+def ndjson_response(
+    items: Iterable | AsyncIterable, schema: type[BaseModel]
+) -> StreamingResponse:
+    """
+    Uma linha JSON por item, validada por `schema`. Aceita iteráveis
+    síncronos (percorridos no threadpool) e assíncronos.
+    """
+    if hasattr(items, "__aiter__"):
+        body = _async_chunks(items, schema)
+    else:
+        body = _chunks(items, schema)
+    return StreamingResponse(body, media_type=NDJSON_MEDIA_TYPE)
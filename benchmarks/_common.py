@@ -0,0 +1,102 @@
+"""
+Utilitários compartilhados pelos benchmarks.
+
+Os benchmarks rodam a aplicação em processo (sem servidor). Por padrão usam
+SQLite em memória; passe --database-url para medir contra um PostgreSQL real.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Iterable
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+
+def base_parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="URL SQLAlchemy (padrão: SQLite em memória)",
+    )
+    return parser
+
+
+def make_engine(database_url: str | None = None) -> Engine:
+    if not database_url:
+        return create_engine(
+            "sqlite+pysqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+    if database_url.startswith("sqlite"):
+        return create_engine(
+            database_url, connect_args={"check_same_thread": False}
+        )
+    return create_engine(database_url, pool_size=20, max_overflow=20)
+
+
+def prepare_app(engine: Engine):
+    """
+    Aponta a aplicação para o engine informado e recria as tabelas.
+    Retorna (app, SessionLocal).
+    """
+    import app.database as app_database
+    import app.main as app_main
+    import app.models  # noqa: F401
+
+    app_database.engine = engine
+    app_main.engine = engine
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    app_database.SessionLocal = SessionLocal
+
+    app_database.Base.metadata.drop_all(bind=engine)
+    app_database.Base.metadata.create_all(bind=engine)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app_main.app.dependency_overrides[app_database.get_db] = override_get_db
+    return app_main.app, SessionLocal
+
+
+def percentile(values: Iterable[float], p: float) -> float:
+    data = sorted(values)
+    if not data:
+        return 0.0
+    k = max(0, min(len(data) - 1, int(round(p / 100 * (len(data) - 1)))))
+    return data[k]
+
+
+def timed(fn: Callable[[], object], n: int) -> list[float]:
+    durations = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - t0)
+    return durations
+
+
+def report(label: str, durations: list[float], *, unit: str = "req") -> None:
+    total = sum(durations)
+    rate = len(durations) / total if total else float("inf")
+    print(
+        f"{label:<32} n={len(durations):>6}  {rate:>10.1f} {unit}/s  "
+        f"p50={statistics.median(durations) * 1000:.3f}ms  "
+        f"p99={percentile(durations, 99) * 1000:.3f}ms"
+    )
@@ -0,0 +1,152 @@
+"""
+Benchmark ASGI em processo: stack síncrona (def + Session no threadpool)
+vs. assíncrona (async def + AsyncSession) para o dashboard.
+
+Para cada nível de concorrência (50/200/500 clientes simultâneos) mede
+requisições/s e p99 das duas stacks sobre os mesmos dados.
+
+Uso:
+  python benchmarks/bench_async_db.py [--requests 2000] [--database-url URL]
+
+  URL síncrona (ex.: postgresql://u:p@localhost/db); a assíncrona é derivada
+  trocando o driver (asyncpg / aiosqlite).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from _common import base_parser, make_engine, percentile
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database import Base
+from app.models import Customer, PromissoryNote, Sale, User
+from app.services.dashboard_service import get_dashboard, get_dashboard_async
+
+
+def _async_url(url: str) -> str:
+    if url.startswith("sqlite"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+
+def _seed(SessionLocal, notes: int) -> None:
+    db = SessionLocal()
+    user = User(name="B", email="b@b.com", password_hash="x", role="admin")
+    customer = Customer(full_name="Cliente", cpf="00000000000", phone="1")
+    db.add_all([user, customer])
+    db.flush()
+    sale = Sale(
+        customer_id=customer.id,
+        user_id=user.id,
+        total_amount=Decimal(notes * 10),
+        installments_count=notes,
+        first_installment_date=date.today(),
+    )
+    db.add(sale)
+    db.flush()
+    db.add_all(
+        PromissoryNote(
+            sale_id=sale.id,
+            installment_number=i + 1,
+            original_amount=Decimal("10.00"),
+            due_date=date.today() + timedelta(days=i - notes // 2),
+        )
+        for i in range(notes)
+    )
+    db.commit()
+    db.close()
+
+
+def build_app(SessionLocal, AsyncSessionLocal) -> FastAPI:
+    app = FastAPI()
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    @app.get("/sync/dashboard")
+    def sync_dashboard(db: Session = Depends(get_db)):
+        return get_dashboard(db)
+
+    @app.get("/async/dashboard")
+    async def async_dashboard(db: AsyncSession = Depends(get_async_db)):
+        return await get_dashboard_async(db)
+
+    return app
+
+
+async def _load(app, path: str, *, clients: int, total: int):
+    latencies: list[float] = []
+    remaining = [total]
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+
+        async def worker():
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                t0 = time.perf_counter()
+                r = await c.get(path)
+                latencies.append(time.perf_counter() - t0)
+                assert r.status_code == 200, r.text
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - t0
+
+    return len(latencies) / elapsed, percentile(latencies, 99)
+
+
+def main() -> None:
+    parser = base_parser(__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--notes", type=int, default=5000)
+    parser.add_argument("--concurrency", default="50,200,500")
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench.db'}"
+    engine = make_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    _seed(SessionLocal, args.notes)
+
+    async_kwargs = {} if url.startswith("sqlite") else {"pool_size": 20, "max_overflow": 20}
+    async_engine = create_async_engine(_async_url(url), **async_kwargs)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    app = build_app(SessionLocal, AsyncSessionLocal)
+
+    # um único event loop: o pool assíncrono fica preso ao loop que o criou
+    async def run_all():
+        print(f"{'clientes':>8}  {'stack':<6} {'req/s':>10} {'p99 (ms)':>10}")
+        for clients in (int(c) for c in args.concurrency.split(",")):
+            for stack in ("sync", "async"):
+                rps, p99 = await _load(
+                    app, f"/{stack}/dashboard", clients=clients, total=args.requests
+                )
+                print(f"{clients:>8}  {stack:<6} {rps:>10.1f} {p99 * 1000:>10.2f}")
+        await async_engine.dispose()
+
+    asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark: throughput de requisições autenticadas com e sem o cache de
+principais (get_current_user).
+
+Uso:
+  python benchmarks/bench_auth_cache.py [--requests 2000] [--database-url URL]
+"""
+
+from __future__ import annotations
+
+from _common import base_parser, make_engine, prepare_app, report, timed
+
+from fastapi.testclient import TestClient
+
+from app.models.user import User, UserRole
+from app.services.auth_service import create_access_token
+from app.utils.principal_cache import principal_cache
+
+
+def main() -> None:
+    parser = base_parser(__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    app, SessionLocal = prepare_app(make_engine(args.database_url))
+
+    db = SessionLocal()
+    user = User(
+        name="Bench",
+        email="bench@credigestor.com",
+        password_hash="x",
+        role=UserRole.ADMIN.value,
+        active=True,
+    )
+    db.add(user)
+    db.commit()
+    token = create_access_token(subject=str(user.id), role=user.role)
+    db.close()
+
+    headers = {"Authorization": f"Bearer {token}"}
+    ttl = principal_cache.ttl_seconds
+
+    with TestClient(app) as client:
+
+        def call():
+            r = client.get("/api/auth/me", headers=headers)
+            assert r.status_code == 200
+
+        timed(call, 100)  # aquecimento
+
+        principal_cache.ttl_seconds = 0
+        principal_cache.clear()
+        report("sem cache", timed(call, args.requests))
+
+        principal_cache.ttl_seconds = ttl or 30
+        principal_cache.clear()
+        report("com cache", timed(call, args.requests))
+        print(f"hits={principal_cache.hits} misses={principal_cache.misses}")
+
+
+if __name__ == "__main__":
+    main()
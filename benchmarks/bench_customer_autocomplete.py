@@ -0,0 +1,89 @@
+"""
+Benchmark: índice de autocomplete de clientes em memória. Mede a montagem,
+a memória ocupada e a latência por consulta (prefixo de nome e de CPF).
+Meta: menos de 1 ms por consulta com 1 milhão de clientes.
+
+As linhas são geradas em memória (o custo de ler a tabela na carga depende
+do banco e não entra na medição).
+
+Uso:
+  python benchmarks/bench_customer_autocomplete.py [--customers 1000000]
+      [--queries 2000] [--updates 200]
+"""
+
+from __future__ import annotations
+
+import random
+from datetime import datetime
+from types import SimpleNamespace
+
+from _common import base_parser, percentile, report, timed
+
+from app.utils.customer_autocomplete import CustomerAutocompleteIndex
+
+FIRST = ["José", "Maria", "João", "Ana", "Antônio", "Francisca", "Luís", "Érica", "Paulo", "Lúcia"]
+LAST = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Ávila", "Conceição", "Gonçalves", "Araújo"]
+
+
+def _rows(n: int, rnd: random.Random):
+    now = datetime.now()
+    for i in range(1, n + 1):
+        yield SimpleNamespace(
+            id=i,
+            full_name=f"{rnd.choice(FIRST)} {rnd.choice(LAST)} {rnd.choice(LAST)} {i}",
+            cpf=f"{rnd.randrange(10**11):011d}",
+            active=True,
+            updated_at=now,
+        )
+
+
+def main() -> None:
+    parser = base_parser(__doc__)
+    parser.add_argument("--customers", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=200)
+    args = parser.parse_args()
+
+    rnd = random.Random(7)
+    index = CustomerAutocompleteIndex()
+    index.build(_rows(args.customers, rnd))
+
+    stats = index.stats()
+    print(
+        f"montagem: {stats['build_ms']:.0f} ms  clientes={stats['customers']}  "
+        f"chaves de nome={stats['name_keys']}  "
+        f"memória={stats['memory_bytes'] / 2**20:.1f} MiB "
+        f"({stats['bytes_per_customer']:.0f} B/cliente)"
+    )
+
+    prefixes = {
+        "nome (2 letras)": lambda: rnd.choice(FIRST)[:2],
+        "nome + sobrenome": lambda: f"{rnd.choice(FIRST)} {rnd.choice(LAST)[:3]}",
+        "sobrenome": lambda: rnd.choice(LAST)[:4],
+        "cpf (6 dígitos)": lambda: f"{rnd.randrange(10**6):06d}",
+    }
+    for label, make_prefix in prefixes.items():
+        durations = timed(lambda: index.lookup(make_prefix(), limit=10), args.queries)
+        report(label, durations, unit="consulta")
+        if percentile(durations, 99) > 0.001:
+            print("  p99 acima da meta de 1 ms")
+
+    next_id = args.customers + 1
+
+    def update():
+        nonlocal next_id
+        index.upsert(
+            SimpleNamespace(
+                id=next_id,
+                full_name=f"{rnd.choice(FIRST)} {rnd.choice(LAST)}",
+                cpf=f"{rnd.randrange(10**11):011d}",
+                active=True,
+            )
+        )
+        next_id += 1
+
+    report("upsert incremental", timed(update, args.updates), unit="upsert")
+
+
+if __name__ == "__main__":
+    main()
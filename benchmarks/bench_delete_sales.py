@@ -0,0 +1,133 @@
+"""
+Benchmark: exclusão de vendas com parcelas e pagamentos. Compara a cascata
+do ORM (parcelas e pagamentos carregados na sessão e apagados linha a linha,
+como antes de ON DELETE CASCADE) com delete_sales, que emite um único
+DELETE e deixa a cascata para o banco.
+
+Uso:
+  python benchmarks/bench_delete_sales.py [--sales 10000] [--database-url URL]
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from _common import base_parser, make_engine, prepare_app
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import selectinload
+
+from app.models import Customer, Payment, PromissoryNote, Sale, User
+from app.services.sale_service import delete_sales
+
+CHUNK = 5_000
+INSTALLMENTS = 12
+
+
+def _seed(SessionLocal, n_sales: int) -> None:
+    db = SessionLocal()
+    user = User(name="B", email="b@b.com", password_hash="x", role="admin")
+    customer = Customer(full_name="Cliente", cpf="00000000000", phone="1")
+    db.add_all([user, customer])
+    db.commit()
+
+    now = datetime.now(timezone.utc)
+    start = date.today()
+    for offset in range(0, n_sales, CHUNK):
+        ids = range(offset + 1, min(offset + CHUNK, n_sales) + 1)
+        db.execute(
+            insert(Sale),
+            [
+                {
+                    "id": i,
+                    "customer_id": customer.id,
+                    "user_id": user.id,
+                    "total_amount": Decimal("1200.00"),
+                    "down_payment": 0,
+                    "installments_count": INSTALLMENTS,
+                    "first_installment_date": start,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in ids
+            ],
+        )
+        db.execute(
+            insert(PromissoryNote),
+            [
+                {
+                    "id": (i - 1) * INSTALLMENTS + n,
+                    "sale_id": i,
+                    "installment_number": n,
+                    "original_amount": Decimal("100.00"),
+                    "paid_amount": Decimal("100.00") if n == 1 else 0,
+                    "due_date": start + timedelta(days=30 * (n - 1)),
+                    "status": "paid" if n == 1 else "pending",
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in ids
+                for n in range(1, INSTALLMENTS + 1)
+            ],
+        )
+        # uma parcela paga por venda
+        db.execute(
+            insert(Payment),
+            [
+                {
+                    "promissory_note_id": (i - 1) * INSTALLMENTS + 1,
+                    "amount_paid": Decimal("100.00"),
+                    "payment_date": start,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in ids
+            ],
+        )
+        db.commit()
+    db.close()
+
+
+def _orm_cascade(SessionLocal, ids: list[int]) -> None:
+    db = SessionLocal()
+    sales = db.scalars(
+        select(Sale)
+        .where(Sale.id.in_(ids))
+        .options(selectinload(Sale.promissory_notes).selectinload(PromissoryNote.payments))
+    ).all()
+    for sale in sales:
+        db.delete(sale)
+    db.commit()
+    db.close()
+
+
+def _database_cascade(SessionLocal, ids: list[int]) -> None:
+    db = SessionLocal()
+    result = delete_sales(db, ids=ids)
+    assert result["deleted_sales"] == len(ids), result
+    db.close()
+
+
+def main() -> None:
+    parser = base_parser(__doc__)
+    parser.add_argument("--sales", type=int, default=10_000)
+    args = parser.parse_args()
+
+    _, SessionLocal = prepare_app(make_engine(args.database_url))
+    _seed(SessionLocal, 2 * args.sales)
+
+    batches = (
+        ("cascata ORM", _orm_cascade, list(range(1, args.sales + 1))),
+        ("ON DELETE CASCADE", _database_cascade, list(range(args.sales + 1, 2 * args.sales + 1))),
+    )
+    for label, fn, ids in batches:
+        started = time.perf_counter()
+        fn(SessionLocal, ids)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<18} vendas={len(ids):>7}  tempo={elapsed:7.2f} s  ({len(ids) / elapsed:9.0f} vendas/s)")
+
+
+if __name__ == "__main__":
+    main()
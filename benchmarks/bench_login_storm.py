@@ -0,0 +1,109 @@
+"""
+Teste de carga: latência das rotas não-auth durante uma rajada de logins.
+
+Mede o p99 de GET /api/dashboard com clientes concorrentes, primeiro sem
+logins e depois com uma rajada contínua de POST /api/auth/login. Com o
+bcrypt no executor dedicado o p99 do dashboard deve ficar estável.
+
+Uso:
+  python benchmarks/bench_login_storm.py [--clients 20] [--logins 8] [--seconds 5]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from _common import base_parser, make_engine, percentile, prepare_app
+
+import httpx
+
+from app.models.user import User, UserRole
+from app.services.auth_service import create_access_token, hash_password
+from app.utils.hashing_executor import hashing_executor
+
+PASSWORD = "bench_password"
+
+
+async def _dashboard_worker(client, headers, stop_at, latencies):
+    while time.perf_counter() < stop_at:
+        t0 = time.perf_counter()
+        r = await client.get("/api/dashboard", headers=headers)
+        latencies.append(time.perf_counter() - t0)
+        assert r.status_code == 200, r.text
+
+
+async def _login_worker(client, stop_at, counter):
+    while time.perf_counter() < stop_at:
+        r = await client.post(
+            "/api/auth/login",
+            json={"email": "storm@credigestor.com", "password": PASSWORD},
+        )
+        assert r.status_code == 200, r.text
+        counter.append(1)
+
+
+async def _phase(app, headers, *, clients, logins, seconds):
+    latencies: list[float] = []
+    login_count: list[int] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        stop_at = time.perf_counter() + seconds
+        tasks = [
+            _dashboard_worker(c, headers, stop_at, latencies) for _ in range(clients)
+        ]
+        tasks += [_login_worker(c, stop_at, login_count) for _ in range(logins)]
+        await asyncio.gather(*tasks)
+    return latencies, len(login_count)
+
+
+def main() -> None:
+    parser = base_parser(__doc__)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    url = args.database_url
+    if not url:
+        url = f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench.db'}"
+    app, SessionLocal = prepare_app(make_engine(url))
+
+    db = SessionLocal()
+    user = User(
+        name="Storm",
+        email="storm@credigestor.com",
+        password_hash=hash_password(PASSWORD),
+        role=UserRole.ADMIN.value,
+        active=True,
+    )
+    db.add(user)
+    db.commit()
+    headers = {
+        "Authorization": f"Bearer {create_access_token(subject=str(user.id), role=user.role)}"
+    }
+    db.close()
+
+    for label, logins in (("dashboard (sem logins)", 0), ("dashboard (rajada)", args.logins)):
+        latencies, done = asyncio.run(
+            _phase(
+                app,
+                headers,
+                clients=args.clients,
+                logins=logins,
+                seconds=args.seconds,
+            )
+        )
+        print(
+            f"{label:<26} n={len(latencies):>6}  "
+            f"p50={percentile(latencies, 50) * 1000:8.2f}ms  "
+            f"p99={percentile(latencies, 99) * 1000:8.2f}ms  logins={done}"
+        )
+
+    print("executor de hashing:", hashing_executor.stats())
+
+
+if __name__ == "__main__":
+    main()
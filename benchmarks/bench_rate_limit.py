@@ -0,0 +1,65 @@
+"""
+Microbenchmark: throughput de RateLimiter.allow() por backend.
+
+Cenários: chave quente (sempre a mesma), chaves únicas (cada chamada uma
+chave nova, exercita o descarte/limite de chaves) e backend em banco.
+
+Uso:
+  python benchmarks/bench_rate_limit.py [--calls 200000] [--database-url URL]
+"""
+
+from __future__ import annotations
+
+import time
+import tracemalloc
+
+from _common import base_parser, make_engine
+
+from app.utils.rate_limit import (
+    DatabaseBackend,
+    InMemoryBackend,
+    RateLimiter,
+    install_rate_limit_table,
+)
+
+
+def _run(label: str, limiter: RateLimiter, keys) -> None:
+    t0 = time.perf_counter()
+    n = 0
+    for key in keys:
+        limiter.allow(key)
+        n += 1
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<34} {n / elapsed:>12,.0f} allow()/s  ({elapsed / n * 1e6:.2f} µs/op)")
+
+
+def main() -> None:
+    parser = base_parser(__doc__)
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--max-keys", type=int, default=10_000)
+    args = parser.parse_args()
+
+    hot = RateLimiter(10**9, 1, name="hot")
+    _run("memória, chave quente", hot, ("ip" for _ in range(args.calls)))
+
+    backend = InMemoryBackend(max_keys=args.max_keys)
+    unique = RateLimiter(10, 300, name="uniq", backend=backend)
+    tracemalloc.start()
+    _run("memória, chaves únicas", unique, (f"10.0.{i}" for i in range(args.calls)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{'':<34} chaves rastreadas={len(backend):,} "
+        f"(limite {args.max_keys:,}), pico={peak / 1024:.0f} KiB"
+    )
+
+    engine = make_engine(args.database_url)
+    with engine.begin() as conn:
+        install_rate_limit_table(conn)
+    db_limiter = RateLimiter(10**9, 1, name="db", backend=DatabaseBackend(engine))
+    db_calls = max(1, args.calls // 50)
+    _run("banco, chave quente", db_limiter, ("ip" for _ in range(db_calls)))
+
+
+if __name__ == "__main__":
+    main()
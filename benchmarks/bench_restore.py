@@ -0,0 +1,117 @@
+"""
+Benchmark: restauração de um backup completo (restore_service) variando o
+número de workers. Gera promissórias em massa, faz o backup (ZIP em disco)
+e restaura com 1, 2, 4 e 8 workers, medindo a vazão em linhas/s.
+
+Precisa de PostgreSQL (o backup usa pg_export_snapshot e o restore usa
+COPY FROM STDIN):
+  python benchmarks/bench_restore.py --database-url postgresql+psycopg2://... \
+      [--notes 10000000] [--workers 1,2,4,8]
+"""
+
+from __future__ import annotations
+
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from _common import base_parser, make_engine, prepare_app
+
+from sqlalchemy import insert
+
+from app.models import Customer, PromissoryNote, Sale, User
+from app.services.backup_service import stream_backup_zip
+from app.services.restore_service import restore_backup_chain
+
+CHUNK = 50_000
+INSTALLMENTS = 12
+
+
+def _seed(SessionLocal, n_notes: int) -> None:
+    db = SessionLocal()
+    user = User(name="B", email="b@b.com", password_hash="x", role="admin")
+    customer = Customer(full_name="Cliente", cpf="00000000000", phone="1")
+    db.add_all([user, customer])
+    db.commit()
+
+    n_sales = -(-n_notes // INSTALLMENTS)
+    now = datetime.now(timezone.utc)
+    for offset in range(0, n_sales, CHUNK):
+        db.execute(
+            insert(Sale),
+            [
+                {
+                    "id": i + 1,
+                    "customer_id": customer.id,
+                    "user_id": user.id,
+                    "total_amount": Decimal("1234.56"),
+                    "down_payment": 0,
+                    "installments_count": INSTALLMENTS,
+                    "first_installment_date": date.today(),
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(offset, min(offset + CHUNK, n_sales))
+            ],
+        )
+        db.commit()
+
+    start = date.today()
+    for offset in range(0, n_notes, CHUNK):
+        db.execute(
+            insert(PromissoryNote),
+            [
+                {
+                    "sale_id": i // INSTALLMENTS + 1,
+                    "installment_number": i % INSTALLMENTS + 1,
+                    "original_amount": Decimal("102.88"),
+                    "paid_amount": 0,
+                    "due_date": start + timedelta(days=30 * (i % INSTALLMENTS)),
+                    "status": "pending",
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(offset, min(offset + CHUNK, n_notes))
+            ],
+        )
+        db.commit()
+    db.close()
+
+
+def main() -> None:
+    parser = base_parser(__doc__)
+    parser.add_argument("--notes", type=int, default=10_000_000)
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args()
+    if not args.database_url or not args.database_url.startswith("postgresql"):
+        parser.error("o benchmark de restauração precisa de --database-url PostgreSQL")
+
+    engine = make_engine(args.database_url)
+    _, SessionLocal = prepare_app(engine)
+    _seed(SessionLocal, args.notes)
+
+    with tempfile.TemporaryFile() as archive:
+        started = time.perf_counter()
+        _, chunks = stream_backup_zip(engine)
+        for chunk in chunks:
+            archive.write(chunk)
+        print(
+            f"backup     tamanho={archive.tell() / 2**20:8.1f} MiB  "
+            f"tempo={time.perf_counter() - started:6.2f} s"
+        )
+
+        for workers in (int(w) for w in args.workers.split(",")):
+            archive.seek(0)
+            started = time.perf_counter()
+            summary = restore_backup_chain(engine, [archive], workers=workers)
+            elapsed = time.perf_counter() - started
+            rows = sum(t["rows"] for t in summary.values())
+            print(
+                f"workers={workers:<3} linhas={rows:>10}  tempo={elapsed:7.2f} s  "
+                f"({rows / elapsed:9.0f} linhas/s)"
+            )
+
+
+if __name__ == "__main__":
+    main()
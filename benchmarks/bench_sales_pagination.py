@@ -0,0 +1,101 @@
+"""
+Benchmark: listagem de vendas com OFFSET (skip/limit) vs. keyset (cursor em
+created_at, id), na página 1 e numa página profunda.
+
+Uso:
+  python benchmarks/bench_sales_pagination.py [--sales 1000000] [--limit 100]
+      [--page 1000] [--repeat 20] [--database-url URL]
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+
+from _common import base_parser, make_engine, prepare_app, report, timed
+
+from sqlalchemy import insert, select
+
+from app.models import Customer, Sale, User
+from app.services.sale_service import get_sales
+from app.utils.cursor import encode_cursor
+
+CHUNK = 50_000
+
+
+def _seed(SessionLocal, n_sales: int) -> None:
+    db = SessionLocal()
+    user = User(name="B", email="b@b.com", password_hash="x", role="admin")
+    customer = Customer(full_name="Cliente", cpf="00000000000", phone="1")
+    db.add_all([user, customer])
+    db.commit()
+
+    start = datetime.now(timezone.utc)
+    for offset in range(0, n_sales, CHUNK):
+        db.execute(
+            insert(Sale),
+            [
+                {
+                    "customer_id": customer.id,
+                    "user_id": user.id,
+                    "total_amount": 100,
+                    "down_payment": 0,
+                    "installments_count": 1,
+                    "first_installment_date": date.today(),
+                    # alguns empates de created_at para exercitar o desempate por id
+                    "created_at": start - timedelta(seconds=(offset + i) // 3),
+                    "updated_at": start,
+                }
+                for i in range(min(CHUNK, n_sales - offset))
+            ],
+        )
+        db.commit()
+    db.close()
+
+
+def main() -> None:
+    parser = base_parser(__doc__)
+    parser.add_argument("--sales", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    _, SessionLocal = prepare_app(make_engine(args.database_url))
+    _seed(SessionLocal, args.sales)
+
+    skip = (args.page - 1) * args.limit
+    db = SessionLocal()
+
+    # cursor equivalente ao fim da página anterior à página profunda
+    prev_last = db.execute(
+        select(Sale.created_at, Sale.id)
+        .order_by(Sale.created_at.desc(), Sale.id.desc())
+        .offset(skip - 1)
+        .limit(1)
+    ).one()
+    deep_cursor = encode_cursor(tuple(prev_last))
+
+    offset_deep = get_sales(db, skip=skip, limit=args.limit)
+    keyset_deep = get_sales(db, limit=args.limit, cursor=deep_cursor)
+    assert [s.id for s in offset_deep] == [s.id for s in keyset_deep]
+
+    def run(**kwargs):
+        def call():
+            get_sales(db, limit=args.limit, **kwargs)
+            db.expunge_all()
+
+        return call
+
+    report("offset página 1", timed(run(skip=0), args.repeat), unit="pág")
+    report(f"offset página {args.page}", timed(run(skip=skip), args.repeat), unit="pág")
+    report("keyset página 1", timed(run(), args.repeat), unit="pág")
+    report(
+        f"keyset página {args.page}",
+        timed(run(cursor=deep_cursor), args.repeat),
+        unit="pág",
+    )
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
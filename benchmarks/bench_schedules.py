@@ -0,0 +1,87 @@
+"""
+Benchmark: cálculo de cronogramas de parcelas. Compara o laço em Decimal
+(_split_amount + add_months por parcela, como sale_service fazia) com o
+motor em centavos inteiros de schedule_service, para N vendas com número
+de parcelas, valores e datas aleatórios. Não usa banco.
+
+Uso:
+  python benchmarks/bench_schedules.py [--schedules 1000000] [--skip-reference]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import _common  # noqa: F401  (coloca o projeto no sys.path)
+
+from app.services.sale_service import _split_amount, add_months
+from app.services.schedule_service import build_schedules, financed_cents, from_cents
+
+
+def _items(n: int):
+    rng = random.Random(42)
+    start = date.today()
+    return [
+        (
+            Decimal(rng.randrange(10_000, 1_000_000)).scaleb(-2),
+            Decimal(rng.randrange(0, 5_000)).scaleb(-2),
+            rng.choice((1, 2, 3, 4, 5, 6, 10, 12, 18, 24)),
+            start + timedelta(days=rng.randrange(0, 730)),
+        )
+        for _ in range(n)
+    ]
+
+
+def _reference(items) -> int:
+    installments = 0
+    for total, down, n, first in items:
+        amounts = _split_amount(total - down, n)
+        schedule = [(amounts[i], add_months(first, i)) for i in range(n)]
+        installments += len(schedule)
+    return installments
+
+
+def _engine(items) -> int:
+    batch = build_schedules(
+        (financed_cents(total, down), n, first) for total, down, n, first in items
+    )
+    return len(batch.amount_cents)
+
+
+def _engine_decimal(items) -> int:
+    # inclui a conversão de volta para Decimal, como no INSERT das parcelas
+    batch = build_schedules(
+        (financed_cents(total, down), n, first) for total, down, n, first in items
+    )
+    return len([from_cents(c) for c in batch.amount_cents])
+
+
+def _measure(label: str, fn, items) -> None:
+    started = time.perf_counter()
+    installments = fn(items)
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label:<22} cronogramas={len(items):>8}  parcelas={installments:>9}  "
+        f"tempo={elapsed:6.2f} s  ({len(items) / elapsed:10.0f} cronogramas/s)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--schedules", type=int, default=1_000_000)
+    parser.add_argument("--skip-reference", action="store_true")
+    args = parser.parse_args()
+
+    items = _items(args.schedules)
+    if not args.skip_reference:
+        _measure("Decimal (referência)", _reference, items)
+    _measure("centavos", _engine, items)
+    _measure("centavos + Decimal", _engine_decimal, items)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: custo de startup de um worker (tempo de import de app.main e
+tempo até o primeiro 200 em /health, com o lifespan completo).
+
+Cada medição roda num processo novo. A primeira execução encontra o banco
+vazio (DDL); as demais já encontram o schema na versão atual. O script
+falha (exit 1) se a mediana passar dos orçamentos.
+
+Uso:
+  python benchmarks/bench_startup.py [--runs 5] [--database-url URL]
+      [--import-budget-ms 1500] [--first-200-budget-ms 2500]
+"""
+
+from __future__ import annotations
+
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# módulos que não devem ser carregados no startup
+LAZY_MODULES = ("reportlab", "passlib", "scripts.create_admin")
+
+
+def probe(database_url: str) -> None:
+    """Executado no processo filho: mede e imprime um JSON."""
+    t0 = time.perf_counter()
+
+    from _common import make_engine
+
+    import app.main as app_main
+
+    imported = time.perf_counter()
+
+    import app.database as app_database
+    from fastapi.testclient import TestClient
+
+    engine = make_engine(database_url)
+    app_database.engine = engine
+    app_main.engine = engine
+
+    with TestClient(app_main.app) as client:
+        r = client.get("/health")
+        assert r.status_code == 200, r.text
+        first_200 = time.perf_counter()
+
+    print(
+        json.dumps(
+            {
+                "import_ms": (imported - t0) * 1000,
+                "first_200_ms": (first_200 - t0) * 1000,
+                "lazy_loaded": [m for m in LAZY_MODULES if m in sys.modules],
+            }
+        )
+    )
+
+
+def main() -> None:
+    from _common import base_parser
+
+    parser = base_parser(__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=1500)
+    parser.add_argument("--first-200-budget-ms", type=float, default=2500)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    database_url = args.database_url or f"sqlite:///{Path(tmpdir.name) / 'startup.db'}"
+
+    results = []
+    for i in range(args.runs):
+        out = subprocess.run(
+            [sys.executable, __file__, "--probe", database_url],
+            check=True,
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).resolve().parent,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        results.append(result)
+        label = "frio (DDL)" if i == 0 else "schema atual"
+        print(
+            f"execução {i + 1} [{label:<12}] import={result['import_ms']:8.1f}ms  "
+            f"primeiro 200={result['first_200_ms']:8.1f}ms"
+        )
+
+    warm = results[1:] or results
+    import_ms = statistics.median(r["import_ms"] for r in warm)
+    first_200_ms = statistics.median(r["first_200_ms"] for r in warm)
+    print(f"mediana import={import_ms:.1f}ms  primeiro 200={first_200_ms:.1f}ms")
+
+    failures = []
+    if import_ms > args.import_budget_ms:
+        failures.append(f"import {import_ms:.1f}ms > {args.import_budget_ms}ms")
+    if first_200_ms > args.first_200_budget_ms:
+        failures.append(
+            f"primeiro 200 {first_200_ms:.1f}ms > {args.first_200_budget_ms}ms"
+        )
+    eager = sorted({m for r in results for m in r["lazy_loaded"]})
+    if eager:
+        failures.append(f"módulos carregados no startup: {', '.join(eager)}")
+
+    tmpdir.cleanup()
+    if failures:
+        print("ORÇAMENTO ESTOURADO: " + "; ".join(failures))
+        sys.exit(1)
+    print("dentro do orçamento")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--probe":
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        probe(sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,135 @@
+"""
+Benchmark: listagem de clientes com resposta JSON montada em memória vs.
+NDJSON em streaming (Accept: application/x-ndjson). Mede o pico de memória
+(tracemalloc) do lado do servidor, o tempo até o primeiro byte e o tempo
+total para N linhas.
+
+A aplicação é chamada diretamente via ASGI e o corpo é descartado à medida
+que chega (o TestClient acumularia a resposta inteira no cliente).
+
+Uso:
+  python benchmarks/bench_streaming.py [--rows 1000000] [--database-url URL]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import resource
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from _common import base_parser, make_engine, prepare_app
+
+from sqlalchemy import insert
+
+from app.models.customer import Customer
+from app.router.auth_routes import get_current_user
+from app.utils.principal_cache import CachedPrincipal
+
+CHUNK = 50_000
+
+
+def _seed(SessionLocal, n: int) -> None:
+    db = SessionLocal()
+    now = datetime.now(timezone.utc)
+    for offset in range(0, n, CHUNK):
+        db.execute(
+            insert(Customer),
+            [
+                {
+                    "full_name": f"Cliente {i:07d}",
+                    "cpf": f"{i:011d}",
+                    "phone": "(11) 99999-0000",
+                    "email": f"cliente{i}@example.com",
+                    "active": True,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(offset, min(offset + CHUNK, n))
+            ],
+        )
+        db.commit()
+    db.close()
+
+
+async def _call(app, path: str, headers: dict[str, str]) -> tuple[int, float, int]:
+    """Executa a requisição; devolve (status, segundos até o 1º byte, bytes)."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("bench", 1),
+        "server": ("bench", 80),
+    }
+    started = time.perf_counter()
+    state = {"status": 0, "ttfb": None, "bytes": 0}
+    requested = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # o StreamingResponse fica escutando desconexão até o fim do corpo
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            state["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            if body and state["ttfb"] is None:
+                state["ttfb"] = time.perf_counter() - started
+            state["bytes"] += len(body)
+
+    await app(scope, receive, send)
+    finished.set()
+    return state["status"], state["ttfb"] or 0.0, state["bytes"]
+
+
+def _measure(app, label: str, headers: dict[str, str]) -> None:
+    tracemalloc.start()
+    started = time.perf_counter()
+    status, ttfb, size = asyncio.run(_call(app, "/api/customers", headers))
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert status == 200, status
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"{label:<12} pico={peak / 2**20:8.1f} MiB  ttfb={ttfb * 1000:9.1f} ms  "
+        f"total={total:6.2f} s  corpo={size / 2**20:7.1f} MiB  "
+        f"maxrss do processo={max_rss:7.1f} MiB"
+    )
+
+
+def main() -> None:
+    parser = base_parser(__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    app, SessionLocal = prepare_app(make_engine(args.database_url))
+    _seed(SessionLocal, args.rows)
+    # a autenticação não é o que está sendo medido
+    app.dependency_overrides[get_current_user] = lambda: CachedPrincipal(
+        id=1, name="Bench", email="bench@credigestor.com", role="admin", active=True
+    )
+
+    # streaming primeiro: o maxrss do processo só cresce
+    _measure(app, "streaming", {"Accept": "application/x-ndjson"})
+    _measure(app, "em memória", {})
+
+
+if __name__ == "__main__":
+    main()
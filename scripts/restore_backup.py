@@ -0,0 +1,56 @@
+"""
+Restaura um backup completo e, opcionalmente, os incrementais seguintes
+
+Os arquivos são os ZIPs baixados em GET /api/backups (o completo primeiro,
+depois os incrementais na ordem em que foram gerados). Os dados atuais das
+tabelas são substituídos.
+
+Uso:
+  python scripts/restore_backup.py completo.zip [incremental1.zip ...]
+      [--database-url URL]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+# Adicionar diretório raiz ao path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from sqlalchemy import create_engine  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.db_schema import ensure_schema  # noqa: E402
+from app.services.restore_service import restore_backup_chain  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("archives", nargs="+", help="ZIPs: completo e incrementais")
+    parser.add_argument(
+        "--database-url",
+        default=settings.DATABASE_URL,
+        help="URL SQLAlchemy do banco de destino (padrão: o do .env)",
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    ensure_schema(engine, Base)
+
+    try:
+        summary = restore_backup_chain(engine, args.archives)
+    except ValueError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    for table, counts in summary.items():
+        print(f"{table:<24} linhas={counts['rows']:>9}  apagadas={counts['deleted']:>7}")
+    print("✓ Backup restaurado!")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,74 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
 from typing import Generator
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 
 import app.database as app_database
 import app.main as app_main
+from app.models.user import User, UserRole
+from app.services.auth_service import create_access_token
+from app.utils import query_stats, rate_limit
+from app.utils.customer_autocomplete import customer_autocomplete
+from app.utils.principal_cache import principal_cache
 
 # Base no seu projeto está em app.database
 Base = app_database.Base
 
 
 @pytest.fixture(scope="session")
-def test_engine():
+def test_db_path(tmp_path_factory):
+    # arquivo (e não :memory:) para que o engine síncrono e o assíncrono
+    # enxerguem o mesmo banco
+    return tmp_path_factory.mktemp("db") / "test.db"
+
+
+@pytest.fixture(scope="session")
+def test_engine(test_db_path):
     engine = create_engine(
-        "sqlite+pysqlite://",
+        f"sqlite+pysqlite:///{test_db_path}",
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA journal_mode=WAL"))
     return engine
 
 
+@pytest.fixture(scope="session")
+def test_async_engine(test_db_path):
+    return create_async_engine(
+        f"sqlite+aiosqlite:///{test_db_path}", poolclass=NullPool
+    )
+
+
 @pytest.fixture(scope="session", autouse=True)
-def patch_app_engine(test_engine):
+def patch_app_engine(test_engine, test_async_engine):
     """
     Garante que:
-    - app.database.engine usa SQLite
+    - app.database.engine / async_engine usam SQLite
     - app.main.engine usa SQLite
     - Base.metadata.create_all cria tabelas no SQLite (não no Postgres)
     """
     app_database.engine = test_engine
+    app_database.async_engine = test_async_engine
+    app_database.AsyncSessionLocal = async_sessionmaker(
+        bind=test_async_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False,
+    )
     app_main.engine = test_engine
+    # o job de vencimento rodaria em paralelo aos testes
+    app_main.settings.OVERDUE_JOB_ENABLED = False
+    app_main.settings.AUTH_CACHE_RESTORE_CHECK_SECONDS = 0
 
     import app.models  # noqa: F401
 
@@ -42,6 +76,20 @@ def patch_app_engine(test_engine):
     yield
 
 
+@pytest.fixture()
+def async_db():
+    """
+    AsyncSession falsa para os testes unitários dos services assíncronos
+    (@pytest.mark.asyncio): execute, scalar e scalars são AsyncMock; o
+    teste configura return_value/side_effect.
+    """
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=MagicMock())
+    db.scalar = AsyncMock()
+    db.scalars = AsyncMock(return_value=MagicMock())
+    return db
+
+
 @pytest.fixture()
 def db_session(test_engine):
     Base.metadata.drop_all(bind=test_engine)
@@ -52,6 +100,10 @@ def db_session(test_engine):
     )
 
     app_database.SessionLocal = TestingSessionLocal
+    # ids são reaproveitados entre testes (tabelas recriadas)
+    principal_cache.clear()
+    rate_limit.backend.clear()
+    customer_autocomplete.clear()
 
     db = TestingSessionLocal()
     try:
@@ -60,6 +112,26 @@ def db_session(test_engine):
         db.close()
 
 
+@pytest.fixture()
+def admin_user(db_session) -> User:
+    admin = User(
+        name="Admin",
+        email="admin@credigestor.com",
+        password_hash="x",
+        role=UserRole.ADMIN.value,
+        active=True,
+    )
+    db_session.add(admin)
+    db_session.commit()
+    return admin
+
+
+@pytest.fixture()
+def admin_headers(admin_user) -> dict:
+    token = create_access_token(subject=str(admin_user.id), role=admin_user.role)
+    return {"Authorization": f"Bearer {token}"}
+
+
 @pytest.fixture()
 def client(db_session) -> Generator[TestClient, None, None]:
     def override_get_db():
@@ -69,6 +141,35 @@ def client(db_session) -> Generator[TestClient, None, None]:
             pass
 
     app_main.app.dependency_overrides[app_database.get_db] = override_get_db
+    app_main.app.dependency_overrides[app_database.get_read_db] = override_get_db
     with TestClient(app_main.app) as c:
         yield c
     app_main.app.dependency_overrides.clear()
+
+
+@pytest.fixture()
+def query_budget():
+    """
+    Limita a quantidade de statements SQL por requisição:
+
+        with query_budget(3):
+            client.get("/api/sales", headers=headers)
+    """
+
+    @contextmanager
+    def budget(max_queries: int):
+        seen: list[query_stats.QueryStats] = []
+        query_stats.observers.append(seen.append)
+        try:
+            yield seen
+        finally:
+            query_stats.observers.remove(seen.append)
+
+        assert seen, "nenhuma requisição observada"
+        for stats in seen:
+            assert stats.count <= max_queries, (
+                f"{stats.method} {stats.path}: {stats.count} queries "
+                f"(orçamento {max_queries})\n" + "\n".join(stats.shapes)
+            )
+
+    return budget
@@ -130,3 +130,88 @@ def test_me_user_not_found_returns_401(client):
     token = create_access_token(subject="999999", role="admin", expires_hours=1)
     r = client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
     assert r.status_code == 401
+
+
+def test_me_uses_cached_principal_until_user_is_deactivated(client, db_session):
+    from app.schemas.user_schema import UserUpdate
+    from app.services.user_service import deactivate_user, update_user
+    from app.utils.principal_cache import principal_cache
+
+    u = _create_user(
+        db_session,
+        email="cache1@credigestor.com",
+        password="senha",
+        role=UserRole.ADMIN.value,
+        active=True,
+    )
+    token = create_access_token(subject=str(u.id), role="admin", expires_hours=1)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+    assert principal_cache.get(u.id) is not None
+
+    # alteração via service invalida a entrada
+    update_user(db_session, u.id, UserUpdate(name="Novo Nome"))
+    assert principal_cache.get(u.id) is None
+    r = client.get("/api/auth/me", headers=headers)
+    assert r.json()["name"] == "Novo Nome"
+
+    deactivate_user(db_session, u.id)
+    r = client.get("/api/auth/me", headers=headers)
+    assert r.status_code == 401
+
+
+def test_hashing_metrics_requires_admin(client, db_session):
+    admin = _create_user(
+        db_session,
+        email="metrics@credigestor.com",
+        password="senha",
+        role=UserRole.ADMIN.value,
+    )
+    token = create_access_token(subject=str(admin.id), role="admin", expires_hours=1)
+    r = client.get(
+        "/api/metrics/hashing", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert r.status_code == 200
+    assert {"queue_depth", "wait_ms_p99", "run_ms_p99"} <= set(r.json())
+
+    seller_token = create_access_token(
+        subject=str(admin.id), role="seller", expires_hours=1
+    )
+    r = client.get(
+        "/api/metrics/hashing", headers={"Authorization": f"Bearer {seller_token}"}
+    )
+    assert r.status_code == 403
+
+
+def test_login_is_rate_limited_per_client(client, db_session):
+    from app.utils.rate_limit import login_rate_limiter
+
+    for _ in range(login_rate_limiter.max_attempts):
+        r = client.post(
+            "/api/auth/login", json={"email": "x@credigestor.com", "password": "x"}
+        )
+        assert r.status_code == 401
+
+    r = client.post(
+        "/api/auth/login", json={"email": "x@credigestor.com", "password": "x"}
+    )
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) >= 1
+
+
+def test_db_pool_metrics_endpoint(client, db_session):
+    admin = _create_user(
+        db_session,
+        email="pool@credigestor.com",
+        password="senha",
+        role=UserRole.ADMIN.value,
+    )
+    token = create_access_token(subject=str(admin.id), role="admin", expires_hours=1)
+    r = client.get(
+        "/api/metrics/db-pool", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert r.status_code == 200
+    body = r.json()
+    assert {"primary", "primary_async"} <= set(body)
+    assert "checkout_wait" in body["primary"]
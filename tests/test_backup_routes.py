@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import zipfile
+
+from app.models.customer import Customer
+from app.models.user import User
+from app.utils.customer_autocomplete import customer_autocomplete
+
+CUSTOMERS = (
+    "id,full_name,cpf,phone,email,address,active,search_text,created_at,updated_at\n"
+    "7,Paul Atreides,11122233344,1,,,t,paul atreides,2026-01-01 10:00:00,2026-01-01 10:00:00\n"
+)
+
+
+def _backup_zip(admin: User) -> bytes:
+    # o restore substitui a tabela de usuários: o admin continua no backup
+    users = (
+        "id,name,email,password_hash,role,active,created_at,updated_at\n"
+        f"{admin.id},Admin,admin@credigestor.com,x,admin,t,"
+        "2026-01-01 10:00:00,2026-01-01 10:00:00\n"
+    )
+    out = io.BytesIO()
+    files = []
+    with zipfile.ZipFile(out, "w") as zf:
+        for table, data in (("customers", CUSTOMERS), ("users", users)):
+            zf.writestr(f"data/{table}.csv", data)
+            files.append(
+                {
+                    "table": table,
+                    "path": f"data/{table}.csv",
+                    "sha256": hashlib.sha256(data.encode()).hexdigest(),
+                }
+            )
+        manifest = {"backup_id": "f" * 32, "kind": "full", "parent_id": None, "files": files}
+        zf.writestr("manifest.json", json.dumps(manifest))
+    return out.getvalue()
+
+
+def test_restore_endpoint_replaces_data(
+    client, db_session, admin_user, admin_headers
+):
+    db_session.add(Customer(full_name="Leto", cpf="99988877766", phone="1"))
+    db_session.commit()
+    customer_autocomplete.load(db_session)
+
+    r = client.post(
+        "/api/backups/restore",
+        files=[("files", ("backup.zip", _backup_zip(admin_user), "application/zip"))],
+        headers=admin_headers,
+    )
+
+    assert r.status_code == 200, r.text
+    assert r.json()["tables"]["customers"] == {"rows": 1, "deleted": 0}
+    db_session.expire_all()
+    assert [c.full_name for c in db_session.query(Customer)] == ["Paul Atreides"]
+    assert [s.full_name for s in customer_autocomplete.lookup("paul")] == ["Paul Atreides"]
+
+
+def test_restore_endpoint_rejects_invalid_archive(client, admin_headers):
+    r = client.post(
+        "/api/backups/restore",
+        files=[("files", ("backup.zip", b"not a zip", "application/zip"))],
+        headers=admin_headers,
+    )
+
+    assert r.status_code == 400
+    assert "inválido" in r.json()["detail"]
+
+
+def test_incremental_backup_requires_a_previous_backup(client, admin_headers):
+    r = client.get("/api/backups", params={"mode": "incremental"}, headers=admin_headers)
+
+    assert r.status_code == 409
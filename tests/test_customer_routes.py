@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+from app.models.customer import Customer
+from app.models.sale import Sale
+from app.models.user import User, UserRole
+from app.services.auth_service import create_access_token
+from app.utils.customer_autocomplete import customer_autocomplete
+
+
+def _seed(db_session):
+    user = User(
+        name="Balcão",
+        email="balcao@credigestor.com",
+        password_hash="x",
+        role=UserRole.SELLER.value,
+        active=True,
+    )
+    customers = [
+        Customer(full_name="José Ávila", cpf="11122233344", phone="(11) 98888-0001"),
+        Customer(full_name="Joselito Souza", cpf="55566677788", phone="(21) 3333-0002"),
+        Customer(full_name="Maria José", cpf="99988877766", phone="(31) 4444-0003"),
+    ]
+    db_session.add_all([user, *customers])
+    db_session.commit()
+    token = create_access_token(subject=str(user.id), role=user.role)
+    return user, customers, {"Authorization": f"Bearer {token}"}
+
+
+def _names(r):
+    assert r.status_code == 200
+    return [c["full_name"] for c in r.json()]
+
+
+def test_search_accent_insensitive_and_ranked(client, db_session):
+    _, _, headers = _seed(db_session)
+
+    r = client.get("/api/customers/search", params={"q": "jose"}, headers=headers)
+    # nome começando pelo termo vem antes de nome que o contém no meio
+    assert _names(r) == ["José Ávila", "Joselito Souza", "Maria José"]
+
+    r = client.get("/api/customers/search", params={"q": "AVILA"}, headers=headers)
+    assert _names(r) == ["José Ávila"]
+
+
+def test_search_by_cpf_and_phone(client, db_session):
+    _, _, headers = _seed(db_session)
+
+    r = client.get("/api/customers/search", params={"q": "555.666"}, headers=headers)
+    assert _names(r) == ["Joselito Souza"]
+
+    r = client.get("/api/customers/search", params={"q": "4444-0003"}, headers=headers)
+    assert _names(r) == ["Maria José"]
+
+
+def test_search_pagination_and_validation(client, db_session):
+    _, _, headers = _seed(db_session)
+
+    r = client.get(
+        "/api/customers/search", params={"q": "jose", "limit": 1, "offset": 1}, headers=headers
+    )
+    assert _names(r) == ["Joselito Souza"]
+
+    r = client.get("/api/customers/search", params={"q": ""}, headers=headers)
+    assert r.status_code == 422
+
+
+def test_search_text_follows_updates(client, db_session):
+    _, customers, headers = _seed(db_session)
+
+    r = client.put(
+        f"/api/customers/{customers[2].id}",
+        json={"full_name": "Mariana Lopes"},
+        headers=headers,
+    )
+    assert r.status_code == 200
+
+    r = client.get("/api/customers/search", params={"q": "lopes"}, headers=headers)
+    assert _names(r) == ["Mariana Lopes"]
+
+
+def test_sales_filter_uses_customer_search(client, db_session):
+    user, customers, headers = _seed(db_session)
+    db_session.add(
+        Sale(
+            customer_id=customers[0].id,
+            user_id=user.id,
+            total_amount=Decimal("10.00"),
+            installments_count=1,
+            first_installment_date=date.today(),
+        )
+    )
+    db_session.commit()
+
+    r = client.get("/api/sales", params={"client_name": "jose avila"}, headers=headers)
+    assert r.status_code == 200
+    assert len(r.json()) == 1
+
+    r = client.get("/api/sales", params={"client_name": "11122233344"}, headers=headers)
+    assert len(r.json()) == 1
+
+
+def test_autocomplete_uses_the_database_until_the_index_is_loaded(
+    client, db_session, query_budget
+):
+    _, customers, headers = _seed(db_session)
+    customers[2].active = False
+    db_session.commit()
+
+    r = client.get("/api/customers/autocomplete", params={"q": "jos"}, headers=headers)
+    assert set(_names(r)) == {"José Ávila", "Joselito Souza"}
+
+    # carga em segundo plano concluída: as buscas não consultam mais o banco
+    customer_autocomplete.load(db_session)
+    with query_budget(0):
+        r = client.get("/api/customers/autocomplete", params={"q": "jos"}, headers=headers)
+    assert _names(r) == ["José Ávila", "Joselito Souza"]
+    with query_budget(0):
+        r = client.get(
+            "/api/customers/autocomplete", params={"q": "555.6"}, headers=headers
+        )
+    assert r.json() == [
+        {"id": 2, "full_name": "Joselito Souza", "cpf": "555.666.777-88"}
+    ]
+
+
+def test_autocomplete_follows_create_and_update(client, db_session):
+    _, customers, headers = _seed(db_session)
+    customer_autocomplete.load(db_session)
+
+    r = client.post(
+        "/api/customers",
+        json={"full_name": "Ânderson Prado", "cpf": "123.456.789-00", "phone": "1"},
+        headers=headers,
+    )
+    assert r.status_code == 201
+    r = client.get("/api/customers/autocomplete", params={"q": "ander"}, headers=headers)
+    assert _names(r) == ["Ânderson Prado"]
+
+    r = client.put(
+        f"/api/customers/{r.json()[0]['id']}", json={"active": False}, headers=headers
+    )
+    assert r.status_code == 200
+    r = client.get("/api/customers/autocomplete", params={"q": "ander"}, headers=headers)
+    assert _names(r) == []
+
+    r = client.get("/api/customers/autocomplete", params={"q": ""}, headers=headers)
+    assert r.status_code == 422
@@ -55,3 +55,35 @@ def test_lifespan_exception_branch(monkeypatch):
         await cm.__aexit__(None, None, None)
 
     asyncio.run(run())
+
+
+def test_lifespan_schema_already_current(monkeypatch):
+    import asyncio
+
+    import app.main as m
+
+    calls = []
+    monkeypatch.setattr(m, "ensure_schema", lambda engine, base: calls.append(1) or False)
+
+    async def run():
+        cm = m.lifespan(m.app)
+        await cm.__aenter__()
+        await cm.__aexit__(None, None, None)
+
+    asyncio.run(run())
+    assert calls == [1]
+
+
+def test_heavy_modules_are_not_imported_at_startup():
+    import subprocess
+    import sys
+
+    code = (
+        "import sys, app.main; "
+        "print(any(m in sys.modules for m in "
+        "('reportlab', 'passlib', 'scripts.create_admin')))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == "False"
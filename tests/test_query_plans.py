@@ -0,0 +1,282 @@
+"""
+Regressão de planos de execução: semeia uma base grande, executa as
+consultas reais dos services capturando o SQL emitido e verifica o EXPLAIN
+de cada uma (uso dos índices esperados, nenhum seq scan nas tabelas grandes).
+
+Roda sempre em SQLite. Para validar também no PostgreSQL, defina
+EXPLAIN_DATABASE_URL com um banco descartável (as tabelas são recriadas).
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401
+from app.database import Base
+from app.models import Customer, Payment, PromissoryNote, Sale, User
+from app.services.dashboard_service import get_dashboard
+from app.services.overdue_service import mark_overdue_notes
+from app.services.promissory_note_service import list_promissory_notes
+from app.services.report_service import delinquency_report
+from app.services.sale_service import get_sale_by_id, get_sales
+from app.utils.cursor import encode_cursor
+
+BIG_TABLES = ("promissory_notes", "sales", "payments")
+
+N_CUSTOMERS = 500
+N_SALES = 5000
+INSTALLMENTS = 6
+N_PAYMENTS = 20000
+
+
+def _seed(engine) -> None:
+    rnd = random.Random(42)
+    today = date.today()
+    now = datetime.now()
+    ts = {"created_at": now, "updated_at": now}
+
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [dict(name="u", email="u@x.com", password_hash="x", role="admin", active=True, **ts)],
+        )
+        conn.execute(
+            insert(Customer),
+            [
+                dict(full_name=f"Cliente {i}", cpf=f"{i:011d}", phone="1", active=True, **ts)
+                for i in range(1, N_CUSTOMERS + 1)
+            ],
+        )
+        conn.execute(
+            insert(Sale),
+            [
+                dict(
+                    customer_id=rnd.randint(1, N_CUSTOMERS),
+                    user_id=1,
+                    total_amount=60,
+                    down_payment=0,
+                    installments_count=INSTALLMENTS,
+                    first_installment_date=today,
+                    created_at=now - timedelta(minutes=i),
+                    updated_at=now,
+                )
+                for i in range(N_SALES)
+            ],
+        )
+
+        # perfil real: a grande maioria das parcelas já está quitada
+        notes = []
+        for sale_id in range(1, N_SALES + 1):
+            for n in range(1, INSTALLMENTS + 1):
+                paid = rnd.random() < 0.85
+                notes.append(
+                    dict(
+                        sale_id=sale_id,
+                        installment_number=n,
+                        original_amount=10,
+                        paid_amount=10 if paid else 0,
+                        due_date=today + timedelta(days=rnd.randint(-900, 200)),
+                        status="paid" if paid else rnd.choice(["pending", "overdue"]),
+                        **ts,
+                    )
+                )
+        conn.execute(insert(PromissoryNote), notes)
+
+        conn.execute(
+            insert(Payment),
+            [
+                dict(
+                    promissory_note_id=i,
+                    amount_paid=10,
+                    payment_date=today - timedelta(days=rnd.randint(0, 900)),
+                    interest_amount=0,
+                    fine_amount=0,
+                    **ts,
+                )
+                for i in range(1, N_PAYMENTS + 1)
+            ],
+        )
+
+        conn.exec_driver_sql("ANALYZE")
+
+
+def _sqlite_engine():
+    return create_engine(
+        "sqlite+pysqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+
+@pytest.fixture(
+    scope="module",
+    params=[
+        "sqlite",
+        pytest.param(
+            "postgresql",
+            marks=pytest.mark.skipif(
+                not os.getenv("EXPLAIN_DATABASE_URL"),
+                reason="EXPLAIN_DATABASE_URL não definido",
+            ),
+        ),
+    ],
+)
+def plan_engine(request):
+    if request.param == "sqlite":
+        engine = _sqlite_engine()
+    else:
+        engine = create_engine(os.environ["EXPLAIN_DATABASE_URL"])
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    _seed(engine)
+    yield engine
+    if request.param != "sqlite":
+        Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+def _capture(engine, fn, kind: str = "SELECT") -> list[tuple[str, object]]:
+    """Executa fn(db) e devolve os statements de um tipo (SELECT) com seus parâmetros."""
+    statements: list[tuple[str, object]] = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(kind):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        with Session(engine) as db:
+            fn(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return statements
+
+
+def _sqlite_plan(conn, statement, parameters) -> tuple[set[str], list[str]]:
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    details = [row[3] for row in rows]
+    indexes = {
+        word
+        for detail in details
+        for word in detail.replace("(", " ").split()
+        if word.startswith(("ix_", "uq_"))
+    }
+    # "SCAN tabela" sem índice é varredura completa da tabela
+    seq_scans = [
+        d.split()[1]
+        for d in details
+        if d.startswith("SCAN ") and " USING " not in d
+    ]
+    return indexes, seq_scans
+
+
+def _pg_plan(conn, statement, parameters) -> tuple[set[str], list[str]]:
+    raw = conn.exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + statement, parameters
+    ).scalar()
+    plan = raw if isinstance(raw, list) else json.loads(raw)
+
+    indexes: set[str] = set()
+    seq_scans: list[str] = []
+
+    def walk(node):
+        if "Index Name" in node:
+            indexes.add(node["Index Name"])
+        if node.get("Node Type") == "Seq Scan":
+            seq_scans.append(node["Relation Name"])
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return indexes, seq_scans
+
+
+def _assert_plan(engine, fn, expected_indexes: set[str], kind: str = "SELECT") -> None:
+    statements = _capture(engine, fn, kind)
+    assert statements, "nenhuma consulta capturada"
+
+    explain = _pg_plan if engine.dialect.name == "postgresql" else _sqlite_plan
+    used: set[str] = set()
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            indexes, seq_scans = explain(conn, statement, parameters)
+            used |= indexes
+            big = [t for t in seq_scans if t in BIG_TABLES]
+            assert not big, f"seq scan em {big}:\n{statement}"
+
+    assert expected_indexes <= used, f"índices usados: {sorted(used)}"
+
+
+def test_dashboard_plan(plan_engine):
+    _assert_plan(
+        plan_engine,
+        get_dashboard,
+        {"ix_promissory_notes_open_due", "ix_payments_payment_date"},
+    )
+
+
+def test_delinquency_report_plan(plan_engine):
+    _assert_plan(
+        plan_engine,
+        lambda db: delinquency_report(db, due_from=date.today() - timedelta(days=60)),
+        {"ix_promissory_notes_open_due"},
+    )
+
+
+def test_promissory_note_listing_plan(plan_engine):
+    today = date.today()
+    _assert_plan(
+        plan_engine,
+        lambda db: list_promissory_notes(
+            db, due_from=today, due_to=today + timedelta(days=15)
+        ),
+        {"ix_promissory_notes_due_date_id"},
+    )
+
+
+def test_promissory_note_cursor_page_plan(plan_engine):
+    cursor = encode_cursor((date.today(), N_SALES))
+    _assert_plan(
+        plan_engine,
+        lambda db: list_promissory_notes(db, cursor=cursor, limit=50, total="none"),
+        {"ix_promissory_notes_due_date_id"},
+    )
+
+
+def test_promissory_note_listing_by_status_plan(plan_engine):
+    _assert_plan(
+        plan_engine, lambda db: list_promissory_notes(db, status="overdue"), set()
+    )
+
+
+def test_sales_pagination_plan(plan_engine):
+    _assert_plan(
+        plan_engine,
+        lambda db: get_sales(db, skip=100, limit=50),
+        {"ix_sales_created_at_id"},
+    )
+
+
+def test_sale_installments_lookup_plan(plan_engine):
+    _assert_plan(
+        plan_engine,
+        lambda db: get_sale_by_id(db, N_SALES // 2).promissory_notes,
+        {"uq_promissory_notes_sale_installment"},
+    )
+
+
+def test_overdue_job_plan(plan_engine):
+    def run(db):
+        with plan_engine.connect() as conn:
+            assert mark_overdue_notes(conn, batch_size=1000) > 0
+
+    # roda por último: marca as parcelas vencidas da base semeada
+    _assert_plan(plan_engine, run, {"ix_promissory_notes_overdue_candidates"}, kind="UPDATE")
@@ -0,0 +1,438 @@
+from __future__ import annotations
+
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import app.database as app_database
+from app.models.customer import Customer
+from app.models.promissory_note import PromissoryNote
+from app.models.user import User, UserRole
+from app.schemas.sale_schema import SaleCreate
+from app.services.auth_service import create_access_token
+from app.services.overdue_service import overdue_job
+from app.services.sale_service import create_sale_and_promissory_notes
+from app.utils.replica_lag import ReplicaLagMonitor
+
+
+def _seed(db_session):
+    user = User(
+        name="Vendedor",
+        email="vendedor@credigestor.com",
+        password_hash="x",
+        role=UserRole.SELLER.value,
+        active=True,
+    )
+    customer = Customer(full_name="Paul Atreides", cpf="11122233344", phone="1")
+    db_session.add_all([user, customer])
+    db_session.commit()
+
+    create_sale_and_promissory_notes(
+        db_session,
+        user_id=user.id,
+        data=SaleCreate(
+            customer_id=customer.id,
+            total_amount=Decimal("300.00"),
+            installments_count=3,
+            first_installment_date=date.today() - timedelta(days=40),
+        ),
+    )
+    token = create_access_token(subject=str(user.id), role=user.role)
+    return customer, {"Authorization": f"Bearer {token}"}
+
+
+def test_dashboard_async_route(client, db_session):
+    _, headers = _seed(db_session)
+
+    r = client.get("/api/dashboard", headers=headers)
+    assert r.status_code == 200
+    body = r.json()
+    assert Decimal(body["total_to_receive"]) == Decimal("300.00")
+    assert Decimal(body["total_overdue"]) > 0
+    assert len(body["next_due"]) == 3
+
+
+def test_sales_list_async_route_includes_notes(client, db_session):
+    _, headers = _seed(db_session)
+
+    r = client.get("/api/sales", params={"client_name": "atrei"}, headers=headers)
+    assert r.status_code == 200
+    sales = r.json()
+    assert len(sales) == 1
+    assert [n["installment_number"] for n in sales[0]["promissory_notes"]] == [1, 2, 3]
+
+
+def test_promissory_notes_async_route(client, db_session):
+    customer, headers = _seed(db_session)
+
+    r = client.get(
+        "/api/promissory-notes",
+        params={"customer_id": customer.id, "status": "pending"},
+        headers=headers,
+    )
+    assert r.status_code == 200
+    assert r.json()["total"] == 3
+    assert r.json()["items"][0]["customer_name"] == "Paul Atreides"
+
+
+def test_customer_lookup_async_route(client, db_session):
+    customer, headers = _seed(db_session)
+
+    r = client.get(f"/api/customers/{customer.id}", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["cpf"] == "111.222.333-44"
+
+    r = client.get("/api/customers/999999", headers=headers)
+    assert r.status_code == 404
+
+
+def test_dashboard_reads_from_replica_unless_pinned(client, db_session, tmp_path):
+    _, headers = _seed(db_session)
+
+    # "réplica" vazia em outro arquivo SQLite: o dashboard zerado prova a origem
+    replica_path = tmp_path / "replica.db"
+    replica_engine = create_engine(f"sqlite:///{replica_path}")
+    app_database.Base.metadata.create_all(bind=replica_engine)
+    async_replica = create_async_engine(
+        f"sqlite+aiosqlite:///{replica_path}", poolclass=NullPool
+    )
+
+    with patch.object(
+        app_database,
+        "replica_monitor",
+        ReplicaLagMonitor(replica_engine, max_lag_seconds=30),
+    ), patch.object(
+        app_database,
+        "AsyncReplicaSessionLocal",
+        async_sessionmaker(bind=async_replica, class_=AsyncSession),
+    ):
+        r = client.get("/api/dashboard", headers=headers)
+        assert r.status_code == 200
+        assert Decimal(r.json()["total_to_receive"]) == 0
+
+        r = client.get(
+            "/api/dashboard", headers={**headers, "X-Consistency": "primary"}
+        )
+        assert Decimal(r.json()["total_to_receive"]) == Decimal("300.00")
+
+
+def test_read_routes_query_budget(client, db_session, query_budget):
+    customer, headers = _seed(db_session)
+
+    # listagem com as parcelas: selectinload mantém o total constante
+    with query_budget(3):
+        r = client.get("/api/sales", headers=headers)
+    assert r.status_code == 200
+    assert 'queries"' in r.headers["Server-Timing"]
+
+    with query_budget(6):
+        client.get("/api/dashboard", headers=headers)
+
+    with query_budget(3):
+        client.get(
+            "/api/promissory-notes",
+            params={"customer_id": customer.id},
+            headers=headers,
+        )
+
+
+def test_sales_keyset_pagination(client, db_session):
+    from datetime import datetime
+
+    from app.models.sale import Sale
+
+    _, headers = _seed(db_session)
+    customer_id = db_session.query(Sale).first().customer_id
+    # mesmo created_at para todas: o id desempata
+    same_time = datetime(2025, 1, 1, 12, 0, 0)
+    db_session.add_all(
+        [
+            Sale(
+                customer_id=customer_id,
+                user_id=1,
+                total_amount=Decimal("10.00"),
+                installments_count=1,
+                first_installment_date=date.today(),
+                created_at=same_time,
+                updated_at=same_time,
+            )
+            for _ in range(4)
+        ]
+    )
+    db_session.commit()
+
+    expected = [s["id"] for s in client.get("/api/sales", headers=headers).json()]
+    assert len(expected) == 5
+
+    ids, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        r = client.get("/api/sales", params=params, headers=headers)
+        assert r.status_code == 200
+        ids += [s["id"] for s in r.json()]
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert ids == expected
+
+    r = client.get("/api/sales", params={"cursor": "lixo"}, headers=headers)
+    assert r.status_code == 400
+
+
+def test_promissory_notes_cursor_pagination(client, db_session, query_budget):
+    customer, headers = _seed(db_session)
+
+    seen = []
+    cursor = None
+    with query_budget(2):
+        while True:
+            params = {"customer_id": customer.id, "limit": 2, "total": "none"}
+            if cursor:
+                params["cursor"] = cursor
+            r = client.get("/api/promissory-notes", params=params, headers=headers)
+            assert r.status_code == 200
+            body = r.json()
+            assert body["total"] is None
+            seen += [item["installment_number"] for item in body["items"]]
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+    assert seen == [1, 2, 3]
+
+    r = client.get(
+        "/api/promissory-notes", params={"limit": 1, "total": "estimate"}, headers=headers
+    )
+    assert r.json()["total"] == 3
+    assert len(r.json()["items"]) == 1
+
+    r = client.get("/api/promissory-notes", params={"cursor": "x"}, headers=headers)
+    assert r.status_code == 400
+    r = client.get("/api/promissory-notes", params={"limit": 5000}, headers=headers)
+    assert r.status_code == 422
+
+
+def _ndjson(r):
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in r.text.splitlines()]
+
+
+NDJSON = {"Accept": "application/x-ndjson"}
+
+
+def test_list_routes_stream_ndjson(client, db_session):
+    customer, headers = _seed(db_session)
+    admin = User(
+        name="Admin", email="admin@credigestor.com", password_hash="x",
+        role=UserRole.ADMIN.value, active=True,
+    )
+    db_session.add(admin)
+    db_session.commit()
+    admin_headers = {
+        "Authorization": f"Bearer {create_access_token(subject=str(admin.id), role=admin.role)}"
+    }
+
+    notes = _ndjson(
+        client.get(
+            "/api/promissory-notes",
+            params={"customer_id": customer.id, "limit": 1},
+            headers={**headers, **NDJSON},
+        )
+    )
+    # o streaming ignora o limit: todas as parcelas, em ordem de vencimento
+    assert [n["installment_number"] for n in notes] == [1, 2, 3]
+    assert notes[0]["customer_name"] == "Paul Atreides"
+
+    customers = _ndjson(client.get("/api/customers", headers={**headers, **NDJSON}))
+    assert customers == [
+        {
+            "id": customer.id,
+            "full_name": "Paul Atreides",
+            "cpf": "111.222.333-44",
+            "email": None,
+            "phone": "1",
+        }
+    ]
+
+    users = _ndjson(client.get("/api/users", headers={**admin_headers, **NDJSON}))
+    assert [u["email"] for u in users] == [
+        "vendedor@credigestor.com",
+        "admin@credigestor.com",
+    ]
+
+    report = _ndjson(client.get("/api/reports/delinquency", headers=NDJSON))
+    buffered = client.get("/api/reports/delinquency").json()
+    assert len(report) == buffered["total_customers"] == 1
+    assert report[0]["installments"] == buffered["customers"][0]["installments"]
+
+
+def test_promissory_notes_stream_rejects_bad_cursor(client, db_session):
+    _, headers = _seed(db_session)
+    r = client.get(
+        "/api/promissory-notes", params={"cursor": "x"}, headers={**headers, **NDJSON}
+    )
+    assert r.status_code == 400
+
+
+def test_csv_exports_stream_with_optional_gzip(client, db_session):
+    import csv
+    import gzip
+    import io
+
+    customer, headers = _seed(db_session)
+
+    r = client.get(
+        "/api/promissory-notes/export.csv",
+        params={"customer_id": customer.id, "status": "pending"},
+        headers=headers,
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    assert 'filename="promissorias.csv"' in r.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert [row["installment_number"] for row in rows] == ["1", "2", "3"]
+    assert rows[0]["customer_name"] == "Paul Atreides"
+    assert rows[0]["outstanding_balance"] == rows[0]["original_amount"]
+
+    r = client.get("/api/promissory-notes/export.csv", params={"status": "paid"}, headers=headers)
+    assert r.text.strip().count("\n") == 0  # só o cabeçalho
+
+    r = client.get("/api/customers/export.csv", params={"gzip": True}, headers=headers)
+    assert r.headers["content-type"] == "application/gzip"
+    assert 'filename="clientes.csv.gz"' in r.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(r.content).decode())))
+    assert rows[0]["full_name"] == "Paul Atreides"
+    assert rows[0]["active"] == "True"
+
+
+def test_columnar_exports_arrow_and_parquet(client, db_session):
+    import io
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    customer, headers = _seed(db_session)
+
+    r = client.get(
+        "/api/promissory-notes/export.arrows",
+        params={"customer_id": customer.id},
+        headers=headers,
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    assert 'filename="promissorias.arrows"' in r.headers["content-disposition"]
+    table = pa.ipc.open_stream(r.content).read_all()
+    assert table.num_rows == 3
+    assert table.schema.field("due_date").type == pa.date32()
+    amount = table.schema.field("original_amount")
+    assert amount.type == pa.int64()
+    assert amount.metadata[b"scale"] == b"2"
+    assert sum(table.column("original_amount").to_pylist()) == 30000
+
+    r = client.get("/api/customers/export.parquet", headers=headers)
+    assert r.headers["content-type"] == "application/vnd.apache.parquet"
+    table = pq.read_table(io.BytesIO(r.content))
+    assert table.column("full_name").to_pylist() == ["Paul Atreides"]
+    assert table.column("active").to_pylist() == [True]
+
+    r = client.get("/api/customers/export.xlsx", headers=headers)
+    assert r.status_code == 422
+
+
+def test_overdue_refresh_route_marks_notes(client, db_session):
+    _, headers = _seed(db_session)
+    admin = User(
+        name="Admin",
+        email="admin@credigestor.com",
+        password_hash="x",
+        role=UserRole.ADMIN.value,
+        active=True,
+    )
+    db_session.add(admin)
+    db_session.commit()
+    admin_headers = {
+        "Authorization": f"Bearer {create_access_token(subject=str(admin.id), role=admin.role)}"
+    }
+    first = db_session.query(PromissoryNote).filter_by(installment_number=1).one()
+    first.paid_amount = Decimal("40.00")
+    first.status = "partial_payment"
+    db_session.commit()
+    before = overdue_job.stats()["runs"]
+
+    assert client.post("/api/promissory-notes/overdue/refresh", headers=headers).status_code == 403
+    r = client.post("/api/promissory-notes/overdue/refresh", headers=admin_headers)
+
+    assert r.status_code == 200
+    # parcelas de 40 e 10 dias atrás; a terceira ainda vai vencer
+    assert r.json() == {"updated": 2}
+    overdue = client.get("/api/promissory-notes", params={"status": "overdue"}, headers=headers)
+    assert [n["installment_number"] for n in overdue.json()["items"]] == [1, 2]
+    # a paga em parte continua identificável pelo paid_amount
+    assert [Decimal(n["paid_amount"]) for n in overdue.json()["items"]] == [Decimal("40.00"), 0]
+
+    # idempotente
+    r = client.post("/api/promissory-notes/overdue/refresh", headers=admin_headers)
+    assert r.json() == {"updated": 0}
+    stats = client.get("/api/metrics/overdue-job", headers=admin_headers).json()
+    assert stats["runs"] == before + 2
+    assert stats["last_updated"] == 0
+
+
+def test_bulk_promissory_note_status_route(client, db_session):
+    customer, headers = _seed(db_session)
+    admin = User(
+        name="Admin",
+        email="admin@credigestor.com",
+        password_hash="x",
+        role=UserRole.ADMIN.value,
+        active=True,
+    )
+    db_session.add(admin)
+    db_session.commit()
+    admin_headers = {
+        "Authorization": f"Bearer {create_access_token(subject=str(admin.id), role=admin.role)}"
+    }
+    by_filter = {"status": "overdue", "filters": {"customer_id": customer.id}}
+
+    assert client.put("/api/promissory-notes/status", json=by_filter, headers=headers).status_code == 403
+    assert (
+        client.put("/api/promissory-notes/status", json={"status": "paid"}, headers=admin_headers)
+        .status_code
+        == 422
+    )
+
+    # dry_run: 3 parcelas do cliente, só as 2 vencidas admitem overdue
+    r = client.put(
+        "/api/promissory-notes/status", json={**by_filter, "dry_run": True}, headers=admin_headers
+    )
+    assert r.status_code == 200
+    assert (r.json()["matched"], r.json()["updated"], r.json()["ids"]) == (3, 2, [])
+
+    r = client.put("/api/promissory-notes/status", json=by_filter, headers=admin_headers)
+    assert r.status_code == 200
+    overdue_ids = r.json()["ids"]
+    assert r.json()["updated"] == 2
+    overdue = client.get("/api/promissory-notes", params={"status": "overdue"}, headers=headers)
+    assert [n["id"] for n in overdue.json()["items"]] == overdue_ids
+
+    # por ids: overdue -> pending não vale para parcela vencida
+    r = client.put(
+        "/api/promissory-notes/status",
+        json={"status": "pending", "ids": overdue_ids},
+        headers=admin_headers,
+    )
+    assert r.json()["updated"] == 0
+
+    r = client.put(
+        "/api/promissory-notes/status",
+        json={"status": "paid", "ids": overdue_ids[:1]},
+        headers=admin_headers,
+    )
+    assert (r.json()["updated"], r.json()["ids"]) == (1, overdue_ids[:1])
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+from app.models.backup import DeletedRow
+from app.models.customer import Customer
+from app.models.payment import Payment
+from app.models.promissory_note import PromissoryNote
+from app.models.sale import Sale
+from app.models.user import User, UserRole
+from app.services.auth_service import create_access_token
+
+
+def _seller(db_session):
+    user = User(
+        name="Vendedor",
+        email="vendedor@credigestor.com",
+        password_hash="x",
+        role=UserRole.SELLER.value,
+        active=True,
+    )
+    customer = Customer(full_name="Leto Atreides", cpf="55566677788", phone="1")
+    db_session.add_all([user, customer])
+    db_session.commit()
+    token = create_access_token(subject=str(user.id), role=user.role)
+    return customer, {"Authorization": f"Bearer {token}"}
+
+
+def _payload(customer_id, installments=24, **overrides):
+    return {
+        "customer_id": customer_id,
+        "total_amount": "2400.00",
+        "installments_count": installments,
+        "first_installment_date": "2025-01-31",
+        **overrides,
+    }
+
+
+def test_create_sale_uses_batched_inserts(client, db_session, query_budget):
+    customer, headers = _seller(db_session)
+
+    # cliente + venda + parcelas (lote) — independe do número de parcelas
+    with query_budget(4):
+        r = client.post("/api/sales", json=_payload(customer.id), headers=headers)
+
+    assert r.status_code == 201
+    body = r.json()
+    assert len(body["promissory_notes"]) == 24
+    assert body["promissory_notes"][1]["due_date"] == "2025-02-28"
+    assert sum(Decimal(n["original_amount"]) for n in body["promissory_notes"]) == Decimal("2400.00")
+
+
+def test_create_sale_unknown_customer(client, db_session):
+    _, headers = _seller(db_session)
+    r = client.post("/api/sales", json=_payload(9999), headers=headers)
+    assert r.status_code == 404
+
+
+def test_bulk_create_sales(client, db_session, query_budget):
+    customer, headers = _seller(db_session)
+    items = [_payload(customer.id, installments=12) for _ in range(50)]
+    items.insert(3, _payload(9999))
+    items.insert(7, _payload(customer.id, down_payment="5000.00"))
+
+    # no SQLite as vendas são inseridas uma a uma (ordem do RETURNING);
+    # as 600 parcelas continuam num único INSERT em lote
+    with query_budget(len(items) + 4) as seen:
+        r = client.post("/api/sales/bulk", json={"items": items}, headers=headers)
+
+    note_inserts = [
+        shape for shape in seen[0].shapes if shape.startswith("INSERT INTO promissory_notes")
+    ]
+    assert note_inserts and all(seen[0].shapes[s] == 1 for s in note_inserts)
+
+    assert r.status_code == 200
+    body = r.json()
+    assert body["created"] == 50
+    assert body["failed"] == 2
+    assert "Cliente não encontrado" in body["results"][3]["error"]
+    assert "Entrada" in body["results"][7]["error"]
+    assert body["results"][0]["sale"]["promissory_notes"][0]["installment_number"] == 1
+
+    assert db_session.query(Sale).count() == 50
+    assert db_session.query(PromissoryNote).count() == 600
+
+
+def test_bulk_create_sales_validates_size(client, db_session):
+    _, headers = _seller(db_session)
+    r = client.post("/api/sales/bulk", json={"items": []}, headers=headers)
+    assert r.status_code == 422
+
+
+def _sales_with_payments(client, db_session, headers, customer_id, n):
+    r = client.post(
+        "/api/sales/bulk",
+        json={"items": [_payload(customer_id, installments=3) for _ in range(n)]},
+        headers=headers,
+    )
+    sale_ids = [item["sale"]["id"] for item in r.json()["results"]]
+    note = db_session.query(PromissoryNote).filter_by(sale_id=sale_ids[0]).first()
+    db_session.add(
+        Payment(promissory_note_id=note.id, amount_paid=Decimal("10.00"), payment_date=date.today())
+    )
+    db_session.commit()
+    return sale_ids
+
+
+def test_delete_sale_cascades_in_database(client, db_session, query_budget):
+    customer, headers = _seller(db_session)
+    [sale_id] = _sales_with_payments(client, db_session, headers, customer.id, 1)
+
+    # auth + um único DELETE: parcelas e pagamentos não são carregados
+    with query_budget(2):
+        r = client.delete(f"/api/sales/{sale_id}", headers=headers)
+
+    assert r.status_code == 204
+    db_session.expire_all()
+    assert db_session.query(PromissoryNote).count() == 0
+    assert db_session.query(Payment).count() == 0
+    assert client.delete(f"/api/sales/{sale_id}", headers=headers).status_code == 404
+
+
+def test_bulk_delete_sales_by_ids_and_filter(
+    client, db_session, query_budget, admin_headers
+):
+    customer, headers = _seller(db_session)
+    other = Customer(full_name="Alia Atreides", cpf="99988877766", phone="1")
+    db_session.add(other)
+    db_session.commit()
+    sale_ids = _sales_with_payments(client, db_session, headers, customer.id, 4)
+    _sales_with_payments(client, db_session, headers, other.id, 2)
+
+    # principal, trava das vendas, contagem e DELETE
+    with query_budget(4):
+        r = client.request(
+            "DELETE",
+            "/api/sales",
+            json={"ids": sale_ids[:2] + [9999]},
+            headers=admin_headers,
+        )
+
+    assert r.status_code == 200
+    assert r.json() == {
+        "deleted_sales": 2,
+        "deleted_promissory_notes": 6,
+        "deleted_payments": 1,
+    }
+
+    today = date.today().isoformat()
+    r = client.request(
+        "DELETE",
+        "/api/sales",
+        json={"customer_id": customer.id, "created_from": today, "created_to": today},
+        headers=admin_headers,
+    )
+    assert r.json()["deleted_sales"] == 2
+
+    db_session.expire_all()
+    assert {s.customer_id for s in db_session.query(Sale)} == {other.id}
+    assert db_session.query(PromissoryNote).count() == 6
+    assert db_session.query(Payment).count() == 1
+    # a cascata do banco também deixa os tombstones para o backup incremental
+    assert db_session.query(DeletedRow).filter_by(table_name="promissory_notes").count() == 12
+
+
+def test_bulk_delete_sales_requires_criteria_and_admin(
+    client, db_session, admin_headers
+):
+    _, headers = _seller(db_session)
+    assert client.request("DELETE", "/api/sales", json={"ids": [1]}, headers=headers).status_code == 403
+
+    assert client.request("DELETE", "/api/sales", json={}, headers=admin_headers).status_code == 422
+
+
+def test_preview_sale_is_side_effect_free(client, db_session, query_budget):
+    _, headers = _seller(db_session)
+    payload = {
+        "total_amount": "100.00",
+        "down_payment": "20.00",
+        "installments_count": 3,
+        "first_installment_date": "2023-01-31",
+    }
+
+    # só a autenticação toca no banco
+    with query_budget(1):
+        r = client.post("/api/sales/preview", json=payload, headers=headers)
+
+    assert r.status_code == 200
+    body = r.json()
+    assert body["financed_amount"] == "80.00"
+    assert [(i["amount"], i["due_date"]) for i in body["installments"]] == [
+        ("26.67", "2023-01-31"),
+        ("26.67", "2023-02-28"),
+        ("26.66", "2023-03-31"),
+    ]
+    assert db_session.query(Sale).count() == 0
+
+    # mesmo cronograma da venda criada com os mesmos dados
+    customer = db_session.query(Customer).one()
+    created = client.post(
+        "/api/sales", json={**payload, "customer_id": customer.id}, headers=headers
+    ).json()
+    assert [(n["original_amount"], n["due_date"]) for n in created["promissory_notes"]] == [
+        (i["amount"], i["due_date"]) for i in body["installments"]
+    ]
+
+
+def test_preview_sale_rejects_down_payment_above_total(client, db_session):
+    _, headers = _seller(db_session)
+    r = client.post(
+        "/api/sales/preview",
+        json={**_payload(None), "down_payment": "5000.00"},
+        headers=headers,
+    )
+    assert r.status_code == 400
+    assert "Entrada" in r.json()["detail"]
+
+
+def test_preview_sales_bulk(client, db_session):
+    _, headers = _seller(db_session)
+    items = [_payload(None, installments=n) for n in (1, 12, 48)]
+    items.insert(1, _payload(None, down_payment="9999.00"))
+
+    r = client.post("/api/sales/preview/bulk", json={"items": items}, headers=headers)
+
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [len(r["schedule"]["installments"]) if r["schedule"] else None for r in results] == [
+        1, None, 12, 48
+    ]
+    assert "Entrada" in results[1]["error"]
+    assert results[3]["schedule"]["installments"][-1]["due_date"] == "2028-12-31"
+    assert db_session.query(Sale).count() == 0
@@ -1,12 +1,18 @@
 from unittest.mock import MagicMock
+import pytest
 from app.models.user import User
 from app.services.auth_service import (
     authenticate_user,
+    authenticate_user_async,
     create_access_token,
     decode_access_token,
+    get_user_by_id_async,
     hash_password,
+    hash_password_async,
     verify_password,
+    verify_password_async,
 )
+from app.utils.hashing_executor import hashing_executor
 
 def test_hash_password_integrity():
     pwd = "senha"
@@ -14,6 +20,12 @@ def test_hash_password_integrity():
     assert hashed != pwd
     assert verify_password(pwd, hashed) is True
 
+def test_sync_hashing_runs_inline():
+    completed = hashing_executor.stats()["completed"]
+    verify_password("senha", hash_password("senha"))
+    # a thread da rota síncrona faz o hash: nada vai para o executor
+    assert hashing_executor.stats()["completed"] == completed
+
 def test_create_token_default_expiry():
     token = create_access_token(subject="sub", role="admin")
     payload = decode_access_token(token)
@@ -54,4 +66,25 @@ def test_authenticate_user_wrong_password():
 
     # Passa senha errada
     result = authenticate_user(mock_db, "a@a.com", "senha_errada")
-    assert result is None
\ No newline at end of file
+    assert result is None
+
+@pytest.mark.asyncio
+async def test_async_hash_and_verify():
+    hashed = await hash_password_async("senha")
+    assert await verify_password_async("senha", hashed) is True
+
+@pytest.mark.asyncio
+async def test_authenticate_user_async_branches(async_db):
+    fake_user = User(email="a@a.com", password_hash=hash_password("certa"))
+    async_db.scalar.return_value = fake_user
+
+    assert await authenticate_user_async(async_db, "a@a.com", "certa") is fake_user
+    assert await authenticate_user_async(async_db, "a@a.com", "errada") is None
+
+    async_db.scalar.return_value = None
+    assert await authenticate_user_async(async_db, "x", "x") is None
+
+@pytest.mark.asyncio
+async def test_get_user_by_id_async(async_db):
+    async_db.scalar.return_value = User(id=3)
+    assert (await get_user_by_id_async(async_db, 3)).id == 3
@@ -1,63 +1,335 @@
+import hashlib
 import io
+import json
+import os
 import zipfile
-from unittest.mock import MagicMock, patch
-from app.services.backup_service import _list_tables, _copy_table_csv, build_backup_zip
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services import backup_service
+from app.models.backup import BackupRun, DeletedRow
+from app.services.backup_service import (
+    _list_tables,
+    latest_backup_run,
+    record_backup_run,
+    stream_backup_zip,
+)
+from app.utils.pool_metrics import LONG_CHECKOUT_KEY
+
+TABLES = {
+    "customers": "id,full_name\n1,Paul\n2,Leto\n",
+    "deleted_rows": "id,table_name,row_id,deleted_at\n",
+    "sales": "id,total\n1,10.00\n",
+    "users": "id,name\n",
+}
+# o que o COPY devolve com o filtro do incremental
+TABLES.update(
+    {
+        "customers:changed": "id,full_name\n2,Leto\n",
+        "deleted_rows:changed": "id,table_name,row_id,deleted_at\n1,sales,9,2026-01-02 10:00:00\n",
+        "sales:changed": "id,total\n",
+    }
+)
+WATERMARK = datetime(2026, 1, 2, 12, 0, 0)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = -1
+        self._result = []
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append(sql)
+        if "pg_export_snapshot" in sql:
+            self._result = [("00000003-0000001B-1", WATERMARK)]
+        elif "pg_tables" in sql:
+            self.conn.statements.append(params)
+            self._result = [(t,) for t in sorted(TABLES) if ":" not in t]
+        elif "information_schema.columns" in sql:
+            self._result = [
+                ("customers", "updated_at"),
+                ("deleted_rows", "deleted_at"),
+                ("sales", "updated_at"),
+            ]
+
+    def fetchone(self):
+        return self._result[0]
+
+    def fetchall(self):
+        return self._result
+
+    def copy_expert(self, sql, file, size=8192):
+        """Imita o psycopg2: escreve o CSV da tabela em pedaços."""
+        self.conn.statements.append(sql)
+        table = sql.split('"')[3]
+        if "WHERE" in sql:
+            table = f"{table}:changed"
+        data = TABLES[table]
+        for i in range(0, len(data), 5):
+            file.write(data[i : i + 5])
+        self.rowcount = data.count("\n") - 1
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements = []
+        self.closed = False
+        self.info = {}
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def _engine():
+    engine = MagicMock()
+    engine.connections = []
+
+    def raw_connection():
+        conn = FakeConnection()
+        engine.connections.append(conn)
+        return conn
+
+    engine.raw_connection.side_effect = raw_connection
+    return engine
+
 
 def test_list_tables():
-    mock_engine = MagicMock()
-    mock_conn = mock_engine.connect.return_value.__enter__.return_value
-    mock_conn.execute.return_value.fetchall.return_value = [("users",), ("sales",)]
-    
-    tables = _list_tables(mock_engine)
-    assert tables == ["users", "sales"]
-
-def test_copy_table_csv_psycopg2():
-    """Testa o caminho principal: driver com copy_expert (psycopg2)"""
-    mock_engine = MagicMock()
-    mock_raw = mock_engine.raw_connection.return_value.__enter__.return_value
-    mock_cursor = mock_raw.cursor.return_value
-    
-    def side_effect(sql, buf):
-        buf.write("id,name\n1,psycopg2")
-    
-    mock_cursor.copy_expert.side_effect = side_effect
-    
-    result = _copy_table_csv(mock_engine, "users")
-    assert result == b"id,name\n1,psycopg2"
-    mock_cursor.copy_expert.assert_called()
-
-def test_copy_table_csv_fallback():
-    """Testa o caminho de fallback (psycopg3) """
-    mock_engine = MagicMock()
-    mock_raw = mock_engine.raw_connection.return_value.__enter__.return_value
-    mock_cursor = mock_raw.cursor.return_value
-    
-    del mock_cursor.copy_expert
-    
-    mock_copy_result = MagicMock()
-    mock_copy_result.rows.return_value = ["id,val\n", "10,fallback\n"]
-    mock_cursor.copy.return_value = mock_copy_result
-    
-    result = _copy_table_csv(mock_engine, "test_table")
-    
-    assert result == b"id,val\n10,fallback\n"
-    
-    mock_cursor.copy.assert_called()
-
-@patch("app.services.backup_service._list_tables")
-@patch("app.services.backup_service._copy_table_csv")
-def test_build_backup_zip(mock_copy, mock_list):
-    mock_engine = MagicMock()
-    mock_list.return_value = ["users"]
-    mock_copy.return_value = b"id,name\n1,teste"
-    
-    filename, zip_bytes = build_backup_zip(mock_engine)
-    
+    conn = FakeConnection()
+    assert _list_tables(conn.cursor(), "public") == ["customers", "deleted_rows", "sales", "users"]
+    assert conn.statements[-1] == {"schema": "public"}
+
+
+def test_stream_backup_zip_shares_one_snapshot():
+    engine = _engine()
+
+    filename, chunks = stream_backup_zip(engine, workers=2)
+    zip_bytes = b"".join(chunks)
+
     assert filename.startswith("credigestor_backup_")
     assert filename.endswith(".zip")
-    assert len(zip_bytes) > 0
-    
+
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
+        assert zf.namelist()[-1] == "manifest.json"
+        for table in ("customers", "deleted_rows", "sales", "users"):
+            assert zf.read(f"data/{table}.csv").decode() == TABLES[table]
+        manifest = json.loads(zf.read("manifest.json"))
+
+    assert manifest["snapshot"] == "00000003-0000001B-1"
+    assert manifest["kind"] == "full"
+    assert manifest["parent_id"] is None
+    assert manifest["base_id"] == manifest["backup_id"]
+    assert manifest["watermark"] == "2026-01-02T12:00:00"
+    assert manifest["tables"] == ["customers", "deleted_rows", "sales", "users"]
+    assert manifest["files"][0] == {
+        "table": "customers",
+        "path": "data/customers.csv",
+        "mode": "full",
+        "rows": 2,
+        "bytes": len(TABLES["customers"]),
+        "sha256": hashlib.sha256(TABLES["customers"].encode()).hexdigest(),
+    }
+    assert [f["rows"] for f in manifest["files"]] == [2, 0, 1, 0]
+
+    coordinator, *workers = engine.connections
+    assert coordinator.statements[1] == "SELECT pg_export_snapshot(), timezone('UTC', now())"
+    assert len(workers) == 4
+    for conn in engine.connections:
+        assert conn.closed
+        # conexões longas: fora da média de tempo de uso do pool
+        assert conn.info == {LONG_CHECKOUT_KEY: True}
+        assert conn.statements[0] == (
+            "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY"
+        )
+    for conn in workers:
+        assert conn.statements[1] == "SET TRANSACTION SNAPSHOT '00000003-0000001B-1'"
+        assert conn.statements[2].startswith('COPY "public".')
+
+
+def test_stream_backup_zip_streams_in_chunks(monkeypatch):
+    monkeypatch.setattr(backup_service, "CHUNK_BYTES", 4)
+    rows = "".join(f"{i},{os.urandom(16).hex()}\n" for i in range(10_000))
+    monkeypatch.setitem(TABLES, "customers", "id,full_name\n" + rows)
+
+    _, chunks = stream_backup_zip(_engine(), workers=1)
+
+    # o ZIP sai aos poucos, não num único bloco no fim
+    assert sum(1 for c in chunks if c) > 10
+
+
+def test_stream_backup_zip_closes_connections_when_client_leaves():
+    engine = _engine()
+    _, chunks = stream_backup_zip(engine, workers=2)
+
+    next(chunks)
+    chunks.close()
+
+    assert all(conn.closed for conn in engine.connections)
+
+
+def test_dump_errors_reach_the_stream(monkeypatch):
+    def broken_copy(self, sql, file, size=8192):
+        raise RuntimeError("conexão perdida")
+
+    monkeypatch.setattr(FakeCursor, "copy_expert", broken_copy)
+    engine = _engine()
+
+    _, chunks = stream_backup_zip(engine)
+    with pytest.raises(RuntimeError, match="conexão perdida"):
+        list(chunks)
+
+    assert all(conn.closed for conn in engine.connections)
+
+
+def test_invalid_snapshot_id_is_rejected():
+    with pytest.raises(ValueError):
+        backup_service._begin_snapshot(FakeCursor(FakeConnection()), "x'; DROP")
+
+
+def test_incremental_backup_exports_changes_since_parent_watermark():
+    parent = BackupRun(
+        backup_id="a" * 32,
+        kind="full",
+        base_id="a" * 32,
+        watermark=datetime(2026, 1, 1, 12, 0, 0),
+    )
+    engine = _engine()
+    completed = []
+
+    filename, chunks = stream_backup_zip(
+        engine, parent=parent, on_complete=completed.append
+    )
+    zip_bytes = b"".join(chunks)
+
+    assert filename.endswith("_incremental.zip")
     with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
-        lista_arquivos = zf.namelist()
-        assert "manifest.json" in lista_arquivos
-        assert "data/users.csv" in lista_arquivos
\ No newline at end of file
+        manifest = json.loads(zf.read("manifest.json"))
+        assert zf.read("data/customers.csv").decode() == "id,full_name\n2,Leto\n"
+
+    assert completed == [manifest]
+    assert manifest["kind"] == "incremental"
+    assert manifest["parent_id"] == "a" * 32
+    assert manifest["base_id"] == "a" * 32
+    # watermark do pai menos a sobreposição (5 min)
+    assert manifest["changed_since"] == "2026-01-01T11:55:00"
+    modes = {f["table"]: f["mode"] for f in manifest["files"]}
+    assert modes == {
+        "customers": "changed",
+        "deleted_rows": "changed",
+        "sales": "changed",
+        "users": "full",  # sem updated_at: vai inteira
+    }
+
+    copies = [s for conn in engine.connections for s in conn.statements if "COPY" in str(s)]
+    assert (
+        'COPY (SELECT * FROM "public"."deleted_rows" '
+        "WHERE \"deleted_at\" > '2026-01-01 11:55:00'::timestamp) "
+        "TO STDOUT WITH (FORMAT csv, HEADER, NULL '\\N')"
+    ) in copies
+
+
+def test_interrupted_backup_is_not_recorded():
+    completed = []
+    _, chunks = stream_backup_zip(_engine(), on_complete=completed.append)
+
+    next(chunks)
+    chunks.close()
+
+    assert completed == []
+
+
+def test_record_and_latest_backup_run(db_session):
+    assert latest_backup_run(db_session) is None
+
+    for backup_id, kind in (("f" * 32, "full"), ("1" * 32, "incremental")):
+        record_backup_run(
+            db_session,
+            {
+                "backup_id": backup_id,
+                "kind": kind,
+                "parent_id": None if kind == "full" else "f" * 32,
+                "base_id": "f" * 32,
+                "watermark": "2026-01-02T12:00:00",
+            },
+        )
+
+    latest = latest_backup_run(db_session)
+    assert latest.backup_id == "1" * 32
+    assert latest.base_id == "f" * 32
+    assert latest.watermark == WATERMARK
+
+
+def test_recording_a_backup_prunes_tombstones_outside_the_next_window(db_session):
+    overlap = timedelta(seconds=backup_service.settings.BACKUP_WATERMARK_OVERLAP_SECONDS)
+    for row_id, deleted_at in (
+        (1, WATERMARK - overlap - timedelta(minutes=1)),
+        (2, WATERMARK - overlap + timedelta(minutes=1)),
+        (3, WATERMARK + timedelta(minutes=1)),
+    ):
+        db_session.add(DeletedRow(table_name="customers", row_id=row_id, deleted_at=deleted_at))
+    db_session.commit()
+
+    record_backup_run(
+        db_session,
+        {
+            "backup_id": "f" * 32,
+            "kind": "full",
+            "parent_id": None,
+            "base_id": "f" * 32,
+            "watermark": WATERMARK.isoformat(),
+        },
+    )
+
+    # o próximo incremental parte de watermark - overlap
+    remaining = [r.row_id for r in db_session.query(DeletedRow).order_by(DeletedRow.row_id)]
+    assert remaining == [2, 3]
+
+
+@pytest.mark.skipif(
+    not os.getenv("EXPLAIN_DATABASE_URL"),
+    reason="EXPLAIN_DATABASE_URL não definido (PostgreSQL descartável)",
+)
+@pytest.mark.parametrize("session_tz", ["America/Sao_Paulo", "Asia/Tokyo"])
+def test_watermark_and_tombstones_use_utc_in_any_session_timezone(session_tz):
+    from sqlalchemy import create_engine, text
+
+    from app.database import Base
+    from app.models.customer import Customer
+
+    engine = create_engine(
+        os.environ["EXPLAIN_DATABASE_URL"],
+        connect_args={"options": f"-c timezone={session_tz}"},
+    )
+    try:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        utc_now = datetime.now(timezone.utc).replace(tzinfo=None)
+        with engine.begin() as conn:
+            assert conn.exec_driver_sql("SHOW TimeZone").scalar() == session_tz
+            watermark = conn.exec_driver_sql(backup_service._SNAPSHOT_SQL).one()[1]
+            conn.execute(
+                Customer.__table__.insert().values(
+                    id=1, full_name="Paul", cpf="111", phone="1",
+                    created_at=utc_now, updated_at=utc_now,
+                )
+            )
+            conn.execute(text("DELETE FROM customers WHERE id = 1"))
+            deleted_at = conn.execute(text("SELECT deleted_at FROM deleted_rows")).scalar()
+
+        # mesmo relógio do updated_at gravado pela aplicação
+        assert abs(watermark - utc_now) < timedelta(minutes=1)
+        assert abs(deleted_at - utc_now) < timedelta(minutes=1)
+    finally:
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
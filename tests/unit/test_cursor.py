@@ -0,0 +1,24 @@
+from datetime import date, datetime
+
+import pytest
+
+from app.utils.cursor import decode_cursor, encode_cursor
+
+
+def test_roundtrip_with_dates():
+    token = encode_cursor((datetime(2025, 1, 2, 3, 4, 5, 6), 42))
+    assert "=" not in token
+    assert decode_cursor(token, 2) == ["2025-01-02T03:04:05.000006", 42]
+
+    assert decode_cursor(encode_cursor((date(2025, 1, 2), 7)), 2) == ["2025-01-02", 7]
+
+
+@pytest.mark.parametrize("token", ["@@@", "bm90LWpzb24", encode_cursor((1,))])
+def test_invalid_cursor(token):
+    with pytest.raises(ValueError, match="Cursor de paginação inválido"):
+        decode_cursor(token, 2)
+
+
+def test_unsupported_type():
+    with pytest.raises(TypeError):
+        encode_cursor((object(),))
@@ -0,0 +1,191 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.models.customer import Customer
+from app.utils.customer_autocomplete import CustomerAutocompleteIndex
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def _row(id, full_name, cpf, active=True, updated_at=T0):
+    return SimpleNamespace(
+        id=id, full_name=full_name, cpf=cpf, active=active, updated_at=updated_at
+    )
+
+
+def _index():
+    index = CustomerAutocompleteIndex(reconcile_interval_seconds=30)
+    index.build(
+        [
+            _row(1, "José Ávila", "11122233344"),
+            _row(2, "Joselito Souza", "11199988877"),
+            _row(3, "Maria José da Silva", "00012345678"),
+            _row(4, "Inativo Jose", "22233344455", active=False),
+        ],
+        generation=0,
+    )
+    return index
+
+
+def _ids(suggestions):
+    return [s.id for s in suggestions]
+
+
+def test_prefix_on_any_word_accent_insensitive():
+    index = _index()
+    assert _ids(index.lookup("jose")) == [1, 3, 2]
+    assert _ids(index.lookup("JOSÉ Á")) == [1]
+    assert _ids(index.lookup("silv")) == [3]
+    assert _ids(index.lookup("jose da s")) == [3]
+    assert index.lookup("xyz") == []
+    assert index.lookup("  ") == []
+
+
+def test_prefix_on_cpf_with_or_without_punctuation():
+    index = _index()
+    assert _ids(index.lookup("111")) == [1, 2]
+    assert _ids(index.lookup("111.222")) == [1]
+    # zeros à esquerda fazem parte do prefixo
+    assert _ids(index.lookup("0001")) == [3]
+    assert index.lookup("000123456789") == []
+
+    suggestion = index.lookup("000")[0]
+    assert suggestion.cpf == "00012345678"
+    assert suggestion.full_name == "Maria José da Silva"
+
+
+def test_limit_and_inactive_customers_are_skipped():
+    index = _index()
+    assert len(index) == 3
+    assert len(index.lookup("jose", limit=2)) == 2
+    assert 4 not in _ids(index.lookup("inativo"))
+
+
+def test_upsert_adds_renames_and_deactivates():
+    index = _index()
+
+    index.upsert(_row(5, "Ana Jose", "33344455566"))
+    assert _ids(index.lookup("ana")) == [5]
+    assert 5 in _ids(index.lookup("jose"))
+
+    index.upsert(_row(1, "Pedro Ávila", "11122233344"))
+    assert 1 not in _ids(index.lookup("jose"))
+    assert _ids(index.lookup("pedro")) == [1]
+    assert _ids(index.lookup("avila")) == [1]
+
+    index.upsert(_row(2, "Joselito Souza", "11199988877", active=False))
+    assert _ids(index.lookup("1119")) == []
+    assert _ids(index.lookup("jose")) == [5, 3]
+
+    # estruturas continuam consistentes após as remoções
+    assert index.stats()["name_keys"] == 2 + 2 + 4
+    assert index.stats()["cpf_keys"] == 3
+
+
+def test_upsert_is_ignored_until_loaded():
+    index = CustomerAutocompleteIndex()
+    index.upsert(_row(1, "José", "11122233344"))
+    assert len(index) == 0
+    assert not index.loaded
+
+
+def test_reconcile_applies_rows_changed_since_watermark():
+    index = _index()
+    db = MagicMock()
+    db.scalar.return_value = 0
+    db.execute.side_effect = [
+        [
+            _row(3, "Maria José da Silva", "00012345678", active=False, updated_at=T0 + timedelta(minutes=1)),
+            _row(6, "Carlos Jose", "44455566677", updated_at=T0 + timedelta(minutes=2)),
+        ],
+        # tombstone: cliente 1 excluído em outro worker (ou direto no banco)
+        [(1, T0 + timedelta(minutes=3))],
+    ]
+
+    assert index.reconcile(db) == 3
+
+    changed, deleted = (str(c.args[0]) for c in db.execute.call_args_list)
+    assert "updated_at >=" in changed
+    assert "deleted_rows.deleted_at >=" in deleted
+    assert _ids(index.lookup("jose")) == [6, 2]
+    assert _ids(index.lookup("111222")) == []
+    assert _ids(index.lookup("carlos")) == [6]
+    assert index.stats()["watermark"] == (T0 + timedelta(minutes=3)).isoformat()
+
+
+def test_refresh_loads_then_reconciles(test_engine, db_session):
+    index = CustomerAutocompleteIndex()
+    db_session.add(Customer(full_name="José Ávila", cpf="11122233344", phone="1"))
+    db_session.commit()
+    assert index.refresh(test_engine) == 1
+
+    # gravado por outro worker: entra na reconciliação seguinte
+    db_session.add(Customer(full_name="Joselito Souza", cpf="55566677788", phone="1"))
+    db_session.commit()
+    index.refresh(test_engine)
+    assert [s.full_name for s in index.lookup("jose")] == ["José Ávila", "Joselito Souza"]
+
+
+@pytest.mark.asyncio
+async def test_loop_keeps_refreshing_after_failures(monkeypatch):
+    index = CustomerAutocompleteIndex(reconcile_interval_seconds=7)
+    refresh = MagicMock(side_effect=[RuntimeError("banco fora"), 3])
+    monkeypatch.setattr(index, "refresh", refresh)
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 2:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    with pytest.raises(asyncio.CancelledError):
+        await index.loop("engine")
+
+    assert refresh.call_count == 2
+    assert sleeps == [7, 7]
+
+
+def test_reconcile_reloads_everything_after_a_restore():
+    index = _index()
+    db = MagicMock()
+    # backup restaurado em outro worker: updated_at antigo, abaixo do watermark
+    db.scalar.return_value = 1
+    db.execute.return_value = [_row(9, "Paul Atreides", "99988877766", updated_at=T0 - timedelta(days=30))]
+
+    assert index.reconcile(db) == 1
+
+    (stmt,) = (str(c.args[0]) for c in db.execute.call_args_list)
+    assert "updated_at >=" not in stmt
+    assert _ids(index.lookup("jose")) == []
+    assert _ids(index.lookup("paul")) == [9]
+
+
+def test_stats_reports_memory():
+    stats = _index().stats()
+    assert stats["loaded"] is True
+    assert stats["customers"] == 3
+    assert stats["memory_bytes"] > 0
+    assert stats["bytes_per_customer"] == round(stats["memory_bytes"] / 3, 1)
+    assert stats["build_ms"] is not None
+
+
+def test_stats_memory_follows_incremental_changes():
+    index = _index()
+    index.upsert(_row(5, "Ana Jose", "33344455566"))
+    index.upsert(_row(1, "Pedro Ávila", "11122233344"))
+    index.upsert(_row(2, "Joselito Souza", "11199988877", active=False))
+
+    rebuilt = CustomerAutocompleteIndex()
+    rebuilt.build(
+        [
+            _row(1, "Pedro Ávila", "11122233344"),
+            _row(3, "Maria José da Silva", "00012345678"),
+            _row(5, "Ana Jose", "33344455566"),
+        ]
+    )
+    assert index._entries_bytes == rebuilt._entries_bytes
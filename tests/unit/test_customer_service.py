@@ -6,11 +6,13 @@ from app.services.customer_service import (
     update_customer, 
     list_customers, 
     get_customer_by_id, 
-    get_customer_by_cpf
+    get_customer_by_cpf,
+    get_customer_by_id_async,
 )
 from app.schemas.customer_schema import CustomerCreate, CustomerUpdate, CustomerOut
 from app.models.customer import Customer
 
+
 def test_create_customer_success():
     mock_db = MagicMock()
     mock_db.query.return_value.filter.return_value.first.return_value = None
@@ -23,6 +25,7 @@ def test_create_customer_success():
     customer = create_customer(mock_db, data)
     assert customer.cpf == "11111111111"
 
+
 def test_create_customer_duplicate_cpf():
     mock_db = MagicMock()
     mock_db.query.return_value.filter.return_value.first.return_value = MagicMock()
@@ -44,6 +47,7 @@ def test_customer_schema_invalid_cpf():
             phone="123"
         )
 
+
 def test_get_customer_by_cpf():
     mock_db = MagicMock()
     fake_customer = Customer(id=1, cpf="111.111.111-11")
@@ -51,6 +55,7 @@ def test_get_customer_by_cpf():
     result = get_customer_by_cpf(mock_db, "111.111.111-11")
     assert result is not None
 
+
 def test_get_customer_by_id():
     mock_db = MagicMock()
     fake_customer = Customer(id=99, full_name="Busca por ID")
@@ -58,12 +63,14 @@ def test_get_customer_by_id():
     result = get_customer_by_id(mock_db, 99)
     assert result.id == 99
 
+
 def test_list_customers():
     mock_db = MagicMock()
     mock_db.query.return_value.order_by.return_value.all.return_value = [Customer(id=1)]
     result = list_customers(mock_db)
     assert len(result) == 1
 
+
 def test_update_customer():
     mock_db = MagicMock()
     customer = Customer(id=1, full_name="Antigo", phone="000")
@@ -71,6 +78,7 @@ def test_update_customer():
     updated = update_customer(mock_db, customer, update_data)
     assert updated.full_name == "Novo"
 
+
 def test_customer_out_cpf_formatting():
     """Testa se o validador de saída formata o CPF corretamente"""
     data = {
@@ -84,6 +92,7 @@ def test_customer_out_cpf_formatting():
     customer_out = CustomerOut(**data)
     assert customer_out.cpf == "111.222.333-44"
 
+
 def test_customer_out_cpf_already_formatted():
     """Testa se o validador ignora se já vier formatado ou inválido"""
     data = {
@@ -93,4 +102,10 @@ def test_customer_out_cpf_already_formatted():
         "phone": "123"
     }
     customer_out = CustomerOut(**data)
-    assert customer_out.cpf == "111.222.333-44"
\ No newline at end of file
+    assert customer_out.cpf == "111.222.333-44"
+
+
+@pytest.mark.asyncio
+async def test_get_customer_by_id_async(async_db):
+    async_db.scalar.return_value = Customer(id=7)
+    assert (await get_customer_by_id_async(async_db, 7)).id == 7
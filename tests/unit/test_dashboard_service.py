@@ -1,7 +1,9 @@
+import pytest
 from unittest.mock import MagicMock
 from decimal import Decimal
 from datetime import date
-from app.services.dashboard_service import get_dashboard
+from app.services.dashboard_service import get_dashboard, get_dashboard_async
+
 
 def test_get_dashboard_values():
     mock_db = MagicMock()
@@ -39,4 +41,23 @@ def test_get_dashboard_values():
     assert result["total_overdue"] == Decimal("1000.00")
     assert result["received_last_30_days"] == Decimal("2500.00")
     assert len(result["next_due"]) == 1
-    assert result["next_due"][0]["customer_id"] == 99
\ No newline at end of file
+    assert result["next_due"][0]["customer_id"] == 99
+
+
+@pytest.mark.asyncio
+async def test_get_dashboard_async_values(async_db):
+    mock_db = async_db
+    mock_db.scalar.side_effect = [Decimal("5000.00"), None, Decimal("2500.00")]
+    note_mock = MagicMock(
+        id=1, sale_id=10, original_amount=Decimal("100.00"),
+        paid_amount=Decimal("40.00"), due_date=date.today(), status="partial_payment"
+    )
+    mock_db.execute.return_value.all.return_value = [(note_mock, 99)]
+
+    result = await get_dashboard_async(mock_db)
+
+    assert result["total_to_receive"] == Decimal("5000.00")
+    assert result["total_overdue"] == Decimal("0")
+    assert result["received_last_30_days"] == Decimal("2500.00")
+    assert result["next_due"][0]["outstanding_balance"] == Decimal("60.00")
+    assert mock_db.scalar.await_count == 3
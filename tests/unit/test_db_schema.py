@@ -0,0 +1,188 @@
+from unittest.mock import MagicMock
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401
+from app import db_schema
+from app.database import Base
+from app.db_schema import current_schema_version, ensure_schema
+
+
+def _engine():
+    return create_engine(
+        "sqlite+pysqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+
+def test_fresh_database_creates_tables_and_records_version():
+    engine = _engine()
+
+    assert ensure_schema(engine, Base) is True
+
+    assert {
+        "promissory_notes",
+        "rate_limit_buckets",
+        "restore_runs",
+        "schema_version",
+    } <= set(inspect(engine).get_table_names())
+    with engine.connect() as conn:
+        assert current_schema_version(conn) == db_schema.SCHEMA_VERSION
+
+
+def test_current_schema_skips_ddl():
+    engine = _engine()
+    ensure_schema(engine, Base)
+
+    base = MagicMock()
+    assert ensure_schema(engine, base) is False
+    base.metadata.create_all.assert_not_called()
+
+
+def test_unversioned_database_reports_none():
+    with _engine().connect() as conn:
+        assert current_schema_version(conn) is None
+
+
+def test_pending_migrations_run_in_order(monkeypatch):
+    engine = _engine()
+    ensure_schema(engine, Base)
+
+    calls = []
+    monkeypatch.setattr(db_schema, "SCHEMA_VERSION", db_schema.SCHEMA_VERSION + 2)
+    monkeypatch.setattr(
+        db_schema,
+        "MIGRATIONS",
+        {
+            db_schema.SCHEMA_VERSION - 1: lambda conn: calls.append("a"),
+            db_schema.SCHEMA_VERSION: lambda conn: calls.append("b"),
+        },
+    )
+
+    assert ensure_schema(engine, Base) is True
+    assert calls == ["a", "b"]
+    with engine.connect() as conn:
+        assert current_schema_version(conn) == db_schema.SCHEMA_VERSION
+        assert conn.execute(text("SELECT COUNT(*) FROM schema_version")).scalar() == 1
+
+
+def test_newer_schema_is_left_untouched():
+    engine = _engine()
+    ensure_schema(engine, Base)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE schema_version SET version = version + 5"))
+
+    base = MagicMock()
+    assert ensure_schema(engine, base) is False
+    base.metadata.create_all.assert_not_called()
+
+
+def _index_names(engine, table):
+    return {ix["name"] for ix in inspect(engine).get_indexes(table)}
+
+
+def test_unversioned_database_gets_query_indexes():
+    engine = _engine()
+    # banco criado antes do versionamento: sem os índices novos
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for name in (
+            "ix_promissory_notes_open_due",
+            "uq_promissory_notes_sale_installment",
+            "ix_sales_created_at_id",
+            "ix_payments_payment_date",
+        ):
+            conn.execute(text(f"DROP INDEX {name}"))
+        conn.execute(
+            text("CREATE INDEX ix_promissory_notes_sale_id ON promissory_notes (sale_id)")
+        )
+
+    assert ensure_schema(engine, Base) is True
+
+    notes = _index_names(engine, "promissory_notes")
+    assert {"ix_promissory_notes_open_due", "uq_promissory_notes_sale_installment"} <= notes
+    assert "ix_promissory_notes_sale_id" not in notes
+    assert "ix_sales_created_at_id" in _index_names(engine, "sales")
+    assert "ix_payments_payment_date" in _index_names(engine, "payments")
+
+
+def test_unversioned_database_gets_customer_search_column():
+    engine = _engine()
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE customers DROP COLUMN search_text"))
+        conn.execute(
+            text(
+                "INSERT INTO customers (full_name, cpf, phone, active, created_at, updated_at) "
+                "VALUES ('Ângela', '12345678901', '(11) 1234-5678', 1, '2025-01-01', '2025-01-01')"
+            )
+        )
+
+    assert ensure_schema(engine, Base) is True
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT search_text FROM customers")).scalar() == (
+            "angela 12345678901 1112345678"
+        )
+
+
+def test_unversioned_database_gets_note_listing_index():
+    engine = _engine()
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_promissory_notes_due_date_id"))
+        conn.execute(
+            text("CREATE INDEX ix_promissory_notes_due_date ON promissory_notes (due_date)")
+        )
+
+    assert ensure_schema(engine, Base) is True
+
+    notes = _index_names(engine, "promissory_notes")
+    assert "ix_promissory_notes_due_date_id" in notes
+    assert "ix_promissory_notes_due_date" not in notes
+
+
+def test_unversioned_database_gets_overdue_candidates_index():
+    engine = _engine()
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_promissory_notes_overdue_candidates"))
+
+    assert ensure_schema(engine, Base) is True
+
+    assert "ix_promissory_notes_overdue_candidates" in _index_names(engine, "promissory_notes")
+
+
+def test_cascading_deletes_migration_recreates_postgres_fks(monkeypatch):
+    conn = MagicMock()
+    conn.dialect.name = "postgresql"
+    inspector = MagicMock()
+    inspector.get_foreign_keys.side_effect = lambda table: {
+        "promissory_notes": [
+            {"name": "promissory_notes_sale_id_fkey", "constrained_columns": ["sale_id"], "options": {}}
+        ],
+        # já migrado: fica como está
+        "payments": [
+            {
+                "name": "payments_promissory_note_id_fkey",
+                "constrained_columns": ["promissory_note_id"],
+                "options": {"ondelete": "CASCADE"},
+            }
+        ],
+    }[table]
+    monkeypatch.setattr(db_schema, "inspect", lambda conn: inspector)
+
+    db_schema.MIGRATIONS[6](conn)
+
+    from sqlalchemy.dialects import postgresql
+
+    statements = [
+        str(call.args[0].compile(dialect=postgresql.dialect()))
+        for call in conn.execute.call_args_list
+    ]
+    assert statements == [
+        'ALTER TABLE "promissory_notes" DROP CONSTRAINT "promissory_notes_sale_id_fkey"',
+        "ALTER TABLE promissory_notes ADD FOREIGN KEY(sale_id) REFERENCES sales (id) ON DELETE CASCADE",
+    ]
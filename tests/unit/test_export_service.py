@@ -1,6 +1,22 @@
 import csv
+import gzip
 import io
-from app.services.export_service import to_csv_bytes
+import threading
+from datetime import date
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.dialects.postgresql import psycopg2 as pg_psycopg2
+
+from app.services import export_service
+from app.services.export_service import (
+    gzip_chunks,
+    iter_csv,
+    stream_query_columnar,
+    stream_query_csv,
+    to_csv_bytes,
+)
+from app.services.promissory_note_service import promissory_notes_export_select
 
 def test_to_csv_bytes():
     headers = ["col1", "col2"]
@@ -19,4 +35,186 @@ def test_to_csv_bytes():
     
     assert len(data) == 2
     assert data[0]["col1"] == "dado1"
-    assert data[1]["col2"] == "" 
\ No newline at end of file
+    assert data[1]["col2"] == "" 
+
+
+def test_iter_csv_yields_bounded_chunks():
+    rows = ([i, f"nome {i}", None] for i in range(1000))
+    chunks = list(iter_csv(["id", "nome", "obs"], rows, chunk_bytes=256))
+
+    assert len(chunks) > 10
+    assert all(len(c) < 256 + 64 for c in chunks)
+    lines = b"".join(chunks).decode().split("\n")
+    assert lines[0] == "id,nome,obs"
+    assert lines[1] == "0,nome 0,"
+    assert len(lines) == 1002  # cabeçalho + linhas + "" final
+
+
+def test_gzip_chunks_round_trip():
+    data = [b"a,b\n", b"1,2\n" * 1000]
+    assert gzip.decompress(b"".join(gzip_chunks(data))) == b"".join(data)
+
+
+class FakeCopyExpertCursor:
+    """Imita o psycopg2: copy_expert escreve linha a linha num arquivo."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.rowcount = -1
+        self.finished = threading.Event()
+
+    def copy_expert(self, sql, file, size=8192):
+        self.sql = sql
+        try:
+            for line in self.lines:
+                file.write(line)
+            self.rowcount = len(self.lines)
+        finally:
+            self.finished.set()
+
+    def close(self):
+        pass
+
+
+def _pg_db(cursor):
+    db = MagicMock()
+    db.get_bind.return_value.dialect = pg_psycopg2.dialect()
+    db.connection.return_value.connection.cursor.return_value = cursor
+    return db
+
+
+def test_stream_query_csv_uses_copy_on_postgres():
+    cursor = FakeCopyExpertCursor([f"{i},x\n" for i in range(500)])
+    stmt = promissory_notes_export_select(status="overdue", due_from=date(2025, 1, 1))
+
+    chunks = list(stream_query_csv(_pg_db(cursor), stmt, ["id", "x"], chunk_bytes=100))
+
+    body = b"".join(chunks).decode()
+    assert body.startswith("id,x\n0,x\n1,x\n")
+    assert body.endswith("499,x\n")
+    assert cursor.sql.startswith("COPY (SELECT promissory_notes.id")
+    assert cursor.sql.endswith(") TO STDOUT WITH (FORMAT csv)")
+    # filtros iguais aos da listagem, com os valores embutidos
+    assert "promissory_notes.status = 'overdue'" in cursor.sql
+    assert "promissory_notes.due_date >= '2025-01-01'" in cursor.sql
+
+
+def test_copy_stops_when_consumer_goes_away(monkeypatch):
+    monkeypatch.setattr(export_service, "COPY_QUEUE_CHUNKS", 1)
+    cursor = FakeCopyExpertCursor([b"1,x\n"] * 100_000)
+    stream = stream_query_csv(
+        _pg_db(cursor), promissory_notes_export_select(), ["id", "x"], chunk_bytes=64
+    )
+
+    next(stream)  # cabeçalho
+    next(stream)
+    stream.close()
+
+    assert cursor.finished.wait(2)
+    assert cursor.rowcount == -1  # COPY interrompido
+
+
+def test_copy_errors_reach_the_consumer():
+    class Broken(FakeCopyExpertCursor):
+        def copy_expert(self, sql, file, size=8192):
+            raise RuntimeError("conexão perdida")
+
+    stream = stream_query_csv(_pg_db(Broken([])), promissory_notes_export_select(), ["id"])
+    with pytest.raises(RuntimeError, match="conexão perdida"):
+        list(stream)
+
+
+def test_copy_with_psycopg3_cursor():
+    class Copy:
+        def __enter__(self):
+            return iter([memoryview(b"1,x\n"), memoryview(b"2,y\n")])
+
+        def __exit__(self, *exc):
+            return False
+
+    class Psycopg3Cursor:
+        rowcount = 2
+
+        def copy(self, sql):
+            return Copy()
+
+        def close(self):
+            pass
+
+    db = _pg_db(Psycopg3Cursor())
+    db.get_bind.return_value.dialect.driver = "psycopg"
+    chunks = stream_query_csv(db, promissory_notes_export_select(), ["id", "v"])
+    assert b"".join(chunks) == b"id,v\n1,x\n2,y\n"
+
+
+def _notes_table(db_session):
+    from decimal import Decimal
+
+    import pyarrow as pa
+    from sqlalchemy import Column, Date, DateTime, Integer, MetaData, Numeric, String, Table, insert, select
+
+    table = Table(
+        "columnar_notes",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("amount", Numeric(10, 2)),
+        Column("due_date", Date),
+        Column("status", String(20)),
+        Column("created_at", DateTime),
+    )
+    table.drop(db_session.get_bind(), checkfirst=True)
+    table.create(db_session.get_bind())
+    db_session.execute(
+        insert(table),
+        [
+            {
+                "id": i,
+                "amount": Decimal("10.05") * i if i % 7 else None,
+                "due_date": date(2025, 1, 1),
+                "status": "pending",
+                "created_at": None,
+            }
+            for i in range(1, 251)
+        ],
+    )
+    return pa, select(table).order_by(table.c.id)
+
+
+def test_stream_query_columnar_arrow_batches(db_session):
+    pa, stmt = _notes_table(db_session)
+
+    chunks = list(stream_query_columnar(db_session, stmt, fmt="arrow", batch_rows=100))
+
+    assert len(chunks) == 4  # 3 lotes + fim do stream
+    reader = pa.ipc.open_stream(b"".join(chunks))
+    batches = list(reader)
+    assert [b.num_rows for b in batches] == [100, 100, 50]
+    table = pa.Table.from_batches(batches)
+    assert table.schema.field("amount").type == pa.int64()
+    assert table.schema.field("amount").metadata == {
+        b"logical_type": b"scaled_decimal",
+        b"scale": b"2",
+    }
+    assert table.schema.field("id").type == pa.int32()
+    assert table.schema.field("due_date").type == pa.date32()
+    assert table.column("amount").to_pylist()[:7] == [1005, 2010, 3015, 4020, 5025, 6030, None]
+    assert table.column("status").to_pylist()[0] == "pending"
+
+
+def test_stream_query_columnar_parquet_row_groups(db_session):
+    import pyarrow.parquet as pq
+
+    pa, stmt = _notes_table(db_session)
+
+    body = b"".join(stream_query_columnar(db_session, stmt, fmt="parquet", batch_rows=100))
+
+    parquet = pq.ParquetFile(pa.BufferReader(body))
+    assert parquet.metadata.num_row_groups == 3
+    assert parquet.metadata.row_group(0).column(1).compression == "ZSTD"
+    assert parquet.read().column("id").to_pylist() == list(range(1, 251))
+
+
+def test_stream_query_columnar_rejects_unknown_format(db_session):
+    _, stmt = _notes_table(db_session)
+    with pytest.raises(ValueError):
+        list(stream_query_columnar(db_session, stmt, fmt="orc"))
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+
+from app.utils.hashing_executor import HashingExecutor
+
+
+def test_submit_executes_on_dedicated_threads_and_records_stats():
+    ex = HashingExecutor(max_workers=1)
+    name = ex.submit(lambda: threading.current_thread().name).result()
+    assert name.startswith("password-hash")
+
+    stats = ex.stats()
+    assert stats["completed"] == 1
+    assert stats["queue_depth"] == 0
+    assert stats["running"] == 0
+    assert stats["max_workers"] == 1
+    ex.shutdown()
+
+
+def test_run_async_and_queue_depth():
+    ex = HashingExecutor(max_workers=1)
+    release = threading.Event()
+
+    first = ex.submit(release.wait)
+    second = ex.submit(lambda: "ok")
+    # o segundo espera na fila enquanto o primeiro ocupa o único worker
+    assert ex.stats()["queue_depth"] >= 1
+    release.set()
+    first.result()
+    assert second.result() == "ok"
+
+    assert asyncio.run(ex.run_async(lambda x: x * 2, 21)) == 42
+    assert ex.stats()["completed"] == 3
+    assert ex.stats()["wait_ms_p99"] >= ex.stats()["wait_ms_p50"] >= 0
+    ex.shutdown()
+
+
+def test_stats_without_samples_and_shutdown_idempotent():
+    ex = HashingExecutor(max_workers=2)
+    assert ex.stats()["run_ms_p99"] == 0.0
+    ex.shutdown()
+    ex.shutdown()
@@ -0,0 +1,150 @@
+import asyncio
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock, PropertyMock
+
+import pytest
+
+from app.models.customer import Customer
+from app.models.promissory_note import PromissoryNote
+from app.models.sale import Sale
+from app.models.user import User
+from app.services import overdue_service
+from app.services.overdue_service import OverdueJob, mark_overdue_notes
+
+TODAY = date(2026, 3, 10)
+
+
+def _notes(db_session, statuses_and_days):
+    user = User(name="U", email="u@u.com", password_hash="x", role="admin")
+    customer = Customer(full_name="Cliente", cpf="12345678901", phone="1")
+    db_session.add_all([user, customer])
+    db_session.flush()
+    sale = Sale(
+        customer_id=customer.id,
+        user_id=user.id,
+        total_amount=Decimal("100.00"),
+        installments_count=len(statuses_and_days),
+        first_installment_date=TODAY,
+    )
+    db_session.add(sale)
+    db_session.flush()
+    for number, (status, days) in enumerate(statuses_and_days, start=1):
+        db_session.add(
+            PromissoryNote(
+                sale_id=sale.id,
+                installment_number=number,
+                original_amount=Decimal("10.00"),
+                paid_amount=Decimal("5.00") if status == "partial_payment" else 0,
+                due_date=TODAY + timedelta(days=days),
+                status=status,
+            )
+        )
+    db_session.commit()
+
+
+def _statuses(db_session):
+    db_session.expire_all()
+    return [
+        n.status
+        for n in db_session.query(PromissoryNote).order_by(PromissoryNote.installment_number)
+    ]
+
+
+def test_mark_overdue_notes_in_batches(db_session, test_engine):
+    _notes(
+        db_session,
+        [
+            ("pending", -30),
+            ("partial_payment", -1),
+            ("pending", -5),
+            ("paid", -60),
+            ("overdue", -90),
+            ("pending", 0),
+            ("partial_payment", 15),
+        ],
+    )
+    untouched = {
+        n.installment_number: n.updated_at
+        for n in db_session.query(PromissoryNote)
+        if n.installment_number > 3
+    }
+
+    with test_engine.connect() as conn:
+        assert mark_overdue_notes(conn, today=TODAY, batch_size=2) == 3
+        # idempotente: nada mais a marcar
+        assert mark_overdue_notes(conn, today=TODAY, batch_size=2) == 0
+
+    assert _statuses(db_session) == [
+        "overdue", "overdue", "overdue", "paid", "overdue", "pending", "partial_payment"
+    ]
+    for note in db_session.query(PromissoryNote).filter(PromissoryNote.installment_number > 3):
+        assert note.updated_at == untouched[note.installment_number]
+
+
+def test_mark_overdue_notes_continues_past_batches_shortened_by_locks():
+    # lotes curtos por causa do SKIP LOCKED não encerram a execução
+    conn = MagicMock()
+    type(conn.execute.return_value).rowcount = PropertyMock(side_effect=[1, 2, 0])
+
+    assert mark_overdue_notes(conn, today=TODAY, batch_size=2) == 3
+    assert conn.execute.call_count == 3
+    assert conn.commit.call_count == 3
+
+
+def _pg_engine(lock_acquired):
+    conn = MagicMock()
+    conn.dialect.name = "postgresql"
+    conn.execute.return_value.scalar.return_value = lock_acquired
+    engine = MagicMock()
+    engine.connect.return_value.__enter__.return_value = conn
+    return engine, conn
+
+
+def test_job_skips_when_another_worker_holds_the_lock(monkeypatch):
+    mark = MagicMock()
+    monkeypatch.setattr(overdue_service, "mark_overdue_notes", mark)
+    engine, _ = _pg_engine(lock_acquired=False)
+    job = OverdueJob()
+
+    assert job.run(engine) is None
+
+    mark.assert_not_called()
+    assert job.stats()["skipped"] == 1
+    assert job.stats()["runs"] == 0
+
+
+def test_job_releases_the_lock_and_records_stats(monkeypatch):
+    monkeypatch.setattr(overdue_service, "mark_overdue_notes", lambda conn, today: 7)
+    engine, conn = _pg_engine(lock_acquired=True)
+    job = OverdueJob()
+
+    assert job.run(engine) == 7
+
+    statements = [str(call.args[0]) for call in conn.execute.call_args_list]
+    assert statements == [
+        "SELECT pg_try_advisory_lock(:key)",
+        "SELECT pg_advisory_unlock(:key)",
+    ]
+    stats = job.stats()
+    assert (stats["runs"], stats["total_updated"], stats["last_updated"]) == (1, 7, 7)
+    assert stats["last_run_at"] is not None
+
+
+def test_job_loop_survives_failures(monkeypatch):
+    job = OverdueJob()
+    job.run = MagicMock(side_effect=[RuntimeError("banco fora"), 3])
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 2:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(overdue_service.asyncio, "sleep", fake_sleep)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(job.loop(MagicMock(), 60))
+
+    assert job.run.call_count == 2
+    assert sleeps == [60, 60]
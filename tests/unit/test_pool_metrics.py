@@ -0,0 +1,156 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import QueuePool
+
+from app.utils import pool_metrics
+from app.utils.pool_metrics import (
+    PoolLoadSheddingMiddleware,
+    PoolMetrics,
+    exclude_from_hold_time,
+)
+
+
+@pytest.fixture()
+def instrumented(tmp_path):
+    metrics = PoolMetrics("test", pool_size=1, max_overflow=0)
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=metrics.pool_class(QueuePool),
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+        pool_pre_ping=True,
+    )
+    metrics.attach(engine)
+    yield metrics, engine
+    engine.dispose()
+
+
+def test_pool_class_keeps_base_behaviour(instrumented):
+    metrics, engine = instrumented
+    assert type(engine.pool).__name__ == "InstrumentedQueuePool"
+    assert isinstance(engine.pool, QueuePool)
+
+    engine.dispose()  # recreate() mantém a subclasse instrumentada
+    assert type(engine.pool).__name__ == "InstrumentedQueuePool"
+
+
+def test_checkout_connect_hold_and_pre_ping_are_recorded(instrumented):
+    metrics, engine = instrumented
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        snap = metrics.snapshot()
+        assert snap["in_use"] == 1
+        assert snap["connects"] == 1
+
+    with engine.connect() as conn:  # reaproveita: faz pre-ping
+        conn.execute(text("SELECT 1"))
+
+    snap = metrics.snapshot()
+    assert snap["in_use"] == 0
+    assert snap["checkout_wait"]["count"] == 2
+    assert snap["checkout_wait"]["histogram"]["le_inf"] == 2
+    assert snap["pre_ping"]["count"] == 1
+    assert snap["hold_ms_avg"] > 0
+    assert snap["capacity"] == 1
+
+
+def test_timeouts_invalidations_and_estimated_wait(instrumented):
+    metrics, engine = instrumented
+
+    with engine.connect():
+        pass  # alimenta a média de tempo de uso
+
+    conn = engine.connect()
+    assert metrics.estimated_wait_seconds() > 0  # pool cheio
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    assert metrics.checkout_timeouts == 1
+    assert metrics.pending_checkouts == 0
+
+    conn.invalidate()
+    conn.close()
+    assert metrics.invalidations == 1
+    assert metrics.estimated_wait_seconds() == 0.0
+
+
+def test_long_checkouts_stay_out_of_the_hold_average(instrumented, monkeypatch):
+    metrics, engine = instrumented
+    now = {"t": 100.0}
+    monkeypatch.setattr(time, "perf_counter", lambda: now["t"])
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        now["t"] += 0.01
+    hold = metrics.hold_seconds_ewma
+    assert hold > 0
+
+    # stream (yield_per) e checkout marcado (COPY, backup) duram minutos
+    with engine.connect() as conn:
+        list(conn.execution_options(yield_per=10).execute(text("SELECT 1")))
+        now["t"] += 300
+    with engine.connect() as conn:
+        exclude_from_hold_time(conn)
+        now["t"] += 300
+    assert metrics.hold_seconds_ewma == hold
+
+    # a marca vale só para aquele checkout
+    with engine.connect() as conn:
+        now["t"] += 0.01
+    assert metrics.hold_seconds_ewma > hold
+
+
+def test_shedding_estimate_ignores_replica_pools(monkeypatch):
+    primary = PoolMetrics("primary", pool_size=1, max_overflow=0)
+    replica = PoolMetrics("replica", pool_size=1, max_overflow=0, sheds_load=False)
+    primary.estimated_wait_seconds = lambda: 0.1
+    replica.estimated_wait_seconds = lambda: 30.0
+    monkeypatch.setattr(pool_metrics, "registry", {"primary": primary, "replica": replica})
+
+    assert pool_metrics.max_estimated_wait_seconds() == 0.1
+
+
+def test_snapshot_without_engine():
+    metrics = PoolMetrics("solto", pool_size=2, max_overflow=3)
+    snap = metrics.snapshot()
+    assert snap["capacity"] == 5
+    assert snap["in_use"] == 0
+    assert snap["estimated_wait_ms"] == 0.0
+
+
+def _app(budget_ms, wait):
+    app = FastAPI()
+    app.add_middleware(
+        PoolLoadSheddingMiddleware, budget_ms=budget_ms, estimate=lambda: wait
+    )
+
+    @app.get("/api/x")
+    def x():
+        return {"ok": True}
+
+    @app.get("/health")
+    def health():
+        return {"ok": True}
+
+    return app
+
+
+def test_load_shedding_returns_503_with_retry_after():
+    client = TestClient(_app(budget_ms=1000, wait=4.2))
+    r = client.get("/api/x")
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "5"
+
+    # health continua respondendo
+    assert client.get("/health").status_code == 200
+
+
+def test_load_shedding_passes_within_budget_or_disabled():
+    assert TestClient(_app(budget_ms=1000, wait=0.5)).get("/api/x").status_code == 200
+    assert TestClient(_app(budget_ms=0, wait=99)).get("/api/x").status_code == 200
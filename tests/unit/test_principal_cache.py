@@ -0,0 +1,103 @@
+import time
+
+import app.utils.principal_cache as principal_cache_module
+from app.models.backup import RestoreRun
+from app.models.user import User
+from app.utils.principal_cache import (
+    CachedPrincipal,
+    PrincipalCache,
+    check_restore_generation,
+)
+
+
+def _principal(user_id: int = 1) -> CachedPrincipal:
+    return CachedPrincipal(
+        id=user_id, name="N", email=f"u{user_id}@a.com", role="admin", active=True
+    )
+
+
+def test_from_user_keeps_only_authorization_fields():
+    u = User(id=7, name="N", email="e@e.com", password_hash="x", role="seller", active=True)
+    p = CachedPrincipal.from_user(u)
+    assert (p.id, p.name, p.email, p.role, p.active) == (7, "N", "e@e.com", "seller", True)
+    assert not hasattr(p, "password_hash")
+    assert p.token_role is None
+
+
+def test_get_set_and_hit_miss_counters():
+    cache = PrincipalCache(ttl_seconds=30, max_entries=10)
+    assert cache.get(1) is None
+    cache.set(_principal(1))
+    assert cache.get(1).id == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entry_expires_after_ttl(monkeypatch):
+    now = {"t": 100.0}
+    monkeypatch.setattr(time, "monotonic", lambda: now["t"])
+
+    cache = PrincipalCache(ttl_seconds=5, max_entries=10)
+    cache.set(_principal(1))
+    now["t"] += 4.9
+    assert cache.get(1) is not None
+    now["t"] += 0.2
+    assert cache.get(1) is None
+    assert len(cache) == 0
+
+
+def test_lru_eviction_respects_max_entries():
+    cache = PrincipalCache(ttl_seconds=30, max_entries=2)
+    cache.set(_principal(1))
+    cache.set(_principal(2))
+    cache.get(1)  # 1 passa a ser o mais recente
+    cache.set(_principal(3))
+
+    assert len(cache) == 2
+    assert cache.get(2) is None
+    assert cache.get(1) is not None
+    assert cache.get(3) is not None
+
+
+def test_invalidate_and_clear():
+    cache = PrincipalCache(ttl_seconds=30, max_entries=10)
+    cache.set(_principal(1))
+    cache.set(_principal(2))
+    cache.invalidate(1)
+    cache.invalidate(99)  # inexistente não falha
+    assert cache.get(1) is None
+    cache.clear()
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_disabled_cache_never_stores():
+    cache = PrincipalCache(ttl_seconds=0, max_entries=10)
+    assert cache.enabled is False
+    cache.set(_principal(1))
+    assert cache.get(1) is None
+    assert len(cache) == 0
+
+
+def test_generation_change_clears_the_cache():
+    cache = PrincipalCache(ttl_seconds=30, max_entries=10)
+    assert cache.sync_generation(0) is False
+    cache.set(_principal(1))
+
+    assert cache.sync_generation(0) is False
+    assert cache.get(1) is not None
+    assert cache.sync_generation(1) is True
+    assert cache.get(1) is None
+
+
+def test_check_restore_generation_reads_restore_runs(db_session, test_engine, monkeypatch):
+    cache = PrincipalCache(ttl_seconds=30, max_entries=10)
+    monkeypatch.setattr(principal_cache_module, "principal_cache", cache)
+    assert check_restore_generation(test_engine) is False
+    cache.set(_principal(1))
+
+    # restauração feita por outro worker
+    db_session.add(RestoreRun())
+    db_session.commit()
+
+    assert check_restore_generation(test_engine) is True
+    assert len(cache) == 0
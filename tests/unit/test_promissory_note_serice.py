@@ -1,12 +1,17 @@
 from decimal import Decimal
 from datetime import date
 from unittest.mock import MagicMock
-from app.services.promissory_note_service import get_promissory_note_by_id, list_promissory_notes
+from types import SimpleNamespace
+from app.services.promissory_note_service import (
+    get_promissory_note_by_id,
+    list_promissory_notes,
+    list_promissory_notes_async,
+)
+from app.utils.cursor import decode_cursor, encode_cursor
 from app.models.promissory_note import PromissoryNote
 import pytest
-from unittest.mock import MagicMock
 from app.services.promissory_note_service import update_promissory_note_status
-from app.models.promissory_note import PromissoryNote
+
 
 def test_get_promissory_note_by_id():
     mock_db = MagicMock()
@@ -16,58 +21,120 @@ def test_get_promissory_note_by_id():
     result = get_promissory_note_by_id(mock_db, 1)
     assert result.id == 1
 
+
+def _row(**values):
+    return SimpleNamespace(_mapping=values)
+
+
 def test_list_promissory_notes_with_data():
-    """Testa listagem com dados para entrar no loop e cobrir a montagem do item"""
+    """Página com itens projetados (sem entidades ORM) e total exato."""
     mock_db = MagicMock()
-    
-    # Cria Mocks para os objetos retornados pelo banco (Nota, Venda, Cliente)
-    note_mock = MagicMock(
-        id=1, 
-        sale_id=10, 
-        installment_number=1, 
-        due_date=date(2023, 5, 10), 
-        original_amount=Decimal("100.00"), 
-        paid_amount=Decimal("0.00"), 
-        status="pending",
-        created_at=date.today(),
-        updated_at=date.today()
-    )
-    note_mock.original_amount = Decimal("100.00")
-    note_mock.paid_amount = Decimal("0.00")
-    
-    sale_mock = MagicMock(id=10, customer_id=5)
-    cust_mock = MagicMock(id=5, full_name="Cliente Teste")
-
-    # 2. Configura o Mock do Banco para encadeamento
-    mock_query = mock_db.query.return_value
-    mock_query.join.return_value = mock_query
-    mock_query.filter.return_value = mock_query
-    mock_query.order_by.return_value = mock_query
-    
-    mock_query.all.return_value = [(note_mock, sale_mock, cust_mock)]
+    mock_db.execute.return_value.all.return_value = [
+        _row(
+            id=1,
+            sale_id=10,
+            customer_id=5,
+            customer_name="Cliente Teste",
+            installment_number=1,
+            due_date=date(2023, 5, 10),
+            original_amount=Decimal("100.00"),
+            paid_amount=Decimal("0.00"),
+            outstanding_balance=Decimal("100.00"),
+            status="pending",
+            created_at=date.today(),
+            updated_at=date.today(),
+        )
+    ]
+    mock_db.scalar.return_value = 1
 
     result = list_promissory_notes(
         mock_db, 
         status="pending", 
         due_from=date(2023, 1, 1),
-        due_to=date(2023, 12, 31)
+        due_to=date(2023, 12, 31),
+        limit=1,
     )
 
     assert result["total"] == 1
     assert result["items"][0]["customer_name"] == "Cliente Teste"
+    # página cheia: há cursor para a próxima
+    assert decode_cursor(result["next_cursor"], 2) == ["2023-05-10", 1]
+
+    sql = str(mock_db.execute.call_args.args[0])
+    assert "promissory_notes.notes" not in sql
+    assert "customers.email" not in sql
+    assert "LIMIT" in sql
+    assert "count(*)" in str(mock_db.scalar.call_args.args[0])
+
     
 def test_list_promissory_notes_empty():
     mock_db = MagicMock()
-    mock_query = mock_db.query.return_value
-    mock_query.join.return_value = mock_query
-    mock_query.filter.return_value = mock_query
-    mock_query.order_by.return_value = mock_query
-    mock_query.all.return_value = [] # Lista vazia
+    mock_db.execute.return_value.all.return_value = []
 
-    result = list_promissory_notes(mock_db, customer_id=99)
+    result = list_promissory_notes(mock_db, customer_id=99, total="none")
 
-    assert result["total"] == 0
+    assert result["total"] is None
+    assert result["next_cursor"] is None
     assert "MSG13" in result["message"]
+    mock_db.scalar.assert_not_called()
+
+
+def test_list_promissory_notes_counts_only_first_page_by_default():
+    mock_db = MagicMock()
+    mock_db.execute.return_value.all.return_value = []
+    mock_db.scalar.return_value = 3
+
+    assert list_promissory_notes(mock_db)["total"] == 3
+    mock_db.scalar.assert_called_once()
+
+    mock_db.scalar.reset_mock()
+    cursor = encode_cursor((date(2023, 5, 10), 7))
+    assert list_promissory_notes(mock_db, cursor=cursor)["total"] is None
+    mock_db.scalar.assert_not_called()
+
+    list_promissory_notes(mock_db, cursor=cursor, total="exact")
+    mock_db.scalar.assert_called_once()
+
+
+def test_list_promissory_notes_cursor():
+    mock_db = MagicMock()
+    mock_db.execute.return_value.all.return_value = []
+
+    cursor = encode_cursor((date(2023, 5, 10), 7))
+    list_promissory_notes(mock_db, cursor=cursor, total="none")
+
+    stmt = mock_db.execute.call_args.args[0]
+    assert "(promissory_notes.due_date, promissory_notes.id) > " in str(stmt)
+
+    with pytest.raises(ValueError, match="Cursor"):
+        list_promissory_notes(mock_db, cursor="invalido")
+
+
+def test_list_promissory_notes_estimate_falls_back_outside_postgres():
+    mock_db = MagicMock()
+    mock_db.get_bind.return_value.dialect.name = "sqlite"
+    mock_db.execute.return_value.all.return_value = []
+    mock_db.scalar.return_value = 42
+
+    assert list_promissory_notes(mock_db, total="estimate")["total"] == 42
+
+
+def test_list_promissory_notes_estimate_uses_planner_on_postgres():
+    from sqlalchemy.dialects import postgresql
+
+    mock_db = MagicMock()
+    mock_db.get_bind.return_value.dialect = postgresql.dialect()
+    mock_db.execute.return_value.all.return_value = []
+    mock_db.execute.return_value.scalar.return_value = [{"Plan": {"Plan Rows": 1234}}]
+
+    result = list_promissory_notes(mock_db, status="overdue", total="estimate")
+
+    assert result["total"] == 1234
+    mock_db.scalar.assert_not_called()
+    explain = str(mock_db.execute.call_args.args[0])
+    assert explain.startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert "'overdue'" in explain
+
     
 def test_update_promissory_note_status_success():
     mock_db = MagicMock()
@@ -80,6 +147,7 @@ def test_update_promissory_note_status_success():
     mock_db.commit.assert_called()
     mock_db.refresh.assert_called()
 
+
 def test_update_promissory_note_status_not_found():
     mock_db = MagicMock()
     mock_db.query.return_value.filter.return_value.first.return_value = None
@@ -87,3 +155,113 @@ def test_update_promissory_note_status_not_found():
     with pytest.raises(ValueError, match="Promissória não encontrada"):
         update_promissory_note_status(mock_db, 99, "paid")
     
+
+@pytest.mark.asyncio
+async def test_list_promissory_notes_async_applies_filters(async_db):
+    mock_db = async_db
+    mock_db.execute.return_value.all.return_value = []
+    mock_db.scalar.return_value = 0
+
+    result = await list_promissory_notes_async(
+        mock_db,
+        status="pending",
+        customer_id=5,
+        due_from=date(2023, 1, 1),
+        due_to=date(2023, 12, 31),
+    )
+
+    assert result["total"] == 0
+    assert "MSG13" in result["message"]
+    stmt = mock_db.execute.await_args.args[0]
+    sql = str(stmt)
+    assert "promissory_notes.status = " in sql
+    assert "sales.customer_id = " in sql
+    assert "ORDER BY promissory_notes.due_date ASC, promissory_notes.id ASC" in sql
+
+
+def _seed_notes(db_session, statuses_and_days, today):
+    from datetime import timedelta
+
+    from app.models.customer import Customer
+    from app.models.sale import Sale
+    from app.models.user import User
+
+    user = User(name="U", email="u@u.com", password_hash="x", role="admin")
+    customer = Customer(full_name="Cliente", cpf="12345678901", phone="1")
+    db_session.add_all([user, customer])
+    db_session.flush()
+    sale = Sale(
+        customer_id=customer.id,
+        user_id=user.id,
+        total_amount=Decimal("100.00"),
+        installments_count=len(statuses_and_days),
+        first_installment_date=today,
+    )
+    db_session.add(sale)
+    db_session.flush()
+    notes = [
+        PromissoryNote(
+            sale_id=sale.id,
+            installment_number=number,
+            original_amount=Decimal("10.00"),
+            paid_amount=Decimal("5.00") if status == "partial_payment" else 0,
+            due_date=today + timedelta(days=days),
+            status=status,
+        )
+        for number, (status, days) in enumerate(statuses_and_days, start=1)
+    ]
+    db_session.add_all(notes)
+    db_session.commit()
+    return [n.id for n in notes]
+
+
+@pytest.mark.parametrize(
+    "status, expected",
+    [
+        # vencida pending/partial_payment -> overdue
+        ("overdue", ["overdue", "overdue", "overdue", "paid", "overdue"]),
+        # só overdue ainda a vencer e sem pagamento volta a pending
+        ("pending", ["pending", "partial_payment", "overdue", "paid", "pending"]),
+        ("paid", ["paid", "paid", "paid", "paid", "paid"]),
+    ],
+)
+def test_bulk_update_promissory_note_status_transitions(db_session, status, expected):
+    from app.services.promissory_note_service import bulk_update_promissory_note_status
+
+    today = date(2026, 3, 10)
+    ids = _seed_notes(
+        db_session,
+        [("pending", -5), ("partial_payment", -1), ("overdue", -3), ("paid", -9), ("overdue", 4)],
+        today,
+    )
+    before = ["pending", "partial_payment", "overdue", "paid", "overdue"]
+    changed = [i for i, (old, new) in enumerate(zip(before, expected)) if old != new]
+
+    result = bulk_update_promissory_note_status(db_session, status=status, ids=ids, today=today)
+
+    assert result["ids"] == [ids[i] for i in changed]
+    db_session.expire_all()
+    assert [db_session.get(PromissoryNote, i).status for i in ids] == expected
+
+
+def test_bulk_update_promissory_note_status_limit_and_dry_run(db_session):
+    from app.services.promissory_note_service import bulk_update_promissory_note_status
+
+    today = date(2026, 3, 10)
+    ids = _seed_notes(db_session, [("pending", -1)] * 3, today)
+    filters = {"status": "pending", "due_to": today}
+
+    preview = bulk_update_promissory_note_status(
+        db_session, status="overdue", filters=filters, dry_run=True, today=today
+    )
+    assert (preview["matched"], preview["updated"]) == (3, 3)
+
+    with pytest.raises(ValueError):
+        bulk_update_promissory_note_status(
+            db_session, status="overdue", filters=filters, max_notes=2, today=today
+        )
+    db_session.expire_all()
+    assert {db_session.get(PromissoryNote, i).status for i in ids} == {"pending"}
+
+    with pytest.raises(ValueError):
+        bulk_update_promissory_note_status(db_session, status="overdue", filters={}, today=today)
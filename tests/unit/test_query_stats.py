@@ -0,0 +1,118 @@
+import asyncio
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.utils import query_stats
+from app.utils.query_stats import QueryStats, QueryStatsMiddleware, track_queries
+
+
+def test_record_tracks_count_total_and_slowest():
+    stats = QueryStats()
+    stats.record("SELECT 1", 0.002)
+    stats.record("SELECT   2\n", 0.005)
+    stats.record("SELECT 1", 0.001)
+
+    assert stats.count == 3
+    assert abs(stats.total_seconds - 0.008) < 1e-9
+    assert stats.slowest_seconds == 0.005
+    assert stats.slowest_statement == "SELECT 2"
+    assert stats.shapes["SELECT 1"] == 2
+
+
+def test_repeated_shapes_and_threshold():
+    stats = QueryStats()
+    for _ in range(5):
+        stats.record("SELECT * FROM notes WHERE sale_id = ?", 0.0)
+    stats.record("SELECT * FROM sales", 0.0)
+
+    assert stats.repeated(5) == [("SELECT * FROM notes WHERE sale_id = ?", 5)]
+    assert stats.repeated(6) == []
+    assert stats.repeated(0) == []
+
+
+def test_server_timing_header():
+    stats = QueryStats()
+    stats.record("SELECT 1", 0.0015)
+    assert stats.server_timing() == (
+        'db;dur=1.500;desc="1 queries", db-slowest;dur=1.500'
+    )
+
+
+def test_track_queries_attributes_engine_statements():
+    query_stats.install()
+    engine = create_engine("sqlite://")
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))  # fora do contexto: ignorado
+        with track_queries("GET", "/x") as stats:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        assert query_stats.current() is None
+
+    assert stats.count == 2
+    assert stats.path == "/x"
+
+
+def test_failed_statement_does_not_skew_later_timings(monkeypatch):
+    query_stats.install()
+    engine = create_engine("sqlite://")
+    clock = iter([10.0, 20.0, 20.5])
+    monkeypatch.setattr(query_stats.time, "perf_counter", lambda: next(clock))
+
+    with engine.connect() as conn:
+        info = dict(conn.info)
+        with track_queries() as stats:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM tabela_inexistente"))
+            conn.execute(text("SELECT 1"))
+        # nada fica pendurado na conexão (que volta para o pool)
+        assert conn.info == info
+
+    # só o statement que terminou conta, com o próprio início
+    assert stats.count == 1
+    assert stats.total_seconds == 0.5
+
+
+def _app(engine, n_queries):
+    def endpoint(request):
+        with engine.connect() as conn:
+            for _ in range(n_queries):
+                conn.execute(text("SELECT 1"))
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/", endpoint)])
+    return QueryStatsMiddleware(app, n_plus_one_threshold=3)
+
+
+def test_middleware_sets_server_timing_and_logs(caplog):
+    query_stats.install()
+    seen = []
+    query_stats.observers.append(seen.append)
+    try:
+        with caplog.at_level(logging.INFO, logger="app.utils.query_stats"):
+            r = TestClient(_app(create_engine("sqlite://"), 4)).get("/")
+    finally:
+        query_stats.observers.remove(seen.append)
+
+    assert r.status_code == 200
+    assert 'desc="4 queries"' in r.headers["Server-Timing"]
+    assert seen[0].count == 4
+    assert any("queries=4" in m for m in caplog.messages)
+    assert any("N+1" in m for m in caplog.messages)
+
+
+def test_middleware_passes_through_non_http():
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["type"])
+
+    asyncio.run(QueryStatsMiddleware(app)({"type": "lifespan"}, None, None))
+    assert calls == ["lifespan"]
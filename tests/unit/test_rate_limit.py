@@ -27,4 +27,92 @@ def test_rate_limit_different_keys(monkeypatch):
     assert limiter.allow("user_1") is True
     assert limiter.allow("user_1") is False
     # Outro usuário não é afetado
-    assert limiter.allow("user_2") is True
\ No newline at end of file
+    assert limiter.allow("user_2") is True
+
+def test_gcra_refills_one_slot_per_interval(monkeypatch):
+    now = {"t": 1000.0}
+    monkeypatch.setattr(time, "time", lambda: now["t"])
+
+    limiter = SimpleRateLimiter(max_attempts=4, window_seconds=8)  # 1 a cada 2s
+    assert all(limiter.allow("k") for _ in range(4))
+    allowed, retry_after = limiter.check("k")
+    assert allowed is False
+    assert retry_after == 2.0
+
+    now["t"] += 2.0
+    assert limiter.allow("k") is True
+    assert limiter.allow("k") is False
+
+
+def test_in_memory_backend_evicts_idle_keys_and_caps_size():
+    from app.utils.rate_limit import InMemoryBackend
+
+    backend = InMemoryBackend(max_keys=3)
+    for i in range(3):
+        backend.acquire(f"k{i}", now=0.0, interval=10.0, tolerance=20.0)
+    assert len(backend) == 3
+
+    # k0..k2 ficaram ociosas (TAT=10 < now): somem na próxima escrita
+    backend.acquire("novo", now=100.0, interval=10.0, tolerance=20.0)
+    assert len(backend) == 1
+
+    # limite rígido: descarta as menos recentes mesmo ativas
+    for i in range(10):
+        backend.acquire(f"x{i}", now=100.0, interval=10.0, tolerance=20.0)
+    assert len(backend) == 3
+
+    backend.clear()
+    assert len(backend) == 0
+
+
+def test_database_backend_shares_state_between_limiters(monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+    from app.utils.rate_limit import DatabaseBackend, RateLimiter, install_rate_limit_table
+
+    now = {"t": 1000.0}
+    monkeypatch.setattr(time, "time", lambda: now["t"])
+
+    engine = create_engine(
+        "sqlite+pysqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    # a tabela vem da migração do schema (v9)
+    with engine.begin() as conn:
+        install_rate_limit_table(conn)
+    backend = DatabaseBackend(engine, cleanup_every=3)
+    # dois "workers" com o mesmo backend compartilhado
+    w1 = RateLimiter(max_attempts=2, window_seconds=10, name="login", backend=backend)
+    w2 = RateLimiter(max_attempts=2, window_seconds=10, name="login", backend=backend)
+
+    assert w1.allow("ip") is True
+    assert w2.allow("ip") is True
+    allowed, retry_after = w1.check("ip")
+    assert allowed is False
+    assert retry_after == 5.0
+
+    now["t"] += 100.0
+    assert w2.allow("ip") is True  # 6ª chamada dispara a limpeza de ociosas
+
+    backend.clear()
+    assert w1.allow("ip") is True
+
+
+def _request(headers=None, host="10.0.0.1"):
+    from starlette.requests import Request
+
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "headers": raw, "client": (host, 1234)})
+
+
+def test_client_key_prefers_authenticated_user():
+    from app.services.auth_service import create_access_token
+    from app.utils.rate_limit import client_key
+
+    token = create_access_token(subject="42", role="seller")
+
+    # atrás do proxy o IP é o mesmo para todos: o usuário separa os baldes
+    assert client_key(_request({"Authorization": f"Bearer {token}"})) == "user:42"
+    assert client_key(_request()) == "ip:10.0.0.1"
+    assert client_key(_request({"Authorization": "Bearer invalido"})) == "ip:10.0.0.1"
@@ -0,0 +1,212 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import create_engine
+from starlette.requests import Request
+
+import app.database as app_database
+from app.config import Settings
+from app.utils.replica_lag import ReplicaLagMonitor
+
+
+def _request(headers=None):
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "headers": raw})
+
+
+def _monitor(lag=0.0, **kwargs):
+    monitor = ReplicaLagMonitor(
+        MagicMock(), max_lag_seconds=kwargs.pop("max_lag_seconds", 30), **kwargs
+    )
+    monitor.measure_lag = MagicMock(return_value=lag)
+    return monitor
+
+
+def test_monitor_sqlite_has_no_lag():
+    engine = create_engine("sqlite://")
+    monitor = ReplicaLagMonitor(engine, max_lag_seconds=1)
+
+    assert monitor.measure_lag() == 0.0
+    assert monitor.is_fresh() is True
+    assert monitor.last_lag_seconds == 0.0
+
+
+def _pg_engine(*, caught_up, streaming, replay_age):
+    engine = MagicMock()
+    engine.dialect.name = "postgresql"
+    conn = engine.connect.return_value.__enter__.return_value
+    row = conn.execute.return_value.one.return_value
+    row.caught_up, row.streaming, row.replay_age = caught_up, streaming, replay_age
+    return engine
+
+
+def test_monitor_postgres_queries_replay_lag():
+    engine = _pg_engine(caught_up=False, streaming=True, replay_age=4.5)
+    monitor = ReplicaLagMonitor(engine, max_lag_seconds=1)
+
+    assert monitor.measure_lag() == 4.5
+    assert monitor.is_fresh() is False
+
+
+def test_monitor_caught_up_streaming_replica_has_no_lag():
+    # réplica em dia com o WAL recebido não conta o tempo sem escritas
+    engine = _pg_engine(caught_up=True, streaming=True, replay_age=600)
+    monitor = ReplicaLagMonitor(engine, max_lag_seconds=30)
+
+    assert monitor.measure_lag() == 0.0
+    assert monitor.is_fresh() is True
+
+
+def test_monitor_disconnected_receiver_uses_replay_age():
+    # receiver caído: as LSNs param iguais, mas a réplica está ficando para trás
+    engine = _pg_engine(caught_up=True, streaming=False, replay_age=600)
+    monitor = ReplicaLagMonitor(engine, max_lag_seconds=30)
+
+    assert monitor.measure_lag() == 600
+    assert monitor.is_fresh() is False
+
+
+def test_monitor_stale_replica_is_not_fresh():
+    monitor = _monitor(lag=60, max_lag_seconds=30)
+    assert monitor.is_fresh() is False
+
+
+def test_monitor_unreachable_replica_is_not_fresh():
+    monitor = _monitor()
+    monitor.measure_lag.side_effect = RuntimeError("conexão recusada")
+
+    assert monitor.is_fresh() is False
+    assert monitor.last_lag_seconds is None
+
+
+def test_monitor_caches_result_within_interval():
+    monitor = _monitor(check_interval_seconds=60)
+
+    assert monitor.is_fresh() is True
+    assert monitor.is_fresh() is True
+    assert monitor.measure_lag.call_count == 1
+    assert monitor.needs_check() is False
+
+
+def test_monitor_rechecks_after_interval():
+    monitor = _monitor(check_interval_seconds=0)
+
+    monitor.is_fresh()
+    monitor.is_fresh()
+    assert monitor.measure_lag.call_count == 2
+
+
+def test_replica_async_url_conversion():
+    assert Settings(DB_REPLICA_URL=None).DATABASE_REPLICA_URL_ASYNC is None
+    assert (
+        Settings(DB_REPLICA_URL="postgresql://u:p@h:5432/db").DATABASE_REPLICA_URL_ASYNC
+        == "postgresql+asyncpg://u:p@h:5432/db"
+    )
+    assert (
+        Settings(DB_REPLICA_URL="sqlite:///r.db").DATABASE_REPLICA_URL_ASYNC
+        == "sqlite+aiosqlite:///r.db"
+    )
+    assert (
+        Settings(DB_REPLICA_URL="mysql://h/db").DATABASE_REPLICA_URL_ASYNC
+        == "mysql://h/db"
+    )
+
+
+def test_get_read_db_without_replica_uses_primary():
+    primary = MagicMock()
+    with patch.object(app_database, "replica_monitor", None), patch.object(
+        app_database, "SessionLocal", primary
+    ):
+        gen = app_database.get_read_db(_request())
+        assert next(gen) is primary.return_value
+        gen.close()
+
+    primary.return_value.close.assert_called_once()
+
+
+def test_get_read_db_uses_fresh_replica():
+    primary, replica = MagicMock(), MagicMock()
+    with patch.object(app_database, "replica_monitor", _monitor()), patch.object(
+        app_database, "SessionLocal", primary
+    ), patch.object(app_database, "ReplicaSessionLocal", replica):
+        gen = app_database.get_read_db(_request())
+        assert next(gen) is replica.return_value
+        gen.close()
+
+
+def test_get_read_db_falls_back_when_replica_is_stale():
+    primary, replica = MagicMock(), MagicMock()
+    with patch.object(
+        app_database, "replica_monitor", _monitor(lag=120)
+    ), patch.object(app_database, "SessionLocal", primary), patch.object(
+        app_database, "ReplicaSessionLocal", replica
+    ):
+        gen = app_database.get_read_db(_request())
+        assert next(gen) is primary.return_value
+        gen.close()
+
+
+def test_get_read_db_pinned_to_primary_by_header():
+    primary, replica = MagicMock(), MagicMock()
+    monitor = _monitor()
+    with patch.object(app_database, "replica_monitor", monitor), patch.object(
+        app_database, "SessionLocal", primary
+    ), patch.object(app_database, "ReplicaSessionLocal", replica):
+        gen = app_database.get_read_db(_request({"X-Consistency": "primary"}))
+        assert next(gen) is primary.return_value
+        gen.close()
+
+    monitor.measure_lag.assert_not_called()
+
+
+def test_get_read_engine():
+    replica_engine = MagicMock()
+    with patch.object(app_database, "replica_monitor", _monitor()), patch.object(
+        app_database, "replica_engine", replica_engine
+    ):
+        assert app_database.get_read_engine() is replica_engine
+        assert app_database.get_read_engine(_request()) is replica_engine
+        pinned = _request({"X-Consistency": "primary"})
+        assert app_database.get_read_engine(pinned) is app_database.engine
+
+    with patch.object(app_database, "replica_monitor", None):
+        assert app_database.get_read_engine() is app_database.engine
+
+
+def _async_factory():
+    session = MagicMock()
+    factory = MagicMock()
+    factory.return_value.__aenter__.return_value = session
+    return factory, session
+
+
+async def _first(gen):
+    value = await gen.__anext__()
+    await gen.aclose()
+    return value
+
+
+def test_get_async_read_db_uses_fresh_replica():
+    primary, _ = _async_factory()
+    replica, replica_session = _async_factory()
+    monitor = _monitor()
+    with patch.object(app_database, "replica_monitor", monitor), patch.object(
+        app_database, "AsyncSessionLocal", primary
+    ), patch.object(app_database, "AsyncReplicaSessionLocal", replica):
+        db = asyncio.run(_first(app_database.get_async_read_db(_request())))
+
+    assert db is replica_session
+    monitor.measure_lag.assert_called_once()
+
+
+def test_get_async_read_db_falls_back_to_primary():
+    primary, primary_session = _async_factory()
+    replica, _ = _async_factory()
+    with patch.object(
+        app_database, "replica_monitor", _monitor(lag=120)
+    ), patch.object(app_database, "AsyncSessionLocal", primary), patch.object(
+        app_database, "AsyncReplicaSessionLocal", replica
+    ):
+        db = asyncio.run(_first(app_database.get_async_read_db(_request())))
+
+    assert db is primary_session
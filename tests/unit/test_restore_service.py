@@ -0,0 +1,293 @@
+import hashlib
+import io
+import json
+import zipfile
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.models.backup import BackupRun, DeletedRow, restore_generation
+from app.models.customer import Customer
+from app.services.restore_service import restore_backup_chain
+
+HEADER = "id,full_name,cpf,phone,email,address,active,search_text,created_at,updated_at\n"
+
+
+def _customer_row(id, name, cpf, updated="2026-01-01 10:00:00.123456"):
+    return f"{id},{name},{cpf},1,,,t,{name.lower()},2026-01-01 10:00:00,{updated}\n"
+
+
+def _archive(backup_id, kind, parent_id, tables, *, tamper=None, null=None):
+    """ZIP no formato de backup_service (CSV do COPY + manifest)."""
+    out = io.BytesIO()
+    files = []
+    with zipfile.ZipFile(out, "w") as zf:
+        for table, data in tables.items():
+            path = f"data/{table}.csv"
+            zf.writestr(path, data if table != tamper else data.replace("Leto", "Lxto"))
+            files.append(
+                {
+                    "table": table,
+                    "path": path,
+                    "rows": data.count("\n") - 1,
+                    "sha256": hashlib.sha256(data.encode()).hexdigest(),
+                }
+            )
+        manifest = {
+            "backup_id": backup_id,
+            "kind": kind,
+            "parent_id": parent_id,
+            "base_id": "f" * 32,
+            "files": files,
+        }
+        if null is not None:
+            manifest["null"] = null
+        zf.writestr("manifest.json", json.dumps(manifest))
+    out.seek(0)
+    return out
+
+
+def _full(**kw):
+    return _archive(
+        "f" * 32,
+        "full",
+        None,
+        {"customers": HEADER + _customer_row(1, "Paul", "111") + _customer_row(2, "Leto", "222")},
+        **kw,
+    )
+
+
+def _incremental(backup_id="1" * 32, parent_id="f" * 32):
+    return _archive(
+        backup_id,
+        "incremental",
+        parent_id,
+        {
+            "customers": HEADER
+            + _customer_row(2, "Leto II", "222", updated="2026-01-02 10:00:00")
+            + _customer_row(3, "Alia", "333"),
+            "deleted_rows": "id,table_name,row_id,deleted_at\n"
+            "7,customers,1,2026-01-02 09:00:00\n"
+            "8,sales,99,2026-01-02 09:00:00\n",
+        },
+    )
+
+
+def _customers(db_session):
+    db_session.expire_all()
+    return {c.id: c.full_name for c in db_session.query(Customer).order_by(Customer.id)}
+
+
+def test_restore_full_then_incremental(db_session, test_engine):
+    db_session.add(Customer(id=50, full_name="Antigo", cpf="999", phone="1"))
+    db_session.add(
+        BackupRun(backup_id="0" * 32, kind="full", base_id="0" * 32, watermark=datetime.now())
+    )
+    db_session.commit()
+
+    summary = restore_backup_chain(test_engine, [_full(), _incremental()], batch_size=1)
+
+    assert _customers(db_session) == {2: "Leto II", 3: "Alia"}
+    leto = db_session.get(Customer, 2)
+    assert leto.active is True
+    assert leto.email is None
+    assert leto.updated_at == datetime(2026, 1, 2, 10, 0, 0)
+    assert summary["customers"] == {"rows": 4, "deleted": 1}
+    # os tombstones gerados pela própria restauração e a cadeia antiga somem
+    assert db_session.query(DeletedRow).count() == 0
+    assert db_session.query(BackupRun).count() == 0
+    # nova geração: os caches dos outros workers se recarregam
+    assert restore_generation(db_session) == 1
+
+
+def test_restore_keeps_empty_strings_apart_from_null(db_session, test_engine):
+    row = '1,Paul,111,1,"",\\N,t,paul,2026-01-01 10:00:00,2026-01-01 10:00:00\n'
+    full = _archive("f" * 32, "full", None, {"customers": HEADER + row}, null="\\N")
+
+    restore_backup_chain(test_engine, [full])
+
+    db_session.expire_all()
+    paul = db_session.get(Customer, 1)
+    assert paul.email == ""
+    assert paul.address is None
+
+
+def test_restore_rejects_unknown_null_marker(test_engine):
+    full = _archive("f" * 32, "full", None, {"customers": HEADER}, null="'; DROP TABLE x; --")
+
+    with pytest.raises(ValueError, match="NULL"):
+        restore_backup_chain(test_engine, [full])
+
+
+def test_restore_rejects_broken_chain(test_engine):
+    with pytest.raises(ValueError, match="cadeia"):
+        restore_backup_chain(test_engine, [_full(), _incremental(parent_id="2" * 32)])
+
+    with pytest.raises(ValueError, match="completo"):
+        restore_backup_chain(test_engine, [_incremental()])
+
+
+def test_restore_checksum_mismatch_rolls_back(db_session, test_engine):
+    db_session.add(Customer(id=50, full_name="Antigo", cpf="999", phone="1"))
+    db_session.commit()
+
+    with pytest.raises(ValueError, match="checksum"):
+        restore_backup_chain(test_engine, [_full(tamper="customers")])
+
+    assert _customers(db_session) == {50: "Antigo"}
+    assert restore_generation(db_session) == 0
+
+
+def test_deletes_leave_tombstones(db_session):
+    customer = Customer(full_name="Paul", cpf="111", phone="1")
+    db_session.add(customer)
+    db_session.commit()
+
+    db_session.query(Customer).filter(Customer.id == customer.id).delete()
+    db_session.commit()
+
+    tombstone = db_session.query(DeletedRow).one()
+    assert (tombstone.table_name, tombstone.row_id) == ("customers", customer.id)
+    assert tombstone.deleted_at is not None
+
+
+class FakePgCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = -1
+
+    def execute(self, sql, params=None):
+        if sql.startswith("DROP TABLE") and self.conn.fail_cleanup:
+            raise RuntimeError("conexão perdida")
+        self.conn.log.append(sql)
+
+    def copy_expert(self, sql, source, size=8192):
+        data = source.read()
+        self.conn.log.append(sql)
+        self.conn.copied[sql] = data
+        self.rowcount = data.count(b"\n")
+
+    def close(self):
+        pass
+
+
+class FakePgConnection:
+    def __init__(self, log, copied, fail_cleanup):
+        self.log = log
+        self.copied = copied
+        self.fail_cleanup = fail_cleanup
+        self.info = {}
+
+    def cursor(self):
+        return FakePgCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.log.append("ROLLBACK")
+
+    def close(self):
+        pass
+
+
+def _pg_engine(*, fail_on=None, fail_cleanup=False):
+    """Engine falso: raw_connection para o COPY, begin() para a transação da troca."""
+    engine = MagicMock()
+    engine.dialect.name = "postgresql"
+    engine.dialect.driver = "psycopg2"
+    engine.log = []
+    engine.copied = {}
+    engine.raw_connection.side_effect = lambda: FakePgConnection(
+        engine.log, engine.copied, fail_cleanup
+    )
+
+    def exec_driver_sql(sql):
+        if fail_on and fail_on in sql:
+            raise RuntimeError("violação de chave estrangeira")
+        engine.log.append(sql)
+        result = MagicMock()
+        result.all.return_value = [("promissory_notes", "promissory_notes_sale_id_fkey")]
+        return result
+
+    conn = engine.begin.return_value.__enter__.return_value
+    conn.exec_driver_sql.side_effect = exec_driver_sql
+    return engine
+
+
+def _staging(log, table):
+    copy = next(s for s in log if s.startswith("COPY"))
+    return copy.split('"')[1].replace("customers", table)
+
+
+def test_postgres_restore_copies_to_staging_and_swaps_in_one_transaction():
+    engine = _pg_engine()
+
+    summary = restore_backup_chain(engine, [_full()], workers=2)
+
+    log = engine.log
+    staging = _staging(log, "customers")
+    assert staging.startswith("_restore_") and staging.endswith("_customers")
+    copy = f'COPY "{staging}" ("id", "full_name", "cpf", "phone", "email", "address", '
+    copy += '"active", "search_text", "created_at", "updated_at") FROM STDIN WITH (FORMAT csv)'
+    assert engine.copied[copy] == (
+        _customer_row(1, "Paul", "111") + _customer_row(2, "Leto", "222")
+    ).encode()
+    assert summary["customers"]["rows"] == 2
+
+    create = f'CREATE UNLOGGED TABLE "{staging}" (LIKE "customers" INCLUDING DEFAULTS)'
+    drop_fk = 'ALTER TABLE "promissory_notes" DROP CONSTRAINT IF EXISTS "promissory_notes_sale_id_fkey"'
+    truncate = next(s for s in log if s.startswith("TRUNCATE"))
+    insert = next(s for s in log if s.startswith('INSERT INTO "customers"'))
+    create_index = next(s for s in log if s.startswith("CREATE UNIQUE INDEX ix_customers_cpf"))
+    add_fk = next(s for s in log if "ADD FOREIGN KEY(sale_id) REFERENCES sales (id)" in s)
+    # staging carregado antes de tocar nas tabelas; troca, índices e FKs depois
+    assert log.index(create) < log.index(copy) < log.index(drop_fk) < log.index(truncate)
+    assert log.index(truncate) < log.index(insert) < log.index(create_index) < log.index(add_fk)
+    assert insert.endswith(f'FROM "{staging}"')
+    # a cadeia de backups só some no _finish, dentro da mesma transação
+    assert '"backup_runs"' not in truncate and '"deleted_rows"' not in truncate
+    assert engine.begin.call_count == 1
+    assert log[-1] == f'DROP TABLE IF EXISTS "{staging}"'
+
+
+def test_postgres_restore_checksum_mismatch_leaves_tables_untouched():
+    engine = _pg_engine()
+
+    with pytest.raises(ValueError, match="checksum"):
+        restore_backup_chain(engine, [_full(tamper="customers")])
+
+    assert "ROLLBACK" in engine.log
+    assert not engine.begin.called
+    assert not any(s.startswith("TRUNCATE") for s in engine.log)
+    assert engine.log[-1].startswith('DROP TABLE IF EXISTS "_restore_')
+
+
+def test_postgres_restore_failure_rolls_back_and_keeps_original_error():
+    engine = _pg_engine(fail_on="ADD FOREIGN KEY", fail_cleanup=True)
+
+    with pytest.raises(RuntimeError, match="chave estrangeira") as info:
+        restore_backup_chain(engine, [_full()])
+
+    # a transação da troca saiu com a exceção (rollback) e a falha na
+    # limpeza do staging fica anotada no erro original
+    exc_type = engine.begin.return_value.__exit__.call_args.args[0]
+    assert exc_type is RuntimeError
+    assert any("staging" in note for note in info.value.__notes__)
+
+
+def test_restore_rejects_invalid_archive(test_engine):
+    with pytest.raises(ValueError, match="inválido"):
+        restore_backup_chain(test_engine, [io.BytesIO(b"not a zip")])
+
+
+def test_postgres_restore_copies_with_the_backup_null_marker():
+    engine = _pg_engine()
+    row = _customer_row(1, "Paul", "111")
+    full = _archive("f" * 32, "full", None, {"customers": HEADER + row}, null="\\N")
+
+    restore_backup_chain(engine, [full], workers=1)
+
+    copy = next(s for s in engine.log if s.startswith("COPY"))
+    assert copy.endswith("FROM STDIN WITH (FORMAT csv, NULL '\\N')")
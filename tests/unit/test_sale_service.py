@@ -7,9 +7,11 @@ from app.services.sale_service import (
     add_months, 
     _split_amount,
     create_sale_and_promissory_notes,
+    create_sales_bulk,
     get_sales,
     get_sale_by_id,
     delete_sale,
+    get_sales_async,
     update_sale
 )
 from app.schemas.sale_schema import SaleCreate, SaleUpdate
@@ -17,21 +19,26 @@ from app.models.customer import Customer
 from app.models.sale import Sale
 from app.models.promissory_note import PromissoryNote, PromissoryNoteStatus
 
+
 # --- Testes de Funções Auxiliares ---
 def test_last_day_february_leap_year():
     assert _last_day_of_month(2024, 2) == 29
 
+
 def test_last_day_february_non_leap_year():
     assert _last_day_of_month(2023, 2) == 28
 
+
 def test_last_day_30_days_months():
     assert _last_day_of_month(2023, 4) == 30
     assert _last_day_of_month(2023, 12) == 31 
 
+
 def test_add_months_logic():
     d = date(2023, 1, 31)
     assert add_months(d, 1) == date(2023, 2, 28)
 
+
 def test_split_amount_logic():
     parts = _split_amount(Decimal("100.00"), 3)
     assert sum(parts) == Decimal("100.00")
@@ -39,6 +46,7 @@ def test_split_amount_logic():
 
 # --- Testes de Negócio ---
 
+
 def test_create_sale_customer_not_found():
     mock_db = MagicMock()
     mock_db.query.return_value.filter.return_value.first.return_value = None
@@ -47,6 +55,7 @@ def test_create_sale_customer_not_found():
     with pytest.raises(ValueError, match="Cliente não encontrado"):
         create_sale_and_promissory_notes(mock_db, user_id=1, data=data)
 
+
 def test_create_sale_invalid_installments():
     mock_db = MagicMock()
     mock_db.query.return_value.filter.return_value.first.return_value = Customer(id=1)
@@ -58,6 +67,7 @@ def test_create_sale_invalid_installments():
     with pytest.raises(ValueError, match="MSG09"):
         create_sale_and_promissory_notes(mock_db, user_id=1, data=data_mock)
 
+
 def test_create_sale_down_payment_too_high():
     mock_db = MagicMock()
     mock_db.query.return_value.filter.return_value.first.return_value = Customer(id=1)
@@ -69,34 +79,97 @@ def test_create_sale_down_payment_too_high():
     with pytest.raises(ValueError, match="Entrada não pode ser maior"):
         create_sale_and_promissory_notes(mock_db, user_id=1, data=data)
 
+
+def _returning_scalars(mock_db):
+    """Simula os INSERT ... RETURNING em lote devolvendo os objetos inseridos."""
+    models = iter([Sale, PromissoryNote])
+
+    def scalars(stmt, rows):
+        model = next(models)
+        result = MagicMock()
+        objs = [model(id=i + 1, **row) for i, row in enumerate(rows)]
+        result.all.return_value = objs
+        result.__iter__.return_value = iter(objs)
+        return result
+
+    mock_db.scalars.side_effect = scalars
+
+
 def test_create_sale_success_flow():
     mock_db = MagicMock()
     mock_db.query.return_value.filter.return_value.first.return_value = Customer(id=1)
+    _returning_scalars(mock_db)
     data = SaleCreate(
         customer_id=1, user_id=1, total_amount=Decimal("100.00"),
         down_payment=Decimal("20.00"), installments_count=2,
         first_installment_date=date(2023, 1, 1), description="Venda OK"
     )
     sale, notes = create_sale_and_promissory_notes(mock_db, user_id=1, data=data)
-    assert mock_db.add.call_count == 3
+    # uma inserção em lote para a venda e outra para as parcelas
+    assert mock_db.scalars.call_count == 2
+    mock_db.add.assert_not_called()
+    mock_db.refresh.assert_not_called()
     mock_db.commit.assert_called_once()
     assert sale.total_amount == Decimal("100.00")
-    assert len(notes) == 2
+    assert [n.original_amount for n in notes] == [Decimal("40.00"), Decimal("40.00")]
+    assert [n.due_date for n in notes] == [date(2023, 1, 1), date(2023, 2, 1)]
+    assert sale.promissory_notes == notes
+
+
+def test_create_sales_bulk_reports_per_item_errors():
+    mock_db = MagicMock()
+    _returning_scalars(mock_db)
+    inserts = mock_db.scalars.side_effect
+    # a primeira chamada a scalars busca os ids de clientes existentes
+    lookups = iter([[1]])
+    mock_db.scalars.side_effect = lambda stmt, *rows: (
+        inserts(stmt, *rows) if rows else iter(next(lookups))
+    )
+
+    def item(customer_id, down_payment="0.00"):
+        return SaleCreate(
+            customer_id=customer_id, total_amount=Decimal("90.00"),
+            down_payment=Decimal(down_payment), installments_count=3,
+            first_installment_date=date(2024, 1, 31),
+        )
+
+    results = create_sales_bulk(
+        mock_db, user_id=1, items=[item(1), item(2), item(1, "100.00"), item(1)]
+    )
+
+    assert [r["error"] is None for r in results] == [True, False, False, True]
+    assert "Cliente não encontrado" in results[1]["error"]
+    assert "Entrada" in results[2]["error"]
+    assert [r["sale"].id for r in results if r["sale"]] == [1, 2]
+    assert len(results[3]["sale"].promissory_notes) == 3
+    mock_db.commit.assert_called_once()
+
+
+def test_create_sales_bulk_all_invalid_inserts_nothing():
+    mock_db = MagicMock()
+    mock_db.scalars.return_value = iter([])
+    data = SaleCreate(
+        customer_id=5, total_amount=Decimal("10.00"), installments_count=1,
+        first_installment_date=date(2024, 1, 1),
+    )
+
+    results = create_sales_bulk(mock_db, user_id=1, items=[data])
+
+    assert results[0]["sale"] is None
+    assert mock_db.scalars.call_count == 1
+
 
 def test_get_sales_filters():
     mock_db = MagicMock()
-    mock_query = mock_db.query.return_value
-    mock_query.filter.return_value = mock_query
-    mock_query.join.return_value = mock_query
-    mock_query.order_by.return_value = mock_query
-    mock_query.offset.return_value = mock_query
-    mock_query.limit.return_value = mock_query
-    mock_query.all.return_value = []
+    mock_db.scalars.return_value.all.return_value = []
 
     get_sales(mock_db, user_id=1, client_name="João")
-    
-    assert mock_query.filter.call_count >= 1
-    assert mock_query.join.call_count == 1 
+
+    stmt = mock_db.scalars.call_args.args[0]
+    sql = str(stmt)
+    assert "sales.user_id = " in sql
+    assert "JOIN customers" in sql
+
 
 def test_get_sale_by_id():
     mock_db = MagicMock()
@@ -104,96 +177,234 @@ def test_get_sale_by_id():
     mock_db.query.return_value.filter.return_value.first.return_value = mock_sale
     assert get_sale_by_id(mock_db, 1) == mock_sale
 
+
 def test_delete_sale_success():
     mock_db = MagicMock()
-    mock_sale = Sale(id=1)
-    mock_db.query.return_value.filter.return_value.first.return_value = mock_sale
+    mock_db.execute.return_value.rowcount = 1
     assert delete_sale(mock_db, 1) is True
-    mock_db.delete.assert_called_with(mock_sale)
+    # um único DELETE; o banco apaga parcelas e pagamentos (ON DELETE CASCADE)
+    mock_db.delete.assert_not_called()
     mock_db.commit.assert_called_once()
 
+
 def test_delete_sale_not_found():
     mock_db = MagicMock()
-    mock_db.query.return_value.filter.return_value.first.return_value = None
+    mock_db.execute.return_value.rowcount = 0
     assert delete_sale(mock_db, 99) is False
 
+
+def test_delete_sales_requires_criteria():
+    from app.services.sale_service import delete_sales
+
+    with pytest.raises(ValueError, match="filtro"):
+        delete_sales(MagicMock())
+
+
+def test_delete_sales_counts_and_deletes_only_locked_sales():
+    from app.services.sale_service import delete_sales
+
+    mock_db = MagicMock()
+    mock_db.scalars.return_value.all.return_value = [3, 5]
+    mock_db.execute.return_value.one.return_value = (6, 1)
+
+    result = delete_sales(mock_db, customer_id=1)
+
+    assert result == {
+        "deleted_sales": 2,
+        "deleted_promissory_notes": 6,
+        "deleted_payments": 1,
+    }
+    locked = mock_db.scalars.call_args.args[0]
+    assert locked._for_update_arg is not None
+    count_stmt, delete_stmt = (c.args[0] for c in mock_db.execute.call_args_list)
+    assert count_stmt.compile().params["sale_id_1"] == [3, 5]
+    assert delete_stmt.compile().params["id_1"] == [3, 5]
+
+
+def test_delete_sales_nothing_matched():
+    from app.services.sale_service import delete_sales
+
+    mock_db = MagicMock()
+    mock_db.scalars.return_value.all.return_value = []
+
+    assert delete_sales(mock_db, ids=[9])["deleted_sales"] == 0
+    mock_db.execute.assert_not_called()
+
+
 def test_update_sale_not_found():
     mock_db = MagicMock()
-    mock_db.query.return_value.filter.return_value.first.return_value = None
+    mock_db.scalars.return_value.first.return_value = None
     with pytest.raises(ValueError, match="Venda não encontrada"):
         update_sale(mock_db, 99, SaleUpdate(description="X"))
 
-def test_update_sale_financial_change_blocked_by_paid_notes():
-    mock_db = MagicMock()
-    sale = Sale(id=1, total_amount=Decimal("100.00"), installments_count=2, down_payment=0, first_installment_date=date.today())
-    mock_db.query.return_value.filter.return_value.first.return_value = sale
-    paid_note = PromissoryNote(status=PromissoryNoteStatus.PAID.value)
-    mock_db.query.return_value.filter.return_value.all.return_value = [paid_note]
-    
+
+def _sale_with_notes(db_session, installments=4, first=date(2024, 1, 31)):
+    from app.models.user import User
+
+    user = User(name="V", email="v@v.com", password_hash="x", role="vendedor")
+    customer = Customer(full_name="Cliente", cpf="12345678901", phone="1")
+    db_session.add_all([user, customer])
+    db_session.commit()
+    data = SaleCreate(
+        customer_id=customer.id, total_amount=Decimal("400.00"),
+        installments_count=installments, first_installment_date=first,
+    )
+    sale, notes = create_sale_and_promissory_notes(db_session, user_id=user.id, data=data)
+    return sale, {n.installment_number: (n.id, n.updated_at) for n in notes}
+
+
+def _note_statements(db_session):
+    from sqlalchemy import event
+
+    statements = []
+    engine = db_session.get_bind()
+
+    def capture(conn, cursor, statement, params, context, executemany):
+        if "promissory_notes" in statement:
+            statements.append(statement.split()[0])
+
+    event.listen(engine, "before_cursor_execute", capture)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", capture)
+
+
+def test_update_sale_financial_change_blocked_by_paid_notes(db_session):
+    sale, _ = _sale_with_notes(db_session)
+    note = db_session.query(PromissoryNote).filter_by(installment_number=2).one()
+    note.paid_amount = Decimal("10.00")
+    note.status = PromissoryNoteStatus.PARTIAL_PAYMENT.value
+    db_session.commit()
+
     with pytest.raises(ValueError, match="Não é possível alterar valores"):
-        update_sale(mock_db, 1, SaleUpdate(total_amount=Decimal("200.00")))
+        update_sale(db_session, sale.id, SaleUpdate(total_amount=Decimal("200.00")))
 
-def test_update_sale_financial_change_success():
-    """Altera valor e recalcula parcelas (nenhuma paga)"""
-    mock_db = MagicMock()
-    sale = Sale(
-        id=1, 
-        total_amount=Decimal("100.00"), 
-        down_payment=Decimal("0.00"),
-        installments_count=2, 
-        first_installment_date=date(2023, 1, 1)
+
+def test_update_sale_first_date_only_rewrites_changed_notes(db_session):
+    # 31/01 + n meses cai no fim do mês: a parcela de 29/02 não muda
+    sale, before = _sale_with_notes(db_session, first=date(2024, 1, 31))
+    statements, stop = _note_statements(db_session)
+
+    sale, notes = update_sale(db_session, sale.id, SaleUpdate(first_installment_date=date(2024, 1, 29)))
+    stop()
+
+    assert [n.due_date for n in notes] == [
+        date(2024, 1, 29), date(2024, 2, 29), date(2024, 3, 29), date(2024, 4, 29)
+    ]
+    # um SELECT das parcelas e um UPDATE em lote; nada de DELETE/INSERT
+    assert statements == ["SELECT", "UPDATE"]
+    db_session.expire_all()
+    after = {
+        n.installment_number: (n.id, n.updated_at, n.due_date)
+        for n in db_session.query(PromissoryNote).filter_by(sale_id=sale.id)
+    }
+    assert {k: v[0] for k, v in after.items()} == {k: v[0] for k, v in before.items()}
+    assert after[2][1] == before[2][1]
+    assert all(after[k][1] > before[k][1] for k in (1, 3, 4))
+
+
+def test_update_sale_unchanged_schedule_keeps_notes(db_session):
+    sale, before = _sale_with_notes(db_session)
+    statements, stop = _note_statements(db_session)
+
+    # valor e entrada mudam, mas o valor financiado (e o cronograma) não
+    sale, notes = update_sale(
+        db_session, sale.id,
+        SaleUpdate(total_amount=Decimal("500.00"), down_payment=Decimal("100.00")),
+    )
+    stop()
+
+    assert statements == ["SELECT"]
+    assert sale.total_amount == Decimal("500.00")
+    assert {n.installment_number: (n.id, n.updated_at) for n in notes} == before
+
+
+def test_update_sale_changes_installment_count(db_session):
+    sale, before = _sale_with_notes(db_session, installments=4)
+    statements, stop = _note_statements(db_session)
+
+    sale, notes = update_sale(db_session, sale.id, SaleUpdate(installments_count=2))
+    assert [n.id for n in notes] == [before[1][0], before[2][0]]
+    assert [n.original_amount for n in notes] == [Decimal("200.00")] * 2
+
+    sale, notes = update_sale(
+        db_session, sale.id, SaleUpdate(installments_count=3, total_amount=Decimal("600.00"))
     )
-    
-    sale_query_mock = MagicMock()
-    note_query_mock = MagicMock()
-    
-    def side_effect_query(model):
-        if model == Sale:
-            return sale_query_mock
-        elif model == PromissoryNote:
-            return note_query_mock
-        return MagicMock()
-
-    mock_db.query.side_effect = side_effect_query
-    
-    # Configura retorno da Venda
-    sale_query_mock.filter.return_value.first.return_value = sale
-    
-    # Configura retorno das Notas (2 chamadas: 1ª validação, 2ª retorno final)
-    note_old = PromissoryNote(status="pending", paid_amount=Decimal(0))
-    new_notes_list = [PromissoryNote(installment_number=i) for i in range(1, 4)]
-    
-    note_query_mock.filter.return_value.all.side_effect = [[note_old], new_notes_list]
-    
-    # Executa
-    data = SaleUpdate(total_amount=Decimal("300.00"), installments_count=3)
-    updated_sale, new_notes = update_sale(mock_db, 1, data)
-    
-    assert note_query_mock.filter.return_value.delete.called
-    assert len(new_notes) == 3
-    assert updated_sale.total_amount == Decimal("300.00")
+    stop()
+
+    assert statements == ["SELECT", "DELETE", "UPDATE", "SELECT", "INSERT"]
+    assert [n.installment_number for n in notes] == [1, 2, 3]
+    assert [n.original_amount for n in notes] == [Decimal("200.00")] * 3
+    assert notes[2].due_date == date(2024, 3, 31)
+    assert sale.promissory_notes == notes
+    db_session.expire_all()
+    assert db_session.query(PromissoryNote).filter_by(sale_id=sale.id).count() == 3
+
 
 def test_update_sale_simple_change():
     mock_db = MagicMock()
     sale = Sale(id=1, description="Antiga")
-    mock_db.query.return_value.filter.return_value.first.return_value = sale
-    mock_db.query.return_value.filter.return_value.all.return_value = [] 
-    
+    mock_db.scalars.return_value.first.return_value = sale
+    mock_db.scalars.return_value.__iter__.return_value = iter([])
+
     data = SaleUpdate(description="Nova Descrição")
     updated_sale, notes = update_sale(mock_db, 1, data)
-    
+
     assert updated_sale.description == "Nova Descrição"
-    assert not mock_db.query(PromissoryNote).filter().delete.called
+    assert notes == []
+    mock_db.execute.assert_not_called()
+
 
 def test_update_sale_customer_change():
     mock_db = MagicMock()
     sale = Sale(id=1, customer_id=10, description="Old")
-    
-    mock_db.query.return_value.filter.return_value.first.return_value = sale
-    mock_db.query.return_value.filter.return_value.all.return_value = [] 
-    
+    mock_db.scalars.return_value.first.return_value = sale
+    mock_db.scalars.return_value.__iter__.return_value = iter([])
+
     data = SaleUpdate(customer_id=20)
     updated_sale, notes = update_sale(mock_db, 1, data)
-    
+
     assert updated_sale.customer_id == 20
-    assert not mock_db.query(PromissoryNote).filter().delete.called
\ No newline at end of file
+    mock_db.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_sales_async_eager_loads_notes(async_db):
+    mock_db = async_db
+    mock_db.scalars.return_value.all.return_value = [Sale(id=1)]
+
+    result = await get_sales_async(mock_db, user_id=1, client_name="João")
+
+    assert [s.id for s in result] == [1]
+    stmt = mock_db.scalars.await_args.args[0]
+    assert "JOIN customers" in str(stmt)
+    assert stmt._with_options  # selectinload(Sale.promissory_notes)
+
+
+def test_sales_next_cursor_only_on_full_page():
+    from datetime import datetime
+    from app.services.sale_service import sales_next_cursor
+    from app.utils.cursor import decode_cursor
+
+    sales = [Sale(id=i, created_at=datetime(2025, 1, i)) for i in (3, 2)]
+    assert sales_next_cursor(sales, limit=3) is None
+    assert decode_cursor(sales_next_cursor(sales, limit=2), 2) == ["2025-01-02T00:00:00", 2]
+
+
+def test_get_sales_invalid_cursor_values():
+    from app.utils.cursor import encode_cursor
+
+    with pytest.raises(ValueError, match="Cursor"):
+        get_sales(MagicMock(), cursor=encode_cursor(("ontem", 1)))
+
+
+def test_get_sales_loads_notes_like_the_async_version(db_session):
+    sale, _ = _sale_with_notes(db_session, installments=3)
+    db_session.expunge_all()
+    statements, stop = _note_statements(db_session)
+
+    sales = get_sales(db_session)
+    numbers = [n.installment_number for n in sales[0].promissory_notes]
+    stop()
+
+    # promissórias num único SELECT extra (selectin), como na listagem async
+    assert numbers == [1, 2, 3]
+    assert statements == ["SELECT"]
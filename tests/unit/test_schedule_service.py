@@ -0,0 +1,100 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.services.sale_service import _split_amount, add_months
+from app.services.schedule_service import (
+    build_schedules,
+    due_dates,
+    financed_cents,
+    from_cents,
+    split_cents,
+    to_cents,
+)
+
+# casos gerados com semente fixa: falhas reproduzíveis
+CASES = 20_000
+
+
+def _random_amount(rng: random.Random) -> Decimal:
+    # valores até Numeric(10, 2), com terceira casa às vezes (arredondamento)
+    scale = rng.choice((2, 2, 2, 3))
+    return Decimal(rng.randrange(0, 10 ** 8 * 10 ** (scale - 2))).scaleb(-scale)
+
+
+def test_split_cents_matches_split_amount():
+    rng = random.Random(2026)
+    for _ in range(CASES):
+        total = _random_amount(rng)
+        n = rng.choice((1, 2, 3, 6, 7, 12, 13, 24, 48, rng.randrange(1, 500)))
+
+        base, last = split_cents(to_cents(total), n)
+
+        assert [from_cents(base)] * (n - 1) + [from_cents(last)] == _split_amount(total, n), (
+            total,
+            n,
+        )
+
+
+def test_split_cents_rounds_half_up_and_sums_to_total():
+    # 0,05 / 2 = 0,025 -> 0,03 e a última absorve a diferença
+    assert split_cents(5, 2) == (3, 2)
+    assert split_cents(10000, 3) == (3333, 3334)
+    assert split_cents(0, 4) == (0, 0)
+    assert split_cents(-5, 2) == (-3, -2)
+
+    rng = random.Random(7)
+    for _ in range(CASES):
+        total, n = rng.randrange(-10**9, 10**9), rng.randrange(1, 100)
+        base, last = split_cents(total, n)
+        assert base * (n - 1) + last == total
+
+
+def test_due_dates_match_add_months():
+    rng = random.Random(31)
+    start = date(1999, 1, 1)
+    for _ in range(CASES):
+        first = start + timedelta(days=rng.randrange(0, 365 * 40))
+        n = rng.randrange(1, 60)
+        assert list(due_dates(first, n)) == [add_months(first, i) for i in range(n)], first
+
+
+def test_due_dates_clamp_to_month_end():
+    assert due_dates(date(2024, 1, 31), 4) == (
+        date(2024, 1, 31),
+        date(2024, 2, 29),
+        date(2024, 3, 31),
+        date(2024, 4, 30),
+    )
+    assert due_dates(date(2023, 11, 30), 4)[-1] == date(2024, 2, 29)
+
+
+def test_build_schedules_columns():
+    batch = build_schedules(
+        [
+            (financed_cents(Decimal("100.00"), Decimal("20.00")), 3, date(2023, 1, 31)),
+            (10, 1, date(2024, 6, 1)),
+        ]
+    )
+
+    assert len(batch) == 2
+    assert batch.financed_cents == [8000, 10]
+    assert batch.offsets == [0, 3, 4]
+    assert list(batch.schedule(0)) == [
+        (1, 2667, date(2023, 1, 31)),
+        (2, 2667, date(2023, 2, 28)),
+        (3, 2666, date(2023, 3, 31)),
+    ]
+    assert list(batch.schedule(1)) == [(1, 10, date(2024, 6, 1))]
+
+
+@pytest.mark.parametrize(
+    "value, cents",
+    [(Decimal("0.005"), 1), (Decimal("12.3"), 1230), (Decimal("99999999.99"), 9999999999)],
+)
+def test_cents_round_trip(value, cents):
+    assert to_cents(value) == cents
+    assert from_cents(cents) == value.quantize(Decimal("0.01"), rounding="ROUND_HALF_UP")
+    assert str(from_cents(1230)) == "12.30"
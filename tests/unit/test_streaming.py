@@ -0,0 +1,62 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from pydantic import BaseModel
+
+from app.utils import streaming
+from app.utils.streaming import NDJSON_MEDIA_TYPE, ndjson_response, wants_ndjson
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+
+def _request(accept):
+    return SimpleNamespace(headers={"accept": accept} if accept else {})
+
+
+def _body(response):
+    async def collect():
+        return [chunk async for chunk in response.body_iterator]
+
+    return asyncio.run(collect())
+
+
+def test_wants_ndjson_parses_accept_header():
+    assert wants_ndjson(_request(NDJSON_MEDIA_TYPE))
+    assert wants_ndjson(_request("text/html, Application/X-NDJSON;q=0.9"))
+    assert not wants_ndjson(_request("application/json"))
+    assert not wants_ndjson(_request(None))
+
+
+def test_ndjson_response_batches_lines(monkeypatch):
+    monkeypatch.setattr(streaming, "STREAM_BATCH_SIZE", 2)
+    items = ({"id": i, "name": f"n{i}"} for i in range(5))
+
+    response = ndjson_response(items, Item)
+    chunks = _body(response)
+
+    assert response.media_type == NDJSON_MEDIA_TYPE
+    assert len(chunks) == 3
+    lines = b"".join(chunks).decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [0, 1, 2, 3, 4]
+
+
+def test_ndjson_response_accepts_async_iterables():
+    async def items():
+        for i in range(3):
+            yield SimpleNamespace(id=i, name="x")
+
+    class FromAttributes(Item):
+        model_config = {"from_attributes": True}
+
+    chunks = _body(ndjson_response(items(), FromAttributes))
+    assert b"".join(chunks) == (
+        b'{"id":0,"name":"x"}\n{"id":1,"name":"x"}\n{"id":2,"name":"x"}\n'
+    )
+
+
+def test_ndjson_response_empty():
+    assert _body(ndjson_response([], Item)) == []
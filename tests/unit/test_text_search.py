@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401
+from app.database import Base
+from app.models.customer import Customer, build_search_text
+from app.utils.text_search import (
+    SearchMatch,
+    SearchRank,
+    digits_only,
+    normalize_search,
+    search_tokens,
+)
+
+
+def test_normalize_search():
+    assert normalize_search("  JOÃO   d'Ávila ") == "joao d'avila"
+    assert normalize_search("111.222.333-44") == "11122233344"
+    assert normalize_search(None) == ""
+    assert digits_only("(11) 9 8888-7777") == "11988887777"
+    assert search_tokens("Zé  Açaí") == ["ze", "acai"]
+
+
+def test_build_search_text():
+    assert build_search_text("Ângela Çá", "12345678901", "(11) 5555-0000") == (
+        "angela ca 12345678901 1155550000"
+    )
+    assert build_search_text("Ana", None, "") == "ana"
+
+
+def _compile_pg(stmt):
+    return str(
+        stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"render_postcompile": True})
+    )
+
+
+def test_postgres_uses_trigram_operators():
+    stmt = select(Customer.id).where(
+        Customer.active.is_(True), SearchMatch(Customer.search_text, "joao silva")
+    ).order_by(SearchRank(Customer.search_text, "joao silva").desc())
+
+    sql = _compile_pg(stmt)
+    assert "<%" in sql
+    assert "word_similarity" in sql
+    # a condição inteira fica entre parênteses ao ser combinada com AND
+    assert "AND (customers.search_text LIKE" in sql
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def test_sqlite_fallback_matches_all_tokens_and_ranks_prefix_first(db):
+    db.add_all(
+        [
+            Customer(full_name="Maria da Silva", cpf="1", phone="1"),
+            Customer(full_name="Silvana Souza", cpf="2", phone="2"),
+            Customer(full_name="João Silva", cpf="3", phone="3"),
+            Customer(full_name="Silva Neto", cpf="4", phone="4"),
+        ]
+    )
+    db.commit()
+
+    def names(query):
+        stmt = (
+            select(Customer.full_name)
+            .where(SearchMatch(Customer.search_text, query))
+            .order_by(SearchRank(Customer.search_text, query).desc(), Customer.id)
+        )
+        return db.scalars(stmt).all()
+
+    # palavra exata no início > prefixo > palavra no meio
+    assert names("silva") == [
+        "Silva Neto",
+        "Silvana Souza",
+        "Maria da Silva",
+        "João Silva",
+    ]
+    assert names("JOAO silva") == ["João Silva"]
+    assert names("100%") == []
+    assert names("   ") == []